@@ -0,0 +1,42 @@
+Feature: Slide Asset Index
+  As a user managing images for a deck
+  I want DeckBot to know which slides use which files
+  So that changes only invalidate what they affect and broken references are caught early
+
+  Background:
+    Given I have a presentation named "Asset Deck"
+    And the "Asset Deck" deck has 4 slides
+
+  Scenario: Images, backgrounds and CSS urls are mapped to their slides
+    Given slide 2 of "Asset Deck" shows the image "images/chart.png"
+    And slide 3 of "Asset Deck" has the markdown "![bg left](images/photo%20one.jpg)"
+    And slide 4 of "Asset Deck" has the markdown "<div style="background: url('images/texture.png')"></div>"
+    Then the asset index of "Asset Deck" should map "images/chart.png" to slides "2"
+    And the asset index of "Asset Deck" should map "images/photo one.jpg" to slides "3"
+    And the asset index of "Asset Deck" should map "images/texture.png" to slides "4"
+    And the asset index of "Asset Deck" should map "images" to slides "2, 3, 4"
+
+  Scenario: A front matter background affects every slide
+    Given the front matter of "Asset Deck" sets "backgroundImage: url('images/paper.png')"
+    Then the asset index of "Asset Deck" should map "images/paper.png" to slides "1, 2, 3, 4"
+
+  Scenario: Missing and unused assets are reported without rendering
+    Given slide 2 of "Asset Deck" shows the image "images/chart.png"
+    And slide 3 of "Asset Deck" has the markdown "![diagram](images/missing.png)"
+    And "Asset Deck" has an image file "images/old-draft.png"
+    When I validate the deck of "Asset Deck"
+    Then the validation result should list "images/missing.png" as missing on slide 3
+    And the validation result should list "images/old-draft.png" as unused
+
+  Scenario: Deleting an image that slides still use warns about them
+    Given slide 2 of "Asset Deck" shows the image "images/chart.png"
+    When I delete "images/chart.png" from "Asset Deck"
+    Then the tool result should warn that slide 2 still references "images/chart.png"
+
+  Scenario: Changing a deck-wide background re-renders every slide preview
+    Given the front matter of "Asset Deck" sets "backgroundImage: url('images/paper.png')"
+    And Marp image rendering is simulated
+    And the slide previews for "Asset Deck" are up to date
+    When I replace the image "images/paper.png" in "Asset Deck"
+    And I refresh the slide previews for "Asset Deck"
+    Then all 4 slide previews should have been re-rendered
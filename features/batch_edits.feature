@@ -0,0 +1,46 @@
+Feature: Batch Deck Edits
+  As an agent restructuring a deck
+  I want to submit several edits as one change
+  So that the deck is validated, written and compiled once and never left half-edited
+
+  Background:
+    Given I have a presentation named "Batch Deck"
+    And the deck of "Batch Deck" has the slides "Intro, Problem, Solution, Close"
+
+  Scenario: Several edits are applied with a single compile
+    When I apply these edits to "Batch Deck"
+      | action             | slide_number | new_position | content                | old_text | new_text  |
+      | replace_text       |              |              |                        | Problem  | Challenge |
+      | delete_slide       | 3            |              |                        |          |           |
+      | insert_slide_after | 1            |              | # Agenda\n\nWhat's next |          |           |
+      | move_slide         | 4            | 2            |                        |          |           |
+    Then the slides of "Batch Deck" should be "Intro, Close, Agenda, Challenge"
+    And the deck of "Batch Deck" should be compiled 1 time
+    And the tool result should include "Successfully applied 4 edits"
+    And the tool result should include "Slide 3: Title='Agenda'"
+
+  Scenario: A failing edit leaves the deck untouched
+    When I apply these edits to "Batch Deck"
+      | action       | slide_number | new_position | content | old_text | new_text |
+      | delete_slide | 4            |              |         |          |          |
+      | replace_text |              |              |         | Close    | Goodbye  |
+    Then the tool result should include "Edit 2 failed, so no changes were made"
+    And the deck file of "Batch Deck" should not have changed
+    And the deck of "Batch Deck" should be compiled 0 times
+
+  Scenario: The batch is validated as a whole before anything is written
+    When I apply these edits to "Batch Deck"
+      | action        | slide_number | new_position | content                     | old_text | new_text |
+      | replace_slide | 2            |              | # Broken\n\n<!-- not closed |          |          |
+    Then the tool result should include "Unclosed HTML comment"
+    And the deck file of "Batch Deck" should not have changed
+
+  Scenario: The agent can apply batch edits
+    Given a presentation exists
+    Then the agent should have a tool named "apply_edits"
+
+  Scenario: The agent's tools have function declarations Gemini accepts
+    Given a presentation exists
+    When I build the function declarations of the agent's tools
+    Then every object in the tool declarations should declare its properties
+    And the edits of "apply_edits" should declare "action, slide_number, content, old_text, new_text, new_position"
@@ -0,0 +1,56 @@
+Feature: Skipping Unchanged Compiles
+  As a user whose deck gets compiled after every edit
+  I want compiles of an unchanged deck to be skipped
+  So that redundant compile requests don't re-run Marp
+
+  Background:
+    Given I have a presentation named "Stable Deck"
+    And the deck of "Stable Deck" shows the image "images/chart.png"
+    And Marp HTML compiles are simulated
+
+  Scenario: Compiling an unchanged deck is skipped
+    When I compile "Stable Deck" with the compile tool
+    And I compile "Stable Deck" with the compile tool
+    Then Marp should have compiled 1 time
+    And the last compile result should report that it was skipped
+
+  Scenario: An unchanged compile still opens the deck in the REPL
+    When I compile "Stable Deck" with the compile tool
+    And I compile "Stable Deck" with the compile tool outside the web UI
+    Then Marp should have compiled 1 time
+    And the last compile result should report that it was skipped
+    And the compiled HTML of "Stable Deck" should have been opened locally
+
+  Scenario: Changing a referenced image triggers a compile
+    When I compile "Stable Deck" with the compile tool
+    And the image "images/chart.png" of "Stable Deck" is replaced
+    And I compile "Stable Deck" with the compile tool
+    Then Marp should have compiled 2 times
+
+  Scenario: Changing the deck CSS triggers a compile
+    When I compile "Stable Deck" with the compile tool
+    And a "<style>section { color: red; }</style>" block is added to the deck of "Stable Deck"
+    And I compile "Stable Deck" with the compile tool
+    Then Marp should have compiled 2 times
+
+  Scenario: A missing build output is rebuilt
+    When I compile "Stable Deck" with the compile tool
+    And the compiled HTML of "Stable Deck" is deleted
+    And I compile "Stable Deck" with the compile tool
+    Then Marp should have compiled 2 times
+
+  Scenario: Saving identical settings doesn't recompile
+    Given "Stable Deck" is open in the web UI
+    When I update the presentation title to "Quarterly Review" through the web API
+    And the compile job finishes
+    And I update the presentation title to "Quarterly Review" through the web API
+    And the compile job finishes
+    Then polling the compile job should report "succeeded"
+    And the compile job should be reported as skipped
+    And Marp should have compiled 1 time
+
+  Scenario: An auto-compile with nothing to rebuild is not reported as a failure
+    When I compile "Stable Deck" with the compile tool
+    And I create an unreferenced file "notes.txt" in "Stable Deck"
+    Then the tool result should say the presentation is already up to date
+    And Marp should have compiled 1 time
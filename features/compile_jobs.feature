@@ -0,0 +1,45 @@
+Feature: Background Compile Jobs
+  As a user editing files and settings in the web UI
+  I want saves to return immediately while the deck compiles in the background
+  So that the editor never waits for a Marp render
+
+  Background:
+    Given I have a presentation named "Job Deck"
+    And "Job Deck" is open in the web UI
+
+  Scenario: Saving a file returns a compile job immediately
+    Given Marp runs are held until released
+    When I save "deck.marp.md" through the web API
+    Then the response should be accepted with a compile job
+    And the compile job should not be finished yet
+    When the held Marp runs are released
+    And the compile job finishes
+    Then polling the compile job should report "succeeded"
+    And the web UI should have received "compile_started" and "compile_finished" events
+
+  Scenario: Saving settings compiles in the background
+    Given Marp runs are held until released
+    When I update the presentation title to "Renamed" through the web API
+    Then the response should be accepted with a compile job
+    When the held Marp runs are released
+    And the compile job finishes
+    Then polling the compile job should report "succeeded"
+
+  Scenario: A failed compile is reported over the event stream
+    Given Marp fails with "Unexpected token in deck"
+    When I save "deck.marp.md" through the web API
+    And the compile job finishes
+    Then polling the compile job should report "failed"
+    And the compile job error should mention "Unexpected token in deck"
+    And the web UI should have received "compile_started" and "compile_error" events
+
+  Scenario: A compile that exceeds the timeout is reported as failed
+    Given Marp never finishes within the compile timeout
+    When I save "deck.marp.md" through the web API
+    And the compile job finishes
+    Then polling the compile job should report "failed"
+    And the compile job error should mention "timed out"
+
+  Scenario: Unknown compile jobs are not found
+    When I poll the compile job "does-not-exist"
+    Then the compile job response should be not found
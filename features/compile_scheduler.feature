@@ -0,0 +1,40 @@
+Feature: Debounced Auto-Compilation
+  As a user watching the preview while the agent edits my deck
+  I want bursts of edits to be compiled once
+  So that I don't wait for a full Marp compile after every single edit
+
+  Scenario: A burst of edits is compiled once
+    Given I have an auto-compilation test presentation named "Debounce Test"
+    And auto-compilation is debounced with a quiet period of 0.2 seconds
+    When I write 3 files in quick succession
+    Then each tool output should say the compile was scheduled
+    And after the quiet period the presentation should have been compiled 1 time
+    And the compile status updates should be "pending, complete"
+
+  Scenario: Export flushes a pending compile first
+    Given I have an auto-compilation test presentation named "Debounce Test"
+    And auto-compilation is debounced with a quiet period of 30 seconds
+    When I write 2 files in quick succession
+    And I export the presentation to PDF
+    Then the presentation should have been compiled 1 time before the PDF export
+
+  Scenario: Max latency caps how long a compile can be deferred
+    Given a compile scheduler with a quiet period of 0.5 seconds and max latency of 0.2 seconds
+    When I request a compile
+    And I wait 0.4 seconds
+    Then the scheduler should have compiled 1 time
+
+  Scenario: Flush waits for a compile its timer has just started
+    Given a compile scheduler with a quiet period of 0.05 seconds and max latency of 1 seconds
+    And timer compiles take 0.3 seconds to start
+    When I request a compile
+    And the scheduled compile has left the pending state
+    And I flush the compile scheduler
+    Then the scheduler should have compiled 1 time
+
+  Scenario: Explicit compile cancels a scheduled compile
+    Given a compile scheduler with a quiet period of 0.2 seconds and max latency of 1 seconds
+    When I request a compile
+    And I cancel the scheduled compile
+    And I wait 0.4 seconds
+    Then the scheduler should have compiled 0 times
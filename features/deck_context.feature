@@ -0,0 +1,54 @@
+Feature: Compact deck context
+  As a user working on a large presentation
+  I want the agent to receive an outline and the slides I'm looking at
+  So that each request doesn't carry every file of the presentation
+
+  Background:
+    Given I have a presentation "context-deck" with layouts
+
+  Scenario: Small presentations are sent in full
+    Given "context-deck" has a deck of 3 slides
+    And the agent for "context-deck" has built its system prompt
+    Then the system prompt should contain "Body of slide 3"
+    And the system prompt should contain "### layouts.md"
+
+  Scenario: Temporary render decks are left out of the prompt
+    Given "context-deck" has a deck of 3 slides
+    And a background render has written ".render-shard-abc123-000.marp.md" to "context-deck"
+    And the agent for "context-deck" has built its system prompt
+    Then the system prompt should contain "Body of slide 3"
+    And the system prompt should not contain ".render-shard"
+
+  Scenario: Large presentations are sent as an outline plus the slides in view
+    Given "context-deck" has a deck of 60 slides
+    And the agent for "context-deck" has built its system prompt
+    When the agent builds its system prompt again for slide 20
+    Then the system prompt should contain "20. Topic 20"
+    And the system prompt should contain "60. Topic 60"
+    And the system prompt should contain "Body of slide 19"
+    And the system prompt should contain "Body of slide 20"
+    And the system prompt should contain "Body of slide 21"
+    And the system prompt should not contain "Body of slide 40"
+    And the system prompt should not contain "### layouts.md"
+
+  Scenario: Changes since the model's last turn are shown as a diff
+    Given "context-deck" has a deck of 60 slides
+    And the agent for "context-deck" has built its system prompt
+    And the agent has finished a turn
+    When slide 40 of "context-deck" is changed to "# Topic 40\n\nRevised by hand"
+    And the agent builds its system prompt again for slide 20
+    Then the system prompt should contain "Changes since your last turn"
+    And the system prompt should contain "Changed or new slides: 40"
+    And the system prompt should contain "+Revised by hand"
+
+  Scenario: The full mode still sends every file
+    Given "context-deck" has a deck of 60 slides
+    And the deck context mode is "full"
+    And the agent for "context-deck" has built its system prompt
+    Then the system prompt should contain "Body of slide 40"
+
+  Scenario: Other slides are read on demand
+    Given "context-deck" has a deck of 60 slides
+    When I read slide 42 of "context-deck" with the read_slide tool
+    Then the tool result should contain "Slide 42 of 60"
+    And the tool result should contain "Body of slide 42"
@@ -0,0 +1,55 @@
+Feature: Shared Deck Document Model
+  As a developer working on DeckBot
+  I want one parser for Marp decks, shared by every consumer
+  So that slide counts and front matter agree everywhere and each revision is parsed once
+
+  Scenario: Slides are split with their offsets and hashes
+    Given a deck document:
+      """
+      ---
+      marp: true
+      title: Café
+      style: |
+        h1 { color: #112233; }
+      ---
+
+      # Überblick
+
+      ```yaml
+      ---
+      ```
+
+      ---
+
+      # Next
+      """
+    Then the document should have 2 slides
+    And the document front matter title should be "Café"
+    And the document style should contain "color: #112233"
+    And the byte offsets of every slide should match its text
+    And slide 1 of the document should have the title "Überblick"
+
+  Scenario: Identical content shares one parse
+    Given a deck document:
+      """
+      ---
+      marp: true
+      ---
+
+      # One
+      """
+    When the same content is parsed again
+    Then both parses should be the same document
+
+  Scenario: The presentation list counts slides, not the front matter
+    Given I have a presentation named "Counted Deck"
+    And the "Counted Deck" deck has 3 slides
+    When I list presentations through the web API
+    Then "Counted Deck" should be listed with 3 slides
+
+  Scenario: Changing the title rewrites only the front matter
+    Given I have a presentation named "Titled Deck"
+    And the "Titled Deck" deck has 3 slides
+    When I set the title of "Titled Deck" to "New Title"
+    Then the front matter of "Titled Deck" should have the title "New Title"
+    And the slides of "Titled Deck" should be unchanged
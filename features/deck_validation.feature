@@ -66,3 +66,54 @@ Feature: Deck Validation and Summary
   # but maybe they mean a specific anti-pattern? 
   # "CSS in the frontmatter ends up visible" -> Frontmatter not closed properly.
 
+
+  Scenario: Unchanged front matter CSS is not parsed again
+    Given a validation test presentation "validation-test" exists
+    And CSS parsing is counted
+    When I update "deck.marp.md" with the following content:
+      """
+      ---
+      marp: true
+      style: |
+        h1 { color: #123456; }
+      ---
+
+      # Slide 1
+      """
+    And I update "deck.marp.md" with the following content:
+      """
+      ---
+      marp: true
+      style: |
+        h1 { color: #123456; }
+      ---
+
+      # Slide 1, edited
+
+      ---
+
+      # Slide 2
+      """
+    Then the file update validation should succeed
+    And the CSS should have been parsed 1 time
+
+  Scenario: Update deck.marp.md with a comment opener inside a code block
+    Given a validation test presentation "validation-test" exists
+    When I update "deck.marp.md" with the following content:
+      """
+      ---
+      marp: true
+      ---
+
+      # Speaker notes
+
+      ```html
+      <!-- notes start here
+      ```
+
+      ---
+
+      # Slide 2
+      """
+    Then the file update validation should succeed
+    And the tool output should contain "Slide 1: Title='Speaker notes', Images=0"
@@ -23,6 +23,12 @@ def before_scenario(context, scenario):
         except:
             pass
     
+    # Render through plain subprocess calls so tests can mock subprocess.run.
+    # Scenarios that exercise the render daemon opt back in explicitly.
+    os.environ['DECKBOT_RENDER_DAEMON'] = '0'
+    # Likewise no background preview warm-up unless a scenario asks for it
+    os.environ['DECKBOT_PREVIEW_WARMUP'] = '0'
+    
     # Skip mocking for integration tests (tagged with @integration)
     if 'integration' in scenario.tags:
         return
@@ -78,4 +84,10 @@ def after_scenario(context, scenario):
         webapp.current_service = None
     except:
         pass
+    
+    # Stop any render daemon started during the scenario
+    from deckbot.render_service import set_render_service
+    set_render_service(None)
 
+    from deckbot.render_scheduler import set_render_scheduler
+    set_render_scheduler(None)
@@ -0,0 +1,61 @@
+Feature: Local fast path for navigation and build commands
+  As a DeckBot user
+  I want simple commands like "go to slide 5" or "compile" to run at once
+  So that they don't wait on a full model round trip
+
+  Background:
+    Given I have a presentation "fast-deck" with layouts
+    And the deck of "fast-deck" has 3 slides and has been compiled
+    And the model is a fake streaming client with the script:
+      """
+      [["The model answered."]]
+      """
+
+  Scenario: Going to a slide runs the tool without the model
+    When I send "Go to slide 2" to the session of "fast-deck"
+    Then the model reply should be "Navigating to slide 2."
+    And the model should not have been called
+    And the history of "fast-deck" should end with a "go_to_slide" call and the reply "Navigating to slide 2."
+
+  Scenario Outline: REPL slash commands and phrasings are recognised
+    When I send "<message>" to the session of "fast-deck"
+    Then the model reply should be "<reply>"
+    And the model should not have been called
+
+    Examples:
+      | message           | reply                                               |
+      | /next             | Navigating to slide 2.                              |
+      | next slide        | Navigating to slide 2.                              |
+      | /slide 3          | Navigating to slide 3.                              |
+      | previous slide    | You're already on the first slide.                  |
+      | go back one slide | You're already on the first slide.                  |
+      | go to slide 9     | The presentation has 3 slides; there is no slide 9. |
+
+  Scenario: Compile runs locally
+    When I send "/compile" to the session of "fast-deck"
+    Then the model should not have been called
+    And the history of "fast-deck" should end with a "compile_presentation" call
+
+  Scenario Outline: Other messages go to the model
+    When I send "<message>" to the session of "fast-deck"
+    Then the model reply should be "The model answered."
+    And the model should have been called 1 time
+
+    Examples:
+      | message                               |
+      | Go to slide 2 and make its title bold |
+      | next                                  |
+      | go back                               |
+      | previous                              |
+
+  Scenario: Patterns can be added in the preferences
+    Given the preference "fast_path_patterns" is {"go_to_slide": ["zeig folie (?P<slide>\\d+)"]}
+    When I send "Zeig Folie 3" to the session of "fast-deck"
+    Then the model reply should be "Navigating to slide 3."
+    And the model should not have been called
+
+  Scenario: The fast path can be turned off
+    Given the preference "fast_path" is false
+    When I send "Go to slide 2" to the session of "fast-deck"
+    Then the model reply should be "The model answered."
+    And the model should have been called 1 time
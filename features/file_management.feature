@@ -32,6 +32,13 @@ Feature: File Management Tools
     When the agent calls list_files()
     Then the file list result should contain "slide1.md"
     And the file list result should contain "slide2.md"
+
+  Scenario: Temporary render decks are not listed
+    Given I have a file "slide1.md"
+    And I have a file ".render-shard-abc123-000.marp.md"
+    When the agent calls list_files()
+    Then the file list result should contain "slide1.md"
+    And the file list result should not contain ".render-shard"
   
   Scenario: Agent lists files in subdirectory
     Given I have a subdirectory "images"
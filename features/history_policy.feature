@@ -0,0 +1,40 @@
+Feature: Token-budgeted conversation history
+  As a user in a long DeckBot session
+  I want each request to carry a bounded amount of history
+  So that requests stay small and fast however long the session gets
+
+  Background:
+    Given I have a presentation "history-deck" with layouts
+
+  Scenario: A short history is sent verbatim
+    Given the chat history of "history-deck" has 2 turns with large tool responses
+    When I chat with the agent of "history-deck"
+    Then no tool response in the request should be truncated
+    And the request should not contain a history summary
+
+  Scenario: Older tool responses are truncated, recent turns are kept verbatim
+    Given the chat history of "history-deck" has 6 turns with large tool responses
+    When I chat with the agent of "history-deck"
+    Then the tool responses of the last 3 previous turns should be sent verbatim
+    And the tool responses of older turns should be truncated
+    And the request should not contain a history summary
+
+  Scenario: Turns beyond the token budget are replaced by summaries
+    Given the chat history of "history-deck" has 20 turns with large tool responses
+    And the history token budget is 5000 tokens
+    When I chat with the agent of "history-deck"
+    Then the request should contain a summary of turns 1-8
+    And the summary should mention "Request 1"
+    And the tool responses of the last 3 previous turns should be sent verbatim
+    And the request history should be at most 5000 tokens
+    And the history summaries should be saved next to the chat history
+
+  Scenario: Summaries are computed once and reused on later turns
+    Given the chat history of "history-deck" has 20 turns with large tool responses
+    And the history token budget is 5000 tokens
+    When I chat with the agent of "history-deck"
+    And I restart the agent of "history-deck"
+    And the history token budget is 5000 tokens
+    And I chat with the agent of "history-deck"
+    Then the request should contain a summary of turns 1-8
+    And no history summary should have been computed
@@ -0,0 +1,48 @@
+Feature: Incremental Slide Previews
+  As a user iterating on a large deck
+  I want slide previews to re-render only the slides that changed
+  So that a one-character fix doesn't cost a full-deck render
+
+  Background:
+    Given I have a presentation named "Preview Deck"
+    And the "Preview Deck" deck has 6 slides
+    And Marp image rendering is simulated
+
+  Scenario: First render produces every slide and a manifest
+    When I refresh the slide previews for "Preview Deck"
+    Then Marp should have been run 1 time
+    And there should be 6 slide previews
+    And the preview manifest should list 6 slides
+
+  Scenario: Editing one slide re-renders only that slide
+    Given the slide previews for "Preview Deck" are up to date
+    When I change slide 3 of "Preview Deck" to "# Fixed typo"
+    And I refresh the slide previews for "Preview Deck"
+    Then Marp should have been run 1 time
+    And only slide 3 should have been re-rendered
+    And the preview of slide 3 should show "# Fixed typo"
+
+  Scenario: Unchanged decks are not re-rendered
+    Given the slide previews for "Preview Deck" are up to date
+    When I refresh the slide previews for "Preview Deck"
+    Then Marp should have been run 0 times
+
+  Scenario: Changing a referenced image re-renders the slides that use it
+    Given slide 2 of "Preview Deck" shows the image "images/chart.png"
+    And the slide previews for "Preview Deck" are up to date
+    When I replace the image "images/chart.png" in "Preview Deck"
+    And I refresh the slide previews for "Preview Deck"
+    Then only slide 2 should have been re-rendered
+
+  Scenario: Removing a slide drops its preview
+    Given the slide previews for "Preview Deck" are up to date
+    When I delete the last slide of "Preview Deck"
+    And I refresh the slide previews for "Preview Deck"
+    Then there should be 5 slide previews
+    And the preview manifest should list 5 slides
+
+  Scenario: Isolated slides keep inherited directives and page numbers
+    Given a deck with pagination where slide 2 sets "<!-- class: dark -->"
+    When I build the render deck for slide 4 alone
+    Then the render deck should contain "class: dark"
+    And the render deck should pin the page number to 4
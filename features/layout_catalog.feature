@@ -0,0 +1,55 @@
+Feature: Shared Layout Catalog
+  As a developer working on DeckBot
+  I want layouts.md parsed once per revision and shared by every consumer
+  So that chat turns and layout requests don't re-read and re-split the file
+
+  Scenario: Layout metadata is parsed from the layout comments
+    Given a layouts file:
+      """
+      ---
+      marp: true
+      style: |
+        section.two-column { display: grid; }
+      ---
+
+      <!-- layout: two-column -->
+      <!-- image-friendly: true -->
+      <!-- recommended-aspect-ratio: 9:16 -->
+      <!-- image-position: left-or-right-column -->
+      <!-- description: Two-column grid -->
+
+      # Two Columns
+
+      ```markdown
+      ---
+      ```
+
+      ---
+
+      <!-- layout: plain -->
+
+      # Plain
+      """
+    Then the catalog should list the layouts "two-column, plain"
+    And the "two-column" layout should be image-friendly with aspect ratio "9:16"
+    And the "two-column" layout should have the description "Two-column grid"
+    And the "plain" layout should not be image-friendly
+    And the catalog CSS should contain "section.two-column"
+
+  Scenario: Every consumer shares one parse of layouts.md
+    Given I have a presentation "shared-layouts" with layouts
+    And "shared-layouts" is open in the web UI
+    And layouts parsing is counted
+    When every layout consumer reads the layouts of "shared-layouts"
+    Then layouts.md should have been parsed 1 time
+    And every layout consumer should list the same layouts
+
+  Scenario: Editing layouts.md is picked up
+    Given I have a presentation "edited-layouts" with layouts
+    And "edited-layouts" is open in the web UI
+    And layouts parsing is counted
+    When every layout consumer reads the layouts of "edited-layouts"
+    And a "quote" layout is added to the layouts of "edited-layouts"
+    And every layout consumer reads the layouts of "edited-layouts"
+    Then layouts.md should have been parsed 2 times
+    And every layout consumer should list the "quote" layout
@@ -0,0 +1,42 @@
+Feature: Layout Preview Pre-rendering
+  As a user opening the layout picker
+  I want all layout previews rendered together and kept in sync with layouts.md
+  So that the picker doesn't start a render per layout or show outdated layouts
+
+  Background:
+    Given I have a presentation "layout-previews" with layouts
+    And "layout-previews" is open in the web UI
+    And Marp image rendering is simulated
+
+  Scenario: The first preview request renders every layout in one pass
+    When I request the preview of the "two-column" layout
+    And I request the preview of the "title" layout
+    Then the layout preview should be served
+    And Marp should have been run 1 time
+    And every layout of "layout-previews" should have a preview
+
+  Scenario: Editing a layout re-renders only its preview
+    Given the layout previews of "layout-previews" are up to date
+    When the "two-column" layout of "layout-previews" gains the line "Edited column"
+    And I request the preview of the "two-column" layout
+    Then Marp should have been run 1 time
+    And 1 layout should have been rendered
+    And the served layout preview should show "Edited column"
+    And every layout of "layout-previews" should have a preview
+
+  Scenario: Changing the layouts CSS re-renders every preview
+    Given the layout previews of "layout-previews" are up to date
+    When the layouts CSS of "layout-previews" gains "section { color: red; }"
+    And I request the preview of the "two-column" layout
+    Then Marp should have been run 1 time
+    And every layout of "layout-previews" should have been rendered
+
+  Scenario: Unknown layouts are not rendered
+    When I request the preview of the "no-such-layout" layout
+    Then the layout preview request should fail with status 404
+    And Marp should have been run 0 times
+
+  Scenario: Loading a presentation warms the layout previews
+    Given preview warm-up is enabled
+    When I load "layout-previews" through the web API
+    Then every layout of "layout-previews" should get a preview in the background
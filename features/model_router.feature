@@ -0,0 +1,54 @@
+Feature: Model routing with circuit breakers
+  As a DeckBot user
+  I want turns to go to a healthy, responsive model
+  So that a failing or slow model doesn't stall my session
+
+  Background:
+    Given a model router for "primary-model, backup-model, last-model" with fast model "backup-model"
+
+  Scenario: Repeated failures open a model's circuit
+    When "primary-model" fails with "503 UNAVAILABLE" 3 times
+    Then the circuit of "primary-model" should be "open"
+    And the next route should start with "backup-model"
+    And the next route should skip "primary-model"
+
+  Scenario: A rate limit opens the circuit at once and the turn fails over
+    When a turn is run where "primary-model" fails with "429 RESOURCE_EXHAUSTED"
+    Then the turn should have been answered by "backup-model"
+    And the circuit of "primary-model" should be "open"
+
+  Scenario: A turn that fails after running tools is not replayed on another model
+    When a turn is run where "primary-model" runs a tool and then fails with "503 UNAVAILABLE"
+    Then the turn should have failed with "503 UNAVAILABLE"
+    And only "primary-model" should have been called
+
+  Scenario: An open circuit half-opens after the cooldown to probe recovery
+    Given "primary-model" fails with "503 UNAVAILABLE" 3 times
+    When 61 seconds pass
+    And a turn is run where every model answers
+    Then the turn should have been answered by "primary-model"
+    And the circuit of "primary-model" should be "closed"
+
+  Scenario: A failed probe opens the circuit again
+    Given "primary-model" fails with "503 UNAVAILABLE" 3 times
+    When 61 seconds pass
+    And a turn is run where "primary-model" fails with "503 UNAVAILABLE"
+    Then the turn should have been answered by "backup-model"
+    And the circuit of "primary-model" should be "open"
+
+  Scenario: Simple turns go to the fast model while the primary is slow
+    Given "primary-model" has answered 3 times in 20 seconds each
+    Then a route for "next slide" should start with "backup-model"
+    And a route for a long multi-line request should start with "primary-model"
+
+  Scenario: Routing decisions are sent with the request details
+    Given I have a presentation "routed-deck" with layouts
+    And the model is a fake streaming client with the script:
+      """
+      [["Hello from the fallback."]]
+      """
+    And the primary model of the session is unavailable
+    When I send "Hi" to the session of "routed-deck"
+    Then the model reply should be "Hello from the fallback."
+    And the request details should include a routing decision starting with the primary model
+    And the model span of the last trace of "routed-deck" should record 2 attempts
@@ -0,0 +1,74 @@
+Feature: Parallel Sharded Rendering
+  As a user building or exporting a large deck
+  I want full renders split across my CPU cores
+  So that first previews, builds and exports finish sooner
+
+  Scenario: Slides are partitioned into contiguous shards
+    When I plan render shards for 20 slides with 4 jobs
+    Then there should be 4 shards of slides "1-5, 6-10, 11-15, 16-20"
+
+  Scenario: Small decks are not split
+    When I plan render shards for 5 slides with 4 jobs
+    Then there should be 1 shards of slides "1-5"
+
+  Scenario: First preview of a large deck renders shards in parallel
+    Given I have a presentation named "Big Deck"
+    And the "Big Deck" deck has 12 slides
+    And Marp image rendering is simulated
+    And rendering uses 3 parallel jobs
+    When I refresh the slide previews for "Big Deck"
+    Then Marp should have been run 3 times
+    And the previews of "Big Deck" should follow the deck order
+
+  Scenario: A shard that renders a different number of slides falls back to a serial render
+    Given I have a presentation named "Big Deck"
+    And the "Big Deck" deck has 12 slides
+    And Marp image rendering is simulated
+    And Marp renders an extra page for each shard deck
+    And rendering uses 3 parallel jobs
+    When I refresh the slide previews for "Big Deck"
+    Then Marp should have been run 4 times
+    And the previews of "Big Deck" should follow the deck order
+
+  Scenario: Building PNGs with --jobs keeps slide numbering
+    Given I have a presentation named "Big Deck"
+    And the "Big Deck" deck has 8 slides
+    And Marp image rendering is simulated
+    When I build "Big Deck" as "png" with 2 jobs
+    Then Marp should have been run 2 times
+    And the "Big Deck" folder should contain images "deck.001.png" to "deck.008.png"
+
+  Scenario: PDF export merges shards in page order
+    Given I have a presentation named "Big Deck"
+    And the "Big Deck" deck has 12 slides
+    And Marp image rendering is simulated
+    And a PDF merger is available
+    And rendering uses 3 parallel jobs
+    When I export "Big Deck" to PDF
+    Then Marp should have been run 3 times
+    And the exported PDF should contain slides 1 to 12 in order
+
+  Scenario: A PDF export leaves a render slot free for an interactive compile
+    Given I have a presentation named "Big Deck"
+    And the "Big Deck" deck has 16 slides
+    And Marp image rendering is simulated
+    And Marp renders wait until they are released
+    And a PDF merger is available
+    And rendering uses 4 parallel jobs
+    And a render scheduler with 4 workers
+    When I start exporting "Big Deck" to PDF
+    And an interactive render "compile" is submitted
+    Then "compile" should have run while the export was still running
+    And at most 3 Marp renders should have run at once
+    When Marp renders are released
+    Then Marp should have been run 3 times
+    And the exported PDF should contain slides 1 to 16 in order
+
+  Scenario: PDF export renders serially without a PDF merger
+    Given I have a presentation named "Big Deck"
+    And the "Big Deck" deck has 12 slides
+    And Marp image rendering is simulated
+    And no PDF merger is available
+    When I export "Big Deck" to PDF
+    Then Marp should have been run 1 time
+    And the exported PDF should contain slides 1 to 12 in order
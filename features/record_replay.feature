@@ -0,0 +1,60 @@
+Feature: Record and replay Gemini sessions
+  As a developer benchmarking DeckBot
+  I want to record real Gemini sessions and replay them offline
+  So that agent turns, tools and rendering can be timed reproducibly without a network
+
+  Background:
+    Given I have a presentation "replay-deck" with layouts
+    And Gemini answers with the script:
+      """
+      [["Let me update the title. ", {"call": "replace_slide", "args": {"slide_number": 1, "content": "# Recorded title"}}, "Done, the title is updated."]]
+      """
+
+  Scenario: Recording a turn writes each model round to the cassette
+    Given Gemini calls are recorded to a cassette
+    When I send "Fix the title" through the agent of "replay-deck"
+    Then the "agent" cassette should contain 2 calls
+    And the first recorded "agent" call should contain a function call to "replace_slide"
+    And slide 1 of "replay-deck" should contain "# Recorded title"
+
+  Scenario: A recorded turn replays offline and runs the tools again
+    Given Gemini calls are recorded to a cassette
+    And I send "Fix the title" through the agent of "replay-deck"
+    And the deck of "replay-deck" is reset
+    When Gemini is unavailable
+    And Gemini calls are replayed from the cassette
+    And I send "Fix the title" through the agent of "replay-deck"
+    Then the reply should be "Let me update the title.\n\nDone, the title is updated."
+    And slide 1 of "replay-deck" should contain "# Recorded title"
+
+  Scenario: Replays can keep the recorded latency
+    Given Gemini streams one chunk every 0.05 seconds
+    And Gemini calls are recorded to a cassette
+    And I send "Fix the title" through the agent of "replay-deck"
+    When Gemini is unavailable
+    And Gemini calls are replayed from the cassette with "original" latency
+    And I send "Fix the title" through the agent of "replay-deck"
+    Then the turn should have taken at least 0.3 seconds
+
+  Scenario: Generated images are recorded and replayed
+    Given Gemini answers every request with an image
+    And Gemini calls are recorded to a cassette
+    And I generate image candidates for "replay-deck"
+    When Gemini is unavailable
+    And Gemini calls are replayed from the cassette
+    And I generate image candidates for "replay-deck"
+    Then the "images" cassette should contain 4 calls
+    And the replayed candidates should be the recorded images
+
+  Scenario: Replayed tool calls get arguments of the declared types
+    Given Gemini answers with the script:
+      """
+      [["Applying the edit. ", {"call": "apply_edits", "args": {"edits": [{"action": "replace_slide", "slide_number": 1.0, "content": "# Batched title"}]}}, "Done."]]
+      """
+    And Gemini calls are recorded to a cassette
+    And I send "Fix the title" through the agent of "replay-deck"
+    And the deck of "replay-deck" is reset
+    When Gemini is unavailable
+    And Gemini calls are replayed from the cassette
+    And I send "Fix the title" through the agent of "replay-deck"
+    Then slide 1 of "replay-deck" should contain "# Batched title"
@@ -0,0 +1,38 @@
+Feature: Render Coordination
+  As a user working in the web UI
+  I want simultaneous render requests for my deck to share one Marp run
+  So that previews, inspections and compiles don't waste CPU or overwrite each other's output
+
+  Scenario: Concurrent compiles of the same deck share one render
+    Given I have a presentation named "Busy Deck"
+    And Marp runs are held until released
+    When 3 compiles of "Busy Deck" are requested at once
+    And the held Marp runs are released
+    Then Marp should have been invoked 1 time
+    And every compile request should have succeeded
+    And every compile request should have received the same result
+
+  Scenario: Renders of outdated content are skipped once the deck changes
+    Given I have a presentation named "Busy Deck"
+    And Marp runs are held until released
+    When a compile of "Busy Deck" is requested in the background
+    And the deck of "Busy Deck" is changed to "Second draft"
+    And a compile of "Busy Deck" is requested in the background
+    And the deck of "Busy Deck" is changed to "Final draft"
+    And a compile of "Busy Deck" is requested in the background
+    And the held Marp runs are released
+    Then Marp should have been invoked 2 times
+    And the last Marp invocation should have rendered "Final draft"
+    And every compile request should have succeeded
+    And 2 renders should have been cancelled
+
+  Scenario: A render running in the daemon is abandoned when it is superseded
+    Given I have a presentation named "Daemon Deck"
+    And a fake render daemon that never finishes its first job is configured
+    When a compile of "Daemon Deck" is requested in the background
+    And the render daemon has picked up the job
+    And the deck of "Daemon Deck" is changed to "Second draft"
+    And a compile of "Daemon Deck" is requested in the background
+    Then every compile request should have succeeded
+    And the render daemon should have been started 2 times
+    And 1 render should have been cancelled
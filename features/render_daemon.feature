@@ -0,0 +1,36 @@
+Feature: Persistent Marp Render Daemon
+  As a user editing a presentation
+  I want compiles to reuse a long-lived Marp render process
+  So that every edit doesn't pay for starting npx and Node again
+
+  Scenario: Compiles reuse a single render daemon
+    Given I have a presentation named "Daemon Deck"
+    And a fake render daemon is configured
+    When I compile the "Daemon Deck" presentation 3 times
+    Then every compile should succeed
+    And the render daemon should have been started 1 time
+    And the render daemon should have handled 3 jobs
+    And Marp CLI should not have been spawned via npx
+
+  Scenario: A crashed render daemon is restarted
+    Given I have a presentation named "Daemon Deck"
+    And a fake render daemon that crashes on its second job is configured
+    When I compile the "Daemon Deck" presentation 3 times
+    Then every compile should succeed
+    And the render daemon should have been started 2 times
+    And Marp CLI should have been spawned via npx 1 time
+
+  Scenario: Falls back to npx when the daemon cannot load Marp
+    Given I have a presentation named "Daemon Deck"
+    And a fake render daemon that cannot load Marp is configured
+    When I compile the "Daemon Deck" presentation 2 times
+    Then every compile should succeed
+    And Marp CLI should have been spawned via npx 2 times
+    And the render daemon should be marked unavailable
+
+  Scenario: The real render daemon renders one job after another
+    Given I have a presentation named "Daemon Deck"
+    And the real render daemon is configured
+    When I render the "Daemon Deck" deck with the render daemon 2 times
+    Then the render daemon should have completed 2 jobs
+    And the "Daemon Deck" deck should have been compiled to HTML
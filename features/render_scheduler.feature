@@ -0,0 +1,37 @@
+Feature: Render Scheduling
+  As a user editing a presentation
+  I want the render I'm waiting on to run before background previews and exports
+  So that a long PDF export never holds up my next compile
+
+  Scenario: Interactive renders jump the queue
+    Given a render scheduler with 1 worker
+    When an export render "big export" is started and kept running
+    And a background render "preview grid" is submitted
+    And an interactive render "compile" is submitted
+    And "big export" finishes
+    Then the renders should have run in the order "big export, compile, preview grid"
+
+  Scenario: A slot is kept free for interactive renders
+    Given a render scheduler with 2 workers
+    When an export render "export 1" is started and kept running
+    And an export render "export 2" is submitted
+    And an interactive render "compile" is submitted
+    Then "compile" should have run while "export 1" was still running
+    And the render queue should report 1 queued export render
+    When "export 1" finishes
+    Then the renders should have run in the order "export 1, compile, export 2"
+
+  Scenario: A render started from inside another render runs inline
+    Given a render scheduler with 1 worker
+    When an interactive render submits a nested background render
+    Then both renders should have completed
+
+  Scenario: Queue depth is exposed over the web API
+    Given a render scheduler with 1 worker
+    When an export render "big export" is started and kept running
+    And a background render "preview grid" is submitted
+    And I request the render queue status
+    Then the render queue status should show 1 queued background render
+    And the render queue status should show 1 running export render
+    When "big export" finishes
+    Then the renders should have run in the order "big export, preview grid"
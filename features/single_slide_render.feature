@@ -0,0 +1,34 @@
+Feature: Single-Slide Rendering
+  As a user asking the agent to inspect or remix one slide
+  I want only that slide to be rendered
+  So that Visual QA and remix latency don't grow with the size of my deck
+
+  Background:
+    Given I have a presentation named "Preview Deck"
+    And the "Preview Deck" deck has 8 slides
+    And Marp image rendering is simulated
+
+  Scenario: Inspecting a slide renders only that slide
+    Given the slide previews for "Preview Deck" are up to date
+    When I change the theme of "Preview Deck" to "gaia"
+    And the preview for slide 5 of "Preview Deck" is requested
+    Then Marp should have been run 1 time
+    And the last Marp run should have rendered 1 slide
+    And only slide 5 should have been re-rendered
+
+  Scenario: A fresh slide preview is reused
+    Given the slide previews for "Preview Deck" are up to date
+    When the preview for slide 5 of "Preview Deck" is requested
+    Then Marp should have been run 0 times
+    And the preview should not be reported as regenerated
+
+  Scenario: Decks split by headingDivider fall back to a full render
+    Given the slide previews for "Preview Deck" are up to date
+    When I set "headingDivider: 2" in the front matter of "Preview Deck"
+    And the preview for slide 5 of "Preview Deck" is requested
+    Then the last Marp run should have rendered the whole deck
+
+  Scenario: Skipped pages don't count towards later page numbers
+    Given a deck with pagination where slide 2 sets "<!-- _paginate: skip -->"
+    When I build the render deck for slide 4 alone
+    Then the render deck should pin the page number to 3
@@ -0,0 +1,66 @@
+Feature: Slide-Level Editing
+  As an agent editing a deck
+  I want to replace, insert, delete and move individual slides
+  So that an edit only rewrites, validates and re-renders the slides it touches
+
+  Background:
+    Given I have a presentation named "Edit Deck"
+    And the deck of "Edit Deck" has the slides "Intro, Problem, Solution, Close"
+
+  Scenario: Replacing a slide rewrites only that slide
+    When I replace slide 2 of "Edit Deck" with "# Challenge\n\nCosts are rising"
+    Then the slides of "Edit Deck" should be "Intro, Challenge, Solution, Close"
+    And the deck file of "Edit Deck" should be unchanged before slide 2
+    And the tool result should include "Slide 2: Title='Challenge'"
+
+  Scenario: Inserting slides before the first slide
+    When I insert "# Agenda\n\n---\n\n# Goals" after slide 0 of "Edit Deck"
+    Then the slides of "Edit Deck" should be "Agenda, Goals, Intro, Problem, Solution, Close"
+
+  Scenario: Editing a deck with Windows line endings keeps them
+    Given the deck of "Edit Deck" has Windows line endings
+    When I replace slide 2 of "Edit Deck" with "# Challenge\n\nCosts are rising"
+    And I move slide 4 of "Edit Deck" to position 1
+    And I apply these edits to "Edit Deck"
+      | action       | slide_number | new_position | content | old_text               | new_text              |
+      | replace_text |              |              |         | # Intro\n\nAbout intro | # Welcome\n\nAbout us |
+      | delete_slide | 4            |              |         |                        |                       |
+    Then the slides of "Edit Deck" should be "Close, Welcome, Challenge"
+    And the deck file of "Edit Deck" should only have Windows line endings
+
+  Scenario: Moving a slide
+    When I move slide 4 of "Edit Deck" to position 2
+    Then the slides of "Edit Deck" should be "Intro, Close, Problem, Solution"
+
+  Scenario: Deleting a slide keeps the previews of the other slides
+    Given Marp image rendering is simulated
+    And the slide previews for "Edit Deck" are up to date
+    When I delete slide 2 of "Edit Deck"
+    And I refresh the slide previews for "Edit Deck"
+    Then the slides of "Edit Deck" should be "Intro, Solution, Close"
+    And Marp should have been run 0 times
+    And there should be 3 slide previews
+
+  Scenario: Listeners are told which slides changed
+    When I replace slide 3 of "Edit Deck" with "# Approach"
+    Then the slide change listener should report changed slides "3" and a slide count of 4
+
+  Scenario: Invalid slide content is rejected and the deck is left alone
+    When I replace slide 2 of "Edit Deck" with "# Broken\n\n<!-- never closed"
+    Then the tool result should include "Unclosed HTML comment"
+    And the slides of "Edit Deck" should be "Intro, Problem, Solution, Close"
+
+  Scenario: A comment opener inside a code block is accepted
+    When I replace slide 2 of "Edit Deck" with "# Markup\n\n```html\n<!-- notes start here\n```"
+    Then the slides of "Edit Deck" should be "Intro, Markup, Solution, Close"
+
+  Scenario: Editing a slide that doesn't exist
+    When I delete slide 9 of "Edit Deck"
+    Then the tool result should include "Slide 9 does not exist"
+
+  Scenario: The agent can edit individual slides
+    Given a presentation exists
+    Then the agent should have a tool named "replace_slide"
+    And the agent should have a tool named "insert_slide_after"
+    And the agent should have a tool named "delete_slide"
+    And the agent should have a tool named "move_slide"
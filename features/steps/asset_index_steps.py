@@ -0,0 +1,73 @@
+from behave import given, when, then
+import os
+from unittest.mock import MagicMock, patch
+from deckbot.asset_index import get_asset_index
+from deckbot.manager import PresentationManager
+from deckbot.tools import PresentationTools
+from deck_files import deck_path, pres_dir, rewrite_deck
+
+def _tools(context, name):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    tools = PresentationTools(manager.get_presentation(name), MagicMock())
+    tools.on_presentation_updated = MagicMock()
+    return tools
+
+def _write_image(context, name, image):
+    path = os.path.join(pres_dir(context, name), image)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"image bytes")
+
+@given('slide {index:d} of "{name}" has the markdown "{markdown}"')
+def step_impl(context, index, name, markdown):
+    def update(front_matter, slides):
+        slides[index - 1] += "\n\n" + markdown
+        return front_matter, slides
+    rewrite_deck(context, name, update)
+
+@given('the front matter of "{name}" sets "{directive}"')
+def step_impl(context, name, directive):
+    rewrite_deck(context, name, lambda front_matter, slides: (front_matter + "\n" + directive, slides))
+    # The referenced background exists
+    _write_image(context, name, directive.split("'")[1])
+
+@given('"{name}" has an image file "{image}"')
+def step_impl(context, name, image):
+    _write_image(context, name, image)
+
+@then('the asset index of "{name}" should map "{path}" to slides "{slides}"')
+def step_impl(context, name, path, slides):
+    expected = [int(n) for n in slides.split(",")]
+    actual = get_asset_index(pres_dir(context, name)).slides_for(path)
+    assert actual == expected, f"Slides for {path}: {actual}"
+
+@when('I validate the deck of "{name}"')
+def step_impl(context, name):
+    context.tool_result = _tools(context, name).validate_deck()
+
+@then('the validation result should list "{path}" as missing on slide {index:d}')
+def step_impl(context, path, index):
+    assert f"Missing: '{path}' (referenced by slide {index})" in context.tool_result, context.tool_result
+
+@then('the validation result should list "{path}" as unused')
+def step_impl(context, path):
+    assert f"Unused: '{path}'" in context.tool_result, context.tool_result
+
+@when('I delete "{filename}" from "{name}"')
+def step_impl(context, filename, name):
+    # Keep the auto-compile from running Marp
+    with patch('deckbot.tools.compile_deck', return_value=None):
+        context.tool_result = _tools(context, name).delete_file(filename)
+
+@then('the tool result should warn that slide {index:d} still references "{filename}"')
+def step_impl(context, index, filename):
+    assert f"Warning: '{filename}' no longer exists but is still referenced by slide {index}." in context.tool_result, \
+        context.tool_result
+
+@then('all {count:d} slide previews should have been re-rendered')
+def step_impl(context, count):
+    preview_dir = os.path.join(pres_dir(context, context.preview_deck), ".previews")
+    after = {f: os.stat(os.path.join(preview_dir, f)).st_mtime_ns
+             for f in os.listdir(preview_dir) if f.startswith("slide.")}
+    changed = [f for f in after if after[f] != context.preview_snapshot.get(f)]
+    assert len(changed) == count, f"Re-rendered: {sorted(changed)}"
@@ -0,0 +1,92 @@
+from behave import given, when, then
+import os
+from unittest.mock import MagicMock, patch
+from deckbot.manager import PresentationManager
+from deckbot.tools import PresentationTools
+from deck_files import deck_path
+
+PNG_BYTES = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89'
+
+@given('the deck of "{name}" shows the image "{image}"')
+def step_impl(context, name, image):
+    image_path = os.path.join(context.temp_dir, name, image)
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+    with open(image_path, "wb") as f:
+        f.write(PNG_BYTES)
+    with open(deck_path(context, name), "w") as f:
+        f.write(f"---\nmarp: true\ntheme: default\n---\n\n# Results\n\n![chart]({image})\n")
+
+@given('Marp HTML compiles are simulated')
+def step_impl(context):
+    context.marp_compiles = []
+
+    def fake_run(cmd, cwd=None, **kwargs):
+        context.marp_compiles.append(cwd)
+        with open(os.path.join(cwd, "deck.marp.html"), "w") as f:
+            f.write("<section>Results</section>")
+        return MagicMock(returncode=0, stdout=b"", stderr=b"")
+
+    patcher = patch('subprocess.run', side_effect=fake_run)
+    patcher.start()
+    context.add_cleanup(patcher.stop)
+
+@when('I compile "{name}" with the compile tool')
+def step_impl(context, name):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    tools = PresentationTools(manager.get_presentation(name), MagicMock())
+    tools.on_presentation_updated = MagicMock()
+    context.compile_result = tools.compile_presentation()
+
+@when('I compile "{name}" with the compile tool outside the web UI')
+def step_impl(context, name):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    tools = PresentationTools(manager.get_presentation(name), MagicMock())
+    with patch('subprocess.Popen') as mock_popen, patch('os.name', 'posix'):
+        context.compile_result = tools.compile_presentation()
+    context.opened = [call.args[0] for call in mock_popen.call_args_list]
+
+@then('the compiled HTML of "{name}" should have been opened locally')
+def step_impl(context, name):
+    html_file = os.path.join(context.temp_dir, name, "deck.marp.html")
+    assert ["open", html_file] in context.opened, \
+        f"Expected {html_file} to be opened, got {context.opened}"
+
+@when('the image "{image}" of "{name}" is replaced')
+def step_impl(context, name, image):
+    with open(os.path.join(context.temp_dir, name, image), "wb") as f:
+        f.write(PNG_BYTES + b"changed")
+
+@when('a "{style}" block is added to the deck of "{name}"')
+def step_impl(context, style, name):
+    with open(deck_path(context, name), "a") as f:
+        f.write(f"\n{style}\n")
+
+@when('the compiled HTML of "{name}" is deleted')
+def step_impl(context, name):
+    os.unlink(os.path.join(context.temp_dir, name, "deck.marp.html"))
+
+@then('Marp should have compiled {count:d} time')
+@then('Marp should have compiled {count:d} times')
+def step_impl(context, count):
+    assert len(context.marp_compiles) == count, \
+        f"Expected {count} Marp compiles, got {len(context.marp_compiles)}"
+
+@then('the last compile result should report that it was skipped')
+def step_impl(context):
+    assert "skipped" in context.compile_result, context.compile_result
+
+@then('the compile job should be reported as skipped')
+def step_impl(context):
+    assert context.polled_job['skipped'] is True, f"Compile job: {context.polled_job}"
+
+@when('I create an unreferenced file "{filename}" in "{name}"')
+def step_impl(context, filename, name):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    tools = PresentationTools(manager.get_presentation(name), MagicMock())
+    tools.on_presentation_updated = MagicMock()
+    context.tool_result = tools.write_file(filename, "Speaker notes")
+
+@then('the tool result should say the presentation is already up to date')
+def step_impl(context):
+    assert "already up to date" in context.tool_result, context.tool_result
+    assert "failed" not in context.tool_result, context.tool_result
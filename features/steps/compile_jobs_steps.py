@@ -0,0 +1,89 @@
+from behave import given, when, then
+import os
+import subprocess
+from unittest.mock import MagicMock, patch
+from deckbot import webapp
+
+@given('"{name}" is open in the web UI')
+def step_impl(context, name):
+    context.published_events = []
+    service = MagicMock()
+    service.agent.presentation_dir = os.path.join(context.temp_dir, name)
+    service.agent.context = {'name': name}
+    service.publish = lambda event_type, data=None: context.published_events.append((event_type, data))
+    webapp.current_service = service
+    context.client = webapp.app.test_client()
+
+@given('Marp fails with "{message}"')
+def step_impl(context, message):
+    def failing_run(cmd, **kwargs):
+        raise subprocess.CalledProcessError(1, cmd, output="", stderr=message)
+    patcher = patch('subprocess.run', side_effect=failing_run)
+    patcher.start()
+    context.add_cleanup(patcher.stop)
+
+@given('Marp never finishes within the compile timeout')
+def step_impl(context):
+    def slow_run(cmd, **kwargs):
+        raise subprocess.TimeoutExpired(cmd, kwargs.get('timeout'))
+    patcher = patch('subprocess.run', side_effect=slow_run)
+    patcher.start()
+    context.add_cleanup(patcher.stop)
+
+@when('I save "{path}" through the web API')
+def step_impl(context, path):
+    response = context.client.post('/api/presentation/file-save', json={
+        'path': path,
+        'content': "---\nmarp: true\n---\n\n# Saved from the editor\n"
+    })
+    context.response = response
+    context.response_json = response.get_json()
+    context.compile_job = context.response_json.get('compile')
+
+@when('I update the presentation title to "{title}" through the web API')
+def step_impl(context, title):
+    response = context.client.post('/api/presentation/settings', json={'title': title})
+    context.response = response
+    context.response_json = response.get_json()
+    context.compile_job = context.response_json.get('compile_job')
+
+@when('the compile job finishes')
+def step_impl(context):
+    job = webapp.compile_jobs.get(context.compile_job['job_id'])
+    assert job.done.wait(timeout=10), "Compile job never finished"
+
+@when('I poll the compile job "{job_id}"')
+def step_impl(context, job_id):
+    context.response = context.client.get(f'/api/compile/{job_id}')
+
+@then('the response should be accepted with a compile job')
+def step_impl(context):
+    assert context.response.status_code == 202, \
+        f"Expected 202, got {context.response.status_code}: {context.response_json}"
+    assert context.compile_job and context.compile_job.get('job_id'), \
+        f"No compile job in response: {context.response_json}"
+
+@then('the compile job should not be finished yet')
+def step_impl(context):
+    assert context.compile_job['status'] in ('queued', 'running'), context.compile_job
+
+@then('polling the compile job should report "{status}"')
+def step_impl(context, status):
+    response = context.client.get(f"/api/compile/{context.compile_job['job_id']}")
+    assert response.status_code == 200
+    context.polled_job = response.get_json()
+    assert context.polled_job['status'] == status, f"Compile job: {context.polled_job}"
+
+@then('the compile job error should mention "{text}"')
+def step_impl(context, text):
+    assert text in (context.polled_job.get('error') or ''), f"Compile job: {context.polled_job}"
+
+@then('the web UI should have received "{first}" and "{second}" events')
+def step_impl(context, first, second):
+    job_id = context.compile_job['job_id']
+    events = [event for event, data in context.published_events if data and data.get('job_id') == job_id]
+    assert events == [first, second], f"Events for job {job_id}: {events}"
+
+@then('the compile job response should be not found')
+def step_impl(context):
+    assert context.response.status_code == 404
@@ -0,0 +1,109 @@
+from behave import given, when, then
+import time
+from unittest.mock import patch
+from deckbot.compile_scheduler import CompileScheduler
+
+def _is_compile(args):
+    return "npx" in args and "@marp-team/marp-cli" in args and "--pdf" not in args and "--images" not in args
+
+@given('auto-compilation is debounced with a quiet period of {seconds:g} seconds')
+def step_impl(context, seconds):
+    context.tools.configure_auto_compile(quiet_period=seconds, max_latency=seconds * 10)
+    context.compile_events = []
+    context.tools.on_presentation_updated = lambda data=None: context.compile_events.append(data)
+    context.run_patch = patch('subprocess.run')
+    context.mock_run = context.run_patch.start()
+    context.mock_run.return_value.returncode = 0
+    context.add_cleanup(context.run_patch.stop)
+    context.add_cleanup(context.tools.compile_scheduler.cancel)
+
+@when('I write {count:d} files in quick succession')
+def step_impl(context, count):
+    context.tool_results = []
+    for i in range(count):
+        context.tool_results.append(context.tools.write_file(f"notes_{i}.md", f"# Note {i}"))
+
+@when('I export the presentation to PDF')
+def step_impl(context):
+    with patch('os.startfile', create=True):
+        context.export_result = context.tools.export_pdf()
+
+@then('each tool output should say the compile was scheduled')
+def step_impl(context):
+    for result in context.tool_results:
+        assert "compile scheduled" in result, f"Unexpected tool output: {result}"
+
+@then('after the quiet period the presentation should have been compiled {count:d} time')
+@then('after the quiet period the presentation should have been compiled {count:d} times')
+def step_impl(context, count):
+    scheduler = context.tools.compile_scheduler
+    deadline = time.time() + 5
+    while scheduler.pending and time.time() < deadline:
+        time.sleep(0.05)
+    scheduler.flush()
+    compiles = [c for c in context.mock_run.call_args_list if _is_compile(c[0][0])]
+    assert len(compiles) == count, f"Expected {count} compiles, got {len(compiles)}"
+
+@then('the compile status updates should be "{statuses}"')
+def step_impl(context, statuses):
+    expected = [s.strip() for s in statuses.split(",")]
+    actual = [e.get("compile") for e in context.compile_events if e and "compile" in e]
+    assert actual == expected, f"Expected {expected}, got {actual}"
+
+@then('the presentation should have been compiled {count:d} time before the PDF export')
+def step_impl(context, count):
+    assert "PDF export successful" in context.export_result, context.export_result
+    calls = [c[0][0] for c in context.mock_run.call_args_list]
+    pdf_index = next(i for i, args in enumerate(calls) if "--pdf" in args)
+    compiles = [args for args in calls[:pdf_index] if _is_compile(args)]
+    assert len(compiles) == count, f"Expected {count} compiles before export, calls: {calls}"
+    assert not context.tools.compile_scheduler.pending
+
+@given('a compile scheduler with a quiet period of {quiet:g} seconds and max latency of {latency:g} seconds')
+def step_impl(context, quiet, latency):
+    context.compile_count = 0
+    def compile_fn():
+        context.compile_count += 1
+        return "Compilation successful."
+    context.scheduler = CompileScheduler(compile_fn, quiet_period=quiet, max_latency=latency)
+    context.add_cleanup(context.scheduler.cancel)
+
+@when('I request a compile')
+def step_impl(context):
+    assert context.scheduler.request() is None
+
+@given('timer compiles take {seconds:g} seconds to start')
+def step_impl(context, seconds):
+    # Widen the gap between the timer taking the pending compile and running it
+    compile_now = context.scheduler._compile
+
+    def late_compile(trace_parent=None):
+        time.sleep(seconds)
+        return compile_now(trace_parent)
+
+    context.scheduler._compile = late_compile
+
+@when('the scheduled compile has left the pending state')
+def step_impl(context):
+    deadline = time.time() + 5
+    while context.scheduler.pending and time.time() < deadline:
+        time.sleep(0.01)
+    assert not context.scheduler.pending, "The timer never fired"
+    assert context.compile_count == 0, "The compile already ran"
+
+@when('I flush the compile scheduler')
+def step_impl(context):
+    context.scheduler.flush()
+
+@when('I cancel the scheduled compile')
+def step_impl(context):
+    context.scheduler.cancel()
+
+@when('I wait {seconds:g} seconds')
+def step_impl(context, seconds):
+    time.sleep(seconds)
+
+@then('the scheduler should have compiled {count:d} time')
+@then('the scheduler should have compiled {count:d} times')
+def step_impl(context, count):
+    assert context.compile_count == count, f"Expected {count} compiles, got {context.compile_count}"
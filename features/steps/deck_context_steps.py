@@ -0,0 +1,55 @@
+from behave import given, when, then
+from unittest.mock import patch
+import os
+
+from deckbot.deck_document import load_deck
+from deckbot.manager import PresentationManager
+from deckbot.tools import PresentationTools
+from deck_files import deck_path
+
+
+@given('"{name}" has a deck of {count:d} slides')
+def step_impl(context, name, count):
+    filler = "Some supporting detail for this point. " * 8
+    slides = [f"# Topic {i}\n\nBody of slide {i}. {filler}" for i in range(1, count + 1)]
+    with open(deck_path(context, name), "w") as f:
+        f.write("---\nmarp: true\n---\n\n" + "\n\n---\n\n".join(slides) + "\n")
+
+
+@given('a background render has written "{filename}" to "{name}"')
+def step_impl(context, filename, name):
+    with open(deck_path(context, name)) as f:
+        content = f.read()
+    with open(os.path.join(context.temp_dir, name, filename), "w") as f:
+        f.write(content.replace("Body of slide", "Shard copy of slide"))
+
+
+@given('the deck context mode is "{mode}"')
+def step_impl(context, mode):
+    context.deck_context_mode = patch('deckbot.preferences.PreferencesManager.get',
+                                      side_effect=lambda key, default=None: mode if key == 'deck_context_mode' else default)
+    context.deck_context_mode.start()
+    context.add_cleanup(context.deck_context_mode.stop)
+
+
+@given('the agent has finished a turn')
+def step_impl(context):
+    context.agent.deck_context.mark_turn()
+
+
+@when('slide {number:d} of "{name}" is changed to "{text}"')
+def step_impl(context, number, name, text):
+    path = deck_path(context, name)
+    load_deck(path).replace_slide(number, text.replace("\\n", "\n")).write(path)
+
+
+@when('I read slide {number:d} of "{name}" with the read_slide tool')
+def step_impl(context, number, name):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    tools = PresentationTools(manager.get_presentation(name), None, root_dir=context.temp_dir)
+    context.tool_result = tools.read_slide(number)
+
+
+@then('the tool result should contain "{text}"')
+def step_impl(context, text):
+    assert text in context.tool_result, context.tool_result
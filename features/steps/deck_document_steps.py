@@ -0,0 +1,69 @@
+from behave import given, when, then
+from deckbot import webapp
+from deckbot.deck_document import DeckDocument, load_deck
+from deckbot.manager import PresentationManager
+from deck_files import deck_path
+
+@given('a deck document:')
+def step_impl(context):
+    context.deck_content = context.text
+    context.document = DeckDocument.parse(context.text)
+
+@when('the same content is parsed again')
+def step_impl(context):
+    # An equal but distinct string, as a second read of the file would be
+    context.second_document = DeckDocument.parse("".join(list(context.deck_content)))
+
+@then('both parses should be the same document')
+def step_impl(context):
+    assert context.second_document is context.document
+
+@then('the document should have {count:d} slides')
+def step_impl(context, count):
+    assert context.document.slide_count == count, \
+        [slide.text for slide in context.document.slides]
+
+@then('the document front matter title should be "{title}"')
+def step_impl(context, title):
+    assert context.document.front_matter.get('title') == title, context.document.front_matter
+
+@then('the document style should contain "{css}"')
+def step_impl(context, css):
+    assert css in context.document.style, context.document.style
+
+@then('the byte offsets of every slide should match its text')
+def step_impl(context):
+    encoded = context.deck_content.encode("utf-8")
+    for slide in context.document.slides:
+        assert encoded[slide.start:slide.end].decode("utf-8") == slide.text, slide
+        assert context.deck_content[slide.char_start:slide.char_end] == slide.text, slide
+        assert len(slide.hash) == 64
+
+@then('slide {number:d} of the document should have the title "{title}"')
+def step_impl(context, number, title):
+    assert context.document.slide(number).title == title
+
+@when('I list presentations through the web API')
+def step_impl(context):
+    context.listed = webapp.app.test_client().get('/api/presentations').get_json()
+
+@then('"{name}" should be listed with {count:d} slides')
+def step_impl(context, name, count):
+    pres = next(p for p in context.listed if p['name'] == name)
+    assert pres['slide_count'] == count, pres
+
+@when('I set the title of "{name}" to "{title}"')
+def step_impl(context, name, title):
+    context.slides_before = [s.text for s in load_deck(deck_path(context, name)).slides]
+    PresentationManager(root_dir=context.temp_dir).set_presentation_title(name, title)
+
+@then('the front matter of "{name}" should have the title "{title}"')
+def step_impl(context, name, title):
+    doc = load_deck(deck_path(context, name))
+    assert doc.front_matter.get('title') == title, doc.front_matter_text
+    assert doc.front_matter.get('marp') is True, doc.front_matter_text
+
+@then('the slides of "{name}" should be unchanged')
+def step_impl(context, name):
+    slides = [s.text for s in load_deck(deck_path(context, name)).slides]
+    assert slides == context.slides_before, slides
@@ -0,0 +1,31 @@
+"""Paths and read/write helpers for the presentations created by the step definitions."""
+import os
+
+from deckbot.deck_document import split_deck
+
+
+def pres_dir(context, name, root=None):
+    """Directory of a presentation (under the scenario's temp dir unless ``root`` is given)."""
+    return os.path.join(root or context.temp_dir, name)
+
+
+def deck_path(context, name, root=None):
+    return os.path.join(pres_dir(context, name, root), "deck.marp.md")
+
+
+def read_slides(context, name):
+    """(front matter, slide bodies) of a presentation's deck."""
+    with open(deck_path(context, name)) as f:
+        return split_deck(f.read())
+
+
+def write_slides(context, name, front_matter, slides):
+    with open(deck_path(context, name), "w") as f:
+        f.write("---\n" + front_matter + "\n---\n" + "\n\n---\n\n".join(slides) + "\n")
+
+
+def rewrite_deck(context, name, update):
+    """Rewrite a deck with ``update(front_matter, slides)``, which returns the new pair."""
+    front_matter, slides = read_slides(context, name)
+    front_matter, slides = update(front_matter.strip(), [s.strip() for s in slides])
+    write_slides(context, name, front_matter, slides)
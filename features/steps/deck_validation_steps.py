@@ -60,3 +60,18 @@ def step_impl(context, text):
     assert message, "No error message found"
     assert text in message, f"Expected '{text}' in error, got: {message}"
 
+
+@given('CSS parsing is counted')
+def step_impl(context):
+    from unittest.mock import patch
+    from deckbot import deck_validator
+    deck_validator.clear_validation_cache()
+    patcher = patch.object(deck_validator.cssutils, 'CSSParser', wraps=deck_validator.cssutils.CSSParser)
+    context.css_parser = patcher.start()
+    context.add_cleanup(patcher.stop)
+
+@then('the CSS should have been parsed {count:d} time')
+@then('the CSS should have been parsed {count:d} times')
+def step_impl(context, count):
+    assert context.css_parser.call_count == count, \
+        f"Expected {count} CSS parses, got {context.css_parser.call_count}"
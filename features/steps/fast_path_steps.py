@@ -0,0 +1,67 @@
+from behave import given, then
+from unittest.mock import patch
+import json
+import os
+
+
+@given('the deck of "{name}" has {count:d} slides and has been compiled')
+def step_impl(context, name, count):
+    presentation_dir = os.path.join(context.temp_dir, name)
+    slides = [f"# Slide {number}" for number in range(1, count + 1)]
+    with open(os.path.join(presentation_dir, "deck.marp.md"), "w") as f:
+        f.write("---\nmarp: true\n---\n\n" + "\n\n---\n\n".join(slides) + "\n")
+    with open(os.path.join(presentation_dir, "deck.marp.html"), "w") as f:
+        f.write("".join(f'<section id="{n}"></section>' for n in range(1, count + 1)))
+
+
+@given('the preference "{key}" is {value}')
+def step_impl(context, key, value):
+    overrides = getattr(context, 'preference_overrides', None)
+    if overrides is None:
+        overrides = context.preference_overrides = {}
+        from deckbot.preferences import PreferencesManager
+        original = PreferencesManager.get
+
+        def get(self, name, default=None):
+            if name in overrides:
+                return overrides[name]
+            return original(self, name, default)
+        patcher = patch('deckbot.preferences.PreferencesManager.get', get)
+        patcher.start()
+        context.add_cleanup(patcher.stop)
+    overrides[key] = json.loads(value)
+
+
+@then('the model should not have been called')
+def step_impl(context):
+    requests = context.service.agent.client.requests
+    assert not requests, f"The model was called {len(requests)} times"
+
+
+@then('the model should have been called {count:d} time')
+@then('the model should have been called {count:d} times')
+def step_impl(context, count):
+    requests = context.service.agent.client.requests
+    assert len(requests) == count, f"Expected {count} model calls, got {len(requests)}"
+
+
+def _history(context, name):
+    with open(os.path.join(context.temp_dir, name, "chat_history.jsonl")) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@then('the history of "{name}" should end with a "{tool}" call and the reply "{reply}"')
+def step_impl(context, name, tool, reply):
+    entries = _history(context, name)[-4:]
+    assert entries[0]["role"] == "user", entries
+    assert entries[1]["parts"][0]["function_call"]["name"] == tool, entries
+    assert entries[2]["role"] == "tool" and entries[2]["parts"][0]["function_response"]["name"] == tool, entries
+    assert entries[3] == {"role": "model", "content": reply}, entries
+
+
+@then('the history of "{name}" should end with a "{tool}" call')
+def step_impl(context, name, tool):
+    entries = _history(context, name)[-3:]
+    assert entries[0]["parts"][0]["function_call"]["name"] == tool, entries
+    assert entries[1]["parts"][0]["function_response"]["name"] == tool, entries
+    assert entries[2]["role"] == "model", entries
@@ -118,3 +118,9 @@ def step_impl(context, text):
     assert result is not None, f"Result missing. Error was: {error}"
     assert text in result, f"Expected '{text}' in result, got: {result}"
 
+
+@then('the file list result should not contain "{text}"')
+def step_impl(context, text):
+    result = getattr(context, 'last_result', None)
+    assert result is not None, f"Result missing. Error was: {getattr(context, 'last_error', None)}"
+    assert text not in result, f"Did not expect '{text}' in result, got: {result}"
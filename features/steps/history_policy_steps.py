@@ -0,0 +1,149 @@
+from behave import given, when, then
+from unittest.mock import MagicMock, patch
+import json
+import os
+
+from deckbot.agent import Agent
+from deckbot.history_policy import SUMMARIES_SUFFIX, estimate_tokens
+from deckbot.manager import PresentationManager
+
+LARGE_RESPONSE = "x" * 4000
+
+
+def _history_file(context, name):
+    return os.path.join(context.temp_dir, name, "chat_history.jsonl")
+
+
+def _start_agent(context, name):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    with patch.dict(os.environ, {'GOOGLE_API_KEY': 'fake_key'}):
+        context.agent = Agent(manager.get_presentation(name), root_dir=context.temp_dir)
+    context.summaries_computed = 0
+    summarize = context.agent.history_policy.summarize
+
+    def counting_summarize(turns):
+        context.summaries_computed += 1
+        return summarize(turns)
+
+    context.agent.history_policy.summarize = counting_summarize
+
+
+@given('the chat history of "{name}" has {count:d} turns with large tool responses')
+def step_impl(context, name, count):
+    context.history_turns = count
+    with open(_history_file(context, name), "a") as f:
+        for i in range(1, count + 1):
+            entries = [
+                {"role": "user", "content": f"Request {i}"},
+                {"role": "model", "parts": [{"function_call": {
+                    "name": "write_file", "args": {"filename": f"slide{i}.md", "content": "# Slide"}}}]},
+                {"role": "tool", "parts": [{"function_response": {
+                    "name": "write_file", "response": {"result": f"turn {i} {LARGE_RESPONSE}"}}}]},
+                {"role": "model", "content": f"Done with request {i}"},
+            ]
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+
+
+@given('the history token budget is {budget:d} tokens')
+@when('the history token budget is {budget:d} tokens')
+def step_impl(context, budget):
+    if not hasattr(context, 'agent'):
+        _start_agent(context, context.current_presentation)
+    context.agent.history_policy.token_budget = budget
+
+
+@when('I restart the agent of "{name}"')
+def step_impl(context, name):
+    _start_agent(context, name)
+
+
+@when('I chat with the agent of "{name}"')
+def step_impl(context, name):
+    if not hasattr(context, 'agent'):
+        _start_agent(context, name)
+    response = MagicMock()
+    response.candidates = [MagicMock()]
+    response.candidates[0].content.parts = [MagicMock(text="OK")]
+    generate = context.agent.client.models.generate_content
+    generate.reset_mock()
+    generate.return_value = response
+    context.agent.chat("Next request")
+    contents = generate.call_args.kwargs["contents"]
+    # First item is the system prompt, last is the new message (also the last history turn)
+    context.request_history = [{"role": c.role, "parts": c.parts} for c in contents[1:-1]]
+
+
+def _tool_responses(context):
+    responses = []
+    for entry in context.request_history:
+        for part in entry["parts"]:
+            if part.function_response:
+                responses.append(part.function_response.response["result"])
+    return responses
+
+
+def _summaries(context):
+    return [part.text for entry in context.request_history for part in entry["parts"]
+            if part.text and part.text.startswith("[Summary of earlier conversation")]
+
+
+@then('no tool response in the request should be truncated')
+def step_impl(context):
+    responses = _tool_responses(context)
+    assert len(responses) == context.history_turns, responses
+    assert all("elided" not in r for r in responses)
+
+
+@then('the tool responses of the last {count:d} previous turns should be sent verbatim')
+def step_impl(context, count):
+    responses = _tool_responses(context)
+    expected = [f"turn {i} {LARGE_RESPONSE}"
+                for i in range(context.history_turns - count + 1, context.history_turns + 1)]
+    assert responses[-count:] == expected, [r[:20] for r in responses[-count:]]
+
+
+@then('the tool responses of older turns should be truncated')
+def step_impl(context):
+    responses = _tool_responses(context)
+    older = responses[:context.history_turns - 3]
+    assert older, "No older tool responses were sent"
+    assert all("chars elided]" in r and len(r) < 1000 for r in older), [len(r) for r in older]
+
+
+@then('the request should not contain a history summary')
+def step_impl(context):
+    assert _summaries(context) == []
+
+
+@then('the request should contain a summary of turns {first:d}-{last:d}')
+def step_impl(context, first, last):
+    heading = f"[Summary of earlier conversation, turns {first}-{last}]"
+    summaries = _summaries(context)
+    assert any(s.startswith(heading) for s in summaries), [s.splitlines()[0] for s in summaries]
+    context.summary = next(s for s in summaries if s.startswith(heading))
+
+
+@then('the summary should mention "{text}"')
+def step_impl(context, text):
+    assert text in context.summary, context.summary
+
+
+@then('the request history should be at most {budget:d} tokens')
+def step_impl(context, budget):
+    tokens = estimate_tokens(context.request_history)
+    assert tokens <= budget, f"{tokens} tokens sent"
+
+
+@then('the history summaries should be saved next to the chat history')
+def step_impl(context):
+    path = _history_file(context, context.current_presentation) + SUMMARIES_SUFFIX
+    assert os.path.exists(path), f"{path} not found"
+    with open(path) as f:
+        summaries = json.load(f)["summaries"]
+    assert [1, 8] in [s["turns"] for s in summaries.values()], summaries
+
+
+@then('no history summary should have been computed')
+def step_impl(context):
+    assert context.summaries_computed == 0, f"{context.summaries_computed} summaries computed"
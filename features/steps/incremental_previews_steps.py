@@ -0,0 +1,175 @@
+from behave import given, when, then
+import os
+import json
+import time
+from unittest.mock import patch
+from deckbot.preview_cache import SlidePreviewCache, analyze_deck, build_subset_deck, split_deck
+from deck_files import deck_path, pres_dir, read_slides, write_slides
+
+def _fake_marp(rendered):
+    """
+    Pretend to be Marp: `--images` writes one file per slide holding its body,
+    `--pdf` writes all slide bodies into the PDF.
+    """
+    def run(args, cwd=None, **kwargs):
+        args = args[2:]  # drop "npx @marp-team/marp-cli"
+        if "--images" not in args and "--pdf" not in args:
+            return None
+        with open(os.path.join(cwd, args[0])) as f:
+            _, slides = split_deck(f.read())
+        rendered.append((args[0], len(slides)))
+        flag = "--output" if "--output" in args else "-o"
+        output = os.path.join(cwd, args[args.index(flag) + 1])
+        if "--pdf" in args:
+            with open(output, "w") as out:
+                out.write("\n".join(body.strip() for body in slides) + "\n")
+            return None
+        base, ext = os.path.splitext(output)
+        for i, body in enumerate(slides, start=1):
+            with open(f"{base}.{i:03d}{ext}", "w") as out:
+                out.write(body)
+        return None
+    return run
+
+@given('the "{name}" deck has {count:d} slides')
+def step_impl(context, name, count):
+    slides = [f"# Slide {i}\n\nContent {i}" for i in range(1, count + 1)]
+    write_slides(context, name, "marp: true\ntheme: default\npaginate: true", slides)
+    context.preview_deck = name
+
+@given('Marp image rendering is simulated')
+def step_impl(context):
+    context.rendered_decks = []
+    context.marp_patch = patch('subprocess.run', side_effect=_fake_marp(context.rendered_decks))
+    context.mock_marp = context.marp_patch.start()
+    context.add_cleanup(context.marp_patch.stop)
+
+def _snapshot(context, name):
+    preview_dir = os.path.join(pres_dir(context, name), ".previews")
+    return {f: os.stat(os.path.join(preview_dir, f)).st_mtime_ns
+            for f in os.listdir(preview_dir) if f.startswith("slide.")}
+
+@given('the slide previews for "{name}" are up to date')
+def step_impl(context, name):
+    SlidePreviewCache(pres_dir(context, name)).ensure()
+    context.mock_marp.reset_mock()
+    # Make sure re-rendered files get a distinguishable mtime
+    time.sleep(0.01)
+    context.preview_snapshot = _snapshot(context, name)
+
+@when('I refresh the slide previews for "{name}"')
+def step_impl(context, name):
+    context.preview_paths = SlidePreviewCache(pres_dir(context, name)).ensure()
+
+@when('I change slide {index:d} of "{name}" to "{text}"')
+def step_impl(context, index, name, text):
+    front_matter, slides = read_slides(context, name)
+    slides[index - 1] = text
+    write_slides(context, name, front_matter, [s.strip() for s in slides])
+
+@given('slide {index:d} of "{name}" shows the image "{image}"')
+def step_impl(context, index, name, image):
+    path = os.path.join(pres_dir(context, name), image)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"original image")
+    front_matter, slides = read_slides(context, name)
+    slides[index - 1] = slides[index - 1].strip() + f"\n\n![chart]({image})"
+    write_slides(context, name, front_matter, [s.strip() for s in slides])
+
+@when('I replace the image "{image}" in "{name}"')
+def step_impl(context, image, name):
+    with open(os.path.join(pres_dir(context, name), image), "wb") as f:
+        f.write(b"a different image")
+
+@when('I delete the last slide of "{name}"')
+def step_impl(context, name):
+    front_matter, slides = read_slides(context, name)
+    write_slides(context, name, front_matter, [s.strip() for s in slides[:-1]])
+
+@then('Marp should have been run {count:d} time')
+@then('Marp should have been run {count:d} times')
+def step_impl(context, count):
+    assert context.mock_marp.call_count == count, \
+        f"Expected {count} Marp runs, got {context.mock_marp.call_args_list}"
+
+@then('there should be {count:d} slide previews')
+def step_impl(context, count):
+    assert len(context.preview_paths) == count, context.preview_paths
+    preview_dir = os.path.join(pres_dir(context, context.preview_deck), ".previews")
+    files = sorted(f for f in os.listdir(preview_dir) if f.startswith("slide."))
+    assert files == [f"slide.{i:03d}.png" for i in range(1, count + 1)], files
+
+@then('the preview manifest should list {count:d} slides')
+def step_impl(context, count):
+    manifest_path = os.path.join(pres_dir(context, context.preview_deck), ".previews", "manifest.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    assert sorted(manifest["slides"], key=int) == [str(i) for i in range(1, count + 1)], manifest
+    for index, entry in manifest["slides"].items():
+        assert entry["file"] == f"slide.{int(index):03d}.png"
+        assert len(entry["hash"]) == 64
+
+@then('only slide {index:d} should have been re-rendered')
+def step_impl(context, index):
+    after = _snapshot(context, context.preview_deck)
+    changed = sorted(f for f in after if after[f] != context.preview_snapshot.get(f))
+    assert changed == [f"slide.{index:03d}.png"], f"Re-rendered: {changed}"
+
+@then('the preview of slide {index:d} should show "{text}"')
+def step_impl(context, index, text):
+    path = os.path.join(pres_dir(context, context.preview_deck), ".previews", f"slide.{index:03d}.png")
+    with open(path) as f:
+        assert text in f.read()
+
+@given('a deck with pagination where slide 2 sets "{directive}"')
+def step_impl(context, directive):
+    slides = ["# One", f"{directive}\n\n# Two", "# Three", "# Four"]
+    content = "---\nmarp: true\npaginate: true\n---\n\n" + "\n\n---\n\n".join(slides) + "\n"
+    context.analysis = analyze_deck(content, context.temp_dir)
+
+@when('I build the render deck for slide {index:d} alone')
+def step_impl(context, index):
+    context.render_deck = build_subset_deck(context.analysis, [index])
+
+@then('the render deck should contain "{text}"')
+def step_impl(context, text):
+    assert text in context.render_deck, context.render_deck
+
+@then('the render deck should pin the page number to {page:d}')
+def step_impl(context, page):
+    assert f"content: '{page}'" in context.render_deck, context.render_deck
+    _, slides = split_deck(context.render_deck)
+    assert len(slides) == 1, slides
+
+@when('I change the theme of "{name}" to "{theme}"')
+def step_impl(context, name, theme):
+    front_matter, slides = read_slides(context, name)
+    front_matter = front_matter.replace("theme: default", f"theme: {theme}")
+    write_slides(context, name, front_matter, [s.strip() for s in slides])
+
+@when('I set "{directive}" in the front matter of "{name}"')
+def step_impl(context, directive, name):
+    front_matter, slides = read_slides(context, name)
+    write_slides(context, name, front_matter + "\n" + directive, [s.strip() for s in slides])
+
+@when('the preview for slide {index:d} of "{name}" is requested')
+def step_impl(context, index, name):
+    from deckbot.visual_qa import VisualQA
+    context.preview_path, context.preview_generated = VisualQA(None)._ensure_preview(pres_dir(context, name), index)
+    assert context.preview_path, "No preview returned"
+
+@then('the preview should not be reported as regenerated')
+def step_impl(context):
+    assert context.preview_generated is False
+
+@then('the last Marp run should have rendered {count:d} slide')
+@then('the last Marp run should have rendered {count:d} slides')
+def step_impl(context, count):
+    _, rendered = context.rendered_decks[-1]
+    assert rendered == count, f"Rendered {rendered} slides"
+
+@then('the last Marp run should have rendered the whole deck')
+def step_impl(context):
+    deck, _ = context.rendered_decks[-1]
+    assert deck == "deck.marp.md", deck
@@ -0,0 +1,106 @@
+"""Step definitions for the shared layout catalog."""
+import os
+from unittest.mock import patch
+
+from behave import given, when, then
+
+from deckbot import layout_catalog
+from deckbot.layout_catalog import LayoutCatalog
+from deckbot.manager import PresentationManager
+from deckbot.session_service import SessionService
+import deckbot.webapp as webapp
+
+
+@given('a layouts file:')
+def step_impl(context):
+    context.layout_catalog = LayoutCatalog(context.text)
+
+
+@then('the catalog should list the layouts "{names}"')
+def step_impl(context, names):
+    expected = [n.strip() for n in names.split(",")]
+    assert context.layout_catalog.names == expected, context.layout_catalog.names
+
+
+@then('the "{name}" layout should be image-friendly with aspect ratio "{ratio}"')
+def step_impl(context, name, ratio):
+    layout = context.layout_catalog.get(name)
+    assert layout["image_friendly"] is True, layout
+    assert layout["recommended_aspect_ratio"] == ratio, layout
+
+
+@then('the "{name}" layout should have the description "{description}"')
+def step_impl(context, name, description):
+    assert context.layout_catalog.get(name)["description"] == description
+
+
+@then('the "{name}" layout should not be image-friendly')
+def step_impl(context, name):
+    layout = context.layout_catalog.get(name)
+    assert layout["image_friendly"] is False, layout
+    assert layout["recommended_aspect_ratio"] is None, layout
+
+
+@then('the catalog CSS should contain "{text}"')
+def step_impl(context, text):
+    assert text in context.layout_catalog.css, context.layout_catalog.css
+
+
+@given('layouts parsing is counted')
+def step_impl(context):
+    layout_catalog._cache.clear()
+    context.layout_parses = 0
+
+    class CountingCatalog(LayoutCatalog):
+        def __init__(self, content):
+            context.layout_parses += 1
+            super().__init__(content)
+
+    patcher = patch.object(layout_catalog, "LayoutCatalog", CountingCatalog)
+    patcher.start()
+    context.add_cleanup(patcher.stop)
+
+
+@when('every layout consumer reads the layouts of "{name}"')
+def step_impl(context, name):
+    presentation = PresentationManager(root_dir=context.temp_dir).get_presentation(name)
+    # Building the agent's system prompt reads the layouts too
+    service = SessionService(presentation)
+    context.layout_views = {
+        "web": [l["name"] for l in context.client.get('/api/layouts').get_json()["layouts"]],
+        "service": [l["name"] for l in service.get_layouts()],
+        "tool": service.agent.tools_handler.get_layouts(),
+        "prompt": service.agent.system_prompt,
+    }
+
+
+@when('a "{layout}" layout is added to the layouts of "{name}"')
+def step_impl(context, layout, name):
+    path = os.path.join(context.temp_dir, name, "layouts.md")
+    with open(path, "a") as f:
+        f.write(f"\n---\n\n<!-- layout: {layout} -->\n<!-- description: Big quote -->\n\n> Quote\n")
+
+
+@then('layouts.md should have been parsed {count:d} time')
+@then('layouts.md should have been parsed {count:d} times')
+def step_impl(context, count):
+    assert context.layout_parses == count, f"parsed {context.layout_parses} times"
+
+
+@then('every layout consumer should list the same layouts')
+def step_impl(context):
+    views = context.layout_views
+    assert views["web"], "no layouts listed"
+    assert views["web"] == views["service"], views
+    for layout in views["web"]:
+        assert f"## {layout}\n" in views["tool"], layout
+        assert f"**{layout}**" in views["prompt"], layout
+
+
+@then('every layout consumer should list the "{layout}" layout')
+def step_impl(context, layout):
+    views = context.layout_views
+    assert layout in views["web"], views["web"]
+    assert layout in views["service"], views["service"]
+    assert f"## {layout}\n" in views["tool"]
+    assert f"**{layout}**" in views["prompt"]
@@ -0,0 +1,106 @@
+"""Step definitions for pre-rendered layout previews."""
+import os
+import time
+
+from behave import given, when, then
+
+from deckbot.layout_catalog import get_layout_catalog
+from deckbot.layout_previews import LayoutPreviewCache
+from deck_files import pres_dir
+
+
+def _layout_names(context, name):
+    return get_layout_catalog(pres_dir(context, name)).names
+
+
+def _edit_layouts(context, name, edit):
+    path = os.path.join(pres_dir(context, name), "layouts.md")
+    with open(path) as f:
+        content = f.read()
+    with open(path, "w") as f:
+        f.write(edit(content))
+
+
+@given('the layout previews of "{name}" are up to date')
+def step_impl(context, name):
+    LayoutPreviewCache(pres_dir(context, name)).ensure()
+    context.mock_marp.reset_mock()
+    context.rendered_decks.clear()
+
+
+@given('preview warm-up is enabled')
+def step_impl(context):
+    os.environ['DECKBOT_PREVIEW_WARMUP'] = '1'
+
+
+@when('I request the preview of the "{layout}" layout')
+def step_impl(context, layout):
+    context.layout_response = context.client.get(f'/api/layouts/{layout}/preview')
+
+
+@when('the "{layout}" layout of "{name}" gains the line "{line}"')
+def step_impl(context, layout, name, line):
+    marker = f"<!-- layout: {layout} -->"
+    _edit_layouts(context, name, lambda content: content.replace(marker, f"{marker}\n\n{line}", 1))
+
+
+@when('the layouts CSS of "{name}" gains "{css}"')
+def step_impl(context, name, css):
+    _edit_layouts(context, name, lambda content: content.replace("style: |\n", f"style: |\n  {css}\n", 1))
+
+
+@when('I load "{name}" through the web API')
+def step_impl(context, name):
+    response = context.client.post('/api/load', json={'name': name})
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+
+@then('the layout preview should be served')
+def step_impl(context):
+    assert context.layout_response.status_code == 200, context.layout_response.get_data(as_text=True)
+    assert context.layout_response.mimetype == 'image/png'
+
+
+@then('the served layout preview should show "{text}"')
+def step_impl(context, text):
+    assert context.layout_response.status_code == 200, context.layout_response.get_data(as_text=True)
+    assert text in context.layout_response.get_data(as_text=True)
+
+
+@then('the layout preview request should fail with status {status:d}')
+def step_impl(context, status):
+    assert context.layout_response.status_code == status, context.layout_response.status_code
+
+
+@then('every layout of "{name}" should have a preview')
+def step_impl(context, name):
+    names = _layout_names(context, name)
+    cached = LayoutPreviewCache(pres_dir(context, name)).cached()
+    assert sorted(cached) == sorted(names), f"missing: {set(names) - set(cached)}"
+    # Stale previews are removed
+    preview_dir = os.path.join(pres_dir(context, name), ".layout-previews")
+    files = [f for f in os.listdir(preview_dir) if f.endswith(".png")]
+    assert len(files) == len(set(cached.values())), files
+
+
+@then('every layout of "{name}" should get a preview in the background')
+def step_impl(context, name):
+    names = _layout_names(context, name)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        if sorted(LayoutPreviewCache(pres_dir(context, name)).cached()) == sorted(names):
+            return
+        time.sleep(0.05)
+    raise AssertionError("layout previews were not warmed")
+
+
+@then('{count:d} layout should have been rendered')
+@then('{count:d} layouts should have been rendered')
+def step_impl(context, count):
+    assert [slides for _, slides in context.rendered_decks] == [count], context.rendered_decks
+
+
+@then('every layout of "{name}" should have been rendered')
+def step_impl(context, name):
+    names = _layout_names(context, name)
+    assert [slides for _, slides in context.rendered_decks] == [len(names)], context.rendered_decks
@@ -0,0 +1,152 @@
+from behave import given, when, then
+import os
+
+from deckbot.model_router import ModelRouter
+from deckbot.tracing import read_traces
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _call_failing(failing_model, error):
+    def call(model):
+        if model == failing_model:
+            raise Exception(error)
+        return f"answer from {model}"
+    return call
+
+
+@given('a model router for "{models}" with fast model "{fast}"')
+def step_impl(context, models, fast):
+    context.clock = FakeClock()
+    context.tool_calls = 0
+    context.router = ModelRouter([m.strip() for m in models.split(",")], fast_model=fast,
+                                 failure_threshold=3, cooldown=60, slow_seconds=10,
+                                 tool_calls=lambda: context.tool_calls, clock=context.clock)
+
+
+@given('"{model}" fails with "{error}" {count:d} times')
+@when('"{model}" fails with "{error}" {count:d} times')
+def step_impl(context, model, error, count):
+    for _ in range(count):
+        context.router.record_failure(model, Exception(error))
+
+
+@given('"{model}" has answered {count:d} times in {seconds:d} seconds each')
+def step_impl(context, model, count, seconds):
+    for _ in range(count):
+        context.router.record_success(model, float(seconds))
+
+
+@when('{seconds:d} seconds pass')
+def step_impl(context, seconds):
+    context.clock.now += seconds
+
+
+@when('a turn is run where "{model}" fails with "{error}"')
+def step_impl(context, model, error):
+    route = context.router.route("Fix the title")
+    context.answered_by, _ = context.router.run(route, _call_failing(model, error))
+
+
+@when('a turn is run where "{model}" runs a tool and then fails with "{error}"')
+def step_impl(context, model, error):
+    context.called = []
+
+    def call(called_model):
+        context.called.append(called_model)
+        if called_model == model:
+            context.tool_calls += 1
+            raise Exception(error)
+        return f"answer from {called_model}"
+
+    route = context.router.route("Add a slide about Q4")
+    try:
+        context.answered_by, _ = context.router.run(route, call)
+        context.turn_error = None
+    except Exception as e:
+        context.turn_error = e
+    context.route = route
+
+
+@when('a turn is run where every model answers')
+def step_impl(context):
+    route = context.router.route("Fix the title")
+    context.answered_by, _ = context.router.run(route, lambda model: "ok")
+
+
+@then('the turn should have been answered by "{model}"')
+def step_impl(context, model):
+    assert context.answered_by == model, f"Answered by {context.answered_by}"
+
+
+@then('the turn should have failed with "{error}"')
+def step_impl(context, error):
+    assert context.turn_error is not None, f"The turn was answered by {context.answered_by}"
+    assert error in str(context.turn_error), context.turn_error
+
+
+@then('only "{model}" should have been called')
+def step_impl(context, model):
+    assert context.called == [model], context.called
+    assert context.route.attempts[-1].get("tools_ran"), context.route.attempts
+
+
+@then('the circuit of "{model}" should be "{state}"')
+def step_impl(context, model, state):
+    actual = context.router.state(model)
+    assert actual == state, f"Circuit of {model} is {actual}"
+
+
+@then('the next route should start with "{model}"')
+def step_impl(context, model):
+    route = context.router.route("Fix the title")
+    assert route.models[0] == model, route.to_dict()
+
+
+@then('the next route should skip "{model}"')
+def step_impl(context, model):
+    route = context.router.route("Fix the title")
+    assert model not in route.models and model in route.skipped, route.to_dict()
+
+
+@then('a route for "{message}" should start with "{model}"')
+def step_impl(context, message, model):
+    route = context.router.route(message)
+    assert route.models[0] == model, route.to_dict()
+    assert "primary slow" in route.reason, route.reason
+
+
+@then('a route for a long multi-line request should start with "{model}"')
+def step_impl(context, model):
+    route = context.router.route("Restructure the deck:\n- merge slides 2 and 3\n- add a summary slide")
+    assert route.models[0] == model, route.to_dict()
+
+
+@given('the primary model of the session is unavailable')
+def step_impl(context):
+    context.unavailable_model = 'primary'
+
+
+@then('the request details should include a routing decision starting with the primary model')
+def step_impl(context):
+    details = [data for event, data in context.session_events if event == 'agent_request_details']
+    assert details, "No agent_request_details event"
+    routing = details[-1]["routing"]
+    primary = context.service.agent.model_names[0]
+    assert routing["models"][0] == primary, routing
+    assert routing["reason"] == "primary", routing
+
+
+@then('the model span of the last trace of "{name}" should record {count:d} attempts')
+def step_impl(context, name, count):
+    trace = read_traces(os.path.join(context.temp_dir, name))[-1]
+    model_span = next(span for span in trace["children"] if span["name"] == "model")
+    attempts = model_span["attrs"]["attempts"]
+    assert len(attempts) == count, attempts
+    assert [a["ok"] for a in attempts] == [False, True], attempts
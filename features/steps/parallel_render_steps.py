@@ -0,0 +1,165 @@
+from behave import given, when, then
+import os
+import shlex
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from deckbot.cli import cli
+from deckbot.manager import PresentationManager
+from deckbot.tools import PresentationTools
+from deckbot.render_scheduler import RenderScheduler, set_render_scheduler
+from deckbot.sharded_render import plan_shards
+
+class FakePdfWriter:
+    """Stands in for pypdf.PdfWriter: concatenates the shard files."""
+    def __init__(self):
+        self.parts = []
+
+    def append(self, path):
+        with open(path) as f:
+            self.parts.append(f.read())
+
+    def write(self, stream):
+        stream.write("".join(self.parts).encode())
+
+def _start_patch(context, target, **kwargs):
+    p = patch(target, **kwargs)
+    p.start()
+    context.add_cleanup(p.stop)
+
+@when('I plan render shards for {count:d} slides with {jobs:d} jobs')
+def step_impl(context, count, jobs):
+    context.shards = plan_shards(count, jobs)
+
+@then('there should be {count:d} shards of slides "{ranges}"')
+def step_impl(context, count, ranges):
+    assert len(context.shards) == count, context.shards
+    actual = ", ".join(f"{s[0]}-{s[-1]}" for s in context.shards)
+    assert actual == ranges, actual
+
+@given('rendering uses {jobs:d} parallel jobs')
+def step_impl(context, jobs):
+    _start_patch(context, 'deckbot.sharded_render.default_jobs', return_value=jobs)
+    # Enough render slots for every shard of an export, plus the interactive reserve
+    set_render_scheduler(RenderScheduler(max_workers=jobs + 1))
+
+@given('Marp renders an extra page for each shard deck')
+def step_impl(context):
+    render = context.mock_marp.side_effect
+
+    def extra_page(args, cwd=None, **kwargs):
+        result = render(args, cwd=cwd, **kwargs)
+        deck = args[2]
+        if deck.startswith(".render-shard-") and "--images" in args:
+            # e.g. a directive that splits a slide into two pages
+            base, ext = os.path.splitext(os.path.join(cwd, args[args.index("--output") + 1]))
+            with open(f"{base}.999{ext}", "w") as out:
+                out.write("extra page")
+        return result
+
+    context.mock_marp.side_effect = extra_page
+
+@given('Marp renders wait until they are released')
+def step_impl(context):
+    render = context.mock_marp.side_effect
+    context.marp_release = threading.Event()
+    context.marp_lock = threading.Lock()
+    context.marp_in_flight = 0
+    context.marp_max_in_flight = 0
+
+    def held(*args, **kwargs):
+        with context.marp_lock:
+            context.marp_in_flight += 1
+            context.marp_max_in_flight = max(context.marp_max_in_flight, context.marp_in_flight)
+        try:
+            context.marp_release.wait(timeout=10)
+            return render(*args, **kwargs)
+        finally:
+            with context.marp_lock:
+                context.marp_in_flight -= 1
+
+    context.mock_marp.side_effect = held
+
+@when('I start exporting "{name}" to PDF')
+def step_impl(context, name):
+    context.export_thread = threading.Thread(
+        target=lambda: _export_pdf(context, name), daemon=True
+    )
+    context.export_thread.start()
+    deadline = time.time() + 5
+    # Wait until every shard the export was granted is rendering
+    while time.time() < deadline:
+        granted = context.scheduler.stats()["running"]["export"]
+        if granted and context.marp_in_flight == granted:
+            break
+        time.sleep(0.01)
+    assert context.marp_in_flight, "The export never started rendering"
+
+@when('Marp renders are released')
+def step_impl(context):
+    context.marp_release.set()
+    context.export_thread.join(timeout=10)
+    assert not context.export_thread.is_alive(), "The export never finished"
+
+@then('"{name}" should have run while the export was still running')
+def step_impl(context, name):
+    context.jobs[name]["thread"].join(timeout=5)
+    assert name in context.run_order, f"{name} never ran: {context.run_order}"
+    assert context.export_thread.is_alive(), "The export had already finished"
+
+@then('at most {count:d} Marp renders should have run at once')
+def step_impl(context, count):
+    assert context.marp_max_in_flight <= count, \
+        f"{context.marp_max_in_flight} Marp renders ran at once"
+
+@given('a PDF merger is available')
+def step_impl(context):
+    _start_patch(context, 'deckbot.sharded_render._pdf_merger', return_value=FakePdfWriter)
+
+@given('no PDF merger is available')
+def step_impl(context):
+    _start_patch(context, 'deckbot.sharded_render._pdf_merger', return_value=None)
+
+@then('the previews of "{name}" should follow the deck order')
+def step_impl(context, name):
+    preview_dir = os.path.join(context.temp_dir, name, ".previews")
+    for i, path in enumerate(context.preview_paths, start=1):
+        assert path == os.path.join(preview_dir, f"slide.{i:03d}.png"), path
+        with open(path) as f:
+            assert f"# Slide {i}\n" in f.read(), f"{path} holds the wrong slide"
+
+@when('I build "{name}" as "{fmt}" with {jobs:d} jobs')
+def step_impl(context, name, fmt, jobs):
+    runner = CliRunner()
+    context.result = runner.invoke(cli, shlex.split(f"build '{name}' --format {fmt} --jobs {jobs}"),
+                                   env={'VIBE_PRESENTATION_ROOT': context.temp_dir})
+    assert context.result.exit_code == 0, context.result.output
+
+@then('the "{name}" folder should contain images "{first}" to "{last}"')
+def step_impl(context, name, first, last):
+    folder = os.path.join(context.temp_dir, name)
+    images = sorted(f for f in os.listdir(folder) if f.startswith("deck.") and f.endswith(".png"))
+    assert images[0] == first and images[-1] == last, images
+    for i, image in enumerate(images, start=1):
+        with open(os.path.join(folder, image)) as f:
+            assert f"# Slide {i}\n" in f.read(), f"{image} holds the wrong slide"
+
+def _export_pdf(context, name):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    tools = PresentationTools(manager.get_presentation(name), MagicMock(), root_dir=context.temp_dir)
+    with patch('os.startfile', create=True), patch('os.name', 'nt'):
+        context.tool_result = tools.export_pdf()
+    assert "PDF export successful" in context.tool_result, context.tool_result
+    context.pdf_path = os.path.join(context.temp_dir, name, f"{name}.pdf")
+
+@when('I export "{name}" to PDF')
+def step_impl(context, name):
+    _export_pdf(context, name)
+
+@then('the exported PDF should contain slides {first:d} to {last:d} in order')
+def step_impl(context, first, last):
+    with open(context.pdf_path) as f:
+        content = f.read()
+    positions = [content.index(f"# Slide {i}\n") for i in range(first, last + 1)]
+    assert positions == sorted(positions), "Slides are out of order"
@@ -0,0 +1,156 @@
+from behave import given, when, then
+from unittest.mock import patch
+import base64
+import json
+import os
+import time
+
+from PIL import Image
+
+from deckbot.fake_genai import FakeGenaiClient
+from deckbot.genai_client import LATENCY_ENV, RECORD_ENV, REPLAY_ENV
+from deckbot.manager import PresentationManager
+from deckbot.nano_banana import NanoBananaClient
+from deckbot.session_service import SessionService
+
+# 1x1 PNG
+PNG_1X1 = base64.b64encode(
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89'
+    b'\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
+).decode()
+
+
+def _set_env(context, name, value):
+    previous = os.environ.get(name)
+    os.environ[name] = value
+
+    def restore():
+        if previous is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = previous
+    context.add_cleanup(restore)
+
+
+def _unset_env(context, name):
+    if name in os.environ:
+        _set_env(context, name, os.environ[name])
+        del os.environ[name]
+
+
+def _cassette_dir(context):
+    return os.path.join(context.temp_dir, ".cassette")
+
+
+def _cassette(context, component):
+    with open(os.path.join(_cassette_dir(context), f"{component}.jsonl")) as f:
+        return [json.loads(line) for line in f]
+
+
+@given('Gemini answers with the script:')
+def step_impl(context):
+    context.gemini_script = json.loads(context.text)
+    context.gemini_delay = 0.0
+    context.mock_new_client_cls.side_effect = lambda *args, **kwargs: FakeGenaiClient(
+        context.gemini_script, chunk_delay=context.gemini_delay)
+
+
+@given('Gemini streams one chunk every {delay:f} seconds')
+def step_impl(context, delay):
+    context.gemini_delay = delay
+
+
+@given('Gemini answers every request with an image')
+def step_impl(context):
+    context.gemini_script = [[{"image": PNG_1X1}] for _ in range(4)]
+
+
+@given('Gemini calls are recorded to a cassette')
+def step_impl(context):
+    _set_env(context, RECORD_ENV, _cassette_dir(context))
+
+
+@when('Gemini is unavailable')
+def step_impl(context):
+    def unavailable(*args, **kwargs):
+        raise AssertionError("Gemini was called during a replay")
+    context.mock_new_client_cls.side_effect = unavailable
+    _unset_env(context, RECORD_ENV)
+    _unset_env(context, 'GOOGLE_API_KEY')
+
+
+@when('Gemini calls are replayed from the cassette')
+def step_impl(context):
+    _set_env(context, REPLAY_ENV, _cassette_dir(context))
+
+
+@when('Gemini calls are replayed from the cassette with "{latency}" latency')
+def step_impl(context, latency):
+    _set_env(context, REPLAY_ENV, _cassette_dir(context))
+    _set_env(context, LATENCY_ENV, latency)
+
+
+@given('I send "{message}" through the agent of "{name}"')
+@when('I send "{message}" through the agent of "{name}"')
+def step_impl(context, message, name):
+    presentation = PresentationManager(root_dir=context.temp_dir).get_presentation(name)
+    # Outside the secrets profile, so the key comes from the environment (or is missing)
+    with patch('deckbot.secrets.SecretsManager.get_active_profile', return_value=None):
+        service = SessionService(presentation)
+    service.agent.tools_handler.configure_auto_compile(quiet_period=0, max_latency=0)
+    started = time.perf_counter()
+    with patch('deckbot.tools.compile_deck'):
+        context.reply = service.send_message(message)
+    context.turn_seconds = time.perf_counter() - started
+
+
+@given('the deck of "{name}" is reset')
+def step_impl(context, name):
+    path = os.path.join(context.temp_dir, name, "deck.marp.md")
+    with open(path, "w") as f:
+        f.write("---\nmarp: true\n---\n\n# Original title\n")
+
+
+@given('I generate image candidates for "{name}"')
+@when('I generate image candidates for "{name}"')
+def step_impl(context, name):
+    nano = NanoBananaClient({'name': name}, root_dir=context.temp_dir)
+    candidates = nano.generate_candidates("a lighthouse at dusk")["candidates"]
+    context.candidate_runs = getattr(context, 'candidate_runs', []) + [candidates]
+
+
+@then('the "{component}" cassette should contain {count:d} calls')
+def step_impl(context, component, count):
+    calls = _cassette(context, component)
+    assert len(calls) == count, [c["method"] for c in calls]
+
+
+@then('the first recorded "{component}" call should contain a function call to "{tool}"')
+def step_impl(context, component, tool):
+    first = _cassette(context, component)[0]
+    calls = [part["function_call"]["name"]
+             for chunk in first["chunks"]
+             for part in chunk["response"]["candidates"][0]["content"]["parts"]
+             if "function_call" in part]
+    assert calls == [tool], calls
+
+
+@then('the reply should be "{text}"')
+def step_impl(context, text):
+    expected = text.replace("\\n", "\n")
+    assert context.reply == expected, repr(context.reply)
+
+
+@then('the turn should have taken at least {seconds:f} seconds')
+def step_impl(context, seconds):
+    assert context.turn_seconds >= seconds, f"{context.turn_seconds:.3f}s"
+
+
+@then('the replayed candidates should be the recorded images')
+def step_impl(context):
+    recorded, replayed = context.candidate_runs
+    assert len(replayed) == 4, replayed
+    for original, copy in zip(recorded, replayed):
+        with Image.open(original) as a, Image.open(copy) as b:
+            assert a.size == b.size == (1, 1), (a.size, b.size)
+            assert list(a.getdata()) == list(b.getdata())
@@ -0,0 +1,129 @@
+from behave import given, when, then
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from deckbot.render_coordinator import RenderCoordinator, compile_deck
+
+def _wait_until(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+def _coordinator(context):
+    if not hasattr(context, 'coordinator'):
+        context.coordinator = RenderCoordinator()
+        patcher = patch('deckbot.render_coordinator._coordinator', context.coordinator)
+        patcher.start()
+        context.add_cleanup(patcher.stop)
+        context.compile_threads = []
+        context.compile_outcomes = []
+    return context.coordinator
+
+def _presentation_dir(context, name):
+    return os.path.join(context.temp_dir, name)
+
+def _request_compile(context, name):
+    coordinator = _coordinator(context)
+    pres_dir = _presentation_dir(context, name)
+    before = (coordinator.joined, coordinator.in_flight(pres_dir, "html"))
+
+    def worker():
+        try:
+            context.compile_outcomes.append(("ok", compile_deck(pres_dir)))
+        except Exception as e:
+            context.compile_outcomes.append(("error", e))
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    context.compile_threads.append(thread)
+    # Wait until the request has joined a render or queued its own
+    assert _wait_until(lambda: (coordinator.joined, coordinator.in_flight(pres_dir, "html")) != before), \
+        "Compile request never reached the render coordinator"
+
+@given('Marp runs are held until released')
+def step_impl(context):
+    _coordinator(context)
+    context.marp_gate = threading.Event()
+    context.marp_invocations = []
+
+    def held_run(cmd, cwd=None, **kwargs):
+        if not (cwd or "").startswith(context.temp_dir):
+            # Stray render from an earlier scenario's background thread
+            return MagicMock(returncode=0)
+        with open(os.path.join(cwd, "deck.marp.md")) as f:
+            context.marp_invocations.append(f.read())
+        context.marp_gate.wait(timeout=10)
+        return MagicMock(returncode=0)
+
+    patcher = patch('subprocess.run', side_effect=held_run)
+    patcher.start()
+    context.add_cleanup(patcher.stop)
+
+@when('{count:d} compiles of "{name}" are requested at once')
+def step_impl(context, count, name):
+    for _ in range(count):
+        _request_compile(context, name)
+
+@when('a compile of "{name}" is requested in the background')
+def step_impl(context, name):
+    _request_compile(context, name)
+    if hasattr(context, 'marp_invocations') and len(context.compile_threads) == 1:
+        # The first request should actually be rendering before anything else happens
+        assert _wait_until(lambda: len(context.marp_invocations) == 1), "Marp was never invoked"
+
+@when('the deck of "{name}" is changed to "{text}"')
+def step_impl(context, name, text):
+    with open(os.path.join(_presentation_dir(context, name), "deck.marp.md"), "w") as f:
+        f.write(f"---\nmarp: true\n---\n\n# {text}\n")
+
+@when('the held Marp runs are released')
+def step_impl(context):
+    context.marp_gate.set()
+
+@when('the render daemon has picked up the job')
+def step_impl(context):
+    def hung():
+        if not os.path.exists(context.daemon_log):
+            return False
+        with open(context.daemon_log) as f:
+            return any(line.startswith("hang") for line in f)
+    assert _wait_until(hung), "The render daemon never received the job"
+
+def _finish(context):
+    for thread in context.compile_threads:
+        thread.join(timeout=15)
+        assert not thread.is_alive(), "A compile request never finished"
+
+@then('Marp should have been invoked {count:d} time')
+@then('Marp should have been invoked {count:d} times')
+def step_impl(context, count):
+    _finish(context)
+    assert len(context.marp_invocations) == count, \
+        f"Expected {count} Marp runs, got {len(context.marp_invocations)}"
+
+@then('the last Marp invocation should have rendered "{text}"')
+def step_impl(context, text):
+    assert text in context.marp_invocations[-1], f"Last render was: {context.marp_invocations[-1]}"
+
+@then('every compile request should have succeeded')
+def step_impl(context):
+    _finish(context)
+    assert len(context.compile_outcomes) == len(context.compile_threads)
+    for status, value in context.compile_outcomes:
+        assert status == "ok", f"Compile failed: {value!r}"
+
+@then('every compile request should have received the same result')
+def step_impl(context):
+    results = {id(value) for _, value in context.compile_outcomes}
+    assert len(results) == 1, f"Requests got {len(results)} different results"
+
+@then('{count:d} render should have been cancelled')
+@then('{count:d} renders should have been cancelled')
+def step_impl(context, count):
+    _finish(context)
+    assert context.coordinator.cancelled == count, \
+        f"Expected {count} cancelled renders, got {context.coordinator.cancelled}"
@@ -0,0 +1,161 @@
+from behave import given, when, then
+import os
+import shutil
+import sys
+from unittest.mock import MagicMock, patch
+from deckbot.tools import PresentationTools
+from deckbot.manager import PresentationManager
+from deckbot.render_service import MarpRenderService, _find_marp_cli, set_render_service
+
+FAKE_DAEMON = '''
+import json, os, sys
+
+log_path, mode = sys.argv[1], sys.argv[2]
+
+def record(line):
+    with open(log_path, "a") as f:
+        f.write(line + "\\n")
+
+if mode == "broken":
+    print(json.dumps({"ready": False, "error": "Cannot find module '@marp-team/marp-cli'"}), flush=True)
+    sys.exit(1)
+
+record("start %d" % os.getpid())
+print(json.dumps({"ready": True}), flush=True)
+
+handled = 0
+for line in sys.stdin:
+    job = json.loads(line)
+    handled += 1
+    if mode == "crash" and handled == 2:
+        record("crash")
+        sys.exit(1)
+    if mode == "hang-once":
+        with open(log_path) as f:
+            hung_before = any(l.startswith("hang") for l in f)
+        if not hung_before:
+            # Never answer: the job only ends if the caller gives up on it
+            record("hang %d" % os.getpid())
+            continue
+    cwd = job.get("cwd") or "."
+    with open(os.path.join(cwd, "deck.marp.html"), "w") as f:
+        f.write("<section>Slide</section>")
+    record("job %d %s" % (os.getpid(), " ".join(job["args"])))
+    print(json.dumps({"id": job["id"], "ok": True, "code": 0, "stderr": ""}), flush=True)
+'''
+
+def _configure_fake_daemon(context, mode):
+    script = os.path.join(context.temp_dir, "fake_marp_daemon.py")
+    with open(script, "w") as f:
+        f.write(FAKE_DAEMON)
+    context.daemon_log = os.path.join(context.temp_dir, "fake_marp_daemon.log")
+    context.render_service = MarpRenderService(
+        command=[sys.executable, script, context.daemon_log, mode],
+        startup_timeout=10
+    )
+    set_render_service(context.render_service)
+    os.environ['DECKBOT_RENDER_DAEMON'] = '1'
+
+def _daemon_log(context):
+    if not os.path.exists(context.daemon_log):
+        return []
+    with open(context.daemon_log) as f:
+        return [line.strip() for line in f if line.strip()]
+
+@given('a fake render daemon is configured')
+def step_impl(context):
+    _configure_fake_daemon(context, "ok")
+
+@given('a fake render daemon that crashes on its second job is configured')
+def step_impl(context):
+    _configure_fake_daemon(context, "crash")
+
+@given('a fake render daemon that never finishes its first job is configured')
+def step_impl(context):
+    _configure_fake_daemon(context, "hang-once")
+
+@given('a fake render daemon that cannot load Marp is configured')
+def step_impl(context):
+    _configure_fake_daemon(context, "broken")
+
+@when('I compile the "{name}" presentation {count:d} times')
+def step_impl(context, name, count):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    presentation = manager.get_presentation(name)
+    tools = PresentationTools(presentation, MagicMock())
+    tools.on_presentation_updated = MagicMock()
+    
+    context.compile_results = []
+    with patch('subprocess.run') as mock_run:
+        mock_run.return_value.returncode = 0
+        for i in range(count):
+            # Edit the deck each time so no compile is skipped as unchanged
+            with open(os.path.join(context.temp_dir, name, "deck.marp.md"), "a") as f:
+                f.write(f"\n<!-- edit {i} -->\n")
+            context.compile_results.append(tools.compile_presentation())
+        context.mock_run = mock_run
+
+@then('every compile should succeed')
+def step_impl(context):
+    for result in context.compile_results:
+        assert "Compilation successful" in result, f"Unexpected result: {result}"
+
+@then('the render daemon should have been started {count:d} time')
+@then('the render daemon should have been started {count:d} times')
+def step_impl(context, count):
+    starts = [line for line in _daemon_log(context) if line.startswith("start ")]
+    assert len(starts) == count, f"Expected {count} daemon starts, log: {_daemon_log(context)}"
+
+@then('the render daemon should have handled {count:d} jobs')
+def step_impl(context, count):
+    jobs = [line for line in _daemon_log(context) if line.startswith("job ")]
+    assert len(jobs) == count, f"Expected {count} jobs, log: {_daemon_log(context)}"
+    pids = {line.split()[1] for line in jobs}
+    assert len(pids) == 1, f"Jobs ran in more than one process: {pids}"
+
+def _npx_calls(context):
+    return [c for c in context.mock_run.call_args_list
+            if "npx" in c[0][0] and "@marp-team/marp-cli" in c[0][0]]
+
+@then('Marp CLI should not have been spawned via npx')
+def step_impl(context):
+    assert not _npx_calls(context), f"npx was called: {context.mock_run.call_args_list}"
+
+@then('Marp CLI should have been spawned via npx {count:d} time')
+@then('Marp CLI should have been spawned via npx {count:d} times')
+def step_impl(context, count):
+    calls = _npx_calls(context)
+    assert len(calls) == count, f"Expected {count} npx calls, got {len(calls)}: {calls}"
+
+@then('the render daemon should be marked unavailable')
+def step_impl(context):
+    assert not context.render_service.available
+    assert "marp-cli" in context.render_service.disabled_reason
+
+@given('the real render daemon is configured')
+def step_impl(context):
+    if not shutil.which("node") or not _find_marp_cli():
+        context.scenario.skip("node or an installed @marp-team/marp-cli is required")
+        return
+    context.render_service = MarpRenderService(startup_timeout=60)
+    set_render_service(context.render_service)
+
+@when('I render the "{name}" deck with the render daemon {count:d} times')
+def step_impl(context, name, count):
+    presentation_dir = os.path.join(context.temp_dir, name)
+    for _ in range(count):
+        # A daemon that waits for stdin would never answer: the timeout fails the job
+        result = context.render_service.render(["deck.marp.md", "--allow-local-files"],
+                                               cwd=presentation_dir, timeout=120)
+        assert result is not None, f"The daemon did not take the job: {context.render_service.disabled_reason}"
+        code, stderr = result
+        assert code == 0, stderr
+
+@then('the render daemon should have completed {count:d} jobs')
+def step_impl(context, count):
+    assert context.render_service.jobs_completed == count, context.render_service.jobs_completed
+    assert context.render_service.processes_started == 1, context.render_service.processes_started
+
+@then('the "{name}" deck should have been compiled to HTML')
+def step_impl(context, name):
+    assert os.path.exists(os.path.join(context.temp_dir, name, "deck.marp.html"))
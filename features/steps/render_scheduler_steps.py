@@ -0,0 +1,112 @@
+from behave import given, when, then
+import threading
+import time
+from deckbot.render_scheduler import (
+    INTERACTIVE, BACKGROUND, EXPORT, RenderScheduler, set_render_scheduler
+)
+
+PRIORITIES = {"interactive": INTERACTIVE, "background": BACKGROUND, "export": EXPORT}
+
+def _wait_until(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+def _total_queued(context):
+    return sum(context.scheduler.stats()["queued"].values())
+
+def _submit(context, priority, name, keep_running):
+    gate = threading.Event()
+    if not keep_running:
+        gate.set()
+
+    def job():
+        context.run_order.append(name)
+        gate.wait(timeout=10)
+
+    queued_before = _total_queued(context)
+    thread = threading.Thread(
+        target=lambda: context.scheduler.run(job, priority=PRIORITIES[priority], label=name),
+        daemon=True
+    )
+    context.jobs[name] = {"gate": gate, "thread": thread}
+    thread.start()
+    # Wait until the job is either running or waiting in the queue
+    assert _wait_until(lambda: name in context.run_order or _total_queued(context) > queued_before), \
+        f"Render {name} never reached the scheduler"
+
+@given('a render scheduler with {count:d} worker')
+@given('a render scheduler with {count:d} workers')
+def step_impl(context, count):
+    context.scheduler = RenderScheduler(max_workers=count)
+    set_render_scheduler(context.scheduler)
+    context.jobs = {}
+    context.run_order = []
+
+@when('an {priority} render "{name}" is started and kept running')
+def step_impl(context, priority, name):
+    _submit(context, priority, name, keep_running=True)
+    assert _wait_until(lambda: name in context.run_order), f"{name} did not start"
+
+@when('a {priority} render "{name}" is submitted')
+@when('an {priority} render "{name}" is submitted')
+def step_impl(context, priority, name):
+    _submit(context, priority, name, keep_running=False)
+
+@when('"{name}" finishes')
+def step_impl(context, name):
+    context.jobs[name]["gate"].set()
+
+@when('an interactive render submits a nested background render')
+def step_impl(context):
+    context.nested_done = []
+
+    def inner():
+        context.nested_done.append("inner")
+
+    def outer():
+        context.scheduler.run(inner, priority=BACKGROUND, label="inner")
+        context.nested_done.append("outer")
+
+    thread = threading.Thread(target=lambda: context.scheduler.run(outer, priority=INTERACTIVE), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+@when('I request the render queue status')
+def step_impl(context):
+    from deckbot.webapp import app
+    context.client = app.test_client()
+    response = context.client.get('/api/render/queue')
+    assert response.status_code == 200
+    context.response_json = response.get_json()
+
+@then('the renders should have run in the order "{order}"')
+def step_impl(context, order):
+    for job in context.jobs.values():
+        job["thread"].join(timeout=10)
+        assert not job["thread"].is_alive(), "A render never finished"
+    expected = [name.strip() for name in order.split(",")]
+    assert context.run_order == expected, f"Expected {expected}, got {context.run_order}"
+
+@then('"{name}" should have run while "{other}" was still running')
+def step_impl(context, name, other):
+    context.jobs[name]["thread"].join(timeout=5)
+    assert name in context.run_order, f"{name} never ran: {context.run_order}"
+    assert context.jobs[other]["thread"].is_alive(), f"{other} had already finished"
+
+@then('the render queue should report {count:d} queued {priority} render')
+def step_impl(context, count, priority):
+    queued = context.scheduler.stats()["queued"][priority]
+    assert queued == count, f"Expected {count} queued {priority} renders, got {queued}"
+
+@then('the render queue status should show {count:d} {state} {priority} render')
+def step_impl(context, count, state, priority):
+    actual = context.response_json[state][priority]
+    assert actual == count, f"Expected {count} {state} {priority} renders, got {context.response_json}"
+
+@then('both renders should have completed')
+def step_impl(context):
+    assert context.nested_done == ["inner", "outer"], f"Nested renders: {context.nested_done}"
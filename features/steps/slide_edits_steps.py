@@ -0,0 +1,136 @@
+from behave import given, when, then
+from unittest.mock import MagicMock, patch
+from google.genai import types
+from deckbot.deck_document import load_deck
+from deckbot.manager import PresentationManager
+from deckbot.tools import PresentationTools
+from deck_files import deck_path
+
+def _run_tool(context, name, call):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    tools = PresentationTools(manager.get_presentation(name), MagicMock())
+    tools.on_presentation_updated = MagicMock()
+    context.slide_changes = []
+    tools.on_slides_changed = context.slide_changes.append
+    with open(deck_path(context, name), "rb") as f:
+        context.deck_before = f.read()
+    # Keep the auto-compile from running Marp
+    with patch('deckbot.tools.compile_deck', return_value=None) as compile_deck:
+        context.tool_result = call(tools)
+    context.compile_count = compile_deck.call_count
+
+@given('the deck of "{name}" has the slides "{titles}"')
+def step_impl(context, name, titles):
+    slides = [f"# {title.strip()}\n\nAbout {title.strip().lower()}" for title in titles.split(",")]
+    with open(deck_path(context, name), "w") as f:
+        f.write("---\nmarp: true\ntheme: default\n---\n\n" + "\n\n---\n\n".join(slides) + "\n")
+    context.preview_deck = name
+
+@given('the deck of "{name}" has Windows line endings')
+def step_impl(context, name):
+    with open(deck_path(context, name), "rb") as f:
+        content = f.read()
+    with open(deck_path(context, name), "wb") as f:
+        f.write(content.replace(b"\n", b"\r\n"))
+
+@when('I replace slide {number:d} of "{name}" with "{content}"')
+def step_impl(context, number, name, content):
+    content = content.replace("\\n", "\n")
+    _run_tool(context, name, lambda tools: tools.replace_slide(number, content))
+
+@when('I insert "{content}" after slide {number:d} of "{name}"')
+def step_impl(context, content, number, name):
+    content = content.replace("\\n", "\n")
+    _run_tool(context, name, lambda tools: tools.insert_slide_after(number, content))
+
+@when('I move slide {number:d} of "{name}" to position {position:d}')
+def step_impl(context, number, name, position):
+    _run_tool(context, name, lambda tools: tools.move_slide(number, position))
+
+@when('I delete slide {number:d} of "{name}"')
+def step_impl(context, number, name):
+    _run_tool(context, name, lambda tools: tools.delete_slide(number))
+
+@then('the slides of "{name}" should be "{titles}"')
+def step_impl(context, name, titles):
+    expected = [title.strip() for title in titles.split(",")]
+    actual = [slide.title for slide in load_deck(deck_path(context, name)).slides]
+    assert actual == expected, f"Slides: {actual}\n{context.tool_result}"
+
+@then('the deck file of "{name}" should only have Windows line endings')
+def step_impl(context, name):
+    with open(deck_path(context, name), "rb") as f:
+        content = f.read()
+    assert content.count(b"\n") == content.count(b"\r\n"), content
+
+@then('the deck file of "{name}" should be unchanged before slide {number:d}')
+def step_impl(context, name, number):
+    before = load_deck(deck_path(context, name)).slide(number).start
+    with open(deck_path(context, name), "rb") as f:
+        after = f.read()
+    assert after[:before] == context.deck_before[:before]
+
+@then('the tool result should include "{text}"')
+def step_impl(context, text):
+    assert text in context.tool_result, context.tool_result
+
+@then('the slide change listener should report changed slides "{changed}" and a slide count of {count:d}')
+def step_impl(context, changed, count):
+    assert len(context.slide_changes) == 1, context.slide_changes
+    change = context.slide_changes[0]
+    assert change["changed"] == [int(n) for n in changed.split(",")], change
+    assert change["slide_count"] == count, change
+
+@when('I apply these edits to "{name}"')
+def step_impl(context, name):
+    edits = []
+    for row in context.table:
+        edit = {"action": row["action"]}
+        for key in ("slide_number", "new_position"):
+            if row[key]:
+                edit[key] = int(row[key])
+        for key in ("content", "old_text", "new_text"):
+            if row[key]:
+                edit[key] = row[key].replace("\\n", "\n")
+        edits.append(edit)
+    _run_tool(context, name, lambda tools: tools.apply_edits(edits))
+
+@then('the deck of "{name}" should be compiled {count:d} time')
+@then('the deck of "{name}" should be compiled {count:d} times')
+def step_impl(context, name, count):
+    assert context.compile_count == count, f"Compiled {context.compile_count} times\n{context.tool_result}"
+
+@then('the deck file of "{name}" should not have changed')
+def step_impl(context, name):
+    with open(deck_path(context, name), "rb") as f:
+        assert f.read() == context.deck_before
+
+def _schemas(schema, path):
+    """Yield (path, schema) for a schema and every schema nested in it."""
+    yield path, schema
+    for name, prop in (schema.properties or {}).items():
+        yield from _schemas(prop, f"{path}.{name}")
+    if schema.items:
+        yield from _schemas(schema.items, f"{path}[]")
+
+@when("I build the function declarations of the agent's tools")
+def step_impl(context):
+    # The declarations sent with every chat request (see Agent.tools_list)
+    context.declarations = {
+        tool.__name__: types.FunctionDeclaration.from_callable_with_api_option(callable=tool, api_option='GEMINI_API')
+        for tool in context.agent.tools_list
+    }
+
+@then('every object in the tool declarations should declare its properties')
+def step_impl(context):
+    empty = [path for name, declaration in context.declarations.items() if declaration.parameters
+             for path, schema in _schemas(declaration.parameters, name)
+             if schema.type == types.Type.OBJECT and not schema.properties]
+    assert not empty, f"OBJECT schemas without properties: {empty}"
+
+@then('the edits of "{tool}" should declare "{names}"')
+def step_impl(context, tool, names):
+    items = context.declarations[tool].parameters.properties["edits"].items
+    expected = [name.strip() for name in names.split(",")]
+    assert list(items.properties) == expected, list(items.properties)
+    assert items.required == ["action"], items.required
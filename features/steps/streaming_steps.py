@@ -0,0 +1,118 @@
+from behave import given, when, then
+from unittest.mock import patch
+import io
+import json
+import os
+
+from rich.console import Console
+
+from deckbot.deck_document import load_deck
+from deckbot.fake_genai import FakeGenaiClient
+from deckbot.manager import PresentationManager
+from deckbot.repl import StreamPrinter
+from deckbot.session_service import SessionService
+
+
+def _fail_model(client, model):
+    """Make every request to one model fail as if it were overloaded."""
+    for method in ('generate_content', 'generate_content_stream'):
+        original = getattr(client.models, method)
+
+        def call(*args, _original=original, **kwargs):
+            if kwargs.get('model') == model:
+                raise Exception("503 UNAVAILABLE: The model is overloaded.")
+            return _original(*args, **kwargs)
+        setattr(client.models, method, call)
+
+
+@given('the model is a fake streaming client with the script:')
+def step_impl(context):
+    context.fake_script = json.loads(context.text)
+
+
+@given('response streaming is turned off')
+def step_impl(context):
+    patcher = patch('deckbot.preferences.PreferencesManager.get',
+                    side_effect=lambda key, default=None: False if key == 'stream_responses' else default)
+    patcher.start()
+    context.add_cleanup(patcher.stop)
+
+
+@given('I send "{message}" to the session of "{name}"')
+@when('I send "{message}" to the session of "{name}"')
+def step_impl(context, message, name):
+    presentation = PresentationManager(root_dir=context.temp_dir).get_presentation(name)
+    service = SessionService(presentation)
+    service.agent.client = FakeGenaiClient(context.fake_script)
+    if getattr(context, 'unavailable_model', None) == 'primary':
+        _fail_model(service.agent.client, service.agent.model_names[0])
+    context.service = service
+    # Don't wait on the compile debounce window
+    service.agent.tools_handler.configure_auto_compile(quiet_period=0, max_latency=0)
+    context.session_events = []
+    service.subscribe(lambda event_type, data: context.session_events.append((event_type, data)))
+    with patch('deckbot.tools.compile_deck'):
+        context.reply = service.send_message(message)
+
+
+def _event_names(context):
+    return [event_type for event_type, _ in context.session_events]
+
+
+@then('the session events should start with "{names}"')
+def step_impl(context, names):
+    expected = [name.strip() for name in names.split(",")]
+    # Ignore the echoed user message and request details
+    events = [name for name in _event_names(context) if name not in ("message", "agent_request_details")]
+    assert events[:len(expected)] == expected, events
+
+
+@then('the streamed text should be "{text}"')
+def step_impl(context, text):
+    streamed = "".join(data["text"] for event_type, data in context.session_events if event_type == "stream_delta")
+    assert streamed == text, repr(streamed)
+
+
+@then('the "{first}" event should come before the "{second}" event')
+def step_impl(context, first, second):
+    names = _event_names(context)
+    assert first in names and second in names, names
+    assert names.index(first) < names.index(second), names
+
+
+@then('the model reply should be "{text}"')
+def step_impl(context, text):
+    expected = text.replace("\\n", "\n")
+    assert context.reply == expected, repr(context.reply)
+    messages = [data["content"] for event_type, data in context.session_events
+                if event_type == "message" and data.get("role") == "model"]
+    assert messages == [expected], messages
+
+
+@then('slide {number:d} of "{name}" should contain "{text}"')
+def step_impl(context, number, name, text):
+    deck = load_deck(os.path.join(context.temp_dir, name, "deck.marp.md"))
+    assert text in deck.slide(number).text, deck.slide(number).text
+
+
+@then('no "{name}" event should have been sent')
+def step_impl(context, name):
+    assert name not in _event_names(context), _event_names(context)
+
+
+@when('the REPL prints a streamed reply "{text}"')
+def step_impl(context, text):
+    context.repl_output = io.StringIO()
+    printer = StreamPrinter(Console(file=context.repl_output, force_terminal=False, width=80))
+    printer.begin(None)
+    printer("stream_start", {})
+    for word in text.split(" "):
+        printer("stream_delta", {"text": word + " "})
+    printer("stream_end", {"text": text})
+    printer.print_reply(text)
+
+
+@then('the REPL console should show "{text}" once')
+def step_impl(context, text):
+    output = context.repl_output.getvalue()
+    assert output.count(text) == 1, output
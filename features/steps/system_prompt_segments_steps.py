@@ -0,0 +1,72 @@
+from behave import given, when, then
+from unittest.mock import patch
+import json
+import os
+
+from deckbot.agent import Agent
+from deckbot.manager import PresentationManager
+
+
+@given('the agent for "{name}" has built its system prompt')
+def step_impl(context, name):
+    manager = PresentationManager(root_dir=context.temp_dir)
+    presentation = manager.get_presentation(name)
+    with patch.dict(os.environ, {'GOOGLE_API_KEY': 'fake_key'}):
+        context.agent = Agent(presentation, root_dir=context.temp_dir)
+    context.system_prompt = context.agent._build_system_prompt()
+
+
+@when('the agent builds its system prompt again')
+def step_impl(context):
+    context.previous_system_prompt = context.system_prompt
+    context.system_prompt = context.agent._build_system_prompt()
+
+
+@when('the agent builds its system prompt again for slide {number:d}')
+def step_impl(context, number):
+    context.previous_system_prompt = context.system_prompt
+    context.system_prompt = context.agent._build_system_prompt(current_slide=number)
+
+
+@when('I write "{text}" to "{filename}" in "{name}"')
+def step_impl(context, text, filename, name):
+    path = os.path.join(context.temp_dir, name, filename)
+    with open(path, 'a') as f:
+        f.write(f"\n---\n\n{text}\n")
+
+
+@when('I change the description of "{name}" to "{description}"')
+def step_impl(context, name, description):
+    path = os.path.join(context.temp_dir, name, 'metadata.json')
+    with open(path) as f:
+        metadata = json.load(f)
+    metadata['description'] = description
+    with open(path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+@then('no system prompt segment should have been rebuilt')
+def step_impl(context):
+    rebuilt = context.agent.prompt_builder.rebuilt()
+    assert rebuilt == [], f"Rebuilt segments: {rebuilt}"
+
+
+@then('only the system prompt segments "{names}" should have been rebuilt')
+def step_impl(context, names):
+    expected = [name.strip() for name in names.split(',')]
+    rebuilt = context.agent.prompt_builder.rebuilt()
+    assert rebuilt == expected, f"Expected {expected}, rebuilt {rebuilt}"
+
+
+@then('the system prompt should be unchanged')
+def step_impl(context):
+    assert context.system_prompt == context.previous_system_prompt
+
+
+@then('every system prompt segment should report its build time')
+def step_impl(context):
+    timings = context.agent.prompt_builder.timings
+    assert list(timings) == ["presentation", "slide_context", "deck", "instructions", "branding",
+                             "layouts", "marp_docs", "settings", "workflow"], list(timings)
+    for name, timing in timings.items():
+        assert timing["ms"] >= 0 and "cached" in timing and timing["chars"] >= 0, (name, timing)
@@ -0,0 +1,66 @@
+"""Step definitions for template preview builds."""
+import json
+import os
+
+from behave import given, when, then
+
+import deckbot.webapp as webapp
+from deckbot.template_previews import build_template_previews
+from deck_files import deck_path
+
+
+def _templates_dir(context):
+    return os.path.join(context.temp_dir, "templates")
+
+
+def _write_deck(context, name, slides):
+    with open(deck_path(context, name, root=_templates_dir(context)), "w") as f:
+        f.write("---\nmarp: true\ntheme: default\n---\n\n" + "\n\n---\n\n".join(slides) + "\n")
+
+
+@given('there is a gallery template "{name}" with {count:d} slides')
+def step_impl(context, name, count):
+    template_dir = os.path.join(_templates_dir(context), name)
+    os.makedirs(template_dir, exist_ok=True)
+    with open(os.path.join(template_dir, "metadata.json"), "w") as f:
+        json.dump({"name": name, "description": f"{name} template"}, f)
+    _write_deck(context, name, [f"# {name} {i}" for i in range(1, count + 1)])
+    if not hasattr(context, 'gallery_slides'):
+        context.gallery_slides = {}
+    context.gallery_slides[name] = count
+
+
+@given('the template previews are built')
+def step_impl(context):
+    build_template_previews(_templates_dir(context))
+    context.mock_marp.reset_mock()
+
+
+@when('I build the template previews')
+def step_impl(context):
+    context.template_build = build_template_previews(_templates_dir(context))
+
+
+@when('slide {number:d} of the gallery template "{name}" is changed to "{text}"')
+def step_impl(context, number, name, text):
+    _write_deck(context, name, [
+        text if i == number else f"# {name} {i}"
+        for i in range(1, context.gallery_slides[name] + 1)
+    ])
+
+
+@then('the template preview build should report "{name}" as "{status}"')
+def step_impl(context, name, status):
+    assert context.template_build.get(name) == status, context.template_build
+
+
+@then('the gallery should show {count:d} previews for "{name}"')
+def step_impl(context, count, name):
+    client = webapp.app.test_client()
+    response = client.get(f'/api/templates/{name}/preview-slides')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    previews = response.get_json()["previews"]
+    assert len(previews) == count, previews
+    for url in previews:
+        image = client.get(url)
+        assert image.status_code == 200, url
@@ -0,0 +1,102 @@
+from behave import given, when, then
+from unittest.mock import patch
+import os
+
+from deckbot.tracing import TRACE_FILENAME, read_traces
+
+
+def _last_trace(context, name):
+    traces = read_traces(os.path.join(context.temp_dir, name))
+    assert traces, f"No traces recorded for {name}"
+    return traces[-1]
+
+
+def _find(span, name):
+    if span["name"] == name:
+        return span
+    for child in span.get("children", []):
+        found = _find(child, name)
+        if found:
+            return found
+    return None
+
+
+def _walk(span):
+    yield span
+    for child in span.get("children", []):
+        yield from _walk(child)
+
+
+@given('tracing is turned off')
+def step_impl(context):
+    patcher = patch.dict(os.environ, {'DECKBOT_TRACE': '0'})
+    patcher.start()
+    context.add_cleanup(patcher.stop)
+
+
+def _get_traces(context, limit):
+    import deckbot.webapp as webapp
+    previous = webapp.current_service
+    webapp.current_service = context.service
+    context.add_cleanup(setattr, webapp, 'current_service', previous)
+    return webapp.app.test_client().get(f'/api/traces?limit={limit}')
+
+
+@when('I request the traces of the loaded presentation')
+def step_impl(context):
+    response = _get_traces(context, 5)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    context.response_json = response.get_json()
+
+
+@when('I request the traces of the loaded presentation with the limit "{limit}"')
+def step_impl(context, limit):
+    context.traces_response = _get_traces(context, limit)
+
+
+@then('the traces response should be rejected with status {status:d}')
+def step_impl(context, status):
+    assert context.traces_response.status_code == status, \
+        f"Expected {status}, got {context.traces_response.status_code}: {context.traces_response.get_data(as_text=True)}"
+
+
+@then('the trace log of "{name}" should contain {count:d} trace')
+@then('the trace log of "{name}" should contain {count:d} traces')
+def step_impl(context, name, count):
+    traces = read_traces(os.path.join(context.temp_dir, name), limit=None)
+    assert len(traces) == count, f"Expected {count} traces, got {len(traces)}"
+
+
+@then('the last trace of "{name}" should have the spans "{names}"')
+def step_impl(context, name, names):
+    trace = _last_trace(context, name)
+    expected = [n.strip() for n in names.split(",")]
+    actual = [child["name"] for child in trace.get("children", [])]
+    assert actual == expected, f"Expected top-level spans {expected}, got {actual}"
+
+
+@then('in the last trace of "{name}" the "{outer}" span should contain a "{inner}" span')
+def step_impl(context, name, outer, inner):
+    span = _find(_last_trace(context, name), outer)
+    assert span, f"No '{outer}' span in the trace"
+    assert _find({"name": None, "children": span.get("children", [])}, inner), \
+        f"No '{inner}' span inside '{outer}': {span}"
+
+
+@then('every span of the last trace of "{name}" should have a duration')
+def step_impl(context, name):
+    for span in _walk(_last_trace(context, name)):
+        assert isinstance(span.get("ms"), (int, float)) and span["ms"] >= 0, f"Span without duration: {span}"
+
+
+@then('the traces response should list {count:d} trace for the message "{message}"')
+def step_impl(context, count, message):
+    traces = context.response_json["traces"]
+    assert context.response_json["enabled"] is True
+    assert len(traces) == count, f"Expected {count} traces, got {len(traces)}"
+    assert traces[-1]["attrs"]["message"] == message, traces[-1]["attrs"]
+
+
+@then('"{name}" should have no trace log')
+def step_impl(context, name):
+    assert not os.path.exists(os.path.join(context.temp_dir, name, TRACE_FILENAME))
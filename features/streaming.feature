@@ -0,0 +1,29 @@
+Feature: Streaming replies
+  As a user waiting on DeckBot
+  I want to see the reply as it is written, and each tool call as it happens
+  So that I'm not staring at "Thinking..." for the whole turn
+
+  Background:
+    Given I have a presentation "stream-deck" with layouts
+    And the model is a fake streaming client with the script:
+      """
+      [["Let me update the title. ", {"call": "replace_slide", "args": {"slide_number": 1, "content": "# Streamed title"}}, "Done, the title is updated."]]
+      """
+
+  Scenario: Partial text and tool call boundaries are sent as SSE events
+    When I send "Fix the title" to the session of "stream-deck"
+    Then the session events should start with "thinking_start, stream_start, stream_delta"
+    And the streamed text should be "Let me update the title. Done, the title is updated."
+    And the "tool_start" event should come before the "stream_tool_call" event
+    And the model reply should be "Let me update the title.\n\nDone, the title is updated."
+    And slide 1 of "stream-deck" should contain "# Streamed title"
+
+  Scenario: Streaming can be turned off
+    Given response streaming is turned off
+    When I send "Fix the title" to the session of "stream-deck"
+    Then no "stream_delta" event should have been sent
+    And the model reply should be "Done, the title is updated."
+
+  Scenario: The REPL renders the reply as it streams in
+    When the REPL prints a streamed reply "Hello from the stream"
+    Then the REPL console should show "Hello from the stream" once
@@ -0,0 +1,33 @@
+Feature: Memoized system prompt segments
+  As a user chatting with DeckBot
+  I want each turn to start quickly
+  So that only the parts of the system prompt whose inputs changed are rebuilt
+
+  Background:
+    Given I have a presentation "prompt-deck" with layouts
+    And the agent for "prompt-deck" has built its system prompt
+
+  Scenario: An unchanged presentation reuses every segment
+    When the agent builds its system prompt again
+    Then no system prompt segment should have been rebuilt
+    And the system prompt should be unchanged
+
+  Scenario: Editing the deck rebuilds only the deck segment
+    When I write "# Fresh slide" to "deck.marp.md" in "prompt-deck"
+    And the agent builds its system prompt again
+    Then only the system prompt segments "deck" should have been rebuilt
+    And the system prompt should contain "# Fresh slide"
+
+  Scenario: Changing the metadata rebuilds the segments that read it
+    When I change the description of "prompt-deck" to "A new direction"
+    And the agent builds its system prompt again
+    Then only the system prompt segments "presentation, branding, settings" should have been rebuilt
+
+  Scenario: Viewing another slide rebuilds only the slide context
+    When the agent builds its system prompt again for slide 3
+    Then only the system prompt segments "slide_context" should have been rebuilt
+    And the system prompt should contain "currently viewing **slide 3**"
+
+  Scenario: Segment timings are exposed
+    When the agent builds its system prompt again
+    Then every system prompt segment should report its build time
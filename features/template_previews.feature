@@ -0,0 +1,42 @@
+Feature: Template Preview Builds
+  As a user browsing the template gallery
+  I want template previews generated and kept current automatically
+  So that new and edited templates show their slides
+
+  Background:
+    Given there is a gallery template "Alpha" with 3 slides
+    And there is a gallery template "Beta" with 2 slides
+    And Marp image rendering is simulated
+
+  Scenario: Building renders every template
+    When I build the template previews
+    Then the template preview build should report "Alpha" as "built"
+    And the template preview build should report "Beta" as "built"
+    And the gallery should show 3 previews for "Alpha"
+    And the gallery should show 2 previews for "Beta"
+
+  Scenario: Unchanged templates are skipped
+    Given the template previews are built
+    When I build the template previews
+    Then Marp should have been run 0 times
+    And the template preview build should report "Alpha" as "current"
+
+  Scenario: Editing a template rebuilds only that template
+    Given the template previews are built
+    When slide 2 of the gallery template "Alpha" is changed to "# Revised"
+    And I build the template previews
+    Then Marp should have been run 1 time
+    And the template preview build should report "Alpha" as "built"
+    And the template preview build should report "Beta" as "current"
+    And the gallery should show 3 previews for "Alpha"
+
+  Scenario: The gallery shows no previews for an edited template until it is rebuilt
+    Given the template previews are built
+    When slide 2 of the gallery template "Alpha" is changed to "# Revised"
+    Then the gallery should show 0 previews for "Alpha"
+    And the gallery should show 2 previews for "Beta"
+
+  Scenario: Building previews from the command line
+    When I run the command "templates build-previews"
+    Then the output should contain "Alpha: built"
+    And the output should contain "Beta: built"
@@ -0,0 +1,41 @@
+Feature: Per-turn tracing
+  As a developer investigating a slow turn
+  I want each agent turn recorded as nested, timed spans
+  So that I can see whether the time went to the prompt, the model, a tool or a compile
+
+  Background:
+    Given I have a presentation "traced-deck" with layouts
+    And the model is a fake streaming client with the script:
+      """
+      [["Let me fix the title. ", {"call": "replace_slide", "args": {"slide_number": 1, "content": "# Traced title"}}, "Done."]]
+      """
+
+  Scenario: A turn is written to the trace log as nested spans
+    When I send "Fix the title" to the session of "traced-deck"
+    Then the trace log of "traced-deck" should contain 1 trace
+    And the last trace of "traced-deck" should have the spans "prompt, history, model, compile_flush"
+    And in the last trace of "traced-deck" the "model" span should contain a "tool:replace_slide" span
+    And in the last trace of "traced-deck" the "tool:replace_slide" span should contain a "compile" span
+    And every span of the last trace of "traced-deck" should have a duration
+
+  Scenario: Recent traces are served by the API
+    Given I send "Fix the title" to the session of "traced-deck"
+    When I request the traces of the loaded presentation
+    Then the traces response should list 1 trace for the message "Fix the title"
+
+  Scenario: The traces API rejects a limit below one
+    Given I send "Fix the title" to the session of "traced-deck"
+    When I request the traces of the loaded presentation with the limit "0"
+    Then the traces response should be rejected with status 400
+
+  Scenario: The trace command prints the span tree
+    Given I send "Fix the title" to the session of "traced-deck"
+    When I run the command "trace traced-deck"
+    Then the output should contain "tool:replace_slide"
+    And the output should contain "model"
+
+  Scenario: Tracing can be turned off
+    Given tracing is turned off
+    When I send "Fix the title" to the session of "traced-deck"
+    Then "traced-deck" should have no trace log
+    And slide 1 of "traced-deck" should contain "# Traced title"
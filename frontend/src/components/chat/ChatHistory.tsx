@@ -1 +1,29 @@
-H
\ No newline at end of file
+import { useEffect, useRef } from 'react'
+import { useChatStore } from '@/store/useChatStore'
+import { Message } from './Message'
+import { ThinkingIndicator } from './ThinkingIndicator'
+
+export function ChatHistory() {
+  const { messages, isThinking, streamingText } = useChatStore()
+  const bottomRef = useRef<HTMLDivElement>(null)
+
+  // Keep the newest message (or the reply being streamed) in view
+  useEffect(() => {
+    bottomRef.current?.scrollIntoView({ behavior: 'smooth', block: 'end' })
+  }, [messages, streamingText, isThinking])
+
+  return (
+    <div className="flex-1 overflow-y-auto">
+      {messages.map((message, index) => (
+        <Message key={index} message={message} />
+      ))}
+      {/* The streamed reply shows as an in-progress model message until the final message event replaces it */}
+      {streamingText ? (
+        <Message message={{ role: 'model', content: streamingText }} />
+      ) : (
+        isThinking && <ThinkingIndicator />
+      )}
+      <div ref={bottomRef} />
+    </div>
+  )
+}
@@ -4,15 +4,33 @@ import type { Message, ImageCandidate, ImageRequestDetails } from '@/types/Chat'
 
 export function useSSEIntegration() {
   useSSEConnection()
-  const { addMessage, setThinking, setImageRequestDetails, addImageCandidate, setSelectedImageIndex, setCurrentBatchSlug } = useChatStore()
+  const {
+    addMessage, setThinking, setImageRequestDetails, addImageCandidate, setSelectedImageIndex, setCurrentBatchSlug,
+    appendStreamingText, breakStreamingText, clearStreamingText,
+  } = useChatStore()
 
   // Handle incoming messages
   useEventSource('message', (data: any) => {
     if (data.role && data.content) {
+      // The complete reply replaces its streamed text
+      if (data.role === 'model') clearStreamingText()
       addMessage({ role: data.role, content: data.content } as Message)
     }
   })
 
+  // Handle streamed replies
+  useEventSource('stream_start', () => {
+    clearStreamingText()
+  })
+
+  useEventSource('stream_delta', (data: any) => {
+    if (data?.text) appendStreamingText(data.text)
+  })
+
+  useEventSource('stream_tool_call', () => {
+    breakStreamingText()
+  })
+
   // Handle thinking state
   useEventSource('thinking_start', () => {
     setThinking(true)
@@ -20,6 +38,7 @@ export function useSSEIntegration() {
   
   useEventSource('thinking_end', () => {
     setThinking(false)
+    clearStreamingText()
   })
 
   // Handle image generation
@@ -51,11 +70,25 @@ export function useSSEIntegration() {
   })
 
   // Handle presentation updates
-  useEventSource('presentation_updated', () => {
+  useEventSource('presentation_updated', (data: any) => {
+    // Compile status updates ("pending"/"failed") don't change the preview
+    if (data?.compile && data.compile !== 'complete') return
     // Dispatch custom event for preview reload
     window.dispatchEvent(new CustomEvent('presentation-updated'))
   })
 
+  // Background compiles started by file saves and settings changes
+  useEventSource('compile_finished', () => {
+    window.dispatchEvent(new CustomEvent('presentation-updated'))
+  })
+
+  useEventSource('compile_error', (data: any) => {
+    addMessage({
+      role: 'system',
+      content: `Compile failed: ${data?.error || 'unknown error'}`,
+    } as Message)
+  })
+
   // Handle tool calls (they come as system messages)
   useEventSource('tool_call', () => {
     // Tool calls are handled via regular messages
@@ -14,7 +14,10 @@ import type {
   SelectImageRequest,
   SelectLayoutRequest,
   SaveFileRequest,
+  SaveFileResponse,
   UpdatePresentationSettingsRequest,
+  UpdatePresentationSettingsResponse,
+  CompileJob,
   UpdateStyleRequest,
   StyleSpecResponse,
   AgentPromptsResponse,
@@ -104,7 +107,7 @@ export const presentationsAPI = {
   settings: {
     get: (): Promise<PresentationSettings> => fetchJSON('/api/presentation/settings'),
     
-    update: (data: UpdatePresentationSettingsRequest): Promise<{ message: string }> =>
+    update: (data: UpdatePresentationSettingsRequest): Promise<UpdatePresentationSettingsResponse> =>
       fetchJSON('/api/presentation/settings', {
         method: 'POST',
         body: JSON.stringify(data),
@@ -128,7 +131,7 @@ export const presentationsAPI = {
     getContent: (path: string): Promise<FileContent> =>
       fetchJSON(`/api/presentation/file-content?path=${encodeURIComponent(path)}`),
     
-    save: (data: SaveFileRequest): Promise<{ success: boolean; message: string; compile?: any }> =>
+    save: (data: SaveFileRequest): Promise<SaveFileResponse> =>
       fetchJSON('/api/presentation/file-save', {
         method: 'POST',
         body: JSON.stringify(data),
@@ -166,6 +169,12 @@ export const templatesAPI = {
     fetchJSON(`/api/templates/${encodeURIComponent(name)}/preview-slides`),
 }
 
+// Compile job APIs
+export const compileAPI = {
+  status: (jobId: string): Promise<CompileJob> =>
+    fetchJSON(`/api/compile/${encodeURIComponent(jobId)}`),
+}
+
 // Chat APIs
 export const chatAPI = {
   send: (data: ChatRequest): Promise<{ status: string }> =>
@@ -54,9 +54,17 @@ export class SSEService {
       'image_selected',
       'layout_request',
       'presentation_updated',
+      'slides_changed',
+      'compile_started',
+      'compile_finished',
+      'compile_error',
       'tool_call',
       'tool_result',
       'agent_request_details',
+      'stream_start',
+      'stream_delta',
+      'stream_tool_call',
+      'stream_end',
       'error',
     ]
 
@@ -8,6 +8,8 @@ interface ChatState {
   imageRequestDetails: ImageRequestDetails | null
   imageCandidates: ImageCandidate[]
   selectedImageIndex: number | null
+  // Text of the reply being streamed (null when nothing is streaming)
+  streamingText: string | null
   
   // Actions
   addMessage: (message: Message) => void
@@ -19,6 +21,9 @@ interface ChatState {
   clearImageCandidates: () => void
   setSelectedImageIndex: (index: number | null) => void
   setCurrentBatchSlug: (slug: string | null) => void
+  appendStreamingText: (text: string) => void
+  breakStreamingText: () => void
+  clearStreamingText: () => void
 }
 
 export const useChatStore = create<ChatState>((set) => ({
@@ -28,6 +33,7 @@ export const useChatStore = create<ChatState>((set) => ({
   imageRequestDetails: null,
   imageCandidates: [],
   selectedImageIndex: null,
+  streamingText: null,
   
   addMessage: (message) => set((state) => ({
     messages: [...state.messages, message]
@@ -55,5 +61,16 @@ export const useChatStore = create<ChatState>((set) => ({
   setSelectedImageIndex: (index) => set({ selectedImageIndex: index }),
   
   setCurrentBatchSlug: (slug) => set({ currentBatchSlug: slug }),
+  
+  appendStreamingText: (text) => set((state) => ({
+    streamingText: (state.streamingText ?? '') + text
+  })),
+  
+  // A tool call ends the current paragraph of the streamed reply
+  breakStreamingText: () => set((state) => ({
+    streamingText: state.streamingText ? `${state.streamingText.trimEnd()}\n\n` : state.streamingText
+  })),
+  
+  clearStreamingText: () => set({ streamingText: null }),
 }))
 
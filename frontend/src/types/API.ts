@@ -59,6 +59,37 @@ export interface SelectLayoutRequest {
   layout_name: string
 }
 
+export interface CompileJob {
+  job_id: string
+  status: 'queued' | 'running' | 'succeeded' | 'failed'
+  skipped?: boolean
+  reason?: string | null
+  error?: string | null
+  created_at: number
+  started_at?: number | null
+  finished_at?: number | null
+  duration?: number | null
+}
+
+// Payload of the `slides_changed` event sent after a slide-level edit
+export interface SlidesChangedEvent {
+  changed: number[]
+  removed: number[]
+  slide_map: Record<string, number>
+  slide_count: number
+}
+
+export interface SaveFileResponse {
+  success: boolean
+  message: string
+  compile?: CompileJob
+}
+
+export interface UpdatePresentationSettingsResponse {
+  message: string
+  compile_job?: CompileJob
+}
+
 export interface SaveFileRequest {
   path: string
   content: string
@@ -117,9 +148,17 @@ export type SSEEventType =
   | 'image_selected'
   | 'layout_request'
   | 'presentation_updated'
+  | 'slides_changed'
+  | 'compile_started'
+  | 'compile_finished'
+  | 'compile_error'
   | 'tool_call'
   | 'tool_result'
   | 'agent_request_details'
+  | 'stream_start'
+  | 'stream_delta'
+  | 'stream_tool_call'
+  | 'stream_end'
   | 'error'
 
 export interface SSEEvent {
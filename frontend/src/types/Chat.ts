@@ -49,11 +49,20 @@ export interface ToolCall {
   timestamp?: string
 }
 
+export interface ModelRouting {
+  models: string[]
+  reason: string
+  simple: boolean
+  skipped?: Record<string, string>
+  health?: Record<string, { state: string; calls: number; p50_ms: number | null; error_rate: number | null }>
+}
+
 export interface AgentRequestDetails {
   user_message: string
   model?: string
   temperature?: number
   max_tokens?: number
+  routing?: ModelRouting
   [key: string]: any
 }
 
@@ -1,11 +1,201 @@
 import os
 import json
+import time
 from google import genai
 from google.genai import types
 from rich.console import Console
 from deckbot.nano_banana import NanoBananaClient
 from deckbot.tools import PresentationTools
+from deckbot.layout_catalog import get_layout_catalog
 from deckbot.preferences import PreferencesManager
+from deckbot.deck_context import DeckContext
+from deckbot.deck_document import load_deck, markdown_files
+from deckbot.fast_path import IntentMatcher, plan
+from deckbot.genai_client import create_client
+from deckbot.history_policy import HistoryPolicy
+from deckbot.model_router import ModelRouter, should_fail_over
+from deckbot.prompt_builder import PromptBuilder, file_fingerprint, files_fingerprint
+from deckbot import tracing
+
+# Constant parts of the system prompt (see Agent._create_prompt_builder)
+ROLE_INSTRUCTIONS = """## Your Role
+1. Help the user outline, write, and refine the presentation content in Markdown.
+2. Manage the files directly. Use 'write_file' to create or update slides.
+3. Create visuals using 'generate_image'.
+4. Always keep the "Vibe" in mind: Professional but enthusiastic, clean, and modern.
+
+"""
+
+IMAGE_SIZING_GUIDE = """## Image Sizing & Styling with Marp
+
+**IMPORTANT**: Marp provides special directives for controlling image sizes. These directives are placed in the image's alt text (the brackets in `![...](...)`).
+
+### Sizing Syntax
+Use these directives in the alt text to control image dimensions:
+
+```markdown
+![w:200px](image.jpg)          # Width only
+![h:150px](image.jpg)          # Height only
+![w:300px h:200px](image.jpg)  # Both width and height
+![width:200px](image.jpg)      # Alternative syntax
+![height:150px](image.jpg)     # Alternative syntax
+```
+
+**Supported units**: `px`, `cm`, `mm`, `in`, `pt`, `pc`, `em`, `%`
+
+### Common Use Cases
+
+1. **Small inline icons or decorations**:
+   ```markdown
+   ![w:32px](icon.svg) This is an icon
+   ```
+
+2. **Constrained images in layouts**:
+   ```markdown
+   ![w:250px](portrait-photo.jpg)
+   ```
+
+3. **Specific aspect ratios**:
+   ```markdown
+   ![w:400px h:300px](screenshot.png)
+   ```
+
+### How CSS and Marp Directives Interact
+
+- **Layout CSS uses `max-width: 100%`** (not `width: 100%`) to allow Marp sizing directives to work
+- This means:
+  - Images will **never exceed** their container width
+  - But they **can be smaller** when you use Marp sizing directives
+  - Without sizing directives, images will naturally fit their container
+
+### Styling with CSS
+
+You can **combine** Marp sizing directives with CSS styling:
+
+```markdown
+![w:200px](image.jpg)
+```
+
+Then add CSS rules for borders, shadows, etc:
+
+```css
+img {
+  border: 3px solid #333;
+  border-radius: 8px;
+  box-shadow: 0 4px 8px rgba(0,0,0,0.2);
+}
+```
+
+**What works**:
+- Borders, shadows, filters, transforms, opacity, etc. (any non-sizing CSS)
+- Marp sizing directives control the dimensions
+- CSS controls the appearance
+
+**What doesn't work**:
+- CSS rules that set `width: 100%` will override Marp sizing (but layouts use `max-width: 100%` to avoid this)
+
+### Best Practices
+
+1. **Use Marp directives for sizing**: `![w:200px](...)` instead of relying on CSS
+2. **Use CSS for styling**: borders, shadows, colors, effects
+3. **Test your sizing**: If images aren't responding to size directives, check for conflicting CSS `width` or `height` rules
+4. **Be specific**: `![w:150px](...)` is clearer than hoping CSS will size it correctly"""
+
+CAPABILITIES_TEMPLATE = """## Capabilities & Tools
+- Use 'list_files' to see what slides exist.
+  - **Note**: `list_files` returns items in **reverse-chronological order** (newest first). The first file listed is the most recently created/modified.
+  - Generated image batches are stored in the `drafts/` directory. Use `list_files('drafts')` to find previously generated images.
+- Use 'read_file' ONLY for files NOT listed in the context above (e.g., logs, data files). 
+  - **DO NOT use 'read_file' for deck.marp.md or other markdown files provided in the 'Current Presentation Context'.** 
+  - Reading them again is redundant and wastes resources.
+- Use 'read_slide' to read specific slides when the context shows deck.marp.md as an outline (large decks).
+- Use 'create_slide_with_layout' to create a SINGLE new slide using a layout template.
+  - **IMPORTANT**: Use this tool when the user wants to create ONLY ONE new slide.
+  - This triggers an interactive UI where the user selects from visual layout previews (similar to image generation).
+  - You call the tool → System shows layouts → User picks one → Slide is created automatically.
+  - **DO NOT use this tool if the user wants multiple slides** - instead, create multiple slides manually using 'replace_text' or 'write_file', since the UI only allows selecting one layout at a time.
+- Use 'replace_text' to safely edit part of a file (e.g., insert an image link, change a title) without rewriting the whole file.
+  - **ALWAYS prefer 'replace_text' for small edits to existing files.**
+  - **Use this for creating MULTIPLE slides** by adding them to deck.marp.md.
+  - **Note**: Automatically recompiles the presentation. You do not need to call 'compile_presentation' manually.
+- Use 'replace_slide', 'insert_slide_after', 'delete_slide' and 'move_slide' to edit deck.marp.md one slide at a time (slide numbers are 1-based).
+  - **PREFER these over 'replace_text' or 'write_file' when a change is about whole slides**: only the touched slides are validated, rewritten and re-rendered.
+  - 'replace_slide(slide_number, content)': pass the slide's markdown without '---' separators.
+  - 'insert_slide_after(slide_number, content)': use 0 to insert before the first slide. The content may hold several slides separated by '---'.
+  - 'move_slide(slide_number, new_position)' reorders a slide; 'delete_slide(slide_number)' removes one.
+  - **Note**: Automatically recompiles the presentation.
+- Use 'apply_edits' to make SEVERAL changes to deck.marp.md in one step (e.g. restructuring the deck).
+  - Pass an ordered list of edits, each with an "action" ("replace_text", "replace_slide", "insert_slide_after", "delete_slide", "move_slide") and that action's arguments. Slide numbers refer to the deck as left by the previous edits.
+  - **PREFER this over a chain of 'replace_text' calls**: the deck is validated, written and recompiled once, and if any edit fails nothing is changed.
+- Use 'write_file' to create NEW files or completely OVERWRITE existing files.
+  - **WARNING**: 'write_file' replaces the ENTIRE content of the file. If you use it on an existing file, you MUST provide the COMPLETE new content (including all existing slides), otherwise you will delete user data.
+  - **Note**: Automatically recompiles the presentation.
+- Use 'copy_file', 'move_file', 'delete_file', 'create_directory' to organize and manage files within the presentation.
+- Use 'generate_image' to create visuals. 
+  - You can specify 'aspect_ratio' (e.g., "1:1", "16:9", "9:16", "4:3") and 'resolution' ("1K", "2K", "4K"). 
+  - **Default aspect ratio is {current_aspect_ratio} (matching the presentation)** unless the user requests otherwise.
+  - Default resolution is 2K.
+  - Consider the slide layout when choosing aspect ratio - if the user asks for a "square image" use "1:1", "landscape" use "16:9", etc.
+  - **CRITICAL - PROMPT FIDELITY**: The 'prompt' parameter goes directly to the image generation model. You MUST include ALL user-specified details, constraints, and style requirements in the prompt. Do NOT summarize or simplify the user's request.
+    - If user says "no title" → include "no title" in prompt
+    - If user says "flat design, no shadows" → include "flat design, no shadows" in prompt  
+    - If user says "blue bars and red line" → include "blue bars and red line" in prompt
+    - Only omit non-visual details like "for page 1" or "add this to slide 3"
+    - Preserve negative constraints (no X, without Y, avoid Z) - these are critical for the image model
+  - **IMPORTANT**: When you call this, the system will generate candidates and let the user pick. DO NOT write any files that reference the image until you receive a [SYSTEM] message confirming which image was selected.
+- Use 'get_aspect_ratio' and 'set_aspect_ratio' to manage presentation aspect ratio (e.g., "16:9", "4:3"). Changing this recompiles the deck.
+- Use 'compile_presentation' to BUILD and PREVIEW the actual slide deck (opens HTML). Use this when the user wants to "see the deck" or "preview".
+  - **IMPORTANT**: Do NOT call this after using 'write_file' or 'replace_text', as those tools automatically recompile. Only use this if you need to force a recompile or open a specific slide.
+  - **IMPORTANT**: You can optionally pass a 'slide_number' (integer) to open the presentation directly at that slide. E.g., `compile_presentation(slide_number=5)`.
+  - **NOTE**: This tool does NOT automatically run visual inspection. If you want to verify the visual layout, you MUST call 'inspect_slide' afterwards.
+- Use 'go_to_slide' to navigate to a specific slide (e.g., `go_to_slide(slide_number=3)`) WITHOUT recompiling. Use this when the deck is already built and you just want to change the view.
+  - **NOTE**: This tool does NOT automatically run visual inspection. If you want to verify the visual layout, you MUST call 'inspect_slide' afterwards.
+- Use 'inspect_slide' to visually check a specific slide for errors.
+  - **USE THIS** after 'go_to_slide' or 'compile_presentation' if you suspect layout issues or want to verify a fix.
+  - It will return a detailed visual report and alert you to critical issues like content overflow.
+- Use 'validate_deck' to check the deck for syntax errors (CSS, frontmatter) without modifying it.
+  - Use this if the user reports formatting issues or if you want to verify your changes are valid.
+- Use 'export_pdf' to EXPORT the deck to PDF. This requires Chrome/Chromium installed on the system.
+- Use 'open_presentation_folder' to OPEN the source files for the user to edit.
+- Use 'get_presentation_summary' to get a text summary of the slide deck state (titles, images, text previews). Use this for YOUR understanding or to summarize progress in chat, but NOT to "show" the deck visually.
+- Use 'list_presentations', 'create_presentation', 'load_presentation' to manage decks.
+- Use 'remix_slide' to remix an entire slide by rendering it to an image and generating a remixed version.
+  - **CRITICAL**: Use this when the user says "remix this slide", "remix slide X", "remix the slide", or any variation asking to remix a SLIDE
+  - The tool renders the entire slide (including all text, images, and layout) to an image first, then generates remixed candidates
+  - After selection, the remixed image will replace the ENTIRE slide contents by overlaying the image
+  - Requires 'slide_number' (integer) - use the current slide number if user says "this slide" or "the slide"
+  - Requires 'remix_prompt' (string describing the transformation, e.g., "make it look like everything is on fire")
+  - **DO NOT use 'remix_image' when the user asks to remix a slide** - always use 'remix_slide' for slide remixing
+- Use 'remix_image' to remix a specific existing image file.
+  - **CRITICAL**: Only use this when the user explicitly mentions an IMAGE FILE by name or path (e.g., "remix images/logo.png")
+  - The tool uses the existing image file as a reference and generates remixed candidates
+  - After selection, the remixed image will replace the original image file and all references to it
+  - Requires 'image_path' (string, relative to presentation directory, e.g., "images/logo.png")
+  - Requires 'remix_prompt' (string describing the transformation)
+  - **IMPORTANT**: If the user says "remix this slide" or "remix slide X", you MUST use 'remix_slide', NOT 'remix_image'
+"""
+
+WORKFLOW_INSTRUCTIONS = """
+## Image Generation Workflow
+When the user asks for an image:
+1. Call 'generate_image' with the prompt - this starts the process
+2. STOP and WAIT - the system will show candidates to the user
+3. The system will send you a SYSTEM message indicating which image was selected, including:
+   - A batch ID identifying which generation request this selection came from
+   - The file path where the image was saved (e.g., images/selected_image.png)
+   - If you see a SYSTEM message with an old batch ID while working on a NEW image request, IGNORE the old selection
+   - Only act on SYSTEM messages that correspond to the CURRENT image generation batch
+4. ONLY THEN should you update the presentation files to reference that image path
+5. After incorporating, you MUST call 'compile_presentation' immediately to update the preview for the user. Do not ask for permission.
+
+**Important**: Each image generation creates a new batch with a unique ID. Previous SYSTEM messages in the history may reference old batches - these are for context only and should NOT be re-processed.
+
+## Behavior
+- Be proactive. If the user agrees to a plan, execute it (write the files).
+- If the presentation is empty, suggest a structure.
+- If the presentation has content, offer to summarize or refine it.
+"""
+
 
 class Agent:
     def __init__(self, presentation_context, root_dir=None):
@@ -42,6 +232,12 @@ class Agent:
         self.nano_client = NanoBananaClient(presentation_context, root_dir=root_dir, image_model=image_model)
         self.tools_handler = PresentationTools(presentation_context, self.nano_client, root_dir=root_dir, api_key=self.api_key)
         
+        # Collapse bursts of edits within a turn into a single compile
+        self.tools_handler.configure_auto_compile(
+            quiet_period=self.prefs.get('auto_compile_quiet_period', 1.5),
+            max_latency=self.prefs.get('auto_compile_max_latency', 5.0)
+        )
+        
         # Wrap tools for visibility and patch handler
         def w(name, original_func):
             wrapper = self.tools_handler._wrap_tool(name, original_func)
@@ -53,8 +249,14 @@ class Agent:
         self.tools_list = [
             w("list_files", self.tools_handler.list_files),
             w("read_file", self.tools_handler.read_file),
+            w("read_slide", self.tools_handler.read_slide),
             w("write_file", self.tools_handler.write_file),
             w("replace_text", self.tools_handler.replace_text),
+            w("replace_slide", self.tools_handler.replace_slide),
+            w("insert_slide_after", self.tools_handler.insert_slide_after),
+            w("delete_slide", self.tools_handler.delete_slide),
+            w("move_slide", self.tools_handler.move_slide),
+            w("apply_edits", self.tools_handler.apply_edits),
             w("copy_file", self.tools_handler.copy_file),
             w("move_file", self.tools_handler.move_file),
             w("delete_file", self.tools_handler.delete_file),
@@ -96,14 +298,29 @@ class Agent:
         self.presentation_dir = os.path.join(root, presentation_context['name'])
         self.history_file = os.path.join(self.presentation_dir, "chat_history.jsonl")
         
+        # Older turns are shortened/summarized to keep requests within a token budget
+        self.history_policy = HistoryPolicy.from_preferences(self.prefs, self.history_file)
+        
+        # Large decks go into the prompt as an outline plus the slides in view
+        self.deck_context = DeckContext.from_preferences(self.prefs, self.presentation_dir)
+        
+        # Navigation and build commands run locally instead of through the model
+        self.intents = IntentMatcher.from_preferences(self.prefs)
+        
+        # System prompt segments are cached between turns
+        self._prompt_slide = None
+        self.prompt_builder = self._create_prompt_builder()
+        
         # Initialize model logic
         self.model = None
         self.chat_session = None
         self.history = [] # Local in-memory history for re-initialization
         self.client = None
+        self.router = None
 
-        if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
+        # A plain genai.Client, or a recording/replaying one (see genai_client)
+        self.client = create_client(self.api_key, "agent")
+        if self.client:
 
             # Load models from profile first, then preferences as fallback
             primary_model = (
@@ -132,6 +349,13 @@ class Agent:
             # Remove duplicates while preserving order
             self.model_names = list(dict.fromkeys(self.model_names))
             
+            # Fails over along model_names and sends simple turns to the secondary while the primary is slow
+            self.router = ModelRouter.from_preferences(
+                self.prefs, self.model_names, fast_model=secondary_model,
+                busy_seconds=lambda: self.tools_handler.tool_seconds,
+                tool_calls=lambda: self.tools_handler.tool_calls
+            )
+            
             # Initial model init (will be refreshed on chat)
             self._init_model(self._build_system_prompt())
         else:
@@ -143,167 +367,53 @@ class Agent:
         # Load history
         self.load_history()
 
+    def _create_prompt_builder(self):
+        """System prompt segments, each rebuilt only when its inputs change."""
+        metadata_path = os.path.join(self.presentation_dir, "metadata.json")
+        layouts_path = os.path.join(self.presentation_dir, "layouts.md")
+
+        def metadata_key():
+            return file_fingerprint(metadata_path)
+
+        builder = PromptBuilder()
+        builder.add("presentation",
+                    lambda: (self.context.get('name'), self.context.get('description'), metadata_key()),
+                    self._presentation_segment)
+        builder.add("slide_context", lambda: self._prompt_slide, self._slide_context_segment)
+        builder.add("deck", self._deck_fingerprint, self._deck_segment)
+        builder.add("instructions", lambda: None, lambda: ROLE_INSTRUCTIONS)
+        builder.add("branding", metadata_key, self._branding_segment)
+        builder.add("layouts", lambda: file_fingerprint(layouts_path), self._layouts_segment)
+        builder.add("marp_docs", lambda: file_fingerprint(os.path.abspath("MARP.md")), self._marp_docs_segment)
+        builder.add("settings", metadata_key, self._settings_segment)
+        builder.add("workflow", lambda: None, lambda: WORKFLOW_INSTRUCTIONS)
+        return builder
+
     def _build_system_prompt(self, current_slide=None):
-        # Fetch dynamic content
-        file_context = self.tools_handler.get_full_context()
+        self._prompt_slide = current_slide
+        prompt = self.prompt_builder.build()
+        rebuilt = self.prompt_builder.rebuilt()
+        total_ms = sum(t["ms"] for t in self.prompt_builder.timings.values())
+        print(f"[AGENT] System prompt segments rebuilt: {', '.join(rebuilt) or 'none'} ({total_ms:.1f} ms)")
+        return prompt
 
-        # Read Marp documentation
-        marp_docs = ""
-        try:
-            with open("MARP.md", "r") as f:
-                marp_docs = f.read()
-        except FileNotFoundError:
-            # Fallback or warn if needed, but for now just keep it empty
-            pass
-            
-        # Template instructions and design opinions from metadata
+    def _read_metadata(self):
+        metadata_path = os.path.join(self.presentation_dir, "metadata.json")
+        if not os.path.exists(metadata_path):
+            return {}
+        with open(metadata_path, "r") as f:
+            return json.load(f)
+
+    def _presentation_segment(self):
+        # Template instructions from metadata
         template_instructions = ""
-        design_opinions_section = ""
-        try:
-            metadata_path = os.path.join(self.presentation_dir, "metadata.json")
-            if os.path.exists(metadata_path):
-                with open(metadata_path, "r") as f:
-                    data = json.load(f)
-                    if "instructions" in data and data["instructions"]:
-                        template_instructions = f"\n## Branding & Template Instructions\n{data['instructions']}\n"
-                    
-                    # Build color and font settings section if defined
-                    color_settings_section = ""
-                    if "color_settings" in data and data["color_settings"]:
-                        colors = data["color_settings"]
-                        color_settings_section = "\n## Presentation Style Settings\n"
-                        color_settings_section += "These are the official style reference settings for this presentation. Use them consistently throughout:\n\n"
-                        color_settings_section += "### Color Palette\n"
-                        color_settings_section += f"- **Primary**: {colors.get('primary', 'N/A')}\n"
-                        color_settings_section += f"- **Secondary**: {colors.get('secondary', 'N/A')}\n"
-                        color_settings_section += f"- **Accent**: {colors.get('accent', 'N/A')}\n"
-                        color_settings_section += f"- **Danger**: {colors.get('danger', 'N/A')}\n"
-                        color_settings_section += f"- **Muted**: {colors.get('muted', 'N/A')}\n"
-                        color_settings_section += f"- **Foreground (Text)**: {colors.get('foreground', 'N/A')}\n"
-                        color_settings_section += f"- **Background**: {colors.get('background', 'N/A')}\n\n"
-                        color_settings_section += "When creating slides, use these colors for text, backgrounds, accents, and visual elements. These colors define the visual identity of this presentation.\n\n"
-                    
-                    # Add font settings if defined
-                    if "font_settings" in data and data["font_settings"]:
-                        fonts = data["font_settings"]
-                        if not color_settings_section:
-                            color_settings_section = "\n## Presentation Style Settings\n"
-                        color_settings_section += "### Typography\n"
-                        color_settings_section += f"- **Primary Font (Headings)**: {fonts.get('primary', 'N/A')}\n"
-                        color_settings_section += f"- **Secondary Font (Body)**: {fonts.get('secondary', 'N/A')}\n\n"
-                        color_settings_section += "Use these fonts consistently for headings and body text throughout the presentation.\n"
-                    
-                    # Build design opinions section if defined
-                    if "design_opinions" in data and data["design_opinions"]:
-                        opinions = data["design_opinions"]
-                        design_opinions_section = "\n## Design & Aesthetics\n"
-                        
-                        # Handle icon preference
-                        if "icons" in opinions:
-                            if opinions["icons"] == "lucide":
-                                design_opinions_section += """1. **Icons over Emojis**: Prefer using Lucide icons instead of emojis.
-   - Use the following syntax to embed Lucide icons:
-     `![icon-name](https://cdn.jsdelivr.net/npm/lucide-static@latest/icons/{{icon-name}}.svg)`
-   - Example: `![smile](https://cdn.jsdelivr.net/npm/lucide-static@latest/icons/smile.svg)`
-   - You can resize icons using Marp syntax: `![w:32](...)`
-"""
-                            elif opinions["icons"] == "emoji":
-                                design_opinions_section += "1. **Icons**: Use emojis for visual interest.\n"
-                            elif opinions["icons"] == "none":
-                                design_opinions_section += "1. **Icons**: Avoid using icons or emojis unless specifically requested.\n"
-                        
-                        # Handle color palette (legacy - now we use color_settings)
-                        if "color_palette" in opinions and opinions["color_palette"]:
-                            if isinstance(opinions["color_palette"], list):
-                                colors = ", ".join(opinions["color_palette"])
-                            else:
-                                colors = str(opinions["color_palette"])
-                            design_opinions_section += f"2. **Color Palette**: Prefer these colors: {colors}\n"
-                        
-                        # Handle typography style
-                        if "typography_style" in opinions:
-                            design_opinions_section += f"3. **Typography Style**: {opinions['typography_style']}\n"
-                        
-                        # Handle all other keys generically
-                        for key, value in opinions.items():
-                            if key not in ["icons", "color_palette", "typography_style"]:
-                                design_opinions_section += f"- **{key}**: {value}\n"
-                        
-                        design_opinions_section += "\n"
-        except Exception:
-            pass
-        
-        # Load available layouts
-        layouts_section = ""
-        try:
-            layouts_path = os.path.join(self.presentation_dir, "layouts.md")
-            if os.path.exists(layouts_path):
-                with open(layouts_path, "r") as f:
-                    layouts_content = f.read()
-                
-                # Parse layout names from HTML comments
-                import re
-                layout_names = re.findall(r'<!-- layout: ([\w-]+) -->', layouts_content)
-                
-                if layout_names:
-                    layouts_section = "\n## Available Layouts\n"
-                    layouts_section += "This presentation includes pre-designed slide layouts. Use the 'get_layouts' tool to see full details, or reference these layouts when creating slides:\n\n"
-                    
-                    # Parse all layout metadata
-                    for layout_name in layout_names:
-                        # Find this layout's metadata in the content
-                        layout_start = layouts_content.find(f'<!-- layout: {layout_name} -->')
-                        if layout_start >= 0:
-                            # Find next layout or end of file
-                            next_layout = layouts_content.find('<!-- layout:', layout_start + 1)
-                            layout_section = layouts_content[layout_start:next_layout if next_layout > 0 else len(layouts_content)]
-                            
-                            # Extract metadata
-                            image_friendly = re.search(r'<!-- image-friendly: (true|false) -->', layout_section)
-                            aspect_ratio = re.search(r'<!-- recommended-aspect-ratio: ([\d:]+) -->', layout_section)
-                            description = re.search(r'<!-- description: (.+?) -->', layout_section)
-                            
-                            desc_text = description.group(1) if description else f"{layout_name} layout"
-                            layouts_section += f"- **{layout_name}**: {desc_text}"
-                            
-                            if image_friendly and image_friendly.group(1) == "true":
-                                layouts_section += f" ✓ Image-friendly"
-                                if aspect_ratio:
-                                    layouts_section += f" (best aspect ratio: {aspect_ratio.group(1)})"
-                            
-                            layouts_section += "\n"
-                    
-                    layouts_section += "\n**Important for Image Generation**: When generating images for specific layouts, use the recommended aspect ratio for that layout. Call 'get_layouts()' to see all layout details including aspect ratio recommendations.\n"
-        except Exception:
-            pass
-        
-        # Get current presentation aspect ratio
-        current_aspect_ratio = "4:3"  # default
         try:
-            aspect_ratio = self.tools_handler.manager.get_presentation_aspect_ratio(self.context['name'])
-            if aspect_ratio:
-                current_aspect_ratio = aspect_ratio
+            data = self._read_metadata()
+            if "instructions" in data and data["instructions"]:
+                template_instructions = f"\n## Branding & Template Instructions\n{data['instructions']}\n"
         except Exception:
             pass
 
-        final_design_section = design_opinions_section if design_opinions_section else """
-## Design & Aesthetics
-1. **Clean Layouts**: Use ample whitespace.
-2. **Visuals**: Prefer high-quality images (generated or provided) over cluttered text.
-"""
-        
-        # Ensure color_settings_section is defined even if not in metadata
-        if "color_settings_section" not in locals():
-            color_settings_section = ""
-
-        # Build current slide context
-        slide_context = ""
-        if current_slide:
-            slide_context = f"""
-## Current User Context
-The user is currently viewing **slide {current_slide}**. When using navigation tools like 'go_to_slide()' or 'compile_presentation()', keep this context in mind. The user's focus is on this slide.
-"""
-
         return f"""
 You are "DeckBot", a helpful AI assistant for creating Marp (Markdown) presentations.
 
@@ -311,186 +421,177 @@ You are "DeckBot", a helpful AI assistant for creating Marp (Markdown) presentat
 Name: {self.context['name']}
 Description: {self.context.get('description', '')}
 {template_instructions}
-{slide_context}
-## Context - Read this First!
-The following files are the CURRENT content of the presentation.
-You do NOT need to call 'read_file' for these files.
-{file_context}
-
-## Your Role
-1. Help the user outline, write, and refine the presentation content in Markdown.
-2. Manage the files directly. Use 'write_file' to create or update slides.
-3. Create visuals using 'generate_image'.
-4. Always keep the "Vibe" in mind: Professional but enthusiastic, clean, and modern.
-
-{color_settings_section}
-{final_design_section}
-{layouts_section}
-
-## Image Sizing & Styling with Marp
-
-**IMPORTANT**: Marp provides special directives for controlling image sizes. These directives are placed in the image's alt text (the brackets in `![...](...)`).
-
-### Sizing Syntax
-Use these directives in the alt text to control image dimensions:
-
-```markdown
-![w:200px](image.jpg)          # Width only
-![h:150px](image.jpg)          # Height only
-![w:300px h:200px](image.jpg)  # Both width and height
-![width:200px](image.jpg)      # Alternative syntax
-![height:150px](image.jpg)     # Alternative syntax
-```
+"""
 
-**Supported units**: `px`, `cm`, `mm`, `in`, `pt`, `pc`, `em`, `%`
+    def _slide_context_segment(self):
+        slide_context = ""
+        if self._prompt_slide:
+            slide_context = f"""
+## Current User Context
+The user is currently viewing **slide {self._prompt_slide}**. When using navigation tools like 'go_to_slide()' or 'compile_presentation()', keep this context in mind. The user's focus is on this slide.
+"""
+        return slide_context + "\n"
 
-### Common Use Cases
+    def _deck_fingerprint(self):
+        """Fingerprints of the Markdown files inlined into the prompt."""
+        try:
+            files = markdown_files(self.presentation_dir)
+        except OSError:
+            return None
+        fingerprint = files_fingerprint(os.path.join(self.presentation_dir, f) for f in files)
+        if self.deck_context.compact():
+            # The compact view also depends on the slide in view and the last turn's deck
+            return fingerprint, self._prompt_slide, self.deck_context.turn_key()
+        return fingerprint
 
-1. **Small inline icons or decorations**:
-   ```markdown
-   ![w:32px](icon.svg) This is an icon
-   ```
+    def _deck_segment(self):
+        if self.deck_context.compact():
+            file_context = self.deck_context.build(self._prompt_slide)
+            return f"""## Context - Read this First!
+The presentation is large, so deck.marp.md is shown as an outline plus the slides around the one the user is viewing.
+These slides are CURRENT; call 'read_slide' for any other slide before changing it.
+{file_context}
 
-2. **Constrained images in layouts**:
-   ```markdown
-   ![w:250px](portrait-photo.jpg)
-   ```
+"""
+        file_context = self.tools_handler.get_full_context()
+        return f"""## Context - Read this First!
+The following files are the CURRENT content of the presentation.
+You do NOT need to call 'read_file' for these files.
+{file_context}
 
-3. **Specific aspect ratios**:
-   ```markdown
-   ![w:400px h:300px](screenshot.png)
-   ```
+"""
 
-### How CSS and Marp Directives Interact
+    def _branding_segment(self):
+        # Color/font settings and design opinions from metadata
+        color_settings_section = ""
+        design_opinions_section = ""
+        try:
+            data = self._read_metadata()
+            # Build color and font settings section if defined
+            if "color_settings" in data and data["color_settings"]:
+                colors = data["color_settings"]
+                color_settings_section = "\n## Presentation Style Settings\n"
+                color_settings_section += "These are the official style reference settings for this presentation. Use them consistently throughout:\n\n"
+                color_settings_section += "### Color Palette\n"
+                color_settings_section += f"- **Primary**: {colors.get('primary', 'N/A')}\n"
+                color_settings_section += f"- **Secondary**: {colors.get('secondary', 'N/A')}\n"
+                color_settings_section += f"- **Accent**: {colors.get('accent', 'N/A')}\n"
+                color_settings_section += f"- **Danger**: {colors.get('danger', 'N/A')}\n"
+                color_settings_section += f"- **Muted**: {colors.get('muted', 'N/A')}\n"
+                color_settings_section += f"- **Foreground (Text)**: {colors.get('foreground', 'N/A')}\n"
+                color_settings_section += f"- **Background**: {colors.get('background', 'N/A')}\n\n"
+                color_settings_section += "When creating slides, use these colors for text, backgrounds, accents, and visual elements. These colors define the visual identity of this presentation.\n\n"
 
-- **Layout CSS uses `max-width: 100%`** (not `width: 100%`) to allow Marp sizing directives to work
-- This means:
-  - Images will **never exceed** their container width
-  - But they **can be smaller** when you use Marp sizing directives
-  - Without sizing directives, images will naturally fit their container
+            # Add font settings if defined
+            if "font_settings" in data and data["font_settings"]:
+                fonts = data["font_settings"]
+                if not color_settings_section:
+                    color_settings_section = "\n## Presentation Style Settings\n"
+                color_settings_section += "### Typography\n"
+                color_settings_section += f"- **Primary Font (Headings)**: {fonts.get('primary', 'N/A')}\n"
+                color_settings_section += f"- **Secondary Font (Body)**: {fonts.get('secondary', 'N/A')}\n\n"
+                color_settings_section += "Use these fonts consistently for headings and body text throughout the presentation.\n"
 
-### Styling with CSS
+            # Build design opinions section if defined
+            if "design_opinions" in data and data["design_opinions"]:
+                opinions = data["design_opinions"]
+                design_opinions_section = "\n## Design & Aesthetics\n"
 
-You can **combine** Marp sizing directives with CSS styling:
+                # Handle icon preference
+                if "icons" in opinions:
+                    if opinions["icons"] == "lucide":
+                        design_opinions_section += """1. **Icons over Emojis**: Prefer using Lucide icons instead of emojis.
+   - Use the following syntax to embed Lucide icons:
+     `![icon-name](https://cdn.jsdelivr.net/npm/lucide-static@latest/icons/{{icon-name}}.svg)`
+   - Example: `![smile](https://cdn.jsdelivr.net/npm/lucide-static@latest/icons/smile.svg)`
+   - You can resize icons using Marp syntax: `![w:32](...)`
+"""
+                    elif opinions["icons"] == "emoji":
+                        design_opinions_section += "1. **Icons**: Use emojis for visual interest.\n"
+                    elif opinions["icons"] == "none":
+                        design_opinions_section += "1. **Icons**: Avoid using icons or emojis unless specifically requested.\n"
 
-```markdown
-![w:200px](image.jpg)
-```
+                # Handle color palette (legacy - now we use color_settings)
+                if "color_palette" in opinions and opinions["color_palette"]:
+                    if isinstance(opinions["color_palette"], list):
+                        colors = ", ".join(opinions["color_palette"])
+                    else:
+                        colors = str(opinions["color_palette"])
+                    design_opinions_section += f"2. **Color Palette**: Prefer these colors: {colors}\n"
 
-Then add CSS rules for borders, shadows, etc:
+                # Handle typography style
+                if "typography_style" in opinions:
+                    design_opinions_section += f"3. **Typography Style**: {opinions['typography_style']}\n"
 
-```css
-img {{
-  border: 3px solid #333;
-  border-radius: 8px;
-  box-shadow: 0 4px 8px rgba(0,0,0,0.2);
-}}
-```
+                # Handle all other keys generically
+                for key, value in opinions.items():
+                    if key not in ["icons", "color_palette", "typography_style"]:
+                        design_opinions_section += f"- **{key}**: {value}\n"
 
-**What works**:
-- Borders, shadows, filters, transforms, opacity, etc. (any non-sizing CSS)
-- Marp sizing directives control the dimensions
-- CSS controls the appearance
+                design_opinions_section += "\n"
+        except Exception:
+            pass
 
-**What doesn't work**:
-- CSS rules that set `width: 100%` will override Marp sizing (but layouts use `max-width: 100%` to avoid this)
+        final_design_section = design_opinions_section if design_opinions_section else """
+## Design & Aesthetics
+1. **Clean Layouts**: Use ample whitespace.
+2. **Visuals**: Prefer high-quality images (generated or provided) over cluttered text.
+"""
+        return f"{color_settings_section}\n{final_design_section}\n"
 
-### Best Practices
+    def _layouts_segment(self):
+        layouts_section = ""
+        try:
+            catalog = get_layout_catalog(self.presentation_dir)
+            if catalog:
+                layouts = catalog.layouts
+                
+                if layouts:
+                    layouts_section = "\n## Available Layouts\n"
+                    layouts_section += "This presentation includes pre-designed slide layouts. Use the 'get_layouts' tool to see full details, or reference these layouts when creating slides:\n\n"
+                    
+                    for layout in layouts:
+                        desc_text = layout["description"] or f"{layout['name']} layout"
+                        layouts_section += f"- **{layout['name']}**: {desc_text}"
+                        
+                        if layout["image_friendly"]:
+                            layouts_section += f" ✓ Image-friendly"
+                            if layout["recommended_aspect_ratio"]:
+                                layouts_section += f" (best aspect ratio: {layout['recommended_aspect_ratio']})"
+                        
+                        layouts_section += "\n"
+                    
+                    layouts_section += "\n**Important for Image Generation**: When generating images for specific layouts, use the recommended aspect ratio for that layout. Call 'get_layouts()' to see all layout details including aspect ratio recommendations.\n"
+        except Exception:
+            pass
+        return f"{layouts_section}\n\n"
 
-1. **Use Marp directives for sizing**: `![w:200px](...)` instead of relying on CSS
-2. **Use CSS for styling**: borders, shadows, colors, effects
-3. **Test your sizing**: If images aren't responding to size directives, check for conflicting CSS `width` or `height` rules
-4. **Be specific**: `![w:150px](...)` is clearer than hoping CSS will size it correctly
+    def _marp_docs_segment(self):
+        # Marp documentation from the working directory
+        marp_docs = ""
+        try:
+            with open("MARP.md", "r") as f:
+                marp_docs = f.read()
+        except FileNotFoundError:
+            pass
+        return f"{IMAGE_SIZING_GUIDE}\n\n## Marp Documentation\n{marp_docs}\n\n"
 
-## Marp Documentation
-{marp_docs}
+    def _settings_segment(self):
+        # Get current presentation aspect ratio
+        current_aspect_ratio = "4:3"  # default
+        try:
+            aspect_ratio = self.tools_handler.manager.get_presentation_aspect_ratio(self.context['name'])
+            if aspect_ratio:
+                current_aspect_ratio = aspect_ratio
+        except Exception:
+            pass
 
-        ## Current Presentation Settings
+        return f"""        ## Current Presentation Settings
         - Aspect Ratio: {current_aspect_ratio} (Provided by system - DO NOT call 'get_aspect_ratio' to check this)
         - Note: Only use 'set_aspect_ratio' if the user explicitly asks to change it.
 
-## Capabilities & Tools
-- Use 'list_files' to see what slides exist.
-  - **Note**: `list_files` returns items in **reverse-chronological order** (newest first). The first file listed is the most recently created/modified.
-  - Generated image batches are stored in the `drafts/` directory. Use `list_files('drafts')` to find previously generated images.
-- Use 'read_file' ONLY for files NOT listed in the context above (e.g., logs, data files). 
-  - **DO NOT use 'read_file' for deck.marp.md or other markdown files provided in the 'Current Presentation Context'.** 
-  - Reading them again is redundant and wastes resources.
-- Use 'create_slide_with_layout' to create a SINGLE new slide using a layout template.
-  - **IMPORTANT**: Use this tool when the user wants to create ONLY ONE new slide.
-  - This triggers an interactive UI where the user selects from visual layout previews (similar to image generation).
-  - You call the tool → System shows layouts → User picks one → Slide is created automatically.
-  - **DO NOT use this tool if the user wants multiple slides** - instead, create multiple slides manually using 'replace_text' or 'write_file', since the UI only allows selecting one layout at a time.
-- Use 'replace_text' to safely edit part of a file (e.g., insert an image link, change a title) without rewriting the whole file.
-  - **ALWAYS prefer 'replace_text' for small edits to existing files.**
-  - **Use this for creating MULTIPLE slides** by adding them to deck.marp.md.
-  - **Note**: Automatically recompiles the presentation. You do not need to call 'compile_presentation' manually.
-- Use 'write_file' to create NEW files or completely OVERWRITE existing files.
-  - **WARNING**: 'write_file' replaces the ENTIRE content of the file. If you use it on an existing file, you MUST provide the COMPLETE new content (including all existing slides), otherwise you will delete user data.
-  - **Note**: Automatically recompiles the presentation.
-- Use 'copy_file', 'move_file', 'delete_file', 'create_directory' to organize and manage files within the presentation.
-- Use 'generate_image' to create visuals. 
-  - You can specify 'aspect_ratio' (e.g., "1:1", "16:9", "9:16", "4:3") and 'resolution' ("1K", "2K", "4K"). 
-  - **Default aspect ratio is {current_aspect_ratio} (matching the presentation)** unless the user requests otherwise.
-  - Default resolution is 2K.
-  - Consider the slide layout when choosing aspect ratio - if the user asks for a "square image" use "1:1", "landscape" use "16:9", etc.
-  - **CRITICAL - PROMPT FIDELITY**: The 'prompt' parameter goes directly to the image generation model. You MUST include ALL user-specified details, constraints, and style requirements in the prompt. Do NOT summarize or simplify the user's request.
-    - If user says "no title" → include "no title" in prompt
-    - If user says "flat design, no shadows" → include "flat design, no shadows" in prompt  
-    - If user says "blue bars and red line" → include "blue bars and red line" in prompt
-    - Only omit non-visual details like "for page 1" or "add this to slide 3"
-    - Preserve negative constraints (no X, without Y, avoid Z) - these are critical for the image model
-  - **IMPORTANT**: When you call this, the system will generate candidates and let the user pick. DO NOT write any files that reference the image until you receive a [SYSTEM] message confirming which image was selected.
-- Use 'get_aspect_ratio' and 'set_aspect_ratio' to manage presentation aspect ratio (e.g., "16:9", "4:3"). Changing this recompiles the deck.
-- Use 'compile_presentation' to BUILD and PREVIEW the actual slide deck (opens HTML). Use this when the user wants to "see the deck" or "preview".
-  - **IMPORTANT**: Do NOT call this after using 'write_file' or 'replace_text', as those tools automatically recompile. Only use this if you need to force a recompile or open a specific slide.
-  - **IMPORTANT**: You can optionally pass a 'slide_number' (integer) to open the presentation directly at that slide. E.g., `compile_presentation(slide_number=5)`.
-  - **NOTE**: This tool does NOT automatically run visual inspection. If you want to verify the visual layout, you MUST call 'inspect_slide' afterwards.
-- Use 'go_to_slide' to navigate to a specific slide (e.g., `go_to_slide(slide_number=3)`) WITHOUT recompiling. Use this when the deck is already built and you just want to change the view.
-  - **NOTE**: This tool does NOT automatically run visual inspection. If you want to verify the visual layout, you MUST call 'inspect_slide' afterwards.
-- Use 'inspect_slide' to visually check a specific slide for errors.
-  - **USE THIS** after 'go_to_slide' or 'compile_presentation' if you suspect layout issues or want to verify a fix.
-  - It will return a detailed visual report and alert you to critical issues like content overflow.
-- Use 'validate_deck' to check the deck for syntax errors (CSS, frontmatter) without modifying it.
-  - Use this if the user reports formatting issues or if you want to verify your changes are valid.
-- Use 'export_pdf' to EXPORT the deck to PDF. This requires Chrome/Chromium installed on the system.
-- Use 'open_presentation_folder' to OPEN the source files for the user to edit.
-- Use 'get_presentation_summary' to get a text summary of the slide deck state (titles, images, text previews). Use this for YOUR understanding or to summarize progress in chat, but NOT to "show" the deck visually.
-- Use 'list_presentations', 'create_presentation', 'load_presentation' to manage decks.
-- Use 'remix_slide' to remix an entire slide by rendering it to an image and generating a remixed version.
-  - **CRITICAL**: Use this when the user says "remix this slide", "remix slide X", "remix the slide", or any variation asking to remix a SLIDE
-  - The tool renders the entire slide (including all text, images, and layout) to an image first, then generates remixed candidates
-  - After selection, the remixed image will replace the ENTIRE slide contents by overlaying the image
-  - Requires 'slide_number' (integer) - use the current slide number if user says "this slide" or "the slide"
-  - Requires 'remix_prompt' (string describing the transformation, e.g., "make it look like everything is on fire")
-  - **DO NOT use 'remix_image' when the user asks to remix a slide** - always use 'remix_slide' for slide remixing
-- Use 'remix_image' to remix a specific existing image file.
-  - **CRITICAL**: Only use this when the user explicitly mentions an IMAGE FILE by name or path (e.g., "remix images/logo.png")
-  - The tool uses the existing image file as a reference and generates remixed candidates
-  - After selection, the remixed image will replace the original image file and all references to it
-  - Requires 'image_path' (string, relative to presentation directory, e.g., "images/logo.png")
-  - Requires 'remix_prompt' (string describing the transformation)
-  - **IMPORTANT**: If the user says "remix this slide" or "remix slide X", you MUST use 'remix_slide', NOT 'remix_image'
-
-## Image Generation Workflow
-When the user asks for an image:
-1. Call 'generate_image' with the prompt - this starts the process
-2. STOP and WAIT - the system will show candidates to the user
-3. The system will send you a SYSTEM message indicating which image was selected, including:
-   - A batch ID identifying which generation request this selection came from
-   - The file path where the image was saved (e.g., images/selected_image.png)
-   - If you see a SYSTEM message with an old batch ID while working on a NEW image request, IGNORE the old selection
-   - Only act on SYSTEM messages that correspond to the CURRENT image generation batch
-4. ONLY THEN should you update the presentation files to reference that image path
-5. After incorporating, you MUST call 'compile_presentation' immediately to update the preview for the user. Do not ask for permission.
+""" + CAPABILITIES_TEMPLATE.format(current_aspect_ratio=current_aspect_ratio)
 
-**Important**: Each image generation creates a new batch with a unique ID. Previous SYSTEM messages in the history may reference old batches - these are for context only and should NOT be re-processed.
-
-## Behavior
-- Be proactive. If the user agrees to a plan, execute it (write the files).
-- If the presentation is empty, suggest a structure.
-- If the presentation has content, offer to summarize or refine it.
-"""
 
     def _on_tool_event(self, event, data):
         """Log tool usage to history."""
@@ -549,50 +650,169 @@ When the user asks for an image:
                 continue
         print("Error: Could not initialize any Gemini model. Please check your API key and network connection.")
 
-    def _generate_with_fallback(self, contents):
+    def _generate_config(self):
+        return types.GenerateContentConfig(
+            tools=self.tools_list,
+            automatic_function_calling=types.AutomaticFunctionCallingConfig(
+                disable=False
+            )
+        )
+
+    def _generate_with_fallback(self, contents, route=None):
         """
-        Attempt generation with current model. 
-        If 429/Resource Exhausted occurs, switch to secondary model and retry.
+        Generate with the models the router picks for this turn, failing over
+        to the next one on rate limits, overload and other transient errors.
         """
-        try:
+        route = route or self.router.route()
+
+        def generate(model):
             return self.client.models.generate_content(
-                model=self.model_name,
+                model=model,
                 contents=contents,
-                config=types.GenerateContentConfig(
-                    tools=self.tools_list,
-                    automatic_function_calling=types.AutomaticFunctionCallingConfig(
-                        disable=False
-                    )
-                )
+                config=self._generate_config()
             )
-        except Exception as e:
-            # Check for Resource Exhausted error
-            error_str = str(e)
-            # print(f"DEBUG: Error string: {error_str}") # Debug
-            is_resource_exhausted = "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
-            
-            if is_resource_exhausted:
-                # print(f"DEBUG: Resource exhausted. Current: {self.model_name}, Secondary: {self.secondary_model_name}")
-                # If we haven't switched yet and have a secondary model
-                if self.model_name != self.secondary_model_name and self.secondary_model_name:
-                    print(f"Resource exhausted on {self.model_name}. Switching to secondary model: {self.secondary_model_name}")
-                    self.model_name = self.secondary_model_name
-                    
-                    # Retry with new model
-                    return self.client.models.generate_content(
-                        model=self.model_name,
-                        contents=contents,
-                        config=types.GenerateContentConfig(
-                            tools=self.tools_list,
-                            automatic_function_calling=types.AutomaticFunctionCallingConfig(
-                                disable=False
-                            )
-                        )
-                    )
-            # Re-raise if not handled
-            raise e
-
-    def chat(self, user_input, status_spinner=None, cancelled_flag=None, current_slide=None):
+
+        self.model_name, response = self.router.run(route, generate)
+        return response
+
+    def _stream_with_fallback(self, contents, route=None):
+        """Like _generate_with_fallback, but yields response chunks as they arrive."""
+        route = route or self.router.route()
+
+        def start(model):
+            stream = iter(self.client.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=self._generate_config()
+            ))
+            # Request errors surface with the first chunk
+            return next(stream, None), stream
+
+        # Failing over is only possible until the first chunk has been passed on
+        self.model_name, (first, stream) = self.router.run(route, start)
+        if first is not None:
+            yield first
+            try:
+                yield from stream
+            except Exception as e:
+                self.router.record_failure(self.model_name, e, counts=should_fail_over(e))
+                raise
+
+    def _stream_turn(self, contents, on_stream, cancelled_flag=None, route=None):
+        """
+        Stream the model's reply. Text is passed to on_stream as it arrives
+        ('stream_delta'), and function calls mark the boundaries between the
+        text before and after a tool runs ('stream_tool_call').
+
+        Returns the text of the turn (the segments around tool calls joined by blank lines).
+        """
+        segments = [""]
+        route = route or self.router.route()
+        on_stream("stream_start", {"model": route.models[0]})
+        model_span = tracing.current_span()
+        started = time.perf_counter()
+        first_chunk = True
+        try:
+            for chunk in self._stream_with_fallback(contents, route):
+                if first_chunk and model_span:
+                    model_span.set(first_chunk_ms=round((time.perf_counter() - started) * 1000, 2))
+                first_chunk = False
+                if cancelled_flag and cancelled_flag.is_cancelled():
+                    break
+                candidate = chunk.candidates[0] if chunk.candidates else None
+                if not candidate or not candidate.content or not candidate.content.parts:
+                    continue
+                for part in candidate.content.parts:
+                    if part.function_call:
+                        on_stream("stream_tool_call", {"tool": part.function_call.name})
+                        if segments[-1]:
+                            segments.append("")
+                    elif part.text and not getattr(part, 'thought', None):
+                        segments[-1] += part.text
+                        on_stream("stream_delta", {"text": part.text})
+        finally:
+            text = "\n\n".join(segment.strip() for segment in segments if segment.strip())
+            on_stream("stream_end", {"text": text})
+        return text
+
+    def _response_text(self, response):
+        """Text of a (non-streamed) response."""
+        text_response = ""
+        if response.candidates and len(response.candidates) > 0:
+            candidate = response.candidates[0]
+            if candidate.content and candidate.content.parts:
+                for part in candidate.content.parts:
+                    if hasattr(part, 'text') and part.text:
+                        text_response += part.text
+                    # Also check function responses for tool return values
+                    elif hasattr(part, 'function_response') and part.function_response:
+                        # Extract response text from function response if available
+                        func_response = part.function_response
+                        if hasattr(func_response, 'response') and func_response.response:
+                            # Function response might be a string or dict
+                            if isinstance(func_response.response, str):
+                                text_response += func_response.response
+                            elif isinstance(func_response.response, dict) and 'text' in func_response.response:
+                                text_response += func_response.response['text']
+        return text_response
+
+    def chat(self, user_input, status_spinner=None, cancelled_flag=None, current_slide=None, on_stream=None):
+        """
+        Send a message and return the reply.
+
+        If on_stream is given (and the stream_responses preference isn't off),
+        the reply is streamed: on_stream(event_type, data) receives
+        'stream_start', 'stream_delta' (partial text), 'stream_tool_call'
+        (a tool call boundary) and 'stream_end' as the response arrives.
+
+        Commands like "go to slide 5" or "compile" are run without the model
+        (see deckbot.fast_path).
+
+        The turn is traced (see deckbot.tracing) to the presentation's trace log.
+        """
+        with tracing.trace_turn(self.presentation_dir, message=user_input[:200], slide=current_slide) as turn:
+            reply = self._fast_path(user_input, current_slide)
+            if reply is None:
+                reply = self._chat(user_input, status_spinner, cancelled_flag, current_slide, on_stream)
+            turn.set(reply_chars=len(reply or ""))
+            return reply
+
+    def _fast_path(self, user_input, current_slide=None):
+        """Run a navigation/build command locally. Returns None if the model should handle the message."""
+        intent = self.intents.match(user_input)
+        if intent is None:
+            return None
+        try:
+            slide_count = load_deck(self.deck_context.deck_path).slide_count
+        except OSError:
+            slide_count = 0
+        tool_name, payload = plan(intent, current_slide or self.tools_handler.current_slide, slide_count)
+        print(f"[AGENT] Fast path: {intent.name} -> {tool_name or 'no tool call'}")
+
+        with tracing.span("fast_path", intent=intent.name, tool=tool_name):
+            self._log_user_message(user_input)
+            if tool_name:
+                try:
+                    # The wrapped tool, so the call and its result are logged as if the model had made it
+                    reply = getattr(self.tools_handler, tool_name)(**payload)
+                except Exception as e:
+                    reply = f"Error running {tool_name}: {e}"
+            else:
+                reply = payload
+            self._log_message("model", reply)
+        return reply
+
+    def _log_user_message(self, user_input):
+        """Log the user's message, unless the /api/chat endpoint already did."""
+        if self.history:
+            last_entry = self.history[-1]
+            if last_entry.get("role") == "user":
+                parts = last_entry.get("parts", [])
+                if parts and hasattr(parts[0], 'text') and parts[0].text == user_input:
+                    return
+        self._log_message("user", user_input)
+
+    def _chat(self, user_input, status_spinner, cancelled_flag, current_slide, on_stream):
         print(f"[AGENT] chat() called with input: {user_input[:100]}... (slide={current_slide})")
 
         if not self.model or not self.client:
@@ -613,23 +833,15 @@ When the user asks for an image:
 
         # Refresh system prompt to include latest file context and current slide
         print("[AGENT] Building system prompt...")
-        new_system_prompt = self._build_system_prompt(current_slide=current_slide)
+        with tracing.span("prompt") as prompt_span:
+            new_system_prompt = self._build_system_prompt(current_slide=current_slide)
+            prompt_span.set(chars=len(new_system_prompt), rebuilt=self.prompt_builder.rebuilt())
         self.system_prompt = new_system_prompt
         print(f"[AGENT] System prompt built ({len(new_system_prompt)} chars)")
         
         try:
             # Note: User message may already be logged by /api/chat endpoint
-            # Check if it's already in history to avoid duplicates
-            should_log = True
-            if self.history and len(self.history) > 0:
-                last_entry = self.history[-1]
-                if last_entry.get("role") == "user":
-                    parts = last_entry.get("parts", [])
-                    if parts and hasattr(parts[0], 'text') and parts[0].text == user_input:
-                        should_log = False
-
-            if should_log:
-                self._log_message("user", user_input)
+            self._log_user_message(user_input)
             
             # Build message history for the API call
             # Convert our internal history format to the new API format
@@ -641,8 +853,15 @@ When the user asks for an image:
                 parts=[types.Part(text=f"[System Instructions]\n{new_system_prompt}")]
             ))
             
-            # Add conversation history if it exists
-            for msg in self.history:
+            # Add conversation history, windowed to the token budget
+            with tracing.span("history") as history_span:
+                window = self.history_policy.apply(self.history)
+                stats = self.history_policy.last_stats
+                history_span.set(**stats)
+            if stats["summarized_turns"] or stats["sent_tokens"] < stats["tokens"]:
+                print(f"[AGENT] History: ~{stats['sent_tokens']} of ~{stats['tokens']} tokens sent, "
+                      f"{stats['summarized_turns']} turns summarized ({stats['new_summaries']} new summaries)")
+            for msg in window:
                 # Trust the role from history
                 role = msg.get("role", "user")
                 
@@ -669,12 +888,18 @@ When the user asks for an image:
                 parts=[types.Part(text=user_input)]
             ))
             
+            # Models to try for this turn, in order
+            route = self.router.route(user_input)
+            
             # Emit request details if callback is set (web mode)
             if hasattr(self.tools_handler, 'on_agent_request'):
                 request_details = {
                     'user_message': user_input,
                     'system_prompt': new_system_prompt,
-                    'model': self.model_name
+                    'model': route.models[0],
+                    'prompt_segments': {name: dict(timing) for name, timing in self.prompt_builder.timings.items()},
+                    'history': dict(stats),
+                    'routing': dict(route.to_dict(), health=self.router.stats())
                 }
                 self.tools_handler.on_agent_request(request_details)
             
@@ -684,9 +909,20 @@ When the user asks for an image:
                 return "Request cancelled by user."
 
             # Make the API call with automatic function calling
-            print(f"[AGENT] Making API call to {self.model_name} with {len(contents)} content items...")
+            streaming = on_stream is not None and self.prefs.get('stream_responses', True)
+            print(f"[AGENT] Making {'streaming ' if streaming else ''}API call to {route.models[0]} "
+                  f"({route.reason}) with {len(contents)} content items...")
             try:
-                response = self._generate_with_fallback(contents)
+                with tracing.span("model", model=route.models[0], streamed=streaming,
+                                  contents=len(contents), route=route.reason) as model_span:
+                    try:
+                        if streaming:
+                            text_response = self._stream_turn(contents, on_stream, cancelled_flag, route)
+                        else:
+                            response = self._generate_with_fallback(contents, route)
+                    finally:
+                        # The model that answered, after any failover
+                        model_span.set(model=self.model_name, attempts=route.attempts)
                 print("[AGENT] API call completed successfully")
 
                 # Check for cancellation after API call
@@ -700,25 +936,10 @@ When the user asks for an image:
                 traceback.print_exc()
                 return f"Error: Tool not found or failed to execute: {repr(ke)}. Available tools: {[t.__name__ if hasattr(t, '__name__') else str(t) for t in self.tools_list[:5]]}"
 
-            # Extract text from response
-            print("[AGENT] Extracting text from response...")
-            text_response = ""
-            if response.candidates and len(response.candidates) > 0:
-                candidate = response.candidates[0]
-                if candidate.content and candidate.content.parts:
-                    for part in candidate.content.parts:
-                        if hasattr(part, 'text') and part.text:
-                            text_response += part.text
-                        # Also check function responses for tool return values
-                        elif hasattr(part, 'function_response') and part.function_response:
-                            # Extract response text from function response if available
-                            func_response = part.function_response
-                            if hasattr(func_response, 'response') and func_response.response:
-                                # Function response might be a string or dict
-                                if isinstance(func_response.response, str):
-                                    text_response += func_response.response
-                                elif isinstance(func_response.response, dict) and 'text' in func_response.response:
-                                    text_response += func_response.response['text']
+            if not streaming:
+                # Extract text from response
+                print("[AGENT] Extracting text from response...")
+                text_response = self._response_text(response)
             
             if not text_response:
                 # If we're waiting for user input (e.g., image selection), don't return a generic message
@@ -745,6 +966,12 @@ When the user asks for an image:
             import traceback
             traceback.print_exc()
             return f"Error communicating with AI: {repr(e)}"
+        finally:
+            # Don't leave the preview waiting on the debounce window once the turn is over
+            with tracing.span("compile_flush"):
+                self.tools_handler.flush_pending_compile()
+            # The next turn's deck context shows changes made after this point
+            self.deck_context.mark_turn()
 
     def _log_message(self, role, content=None, parts=None):
         # Keep SYSTEM messages in history - they provide important context
@@ -0,0 +1,224 @@
+"""
+Slide <-> asset dependency index.
+
+Maps every slide of a deck to the files it references and every file back to
+the slides that use it. References are collected from:
+
+- Markdown images, including Marp background images (``![bg](...)``),
+- ``<img>``/``<source>``/``<video>``/``<audio>`` tags,
+- CSS ``url()`` in ``<style>`` blocks, inline styles and directives such as
+  ``backgroundImage``.
+
+References in the front matter or in global ``<style>`` blocks are deck-wide:
+they affect every slide.
+
+The index is rebuilt only when the content of ``deck.marp.md`` changes, so
+lookups are cheap. It answers "which slides does this file change affect"
+and reports missing and unused assets without rendering anything.
+"""
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Set
+
+from deckbot.deck_document import DeckDocument, content_hash
+from deckbot.preview_cache import _STYLE_RE, _referenced_paths, _strip_code, resolve_asset
+
+# Files that count as "assets" when looking for unused ones
+ASSET_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif", ".bmp",
+                    ".mp4", ".webm", ".mp3", ".wav", ".css", ".woff", ".woff2", ".ttf", ".otf"}
+
+
+def _reference_kind(ref: str, text: str) -> str:
+    """Best-effort classification of how a reference is used (for reports)."""
+    escaped = re.escape(ref)
+    if re.search(r'!\[\s*bg\b[^\]]*\]\(\s*<?' + escaped, text, re.IGNORECASE):
+        return "background"
+    if re.search(r'!\[[^\]]*\]\(\s*<?' + escaped, text):
+        return "image"
+    if re.search(r'\bsrc\s*=\s*["\']' + escaped, text, re.IGNORECASE):
+        return "html"
+    return "css"
+
+
+class AssetIndex:
+    """Which slides reference which files, kept in sync with the deck."""
+
+    def __init__(self, presentation_dir: str, deck_filename: str = "deck.marp.md"):
+        self.presentation_dir = os.path.abspath(presentation_dir)
+        self.deck_path = os.path.join(self.presentation_dir, deck_filename)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self.slide_count = 0
+        # asset path -> kind, for references that apply to the whole deck
+        self.deck_assets: Dict[str, str] = {}
+        # slide number -> {asset path: kind}
+        self.slide_assets: Dict[int, Dict[str, str]] = {}
+        # asset path -> slide numbers (deck-wide references are not listed here)
+        self.asset_slides: Dict[str, Set[int]] = {}
+
+    def normalize(self, path: str) -> str:
+        """Key for a file: path relative to the presentation (POSIX style) or absolute if outside."""
+        full = path if os.path.isabs(path) else os.path.join(self.presentation_dir, path)
+        full = os.path.normpath(full)
+        rel = os.path.relpath(full, self.presentation_dir)
+        if rel.startswith(".."):
+            return full
+        return rel.replace(os.sep, "/")
+
+    def _collect(self, text: str) -> Dict[str, str]:
+        refs = {}
+        for ref in _referenced_paths(text):
+            key = self.normalize(resolve_asset(ref, self.presentation_dir))
+            refs.setdefault(key, _reference_kind(ref, text))
+        return refs
+
+    def refresh(self) -> bool:
+        """Rebuild the index if the deck changed. Returns True if it was rebuilt."""
+        try:
+            with open(self.deck_path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except OSError:
+            content = None
+        # Parsing is the expensive part; comparing a digest is not
+        stamp = None if content is None else content_hash(content)
+
+        with self._lock:
+            if stamp == self._stamp and self._stamp is not None:
+                return False
+            self._build(content or "")
+            self._stamp = stamp
+            return True
+
+    def _build(self, content: str):
+        doc = DeckDocument.parse(content)
+        deck_assets = self._collect(doc.front_matter_text)
+        slide_assets = {}
+        asset_slides = {}
+        for slide in doc.slides:
+            index = slide.number
+            code_free = _strip_code(slide.text)
+            # Unscoped <style> blocks apply to the whole deck
+            for m in _STYLE_RE.finditer(code_free):
+                if "scoped" not in (m.group(1) or ""):
+                    for key, kind in self._collect(m.group(0)).items():
+                        deck_assets.setdefault(key, kind)
+            refs = self._collect(code_free)
+            slide_assets[index] = refs
+            for key in refs:
+                asset_slides.setdefault(key, set()).add(index)
+
+        self.slide_count = doc.slide_count if content.strip() else 0
+        self.deck_assets = deck_assets
+        self.slide_assets = slide_assets
+        self.asset_slides = asset_slides
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def referenced_assets(self) -> Set[str]:
+        self.refresh()
+        return set(self.deck_assets) | set(self.asset_slides)
+
+    def assets_for_slide(self, slide_number: int) -> List[str]:
+        """Files slide N depends on, including deck-wide ones."""
+        self.refresh()
+        refs = set(self.deck_assets) | set(self.slide_assets.get(slide_number, {}))
+        return sorted(refs)
+
+    def slides_for(self, path: str) -> List[int]:
+        """
+        Slides affected by a change to path. A directory matches every file
+        below it; deck-wide references affect all slides.
+        """
+        self.refresh()
+        key = self.normalize(path)
+        prefix = key.rstrip("/") + "/"
+
+        def matches(asset):
+            return asset == key or asset.startswith(prefix)
+
+        if any(matches(a) for a in self.deck_assets):
+            return list(range(1, self.slide_count + 1))
+        slides = set()
+        for asset, numbers in self.asset_slides.items():
+            if matches(asset):
+                slides |= numbers
+        return sorted(slides)
+
+    def affected_slides(self, paths: Iterable[str]) -> List[int]:
+        """Union of slides_for() over several changed paths."""
+        slides = set()
+        for path in paths:
+            slides.update(self.slides_for(path))
+        return sorted(slides)
+
+    def is_referenced(self, path: str) -> bool:
+        return bool(self.slides_for(path))
+
+    def _exists(self, asset: str) -> bool:
+        full = asset if os.path.isabs(asset) else os.path.join(self.presentation_dir, asset)
+        return os.path.exists(full)
+
+    def missing_assets(self) -> Dict[str, List[int]]:
+        """Referenced files that don't exist, with the slides that reference them."""
+        self.refresh()
+        missing = {}
+        all_slides = list(range(1, self.slide_count + 1))
+        for asset in self.deck_assets:
+            if not self._exists(asset):
+                missing[asset] = all_slides
+        for asset, numbers in self.asset_slides.items():
+            if asset not in missing and not self._exists(asset):
+                missing[asset] = sorted(numbers)
+        return dict(sorted(missing.items()))
+
+    def unused_assets(self, directory: str = "images") -> List[str]:
+        """Asset files under directory that no slide references."""
+        self.refresh()
+        root = os.path.join(self.presentation_dir, directory)
+        if not os.path.isdir(root):
+            return []
+        referenced = set(self.deck_assets) | set(self.asset_slides)
+        unused = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() not in ASSET_EXTENSIONS:
+                    continue
+                key = self.normalize(os.path.join(dirpath, filename))
+                if key not in referenced:
+                    unused.append(key)
+        return sorted(unused)
+
+    def report(self) -> dict:
+        """Summary for APIs: references per slide, missing and unused assets."""
+        self.refresh()
+        return {
+            "slides": {str(n): sorted(refs) for n, refs in self.slide_assets.items() if refs},
+            "deck_wide": sorted(self.deck_assets),
+            "missing": self.missing_assets(),
+            "unused": self.unused_assets(),
+        }
+
+
+_indexes: Dict[str, AssetIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_asset_index(presentation_dir: str, deck_filename: str = "deck.marp.md") -> AssetIndex:
+    """Shared, lazily refreshed index for a presentation."""
+    key = os.path.join(os.path.abspath(presentation_dir), deck_filename)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = AssetIndex(presentation_dir, deck_filename)
+            _indexes[key] = index
+    index.refresh()
+    return index
+
+
+def format_slide_list(slides: List[int]) -> str:
+    if len(slides) == 1:
+        return f"slide {slides[0]}"
+    return "slides " + ", ".join(str(n) for n in slides)
@@ -0,0 +1,122 @@
+"""
+Build fingerprints for skipping redundant compiles.
+
+The agent often calls ``compile_presentation`` right after a ``write_file``
+that already auto-compiled, and saving settings with identical values
+recompiles too. Both re-ran Marp on an unchanged deck.
+
+A build fingerprint covers everything that affects ``deck.marp.html``:
+
+- the deck source,
+- its merged CSS (front matter ``style`` plus global ``<style>`` blocks) and
+  the stylesheets it ``@import``s,
+- the content hash of every referenced asset, as listed by the asset index
+  (Markdown images including Marp ``bg`` images, ``<img>``/``<source>``
+  tags, CSS ``url()``),
+- Marp config files in the presentation directory and the CLI arguments.
+
+The fingerprint of the last successful build is stored in
+``.build/fingerprint.json``. While it matches and the artifact still exists,
+a compile is a no-op.
+"""
+import json
+import os
+import re
+import time
+from typing import List, Optional
+
+from deckbot.asset_index import get_asset_index
+from deckbot.deck_document import DeckDocument
+from deckbot.preview_cache import _STYLE_RE, _asset_hashes, _sha, hash_asset, resolve_asset
+
+BUILD_DIR = ".build"
+FINGERPRINT_NAME = "fingerprint.json"
+FINGERPRINT_VERSION = 1
+
+# Config files Marp CLI picks up from the working directory
+MARP_CONFIG_FILES = (
+    ".marprc", ".marprc.json", ".marprc.yml", ".marprc.yaml",
+    "marp.config.js", "marp.config.cjs", "marp.config.mjs",
+)
+
+_CSS_IMPORT_RE = re.compile(r'@import\s+["\']([^"\']+)["\']')
+
+
+def merged_css(content: str) -> str:
+    """Deck-wide CSS: the front matter ``style`` directive plus all <style> blocks."""
+    blocks = [m.group(0) for m in _STYLE_RE.finditer(content)]
+    return "\n".join([DeckDocument.parse(content).style] + blocks)
+
+
+def build_fingerprint(presentation_dir: str, deck_filename: str = "deck.marp.md",
+                      args: Optional[List[str]] = None) -> Optional[str]:
+    """Fingerprint of a build of the deck with the given Marp arguments (None if there's no deck)."""
+    deck_path = os.path.join(presentation_dir, deck_filename)
+    try:
+        with open(deck_path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    css = merged_css(content)
+    index = get_asset_index(presentation_dir, deck_filename)
+    referenced = sorted(index.referenced_assets())
+    imports = _CSS_IMPORT_RE.findall(css)
+    assets = {asset: hash_asset(resolve_asset(asset, presentation_dir)) for asset in referenced}
+    assets.update(_asset_hashes("\n".join(f"url({ref})" for ref in imports), presentation_dir))
+    configs = _asset_hashes(
+        "\n".join(f"url({name})" for name in MARP_CONFIG_FILES
+                  if os.path.exists(os.path.join(presentation_dir, name))),
+        presentation_dir
+    )
+    return _sha(FINGERPRINT_VERSION, args or [], content, css, assets, configs)
+
+
+class BuildCache:
+    """Remembers the fingerprint of the last successful build of a presentation."""
+
+    def __init__(self, presentation_dir: str, artifact: str = "deck.marp.html"):
+        self.presentation_dir = presentation_dir
+        self.artifact = artifact
+        self.path = os.path.join(presentation_dir, BUILD_DIR, FINGERPRINT_NAME)
+
+    def load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == FINGERPRINT_VERSION:
+                return data
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def is_current(self, fingerprint: Optional[str]) -> bool:
+        """True if the artifact exists and was built from exactly this fingerprint."""
+        if not fingerprint:
+            return False
+        if not os.path.exists(os.path.join(self.presentation_dir, self.artifact)):
+            return False
+        recorded = self.load()
+        return recorded.get("fingerprint") == fingerprint and recorded.get("artifact") == self.artifact
+
+    def record(self, fingerprint: Optional[str]):
+        """Store the fingerprint of a build that just succeeded."""
+        if not fingerprint:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "version": FINGERPRINT_VERSION,
+                "fingerprint": fingerprint,
+                "artifact": self.artifact,
+                "built_at": time.time(),
+            }, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def invalidate(self):
+        """Forget the last build so the next compile runs Marp."""
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
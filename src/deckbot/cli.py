@@ -1,10 +1,16 @@
 import click
 import subprocess
 import os
+import json
 from rich.console import Console
 from rich.prompt import Prompt, IntPrompt
+from deckbot.genai_client import LATENCY_ENV, RECORD_ENV, REPLAY_ENV
 from deckbot.manager import PresentationManager
 from deckbot.repl import start_repl
+from deckbot.render_service import run_marp
+from deckbot.sharded_render import render_pdf, render_images
+from deckbot.template_previews import build_template_previews, template_names, warm_template_previews
+from deckbot.tracing import format_trace, read_traces, tracing_enabled
 
 console = Console()
 
@@ -40,9 +46,25 @@ def _interactive_create(ctx, manager):
 @click.option('--text', '-t', is_flag=True, help='Start in text/REPL mode instead of web UI')
 @click.option('--web', '-w', is_flag=True, help='Start the web UI server (default behavior, kept for backward compatibility)')
 @click.option('--port', default=5555, help='Port for web server')
+@click.option('--record', 'record_dir', type=click.Path(file_okay=False), default=None,
+              help='Record Gemini requests and responses to this cassette directory')
+@click.option('--replay', 'replay_dir', type=click.Path(exists=True, file_okay=False), default=None,
+              help='Answer Gemini requests from this cassette directory (offline)')
+@click.option('--replay-latency', type=click.Choice(['zero', 'original']), default=None,
+              help='Replay responses instantly (default) or as fast as they were recorded')
 @click.pass_context
-def cli(ctx, resume, text, web, port):
+def cli(ctx, resume, text, web, port, record_dir, replay_dir, replay_latency):
     """Vibe-Coded Presentation CLI"""
+    # Environment variables, so the web server's reloader process inherits them
+    if record_dir and replay_dir:
+        raise click.UsageError("Use either --record or --replay, not both.")
+    if record_dir:
+        os.environ[RECORD_ENV] = os.path.abspath(record_dir)
+    if replay_dir:
+        os.environ[REPLAY_ENV] = os.path.abspath(replay_dir)
+    if replay_latency:
+        os.environ[LATENCY_ENV] = replay_latency
+
     # Text mode: interactive REPL/presentation selection
     if text:
         if ctx.invoked_subcommand is None:
@@ -100,6 +122,9 @@ def cli(ctx, resume, text, web, port):
         try:
             from deckbot.webapp import app, set_backend_url
             set_backend_url(port)
+            # Only in the serving process, not in the debug reloader's watcher
+            if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+                warm_template_previews(PresentationManager().templates_dir)
             console.print(f"[green]Starting Web UI on http://localhost:{port}[/green]")
             app.run(port=port, debug=True)
         except ImportError:
@@ -143,6 +168,33 @@ def list_templates_cmd():
     for t in templates:
         console.print(f"[bold cyan]{t['name']}[/bold cyan]: {t['description']}")
 
+@templates.command(name='build-previews')
+@click.argument('names', nargs=-1)
+@click.option('--force', is_flag=True, help='Rebuild previews even if the template is unchanged')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None, help='Templates to render in parallel (default: CPU count)')
+def build_previews_cmd(names, force, jobs):
+    """Render slide previews for the template gallery"""
+    manager = PresentationManager()
+    available = template_names(manager.templates_dir)
+    unknown = [n for n in names if n not in available]
+    if unknown:
+        console.print(f"[red]Template(s) not found: {', '.join(unknown)}[/red]")
+        return
+    
+    console.print(f"[green]Building template previews in {manager.templates_dir}...[/green]")
+    results = build_template_previews(manager.templates_dir, names=names or None, jobs=jobs, force=force)
+    if not results:
+        console.print("No templates found.")
+        return
+    
+    for name, status in results.items():
+        if status == "built":
+            console.print(f"[bold cyan]{name}[/bold cyan]: [green]built[/green]")
+        elif status == "current":
+            console.print(f"[bold cyan]{name}[/bold cyan]: [dim]up to date[/dim]")
+        else:
+            console.print(f"[bold cyan]{name}[/bold cyan]: [red]{status}[/red]")
+
 @cli.command()
 def list():
     """List all presentations"""
@@ -211,7 +263,8 @@ def open_folder():
 @cli.command()
 @click.argument('name')
 @click.option('--format', '-f', type=click.Choice(['pdf', 'html', 'pptx', 'png', 'jpeg']), default='pdf', help='Output format')
-def build(name, format):
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None, help='Parallel render processes for PDF/image builds (default: CPU count)')
+def build(name, format, jobs):
     """Compile presentation to static file"""
     manager = PresentationManager()
     presentation = manager.get_presentation(name)
@@ -236,21 +289,50 @@ def build(name, format):
     
     console.print(f"[green]Building {format.upper()} for {name}...[/green]")
     
-    # Command: npx @marp-team/marp-cli input_file -o output_file
-    cmd = ["npx", "@marp-team/marp-cli", input_file, "-o", output_file]
-    
-    # Add specific flags if needed
-    if format == 'pdf':
-        cmd.append("--allow-local-files") # often needed for images
-        
     try:
-        subprocess.run(cmd, check=True)
+        if format == 'pdf':
+            # Large decks are rendered in parallel shards and merged in page order
+            render_pdf(presentation_dir, output_file, jobs=jobs)
+        elif format in ('png', 'jpeg'):
+            # One image per slide: deck.001.png, deck.002.png, ...
+            paths = render_images(presentation_dir, output_filename, image_format=format, jobs=jobs)
+            output_file = f"{len(paths)} images ({os.path.join(presentation_dir, f'deck.*.{format}')})"
+        else:
+            # Marp arguments: input_file -o output_file
+            run_marp([input_file, "-o", output_file])
         console.print(f"[bold green]Success![/bold green] Output saved to: {output_file}")
     except subprocess.CalledProcessError as e:
         console.print(f"[red]Build failed: {e}[/red]")
     except FileNotFoundError:
         console.print("[red]Error: npx not found. Please ensure Node.js and npm are installed.[/red]")
 
+@cli.command()
+@click.argument('name')
+@click.option('--limit', '-n', type=click.IntRange(min=1), default=5, help='Number of recent turns to show')
+@click.option('--json', 'as_json', is_flag=True, help='Print the raw trace records as JSON lines')
+def trace(name, limit, as_json):
+    """Show where recent agent turns spent their time"""
+    manager = PresentationManager()
+    presentation = manager.get_presentation(name)
+
+    if not presentation:
+        console.print(f"[red]Presentation '{name}' not found.[/red]")
+        return
+
+    records = read_traces(os.path.join(manager.root_dir, name), limit=limit)
+    if not records:
+        hint = "" if tracing_enabled() else " (tracing is off: DECKBOT_TRACE is set to a falsy value)"
+        console.print(f"No traces recorded for {name} yet{hint}.")
+        return
+
+    for record in records:
+        if as_json:
+            click.echo(json.dumps(record))
+        else:
+            # Span names and attributes aren't Rich markup
+            console.print(format_trace(record), markup=False, highlight=False)
+            console.print()
+
 @cli.command()
 @click.argument('name')
 def preview(name):
@@ -0,0 +1,133 @@
+"""
+Asynchronous compile jobs for the web API.
+
+Saving a file or presentation settings used to compile the deck inside the
+HTTP request, so every editor save held a Flask worker for the length of a
+Marp render (the settings path without any timeout). Those endpoints now
+submit a CompileJob and return its ID right away. The compile runs in a
+background thread through compile_deck (so it is deduplicated and
+prioritised like every other render), and its progress is published as
+``compile_started`` / ``compile_finished`` / ``compile_error`` events.
+Clients that can't listen to events poll ``/api/compile/<job_id>``.
+"""
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from deckbot.render_coordinator import compile_deck
+
+# Seconds a single compile may take before it is reported as failed
+DEFAULT_COMPILE_TIMEOUT = 120
+# How many finished jobs stay queryable
+MAX_FINISHED_JOBS = 200
+
+
+class CompileJob:
+    """State of one asynchronous compile."""
+
+    def __init__(self, presentation_dir: str, reason: Optional[str] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.presentation_dir = presentation_dir
+        self.reason = reason
+        self.status = "queued"
+        self.skipped = False
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> dict:
+        duration = None
+        if self.started_at and self.finished_at:
+            duration = round(self.finished_at - self.started_at, 3)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "skipped": self.skipped,
+            "reason": self.reason,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": duration,
+        }
+
+
+class CompileJobManager:
+    """Runs compile jobs in background threads and keeps their status."""
+
+    def __init__(self, timeout: float = DEFAULT_COMPILE_TIMEOUT, max_finished: int = MAX_FINISHED_JOBS):
+        self.timeout = timeout
+        self.max_finished = max_finished
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, presentation_dir: str, notify: Optional[Callable[[str, Any], None]] = None,
+               reason: Optional[str] = None) -> CompileJob:
+        """
+        Start compiling presentation_dir in the background and return the job.
+
+        Args:
+            presentation_dir: Presentation to compile.
+            notify: Optional callback receiving (event_type, data) progress events.
+            reason: Short description of what triggered the compile (e.g. "file-save").
+        """
+        job = CompileJob(presentation_dir, reason=reason)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        thread = threading.Thread(target=self._run, args=(job, notify), daemon=True)
+        thread.start()
+        return job
+
+    def get(self, job_id: str) -> Optional[CompileJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def _emit(self, notify, event_type: str, job: CompileJob):
+        if notify:
+            try:
+                notify(event_type, job.to_dict())
+            except Exception as e:
+                print(f"[COMPILE] Failed to publish {event_type}: {e}")
+
+    def _run(self, job: CompileJob, notify):
+        job.status = "running"
+        job.started_at = time.time()
+        self._emit(notify, "compile_started", job)
+        try:
+            result = compile_deck(job.presentation_dir, timeout=self.timeout, capture_output=True, text=True)
+            # None: deck and assets unchanged, the existing build is current
+            job.skipped = result is None
+            job.status = "succeeded"
+        except subprocess.TimeoutExpired:
+            job.status = "failed"
+            job.error = f"Compile timed out after {self.timeout:g}s"
+        except subprocess.CalledProcessError as e:
+            job.status = "failed"
+            job.error = (e.stderr or "").strip() or str(e)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = time.time()
+
+        if job.status == "succeeded":
+            print(f"[COMPILE] Job {job.id} finished in {job.finished_at - job.started_at:.2f}s")
+            self._emit(notify, "compile_finished", job)
+        else:
+            print(f"[COMPILE] Job {job.id} failed: {job.error}")
+            self._emit(notify, "compile_error", job)
+        job.done.set()
@@ -0,0 +1,160 @@
+"""
+Debounced, coalescing compile scheduler.
+
+A single agent turn often makes several edits in a row (write_file,
+replace_text, ...). Compiling after each one wastes a full Marp run per edit
+when only the last result matters. CompileScheduler collapses a burst of
+compile requests into one compile that runs once edits have been quiet for
+``quiet_period`` seconds, but never later than ``max_latency`` seconds after
+the first request of the burst.
+
+A quiet period of 0 compiles synchronously on every request (the original
+behaviour).
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+from deckbot import tracing
+
+
+class CompileScheduler:
+    """Collapses bursts of edit events into a single compile per presentation."""
+
+    def __init__(self, compile_fn: Callable[[], str], quiet_period: float = 0.0,
+                 max_latency: Optional[float] = None, on_status: Optional[Callable[[dict], None]] = None):
+        """
+        Args:
+            compile_fn: Callable that compiles the presentation and returns a status string.
+            quiet_period: Seconds without new requests before compiling. 0 = compile immediately.
+            max_latency: Upper bound in seconds between the first request of a burst and its compile.
+            on_status: Optional callback receiving {"compile": "pending"|"failed", ...} updates.
+                       A result starting with "Error" counts as a failed compile.
+        """
+        self.compile_fn = compile_fn
+        self.quiet_period = max(0.0, float(quiet_period or 0))
+        self.max_latency = float(max_latency) if max_latency else None
+        self.on_status = on_status
+
+        self._lock = threading.Lock()
+        # Held while a compile runs so flush() waits for an in-flight compile
+        self._compile_lock = threading.Lock()
+        self._timer = None
+        self._pending_since = None
+        # Timer compiles that left the pending state but haven't finished;
+        # flush() waits for them to reach zero
+        self._in_flight = 0
+        self._compile_done = threading.Condition(self._lock)
+        # Trace of the turn that asked for the pending compile (the timer runs in another thread)
+        self._trace_parent = None
+        self.requests = 0
+        self.compiles = 0
+        self.last_result = None
+
+    @property
+    def deferred(self) -> bool:
+        return self.quiet_period > 0
+
+    @property
+    def pending(self) -> bool:
+        return self._pending_since is not None
+
+    def _emit(self, status: dict):
+        if self.on_status:
+            try:
+                self.on_status(status)
+            except Exception as e:
+                print(f"[COMPILE] Status callback failed: {e}")
+
+    def request(self) -> Optional[str]:
+        """
+        Ask for a compile. Returns the compile result when compiling synchronously,
+        or None when the compile was scheduled for later.
+        """
+        self.requests += 1
+        if not self.deferred:
+            return self._compile()
+
+        with self._lock:
+            now = time.time()
+            first_request = self._pending_since is None
+            if first_request:
+                self._pending_since = now
+                requester = tracing.current_span()
+                self._trace_parent = requester.trace.root if requester else None
+
+            delay = self.quiet_period
+            if self.max_latency is not None:
+                deadline = self._pending_since + self.max_latency
+                delay = max(0.0, min(delay, deadline - now))
+
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+        if first_request:
+            self._emit({"compile": "pending"})
+        return None
+
+    def _on_timer(self):
+        with self._lock:
+            if self._pending_since is None:
+                return
+            self._pending_since = None
+            self._timer = None
+            trace_parent, self._trace_parent = self._trace_parent, None
+            self._in_flight += 1
+        try:
+            self._compile(trace_parent)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._compile_done.notify_all()
+
+    def _compile(self, trace_parent=None) -> str:
+        with self._compile_lock, tracing.span("compile", parent=trace_parent,
+                                              deferred=trace_parent is not None) as compile_span:
+            try:
+                result = self.compile_fn()
+            except Exception as e:
+                result = f"Error compiling: {e}"
+            compile_span.set(ok=not (result and result.startswith("Error")))
+            self.compiles += 1
+            self.last_result = result
+            if result and result.startswith("Error"):
+                self._emit({"compile": "failed", "error": result})
+            return result
+
+    def flush(self) -> Optional[str]:
+        """
+        Run any pending compile now and wait for it (and any in-flight compile)
+        to finish. Returns the compile result, or None if nothing was pending.
+        """
+        with self._lock:
+            was_pending = self._pending_since is not None
+            self._pending_since = None
+            trace_parent, self._trace_parent = self._trace_parent, None
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+        if was_pending:
+            # Flushed from within the turn: nest under whatever is running now
+            return self._compile(tracing.current_span() or trace_parent)
+
+        # Wait for a compile that a timer already started
+        with self._lock:
+            while self._in_flight:
+                self._compile_done.wait()
+        return None
+
+    def cancel(self):
+        """Drop any pending compile (e.g. because an explicit compile just ran)."""
+        with self._lock:
+            self._pending_since = None
+            self._trace_parent = None
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
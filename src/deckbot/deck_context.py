@@ -0,0 +1,177 @@
+"""
+Compact deck context for the system prompt.
+
+``PresentationTools.get_full_context`` inlines every Markdown file of the
+presentation, including the whole of ``layouts.md``, into the system prompt
+on every turn. For a large deck that is tens of kilobytes per request, even
+when the user asks about one slide.
+
+``DeckContext`` renders a compact view instead:
+
+- an outline of the deck, one line per slide (title and layout),
+- the full text of the slide the user is looking at and ``window`` slides
+  on either side,
+- a diff of the deck since the end of the model's previous turn, so edits
+  made in the editor or UI between turns are visible,
+- the names of the other Markdown files.
+
+The model fetches any other slide with the ``read_slide`` tool and other
+files with ``read_file``. Layouts are already listed in their own prompt
+section.
+
+Modes (``deck_context_mode`` in .deckbot.yaml):
+
+- ``full``: every file, as before.
+- ``delta``: always the compact view.
+- ``auto`` (default): the full text while the Markdown files total less than
+  ``deck_context_full_limit`` characters, the compact view above that.
+"""
+import difflib
+import os
+import re
+from typing import List, Optional
+
+from deckbot.deck_document import DeckDocument, content_hash, markdown_files
+
+DECK_FILENAME = "deck.marp.md"
+
+MODES = ("auto", "full", "delta")
+DEFAULT_MODE = "auto"
+DEFAULT_WINDOW = 1
+DEFAULT_FULL_LIMIT = 16000
+# Diff lines shown before the rest is cut off
+MAX_DIFF_LINES = 80
+
+_CLASS_RE = re.compile(r'<!--\s*_?class:\s*([\w -]+?)\s*-->')
+_LAYOUT_RE = re.compile(r'<!--\s*layout:\s*([\w-]+)\s*-->')
+_HEADING_RE = re.compile(r'^#{1,6}\s+(.+)$', re.MULTILINE)
+
+
+def slide_label(text: str) -> str:
+    """Short description of a slide: its first heading (or line) and its layout/class."""
+    heading = _HEADING_RE.search(text)
+    if heading:
+        label = heading.group(1).strip()
+    else:
+        lines = [line.strip() for line in text.splitlines()
+                 if line.strip() and not line.strip().startswith("<!--")]
+        label = lines[0] if lines else "(empty)"
+    if len(label) > 80:
+        label = label[:77] + "..."
+    layout = _LAYOUT_RE.search(text) or _CLASS_RE.search(text)
+    return f"{label} [{layout.group(1)}]" if layout else label
+
+
+class DeckContext:
+    """Builds the deck part of the system prompt and remembers the deck of the last turn."""
+
+    def __init__(self, presentation_dir: str, mode: str = DEFAULT_MODE,
+                 window: int = DEFAULT_WINDOW, full_limit: int = DEFAULT_FULL_LIMIT):
+        if mode not in MODES:
+            print(f"[AGENT] Unknown deck_context_mode '{mode}', using '{DEFAULT_MODE}'")
+            mode = DEFAULT_MODE
+        self.presentation_dir = presentation_dir
+        self.mode = mode
+        self.window = max(0, window)
+        self.full_limit = full_limit
+        # Deck content when the model's last turn ended
+        self._last_turn_content: Optional[str] = None
+
+    @classmethod
+    def from_preferences(cls, prefs, presentation_dir: str) -> "DeckContext":
+        return cls(
+            presentation_dir,
+            mode=prefs.get('deck_context_mode', DEFAULT_MODE),
+            window=prefs.get('deck_context_window', DEFAULT_WINDOW),
+            full_limit=prefs.get('deck_context_full_limit', DEFAULT_FULL_LIMIT),
+        )
+
+    @property
+    def deck_path(self) -> str:
+        return os.path.join(self.presentation_dir, DECK_FILENAME)
+
+    def _markdown_files(self) -> List[str]:
+        try:
+            return markdown_files(self.presentation_dir)
+        except OSError:
+            return []
+
+    def _read_deck(self) -> Optional[str]:
+        try:
+            with open(self.deck_path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def compact(self) -> bool:
+        """Whether the compact view is used for the deck as it is now."""
+        if self.mode == "full" or not os.path.exists(self.deck_path):
+            return False
+        if self.mode == "delta":
+            return True
+        total = 0
+        for name in self._markdown_files():
+            try:
+                total += os.path.getsize(os.path.join(self.presentation_dir, name))
+            except OSError:
+                pass
+        return total > self.full_limit
+
+    def mark_turn(self):
+        """Remember the deck as the model left it (diffs are relative to this)."""
+        self._last_turn_content = self._read_deck()
+
+    def turn_key(self) -> Optional[str]:
+        """Changes whenever mark_turn() records a different deck (for prompt caching)."""
+        if self._last_turn_content is None:
+            return None
+        return content_hash(self._last_turn_content)
+
+    def build(self, current_slide: Optional[int] = None) -> str:
+        """The compact deck context (see module docstring)."""
+        content = self._read_deck() or ""
+        doc = DeckDocument.parse(content)
+        count = doc.slide_count
+        sections = [f"## Presentation Files\n\n### {DECK_FILENAME} ({count} slides)\n"]
+
+        outline = [f"{slide.number}. {slide_label(slide.text)}" for slide in doc.slides]
+        sections.append("#### Outline\n" + ("\n".join(outline) if outline else "(no slides)") + "\n")
+
+        if doc.front_matter_text:
+            sections.append(f"#### Front matter\n```markdown\n---\n{doc.front_matter_text}\n---\n```\n")
+
+        if count:
+            focus = current_slide if current_slide and 1 <= current_slide <= count else 1
+            first, last = max(1, focus - self.window), min(count, focus + self.window)
+            heading = "Current slide" if current_slide else "First slides"
+            shown = [f"#### {heading} and neighbours (slides {first}-{last})"]
+            for number in range(first, last + 1):
+                marker = " (current)" if current_slide and number == focus else ""
+                shown.append(f"Slide {number}{marker}:\n```markdown\n{doc.slide(number).text}\n```")
+            sections.append("\n".join(shown) + "\n")
+
+        diff = self._diff(content)
+        if diff:
+            sections.append(diff)
+
+        others = [name for name in self._markdown_files() if name not in (DECK_FILENAME, "layouts.md")]
+        if others:
+            sections.append("#### Other files\n" + "\n".join(f"- {name}" for name in others) + "\n")
+
+        sections.append("Use 'read_slide' to read any other slide and 'read_file' for other files "
+                        "before editing them.\n")
+        return "\n".join(sections)
+
+    def _diff(self, content: str) -> str:
+        before = self._last_turn_content
+        if before is None or before == content:
+            return ""
+        old_hashes = {slide.hash for slide in DeckDocument.parse(before).slides}
+        changed = [slide.number for slide in DeckDocument.parse(content).slides if slide.hash not in old_hashes]
+        lines = list(difflib.unified_diff(before.splitlines(), content.splitlines(),
+                                          "before", "now", n=1, lineterm=""))
+        if len(lines) > MAX_DIFF_LINES:
+            lines = lines[:MAX_DIFF_LINES] + [f"... ({len(lines) - MAX_DIFF_LINES} more diff lines)"]
+        summary = f"Changed or new slides: {', '.join(map(str, changed))}\n" if changed else ""
+        return ("#### Changes since your last turn\n"
+                f"{summary}```diff\n" + "\n".join(lines) + "\n```\n")
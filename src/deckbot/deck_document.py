@@ -0,0 +1,445 @@
+"""
+Parsed Marp deck shared by every consumer.
+
+The deck used to be split independently in many places: the web API, the
+session service, the presentation manager, the validator and the image
+generator. Most of them used ``content.split('\\n---\\n')``, which counts the
+front matter as a slide and breaks on ``---`` inside code blocks. Their
+results did not agree.
+
+``DeckDocument.parse`` is the single parser. It yields:
+
+- the front matter (raw YAML text, parsed data and its span in the file),
+- the front matter ``style`` block,
+- the slides, each with its text, byte and character offsets and a content
+  hash.
+
+Separators inside fenced code and setext headings are not slide breaks.
+Parses are memoized by content hash, so all consumers of one revision of a
+deck share a single parse. Documents are read-only; build new content with
+the helpers and parse again.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import yaml
+
+# How many parsed revisions to keep
+MAX_CACHED_DOCUMENTS = 64
+
+FENCE_RE = re.compile(r'^\s{0,3}(`{3,}|~{3,})')
+RULER_RE = re.compile(r'^\s{0,3}(-{3,}|\*{3,}|_{3,})\s*$')
+_H1_RE = re.compile(r'^#\s+(.+)$', re.MULTILINE)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def markdown_files(directory: str) -> List[str]:
+    """
+    The Markdown files of a presentation, sorted. Dotfiles are skipped: the
+    renderers write their temporary decks (``.render-shard-*.marp.md``,
+    ``.preview-subset-*.marp.md``, ...) next to the deck.
+    """
+    return sorted(f for f in os.listdir(directory) if f.endswith('.md') and not f.startswith('.'))
+
+
+class DeckSlide:
+    """One slide: its text and where it sits in the deck."""
+
+    __slots__ = ("number", "text", "start", "end", "char_start", "char_end", "hash")
+
+    def __init__(self, number: int, text: str, start: int, end: int, char_start: int, char_end: int):
+        self.number = number
+        self.text = text
+        # Byte offsets (UTF-8) of the slide body in the file, separators excluded
+        self.start = start
+        self.end = end
+        # The same span as string indices, for slicing the content
+        self.char_start = char_start
+        self.char_end = char_end
+        self.hash = content_hash(text)
+
+    @property
+    def title(self) -> Optional[str]:
+        """Text of the first H1 heading, if any."""
+        match = _H1_RE.search(self.text)
+        return match.group(1).strip() if match else None
+
+    def __repr__(self):
+        return f"DeckSlide({self.number}, {self.start}-{self.end})"
+
+
+class DeckDocument:
+    """A parsed revision of a Marp deck. Use DeckDocument.parse() or load_deck()."""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.hash = content_hash(content)
+        # True if the file opens with a '---' fence
+        self.has_front_matter = False
+        # False if the opening fence is never closed
+        self.front_matter_closed = True
+        self.front_matter_text = ""
+        # Character span of front_matter_text (empty span at 0 without front matter)
+        self.front_matter_span = (0, 0)
+        self.slides: List[DeckSlide] = []
+        self._front_matter = None
+        self._front_matter_error = None
+        self._parse()
+
+    @classmethod
+    def parse(cls, content: str) -> "DeckDocument":
+        """Parse content, reusing the parse of an identical revision."""
+        return _cache.get(content)
+
+    def _parse(self):
+        lines = self.content.split("\n")
+        stripped = [line[:-1] if line.endswith("\r") else line for line in lines]
+        # Character and byte offsets of the start and end (before any \r\n) of every line
+        char_starts, char_ends, byte_starts, byte_ends = [], [], [], []
+        chars = nbytes = 0
+        for raw, line in zip(lines, stripped):
+            char_starts.append(chars)
+            byte_starts.append(nbytes)
+            char_ends.append(chars + len(line))
+            byte_ends.append(nbytes + len(line.encode("utf-8")))
+            chars += len(raw) + 1
+            nbytes += len(raw.encode("utf-8")) + 1
+
+        start = 0
+        if stripped and stripped[0].strip() == "---":
+            self.has_front_matter = True
+            self.front_matter_closed = False
+            for i in range(1, len(stripped)):
+                if stripped[i].strip() in ("---", "..."):
+                    self.front_matter_closed = True
+                    self.front_matter_text = "\n".join(stripped[1:i])
+                    fm_end = char_ends[i - 1] if i > 1 else char_starts[1]
+                    self.front_matter_span = (char_starts[1], fm_end)
+                    start = i + 1
+                    break
+
+        def close(first, last):
+            """Add the slide made of lines first..last-1."""
+            text = "\n".join(stripped[first:last])
+            if last > first:
+                span = (byte_starts[first], byte_ends[last - 1], char_starts[first], char_ends[last - 1])
+            else:
+                # Empty slide: an empty span where it would start
+                at = min(first, len(lines) - 1)
+                pos = (byte_starts[at], char_starts[at]) if first < len(lines) else (byte_ends[at], char_ends[at])
+                span = (pos[0], pos[0], pos[1], pos[1])
+            self.slides.append(DeckSlide(len(self.slides) + 1, text, *span))
+
+        first = start
+        fence = None
+        for i in range(start, len(stripped)):
+            line = stripped[i]
+            m = FENCE_RE.match(line)
+            if fence:
+                if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence):
+                    fence = None
+                continue
+            if m:
+                fence = m.group(1)
+                continue
+            if RULER_RE.match(line):
+                prev = stripped[i - 1] if i > first else ""
+                setext = line.strip().startswith("-") and prev.strip() and not (
+                    prev.lstrip().startswith("#") or prev.rstrip().endswith("-->")
+                )
+                if not setext:
+                    close(first, i)
+                    first = i + 1
+        close(first, len(stripped))
+
+    # ------------------------------------------------------------------
+    # Front matter
+    # ------------------------------------------------------------------
+    @property
+    def front_matter(self) -> dict:
+        """Parsed front matter ({} if absent or invalid; see front_matter_error)."""
+        if self._front_matter is None:
+            data = {}
+            if self.front_matter_text.strip():
+                try:
+                    data = yaml.safe_load(self.front_matter_text)
+                except yaml.YAMLError as e:
+                    self._front_matter_error = e
+                    data = {}
+            self._front_matter = data if isinstance(data, dict) else {}
+        # Documents are shared between consumers: hand out a copy
+        return dict(self._front_matter)
+
+    @property
+    def front_matter_error(self) -> Optional[yaml.YAMLError]:
+        self.front_matter
+        return self._front_matter_error
+
+    @property
+    def style(self) -> str:
+        """The front matter ``style`` block ("" if there is none)."""
+        style = self.front_matter.get("style")
+        return str(style) if style else ""
+
+    @property
+    def slide_count(self) -> int:
+        return len(self.slides)
+
+    @property
+    def body_start(self) -> int:
+        """Character index where the first slide begins."""
+        return self.slides[0].char_start if self.slides else len(self.content)
+
+    def slide(self, number: int) -> DeckSlide:
+        """Slide by 1-based number."""
+        if not 1 <= number <= len(self.slides):
+            raise IndexError(f"Slide {number} does not exist (the deck has {len(self.slides)} slides)")
+        return self.slides[number - 1]
+
+    def with_front_matter_text(self, text: str) -> str:
+        """Content with the front matter YAML replaced by text (added if missing)."""
+        text = text.strip("\n")
+        if not self.has_front_matter or not self.front_matter_closed:
+            return "---\n" + text + "\n---\n\n" + self.content
+        start, end = self.front_matter_span
+        if start == end:
+            # Empty front matter: the fences are adjacent
+            return self.content[:start] + text + "\n" + self.content[start:]
+        return self.content[:start] + text + self.content[end:]
+
+    def with_front_matter(self, data: dict) -> str:
+        """Content with the front matter replaced by data, dumped as YAML."""
+        text = yaml.dump(data, default_flow_style=False, sort_keys=False, allow_unicode=True).strip()
+        return self.with_front_matter_text(text)
+
+    # ------------------------------------------------------------------
+    # Slide edits
+    # ------------------------------------------------------------------
+    def replace_slide(self, number: int, content: str) -> "SlideEdit":
+        """Replace slide N with content (which may hold several slides)."""
+        self.slide(number)
+        return self._splice(number, number, _new_slides(content))
+
+    def insert_slides_after(self, number: int, content: str) -> "SlideEdit":
+        """Insert the slide(s) in content after slide N (0 inserts before the first slide)."""
+        if number != 0:
+            self.slide(number)
+        new = _new_slides(content)
+        if number == 0:
+            return self._splice(1, 1, new + [1])
+        return self._splice(number, number, [number] + new)
+
+    def delete_slide(self, number: int) -> "SlideEdit":
+        self.slide(number)
+        if len(self.slides) == 1:
+            raise ValueError("Cannot delete the only slide of the deck")
+        if number < len(self.slides):
+            return self._splice(number, number + 1, [number + 1])
+        return self._splice(number - 1, number, [number - 1])
+
+    def move_slide(self, number: int, to: int) -> "SlideEdit":
+        """Move slide N so that it becomes slide `to`."""
+        self.slide(number)
+        self.slide(to)
+        first, last = min(number, to), max(number, to)
+        entries = list(range(first, last + 1))
+        entries.remove(number)
+        entries.insert(to - first, number)
+        return self._splice(first, last, entries)
+
+    def _splice(self, first: int, last: int, entries: list) -> "SlideEdit":
+        """
+        Replace slides first..last with entries: old slide numbers (kept
+        verbatim) or new slide text.
+        """
+        texts = [self.slide(e).text if isinstance(e, int) else e for e in entries]
+        ends_deck = last == len(self.slides)
+        for i, text in enumerate(texts):
+            # A paragraph line right above '---' would turn it into a setext heading
+            if (i < len(texts) - 1 or not ends_deck) and _needs_blank_line(text):
+                texts[i] = text + "\n"
+        region = "\n---\n".join(texts)
+        if "\r\n" in self.content:
+            # Slide texts are normalized to \n; keep a CRLF deck CRLF
+            region = region.replace("\n", "\r\n")
+        start, end = self.slides[first - 1], self.slides[last - 1]
+        content = self.content[:start.char_start] + region + self.content[end.char_end:]
+
+        order = (list(range(1, first))
+                 + [e if isinstance(e, int) else None for e in entries]
+                 + list(range(last + 1, len(self.slides) + 1)))
+        edited = DeckDocument.parse(content)
+        if edited.slide_count != len(order):
+            raise ValueError(
+                f"The edit would leave {edited.slide_count} slides instead of {len(order)}; "
+                "check the content for stray slide separators or unclosed code blocks"
+            )
+        # Slides that moved but whose text changed count as changed
+        order = [old if old is None or edited.slides[i].hash == self.slides[old - 1].hash else None
+                 for i, old in enumerate(order)]
+        return SlideEdit(self, edited, order)
+
+
+def _needs_blank_line(text: str) -> bool:
+    last = text.rsplit("\n", 1)[-1]
+    return bool(last.strip()) and not (last.lstrip().startswith("#") or last.rstrip().endswith("-->"))
+
+
+def _new_slides(content: str) -> List[str]:
+    """Split new slide content into normalized slide texts."""
+    body = content.strip("\n")
+    if not body.strip():
+        raise ValueError("Slide content is empty")
+    # The leading newline keeps a '---' on the first line from reading as front matter
+    texts = [slide.text.strip("\n") for slide in DeckDocument.parse("\n" + body).slides]
+    while texts and not texts[0].strip():
+        texts.pop(0)
+    while texts and not texts[-1].strip():
+        texts.pop()
+    return ["\n" + text + "\n" for text in texts]
+
+
+class StaleDeckError(Exception):
+    """The deck on disk is not the revision an edit was computed from."""
+
+
+_write_lock = threading.Lock()
+
+
+def _common_prefix(a: bytes, b: bytes) -> int:
+    """Length of the common prefix of a and b (binary search over C-level compares)."""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class SlideEdit:
+    """The result of an edit to a deck, and what it did to each slide."""
+
+    def __init__(self, before: DeckDocument, after: DeckDocument, order: Optional[list] = None):
+        self.before = before
+        self.after = after
+        # For every slide of the new deck: its old number, or None if its content is new
+        self.order = order if order is not None else self._match_slides()
+
+    def _match_slides(self) -> list:
+        """Work out the order by matching slide hashes (for free-form text edits)."""
+        positions = {}
+        for slide in self.before.slides:
+            positions.setdefault(slide.hash, []).append(slide.number)
+        order = []
+        for slide in self.after.slides:
+            candidates = positions.get(slide.hash)
+            if not candidates:
+                order.append(None)
+                continue
+            # Prefer the slide that was at the same position
+            old = slide.number if slide.number in candidates else candidates[0]
+            candidates.remove(old)
+            order.append(old)
+        return order
+
+    @property
+    def content(self) -> str:
+        return self.after.content
+
+    @property
+    def changed(self) -> List[int]:
+        """New slide numbers whose content is new or changed."""
+        return [n for n, old in enumerate(self.order, start=1) if old is None]
+
+    @property
+    def slide_map(self) -> dict:
+        """Old slide number -> new slide number, for slides whose content is unchanged."""
+        return {old: n for n, old in enumerate(self.order, start=1) if old is not None}
+
+    @property
+    def removed(self) -> List[int]:
+        kept = set(self.slide_map)
+        return [n for n in range(1, self.before.slide_count + 1) if n not in kept]
+
+    def write(self, path: str) -> int:
+        """
+        Apply the edit to the file at path, rewriting only the bytes that
+        changed (and the tail when the length changed). Returns the number of
+        bytes written. Raises StaleDeckError if the file is not the revision
+        the edit was made against.
+        """
+        old = self.before.content.encode("utf-8")
+        new = self.after.content.encode("utf-8")
+        start = _common_prefix(old, new)
+        with _write_lock:
+            with open(path, "r+b") as f:
+                if f.read() != old:
+                    raise StaleDeckError(f"{path} changed since it was read")
+                f.seek(start)
+                if len(new) == len(old):
+                    suffix = _common_prefix(old[start:][::-1], new[start:][::-1])
+                    chunk = new[start:len(new) - suffix]
+                    f.write(chunk)
+                else:
+                    chunk = new[start:]
+                    f.write(chunk)
+                    f.truncate()
+        return len(chunk)
+
+
+class _DocumentCache:
+    """LRU of parsed documents keyed by content hash."""
+
+    def __init__(self, size: int = MAX_CACHED_DOCUMENTS):
+        self.size = size
+        self._docs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, content: str) -> DeckDocument:
+        key = content_hash(content)
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is not None:
+                self._docs.move_to_end(key)
+                self.hits += 1
+                return doc
+        doc = DeckDocument(content)
+        with self._lock:
+            self.misses += 1
+            self._docs[key] = doc
+            while len(self._docs) > self.size:
+                self._docs.popitem(last=False)
+        return doc
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self.hits = self.misses = 0
+
+
+_cache = _DocumentCache()
+
+
+def load_deck(path: str) -> DeckDocument:
+    """Read and parse the deck at path (shared parse per content revision)."""
+    # newline='' keeps \r\n, so SlideEdit.write can compare with the bytes on disk
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        content = f.read()
+    return DeckDocument.parse(content)
+
+
+def split_deck(content: str):
+    """(front_matter_text, [slide texts]) for content."""
+    doc = DeckDocument.parse(content)
+    return doc.front_matter_text, [slide.text for slide in doc.slides]
@@ -1,22 +1,69 @@
 import re
-import yaml
 import cssutils
 import logging
 import io
+import threading
+from collections import OrderedDict
+from deckbot.deck_document import DeckDocument, content_hash
+from deckbot.preview_cache import _strip_code
 
 # Configure cssutils to be quiet by default
 cssutils.log.setLevel(logging.CRITICAL)
 
+# Validation results are memoized by content hash. The front matter CSS
+# (large once the layouts CSS is merged in) rarely changes between edits,
+# and unchanged slides don't need checking again.
+MAX_CACHED_RESULTS = 512
+
+_css_results = OrderedDict()
+_slide_results = OrderedDict()
+_results_lock = threading.Lock()
+# cssutils logs through a global logger that validate_css swaps out
+_cssutils_lock = threading.Lock()
+
+
+def _memo_get(cache: OrderedDict, key: str):
+    with _results_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _memo_put(cache: OrderedDict, key: str, value):
+    with _results_lock:
+        cache[key] = value
+        while len(cache) > MAX_CACHED_RESULTS:
+            cache.popitem(last=False)
+
+
+def clear_validation_cache():
+    with _results_lock:
+        _css_results.clear()
+        _slide_results.clear()
+
+
 class DeckValidator:
     @staticmethod
     def validate_css(css_content: str) -> list:
         """
         Validates CSS content and returns a list of error messages.
-        Returns empty list if valid.
+        Returns empty list if valid. Results are memoized by CSS hash.
         """
         if not css_content or not css_content.strip():
             return []
 
+        key = content_hash(css_content)
+        errors = _memo_get(_css_results, key)
+        if errors is None:
+            with _cssutils_lock:
+                errors = tuple(DeckValidator._parse_css(css_content))
+            _memo_put(_css_results, key, errors)
+        return list(errors)
+
+    @staticmethod
+    def _parse_css(css_content: str) -> list:
+        """Run cssutils over css_content and collect the errors it logs."""
         # Capture cssutils logs
         log_capture = io.StringIO()
         handler = logging.StreamHandler(log_capture)
@@ -65,6 +112,67 @@ class DeckValidator:
             
         return errors
 
+    @staticmethod
+    def validate_front_matter(doc: DeckDocument):
+        """
+        Validates the front matter of a parsed deck (closing fence, YAML, CSS).
+        Returns an error message, or None if valid.
+        """
+        if not doc.has_front_matter:
+            return None
+        if not doc.front_matter_closed:
+            return "Frontmatter not closed. The file starts with '---' but does not have a closing '---'. This will cause the configuration to be visible in the presentation."
+        if doc.front_matter_error is not None:
+            return f"Invalid YAML frontmatter: {doc.front_matter_error}"
+        if doc.style:
+            css_errors = DeckValidator.validate_css(doc.style)
+            if css_errors:
+                return "CSS Error in frontmatter:\n" + "\n".join(css_errors)
+        return None
+
+    @staticmethod
+    def _slide_facts(text: str) -> tuple:
+        """(errors, title, image count) for a slide body, memoized by slide hash."""
+        key = content_hash(text)
+        facts = _memo_get(_slide_results, key)
+        if facts is not None:
+            return facts
+
+        errors = []
+        # Comment markers inside fenced code are shown as text, not parsed
+        code_free = _strip_code(text)
+        if code_free.count('<!--') > code_free.count('-->'):
+            errors.append("Unclosed HTML comment ('<!--' without '-->'). It would hide the rest of the deck.")
+        for match in re.finditer(r'<style[^>]*>(.*?)</style>', text, re.DOTALL | re.IGNORECASE):
+            errors.extend(DeckValidator.validate_css(match.group(1)))
+
+        h1_match = re.search(r'^#\s+(.+)$', text, re.MULTILINE)
+        title = h1_match.group(1).strip() if h1_match else "No Title"
+        
+        # Count images
+        # Markdown images: ![alt](src)
+        # HTML images: <img src="...">
+        md_images = len(re.findall(r'!\[.*?\]\(.*?\)', text))
+        html_images = len(re.findall(r'<img\s+[^>]*src=[\'"].*?[\'"]', text, re.IGNORECASE))
+
+        facts = (tuple(errors), title, md_images + html_images)
+        _memo_put(_slide_results, key, facts)
+        return facts
+
+    @staticmethod
+    def validate_slide(text: str) -> list:
+        """
+        Validates a single slide body and returns a list of error messages.
+        Only the slide itself is checked, so the cost doesn't depend on the deck size.
+        """
+        return list(DeckValidator._slide_facts(text)[0])
+
+    @staticmethod
+    def summarize_slide(number: int, text: str) -> str:
+        """One summary line for a slide: its title and image count."""
+        _, title, image_count = DeckValidator._slide_facts(text)
+        return f"Slide {number}: Title='{title}', Images={image_count}"
+
     @staticmethod
     def validate_and_summarize(content: str) -> dict:
         """
@@ -74,97 +182,19 @@ class DeckValidator:
         - error: str (if invalid)
         - summary: str (if valid)
         """
+        doc = DeckDocument.parse(content)
         
-        # 1. Validate Frontmatter
-        lines = content.split('\n')
-        if not lines:
-            return {'valid': True, 'summary': "Empty file", 'error': None}
-            
-        has_frontmatter = lines[0].strip() == '---'
-        frontmatter_end_index = -1
-        
-        if has_frontmatter:
-            # Look for closing ---
-            # We start looking from line 1
-            for i, line in enumerate(lines[1:], start=1):
-                if line.strip() == '---':
-                    frontmatter_end_index = i
-                    break
-            
-            if frontmatter_end_index == -1:
-                return {
-                    'valid': False, 
-                    'error': "Frontmatter not closed. The file starts with '---' but does not have a closing '---'. This will cause the configuration to be visible in the presentation.",
-                    'summary': None
-                }
-
-            # 1.5 Validate CSS if present in frontmatter
-            fm_text = '\n'.join(lines[1:frontmatter_end_index])
-            try:
-                frontmatter = yaml.safe_load(fm_text)
-                if frontmatter and isinstance(frontmatter, dict) and 'style' in frontmatter:
-                    css_errors = DeckValidator.validate_css(str(frontmatter['style']))
-                    if css_errors:
-                         return {
-                            'valid': False,
-                            'error': "CSS Error in frontmatter:\n" + "\n".join(css_errors),
-                            'summary': None
-                         }
-            except yaml.YAMLError as e:
-                return {
-                    'valid': False,
-                    'error': f"Invalid YAML frontmatter: {e}",
-                    'summary': None
-                }
-        
-        # 2. Generate Summary
-        # We need to split slides. 
-        # Marp slides are separated by '---' on a line by itself.
-        # We need to handle the frontmatter case so we don't split there.
-        
-        slide_content_start = 0
-        if has_frontmatter:
-            slide_content_start = frontmatter_end_index + 1
-            
-        # Reconstruct the body to split by slides
-        # Note: '---' is both frontmatter delimiter and slide separator.
-        # If we have frontmatter, the first slide starts after it.
-        # If we don't, the first slide starts at the beginning.
-        # Subsequent slides are separated by '\n---\n' (roughly).
-        
-        body_lines = lines[slide_content_start:]
-        
-        # A robust way is to iterate lines and look for '---'.
-        slides = []
-        current_slide_lines = []
-        
-        for line in body_lines:
-            if line.strip() == '---':
-                # End of current slide, start of new one
-                slides.append('\n'.join(current_slide_lines))
-                current_slide_lines = []
-            else:
-                current_slide_lines.append(line)
-        
-        # Append the last slide
-        slides.append('\n'.join(current_slide_lines))
+        # 1. Validate Frontmatter (structure, YAML and CSS)
+        error = DeckValidator.validate_front_matter(doc)
+        if error:
+            return {'valid': False, 'error': error, 'summary': None}
         
+        # 2. Summarize slides (unchanged slides hit the cache)
         summary_lines = []
-        summary_lines.append(f"Total Slides: {len(slides)}")
+        summary_lines.append(f"Total Slides: {doc.slide_count}")
         
-        for i, slide_text in enumerate(slides):
-            # Find H1
-            h1_match = re.search(r'^#\s+(.+)$', slide_text, re.MULTILINE)
-            title = h1_match.group(1).strip() if h1_match else "No Title"
-            
-            # Count images
-            # Markdown images: ![alt](src)
-            # HTML images: <img src="...">
-            md_images = len(re.findall(r'!\[.*?\]\(.*?\)', slide_text))
-            html_images = len(re.findall(r'<img\s+[^>]*src=[\'"].*?[\'"]', slide_text, re.IGNORECASE))
-            image_count = md_images + html_images
-            
-            summary_lines.append(f"Slide {i+1}: Title='{title}', Images={image_count}")
+        for slide in doc.slides:
+            summary_lines.append(DeckValidator.summarize_slide(slide.number, slide.text))
             
         return {
             'valid': True,
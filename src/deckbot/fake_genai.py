@@ -0,0 +1,128 @@
+"""
+Scripted stand-in for ``google.genai.Client``, for working offline.
+
+``FakeGenaiClient`` answers ``models.generate_content`` and
+``models.generate_content_stream`` from a script instead of calling Gemini,
+so streaming, tool calls and the chat pipeline can be exercised without a
+network or an API key. Each turn of the script is a list of steps:
+
+- a string: text the model "says" (streamed in word-sized chunks),
+- ``{"call": "tool_name", "args": {...}}``: a function call. As with
+  automatic function calling, the tool passed in the request config is
+  invoked with the arguments before the script continues. If the request
+  turns automatic function calling off, the call ends the response and the
+  next request continues the turn, as with the real API.
+- ``{"image": "<base64>", "mime_type": "image/png"}``: inline image data.
+
+::
+
+    client = FakeGenaiClient([
+        ["Let me fix the title. ", {"call": "replace_slide", "args": {...}}, "Done!"],
+        ["Anything else?"],
+    ])
+    agent.client = client
+
+Requests are recorded in ``client.requests`` (model, contents, streamed).
+"""
+import base64
+import re
+import time
+from typing import List, Optional, Union
+
+from google.genai import types
+
+Step = Union[str, dict]
+
+_CHUNK_RE = re.compile(r'\S+\s*|\s+')
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGenaiClient"):
+        self._client = client
+
+    def generate_content(self, model: str, contents, config=None):
+        chunks = list(self._client._run(model, contents, config, streamed=False))
+        if self._client._pending is not None:
+            # Ended on a function call for the caller to run
+            return chunks[-1]
+        # Like the real client with automatic function calling: only the last round's reply
+        last_round = []
+        for chunk in chunks:
+            parts = chunk.candidates[0].content.parts
+            if parts[0].function_call:
+                last_round = []
+            else:
+                last_round.extend(parts)
+        text = "".join(part.text for part in last_round if part.text)
+        images = [part for part in last_round if part.inline_data]
+        return _response(([types.Part(text=text)] if text else []) + images)
+
+    def generate_content_stream(self, model: str, contents, config=None):
+        return self._client._run(model, contents, config, streamed=True)
+
+
+def _response(parts: List[types.Part]) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(candidates=[
+        types.Candidate(content=types.Content(role="model", parts=parts))
+    ])
+
+
+class FakeGenaiClient:
+    """Plays back scripted model turns (see module docstring)."""
+
+    def __init__(self, turns: Optional[List[List[Step]]] = None, chunk_delay: float = 0.0,
+                 default_reply: str = "OK"):
+        """
+        Args:
+            turns: One list of steps per chat turn, played in order.
+            chunk_delay: Seconds to wait before each streamed chunk.
+            default_reply: Reply once the script is exhausted.
+        """
+        self.turns = [list(turn) for turn in (turns or [])]
+        self.chunk_delay = chunk_delay
+        self.default_reply = default_reply
+        self.requests = []
+        # Rest of a turn interrupted by a function call (automatic function calling off)
+        self._pending = None
+        self.models = _FakeModels(self)
+
+    def _tool(self, config, name: str):
+        for tool in (getattr(config, "tools", None) or []):
+            if callable(tool) and getattr(tool, "__name__", None) == name:
+                return tool
+        raise KeyError(name)
+
+    def _run(self, model: str, contents, config, streamed: bool):
+        self.requests.append({"model": model, "contents": contents, "streamed": streamed})
+        afc = getattr(config, "automatic_function_calling", None)
+        run_tools = not (afc and afc.disable)
+        if self._pending is not None:
+            steps, self._pending = self._pending, None
+        else:
+            steps = self.turns.pop(0) if self.turns else [self.default_reply]
+        for position, step in enumerate(steps):
+            if isinstance(step, dict) and "image" in step:
+                if self.chunk_delay:
+                    time.sleep(self.chunk_delay)
+                yield _response([types.Part(inline_data=types.Blob(
+                    mime_type=step.get("mime_type", "image/png"),
+                    data=base64.b64decode(step["image"])
+                ))])
+                continue
+            if isinstance(step, dict):
+                if self.chunk_delay:
+                    time.sleep(self.chunk_delay)
+                args = dict(step.get("args", {}))
+                if not run_tools:
+                    # The caller runs the tool and sends the result in a new request
+                    self._pending = steps[position + 1:]
+                    yield _response([types.Part(function_call=types.FunctionCall(name=step["call"], args=args))])
+                    return
+                # Automatic function calling runs the tool before the chunk is yielded
+                self._tool(config, step["call"])(**args)
+                yield _response([types.Part(function_call=types.FunctionCall(name=step["call"], args=args))])
+                continue
+            for piece in _CHUNK_RE.findall(step):
+                if self.chunk_delay:
+                    time.sleep(self.chunk_delay)
+                yield _response([types.Part(text=piece)])
@@ -0,0 +1,157 @@
+"""
+Local fast path for navigation and build commands.
+
+"go to slide 5", "next slide", "compile" or "export pdf" used to cost a full
+model round trip (system prompt, history and all) just for the model to call
+``go_to_slide``, ``compile_presentation`` or ``export_pdf``.
+``IntentMatcher`` recognises these unambiguous commands, including the REPL
+slash commands (``/slide 5``, ``/next``, ``/prev``, ``/compile``, ``/pdf``),
+and ``Agent.chat`` runs the tool itself. Anything that doesn't match a
+pattern in full goes to the model as before.
+
+Intents and their default patterns are in ``DEFAULT_PATTERNS``. Patterns
+are matched against the whole message, lower-cased, without surrounding
+punctuation or a leading/trailing "please". More patterns can be added per
+intent in .deckbot.yaml (``go_to_slide`` patterns need a ``slide`` group)::
+
+    fast_path_patterns:
+      go_to_slide:
+        - 'zeig folie (?P<slide>\\d+)'
+
+``fast_path: false`` turns the fast path off.
+"""
+import re
+from typing import Dict, List, Optional
+
+GO_TO_SLIDE = "go_to_slide"
+NEXT_SLIDE = "next_slide"
+PREVIOUS_SLIDE = "previous_slide"
+COMPILE = "compile"
+EXPORT_PDF = "export_pdf"
+
+DEFAULT_PATTERNS: Dict[str, List[str]] = {
+    GO_TO_SLIDE: [
+        r'(?:go|jump|skip|navigate|move) to (?:slide|page) (?P<slide>\d+)',
+        r'(?:show|open|display)(?: me)? (?:slide|page) (?P<slide>\d+)',
+        r'(?:slide|page) (?P<slide>\d+)',
+        r'/(?:slide|goto|go) (?P<slide>\d+)',
+    ],
+    # Bare "next", "back" or "previous" are ordinary chat replies, so the
+    # phrasings need "slide"/"page" (or the slash command)
+    NEXT_SLIDE: [
+        r'(?:go to |show )?(?:the )?next (?:slide|page)',
+        r'/next',
+    ],
+    PREVIOUS_SLIDE: [
+        r'(?:go to |show |go )?(?:the )?(?:previous|prev) (?:slide|page)',
+        r'(?:go )?back one (?:slide|page)',
+        r'/(?:prev|previous|back)',
+    ],
+    COMPILE: [
+        r'(?:re)?(?:compile|build|rebuild|render)(?: the)?(?: presentation| deck| slides)?',
+        r'/(?:compile|build)',
+    ],
+    EXPORT_PDF: [
+        r'export(?: the)?(?: presentation| deck| slides)?(?: to| as)?(?: a)? pdf',
+        r'(?:make|create|generate|build)(?: me)? (?:a )?pdf',
+        r'/(?:pdf|export)',
+    ],
+}
+
+_POLITE_RE = re.compile(r'^(?:please|pls|can you|could you)\s+|\s+please$')
+
+
+def normalize(message: str) -> str:
+    text = " ".join(message.strip().lower().split())
+    text = text.strip(" .!?")
+    return _POLITE_RE.sub("", text).strip(" .!?")
+
+
+class Intent:
+    """A recognised command: its name and, for go_to_slide, the slide number."""
+
+    def __init__(self, name: str, slide: Optional[int] = None):
+        self.name = name
+        self.slide = slide
+
+    def __repr__(self):
+        return f"Intent({self.name!r}, slide={self.slide!r})"
+
+
+class IntentMatcher:
+    """Matches whole messages against the intent patterns."""
+
+    def __init__(self, patterns: Optional[Dict[str, List[str]]] = None, enabled: bool = True):
+        """
+        Args:
+            patterns: Extra patterns per intent, tried after the defaults.
+            enabled: False to never match (everything goes to the model).
+        """
+        self.enabled = enabled
+        self._patterns = []
+        merged = {name: list(defaults) for name, defaults in DEFAULT_PATTERNS.items()}
+        for name, extra in (patterns or {}).items():
+            if name not in merged:
+                print(f"[AGENT] Unknown fast path intent '{name}' ignored")
+                continue
+            merged[name].extend([extra] if isinstance(extra, str) else extra)
+        for name, sources in merged.items():
+            for source in sources:
+                try:
+                    self._patterns.append((name, re.compile(source)))
+                except re.error as e:
+                    print(f"[AGENT] Invalid fast path pattern for {name} ('{source}'): {e}")
+
+    @classmethod
+    def from_preferences(cls, prefs) -> "IntentMatcher":
+        return cls(
+            patterns=prefs.get('fast_path_patterns', None),
+            enabled=prefs.get('fast_path', True),
+        )
+
+    def match(self, message: str) -> Optional[Intent]:
+        """The intent of a message, or None if the model should handle it."""
+        if not self.enabled or not message:
+            return None
+        text = normalize(message)
+        for name, pattern in self._patterns:
+            found = pattern.fullmatch(text)
+            if not found:
+                continue
+            if name == GO_TO_SLIDE:
+                slide = found.groupdict().get("slide")
+                if not slide:
+                    continue
+                return Intent(name, slide=int(slide))
+            return Intent(name)
+        return None
+
+
+def plan(intent: Intent, current_slide: int, slide_count: int):
+    """
+    The tool call for an intent: (tool_name, kwargs), or (None, reply) when
+    there's nothing to run (e.g. "next slide" on the last slide).
+    """
+    if intent.name == COMPILE:
+        return "compile_presentation", {}
+    if intent.name == EXPORT_PDF:
+        return "export_pdf", {}
+
+    if intent.name == NEXT_SLIDE:
+        target = current_slide + 1
+    elif intent.name == PREVIOUS_SLIDE:
+        target = current_slide - 1
+    else:
+        target = intent.slide
+
+    if slide_count < 1:
+        return None, "The presentation has no slides yet."
+    if target < 1:
+        if intent.name == PREVIOUS_SLIDE:
+            return None, "You're already on the first slide."
+        return None, "Slides are numbered from 1."
+    if target > slide_count:
+        if intent.name == NEXT_SLIDE:
+            return None, f"You're already on the last slide ({slide_count})."
+        return None, f"The presentation has {slide_count} slides; there is no slide {target}."
+    return "go_to_slide", {"slide_number": target}
@@ -0,0 +1,307 @@
+"""
+Gemini client used by the agent, Visual QA and image generation, with
+record/replay of real sessions.
+
+``create_client(api_key, component)`` normally returns a plain
+``genai.Client``. Two environment variables change that:
+
+``DECKBOT_RECORD=<dir>``
+    Calls go to Gemini as usual, and every request/response pair is appended
+    to ``<dir>/<component>.jsonl``, with streamed chunks, function calls,
+    image bytes and timings.
+
+``DECKBOT_REPLAY=<dir>``
+    No network and no API key needed: responses come from the cassette.
+    ``DECKBOT_REPLAY_LATENCY`` is ``zero`` (default) or ``original`` to wait
+    as long as the recorded call took, chunk by chunk.
+
+A recorded request is matched by a hash of its model and contents. If no
+recording matches, the next unused recording of that component and method
+is used instead, so sessions whose prompts differ slightly (e.g. another
+presentation root) still replay.
+
+Automatic function calling is done here rather than by the SDK while
+recording or replaying: each model round is recorded separately, and on
+replay the tools really run. Agent turns, tool calls and the renders they
+trigger are then timed exactly as in the recorded session, without Gemini.
+"""
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+import typing
+from typing import Iterator, List, Optional
+
+from google import genai
+from google.genai import types
+from pydantic import TypeAdapter
+
+RECORD_ENV = "DECKBOT_RECORD"
+REPLAY_ENV = "DECKBOT_REPLAY"
+LATENCY_ENV = "DECKBOT_REPLAY_LATENCY"
+
+# Same limit as the SDK's automatic function calling
+MAX_FUNCTION_CALL_ROUNDS = 10
+
+
+class CassetteMiss(Exception):
+    """A replayed client was asked for a call that isn't in the cassette."""
+
+
+def create_client(api_key: Optional[str], component: str):
+    """
+    Client for one component ("agent", "visual_qa", "images").
+
+    Returns None if there's no API key and nothing to replay.
+    """
+    replay_dir = os.environ.get(REPLAY_ENV)
+    if replay_dir:
+        return ReplayClient(Cassette(replay_dir, component), latency=os.environ.get(LATENCY_ENV, "zero"))
+    if not api_key:
+        return None
+    client = genai.Client(api_key=api_key)
+    record_dir = os.environ.get(RECORD_ENV)
+    if record_dir:
+        return RecordingClient(client, Cassette(record_dir, component))
+    return client
+
+
+def _content_key(item) -> str:
+    if isinstance(item, (types.Content, types.Part)):
+        return item.model_dump_json(exclude_none=True)
+    if hasattr(item, "tobytes"):
+        # PIL images (style and remix references)
+        return hashlib.sha256(item.tobytes()).hexdigest()
+    return json.dumps(item, sort_keys=True, default=str)
+
+
+def request_key(model: str, contents) -> str:
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    digest = hashlib.sha256(model.encode("utf-8"))
+    for item in contents:
+        digest.update(_content_key(item).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Cassette:
+    """Recorded calls of one component: ``<dir>/<component>.jsonl``."""
+
+    def __init__(self, directory: str, component: str):
+        self.directory = directory
+        self.component = component
+        self.path = os.path.join(directory, f"{component}.jsonl")
+        self._lock = threading.Lock()
+        self._entries = None
+        self._used = set()
+
+    def append(self, entry: dict):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def _load(self) -> List[dict]:
+        if self._entries is None:
+            self._entries = []
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    self._entries = [json.loads(line) for line in f if line.strip()]
+        return self._entries
+
+    def take(self, method: str, key: str) -> dict:
+        """The recording for a request (consumed, so repeated requests replay in order)."""
+        with self._lock:
+            candidates = [(i, e) for i, e in enumerate(self._load())
+                          if i not in self._used and e["method"] == method]
+            if not candidates:
+                raise CassetteMiss(f"No recorded {method} call left in {self.path}")
+            index, entry = next(((i, e) for i, e in candidates if e["request"] == key), candidates[0])
+            if entry["request"] != key:
+                print(f"[CASSETTE] {self.component}: request differs from the recording, replaying call #{entry['seq']}")
+            self._used.add(index)
+            return entry
+
+
+def _parts(chunk) -> list:
+    if chunk.candidates and chunk.candidates[0].content and chunk.candidates[0].content.parts:
+        return chunk.candidates[0].content.parts
+    return []
+
+
+def _afc_enabled(config) -> bool:
+    afc = getattr(config, "automatic_function_calling", None)
+    return bool(getattr(config, "tools", None)) and not (afc and afc.disable)
+
+
+def _without_afc(config):
+    """The config with the SDK's automatic function calling turned off (we do it ourselves)."""
+    if config is None:
+        return None
+    return config.model_copy(update={
+        "automatic_function_calling": types.AutomaticFunctionCallingConfig(disable=True)
+    })
+
+
+def _function_map(config) -> dict:
+    """The callable tools of a config, by name (as the model calls them)."""
+    return {tool.__name__: tool for tool in (getattr(config, "tools", None) or []) if callable(tool)}
+
+
+def _call_tool(tool, args: dict):
+    """
+    Run a tool with the arguments of a function call. Each argument is
+    validated against the parameter's annotation, so JSON values become the
+    declared types (2.0 -> 2, a dict -> a pydantic model, ...).
+    """
+    hints = typing.get_type_hints(tool)
+    converted = {}
+    for name, param in inspect.signature(tool).parameters.items():
+        if name not in args:
+            continue
+        annotation = hints.get(name, param.annotation)
+        value = args[name]
+        if annotation is not inspect.Parameter.empty:
+            value = TypeAdapter(annotation).validate_python(value)
+        converted[name] = value
+    return tool(**converted)
+
+
+def _function_responses(chunk, function_map: dict) -> list:
+    """Function response parts for the function calls in a chunk."""
+    responses = []
+    for part in _parts(chunk):
+        call = part.function_call
+        if not call or call.name is None or call.args is None:
+            continue
+        try:
+            response = {"result": _call_tool(function_map[call.name], call.args)}
+        except Exception as e:
+            response = {"error": str(e)}
+        responses.append(types.Part.from_function_response(name=call.name, response=response))
+    return responses
+
+
+def _with_function_calls(round_fn, model: str, contents, config) -> Iterator:
+    """
+    Yield the chunks of each model round, running function calls between
+    rounds (automatic function calling). round_fn(model, contents, config)
+    yields the chunks of one round.
+    """
+    contents = list(contents) if isinstance(contents, (list, tuple)) else [contents]
+    afc = _afc_enabled(config)
+    round_config = _without_afc(config) if afc else config
+    function_map = _function_map(config) if afc else {}
+    for _ in range(MAX_FUNCTION_CALL_ROUNDS):
+        chunks = []
+        responses = []
+        for chunk in round_fn(model, contents, round_config):
+            if function_map:
+                responses.extend(_function_responses(chunk, function_map))
+            chunks.append(chunk)
+            yield chunk
+        if not responses:
+            return
+        contents.append(types.Content(role="model", parts=[p for chunk in chunks for p in _parts(chunk)]))
+        contents.append(types.Content(role="user", parts=responses))
+
+
+def _final_response(chunks: list):
+    """Non-streamed result: the last round's response, as the SDK returns it."""
+    return chunks[-1] if chunks else types.GenerateContentResponse(candidates=[])
+
+
+class _RecordingModels:
+    def __init__(self, client: "RecordingClient"):
+        self._client = client
+
+    def _round(self, method: str):
+        def run(model, contents, config):
+            models = self._client.client.models
+            key = request_key(model, contents)
+            started = time.perf_counter()
+            if method == "generate_content_stream":
+                source = models.generate_content_stream(model=model, contents=contents, config=config)
+            else:
+                source = [models.generate_content(model=model, contents=contents, config=config)]
+            recorded = []
+            for chunk in source:
+                recorded.append({
+                    "at": round(time.perf_counter() - started, 4),
+                    "response": chunk.model_dump(mode="json", exclude_none=True),
+                })
+                yield chunk
+            self._client.cassette.append({
+                "seq": self._client.next_seq(),
+                "method": method,
+                "model": model,
+                "request": key,
+                "latency": round(time.perf_counter() - started, 4),
+                "chunks": recorded,
+            })
+        return run
+
+    def generate_content(self, model: str, contents, config=None):
+        chunks = list(_with_function_calls(self._round("generate_content"), model, contents, config))
+        return _final_response(chunks)
+
+    def generate_content_stream(self, model: str, contents, config=None):
+        return _with_function_calls(self._round("generate_content_stream"), model, contents, config)
+
+
+class RecordingClient:
+    """Wraps a genai.Client and records every call to a cassette."""
+
+    def __init__(self, client, cassette: Cassette):
+        self.client = client
+        self.cassette = cassette
+        self.models = _RecordingModels(self)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def next_seq(self) -> int:
+        with self._lock:
+            self._seq += 1
+            return self._seq
+
+
+class _ReplayModels:
+    def __init__(self, client: "ReplayClient"):
+        self._client = client
+
+    def _round(self, method: str):
+        def run(model, contents, config):
+            entry = self._client.cassette.take(method, request_key(model, contents))
+            started = time.perf_counter()
+            for chunk in entry["chunks"]:
+                if self._client.latency == "original":
+                    wait = chunk["at"] - (time.perf_counter() - started)
+                    if wait > 0:
+                        time.sleep(wait)
+                yield types.GenerateContentResponse.model_validate(chunk["response"])
+        return run
+
+    def generate_content(self, model: str, contents, config=None):
+        chunks = list(_with_function_calls(self._round("generate_content"), model, contents, config))
+        return _final_response(chunks)
+
+    def generate_content_stream(self, model: str, contents, config=None):
+        return _with_function_calls(self._round("generate_content_stream"), model, contents, config)
+
+
+class ReplayClient:
+    """Answers from a cassette instead of Gemini."""
+
+    def __init__(self, cassette: Cassette, latency: str = "zero"):
+        if latency not in ("zero", "original"):
+            raise ValueError(f"Unknown replay latency '{latency}' (use 'zero' or 'original')")
+        self.cassette = cassette
+        self.latency = latency
+        self.models = _ReplayModels(self)
+
+    @property
+    def skips_rate_limits(self) -> bool:
+        """Client-side rate limiting only makes sense when replaying in real time."""
+        return self.latency == "zero"
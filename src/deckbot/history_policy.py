@@ -0,0 +1,281 @@
+"""
+Token-budgeted window over the conversation history.
+
+``Agent.chat`` used to send every entry of ``chat_history.jsonl`` on every
+turn, including each logged function call and each function response (many
+of them full file contents), so requests grew without bound over a session.
+
+``HistoryPolicy.apply`` returns the history to send instead:
+
+* The most recent ``recent_turns`` turns are kept verbatim. A turn starts at
+  a user message and includes the tool calls and replies that follow it.
+* In older turns, function responses and large function call arguments are
+  truncated to ``tool_response_chars``.
+* If the result is still over ``token_budget`` (the history's share of the
+  request; the system prompt is not counted), the oldest turns are replaced
+  by summaries, ``summary_turns`` turns at a time, until it fits (or only the
+  recent turns are left).
+
+Summary blocks are aligned on fixed turn numbers, so the same block is
+summarized on every later turn. Summaries are stored in
+``chat_history.summaries.json`` next to the history file, keyed by a hash of
+the entries they replace, and are reused instead of being recomputed.
+
+Tokens are estimated from character counts (``CHARS_PER_TOKEN``); the budget
+is a bound on request size, not an exact count.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from google.genai import types
+
+SUMMARIES_SUFFIX = ".summaries.json"
+SUMMARIES_VERSION = 1
+
+# Rough average for English text and Markdown
+CHARS_PER_TOKEN = 4
+
+DEFAULT_TOKEN_BUDGET = 32000
+DEFAULT_RECENT_TURNS = 4
+DEFAULT_TOOL_RESPONSE_CHARS = 600
+DEFAULT_SUMMARY_TURNS = 8
+
+# Length of each user message / reply quoted in a summary
+SUMMARY_EXCERPT_CHARS = 200
+
+
+def _clip(text: str, limit: int) -> str:
+    text = str(text)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} chars elided]"
+
+
+def _clip_value(value, limit: int):
+    """Truncate the strings inside a function call/response payload."""
+    if isinstance(value, str):
+        return _clip(value, limit)
+    if isinstance(value, dict):
+        return {k: _clip_value(v, limit) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clip_value(v, limit) for v in value]
+    return value
+
+
+def part_chars(part) -> int:
+    """Approximate size of a part as sent to the model."""
+    size = 0
+    if getattr(part, "text", None):
+        size += len(part.text)
+    if getattr(part, "function_call", None):
+        size += len(part.function_call.name or "") + len(json.dumps(part.function_call.args, default=str))
+    if getattr(part, "function_response", None):
+        size += len(part.function_response.name or "") + len(json.dumps(part.function_response.response, default=str))
+    return size
+
+
+def estimate_tokens(entries: List[dict]) -> int:
+    chars = sum(part_chars(p) for entry in entries for p in entry.get("parts", []))
+    return chars // CHARS_PER_TOKEN + 1 if chars else 0
+
+
+def _is_user_message(entry: dict) -> bool:
+    return entry.get("role") == "user" and any(getattr(p, "text", None) for p in entry.get("parts", []))
+
+
+def split_turns(history: List[dict]) -> List[List[dict]]:
+    """Group history entries into turns, each starting at a user message."""
+    turns = []
+    for entry in history:
+        if not turns or _is_user_message(entry):
+            turns.append([])
+        turns[-1].append(entry)
+    return turns
+
+
+def _serialize(entries: List[dict]) -> str:
+    """Stable text form of entries (for hashing)."""
+    data = []
+    for entry in entries:
+        parts = []
+        for p in entry.get("parts", []):
+            item = {}
+            if getattr(p, "text", None):
+                item["text"] = p.text
+            if getattr(p, "function_call", None):
+                item["call"] = [p.function_call.name, p.function_call.args]
+            if getattr(p, "function_response", None):
+                item["response"] = [p.function_response.name, p.function_response.response]
+            parts.append(item)
+        data.append([entry.get("role"), parts])
+    return json.dumps(data, sort_keys=True, default=str)
+
+
+def extractive_summary(turns: List[List[dict]]) -> str:
+    """Summarize turns from their user messages, tool calls and replies (no model call)."""
+    lines = []
+    for turn in turns:
+        tools = []
+        for entry in turn:
+            for p in entry.get("parts", []):
+                if getattr(p, "function_call", None):
+                    args = p.function_call.args or {}
+                    target = args.get("filename") or args.get("path") or args.get("name") or ""
+                    tools.append(f"{p.function_call.name}({target})" if target else p.function_call.name)
+                elif getattr(p, "text", None):
+                    text = " ".join(p.text.split())
+                    if entry.get("role") == "user":
+                        lines.append(f"- User: {_clip(text, SUMMARY_EXCERPT_CHARS)}")
+                    elif entry.get("role") == "model":
+                        lines.append(f"  DeckBot: {_clip(text, SUMMARY_EXCERPT_CHARS)}")
+        if tools:
+            lines.append(f"  Tools: {', '.join(tools)}")
+    return "\n".join(lines)
+
+
+class HistoryPolicy:
+    """Decides which part of the history is sent to the model, and in what form."""
+
+    def __init__(self, history_file: Optional[str] = None,
+                 token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 recent_turns: int = DEFAULT_RECENT_TURNS,
+                 tool_response_chars: int = DEFAULT_TOOL_RESPONSE_CHARS,
+                 summary_turns: int = DEFAULT_SUMMARY_TURNS,
+                 summarize: Callable[[List[List[dict]]], str] = extractive_summary):
+        """
+        Args:
+            history_file: chat_history.jsonl; summaries are stored next to it (None: in memory only).
+            token_budget: Target size of the history sent with each request.
+            recent_turns: Turns at the end of the history that are never shortened.
+            tool_response_chars: Length older tool responses and call arguments are cut to.
+            summary_turns: Turns replaced by each summary.
+            summarize: Turns -> summary text.
+        """
+        self.summaries_file = history_file + SUMMARIES_SUFFIX if history_file else None
+        self.token_budget = token_budget
+        self.recent_turns = max(1, recent_turns)
+        self.tool_response_chars = tool_response_chars
+        self.summary_turns = max(1, summary_turns)
+        self.summarize = summarize
+        self._lock = threading.Lock()
+        self._summaries = None
+        # Stats of the last apply()
+        self.last_stats: Dict[str, int] = {}
+
+    @classmethod
+    def from_preferences(cls, prefs, history_file: Optional[str] = None) -> "HistoryPolicy":
+        return cls(
+            history_file,
+            token_budget=prefs.get('history_token_budget', DEFAULT_TOKEN_BUDGET),
+            recent_turns=prefs.get('history_recent_turns', DEFAULT_RECENT_TURNS),
+            tool_response_chars=prefs.get('history_tool_response_chars', DEFAULT_TOOL_RESPONSE_CHARS),
+            summary_turns=prefs.get('history_summary_turns', DEFAULT_SUMMARY_TURNS),
+        )
+
+    # Summary store
+
+    def _load_summaries(self) -> Dict[str, dict]:
+        if self._summaries is None:
+            self._summaries = {}
+            if self.summaries_file and os.path.exists(self.summaries_file):
+                try:
+                    with open(self.summaries_file) as f:
+                        data = json.load(f)
+                    if data.get("version") == SUMMARIES_VERSION:
+                        self._summaries = data.get("summaries", {})
+                except (OSError, ValueError, AttributeError):
+                    pass
+        return self._summaries
+
+    def _save_summaries(self):
+        if not self.summaries_file or not os.path.isdir(os.path.dirname(self.summaries_file)):
+            return
+        tmp = f"{self.summaries_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"version": SUMMARIES_VERSION, "summaries": self._summaries}, f, indent=2)
+            os.replace(tmp, self.summaries_file)
+        except OSError as e:
+            print(f"[AGENT] Could not save history summaries: {e}")
+
+    def _summary(self, turns: List[List[dict]], first: int) -> tuple:
+        """Summary text of a block of turns, and whether it was computed now."""
+        entries = [entry for turn in turns for entry in turn]
+        key = hashlib.sha256(_serialize(entries).encode("utf-8")).hexdigest()
+        summaries = self._load_summaries()
+        cached = summaries.get(key)
+        if cached:
+            return cached["text"], False
+        text = self.summarize(turns)
+        summaries[key] = {
+            "turns": [first + 1, first + len(turns)],
+            "text": text,
+            "created_at": time.time(),
+        }
+        return text, True
+
+    # Windowing
+
+    def _elide(self, entry: dict) -> dict:
+        limit = self.tool_response_chars
+        parts = []
+        for p in entry.get("parts", []):
+            if getattr(p, "function_response", None) and part_chars(p) > limit:
+                p = types.Part(function_response=types.FunctionResponse(
+                    name=p.function_response.name,
+                    response=_clip_value(p.function_response.response, limit)
+                ))
+            elif getattr(p, "function_call", None) and part_chars(p) > limit:
+                p = types.Part(function_call=types.FunctionCall(
+                    name=p.function_call.name,
+                    args=_clip_value(p.function_call.args, limit)
+                ))
+            parts.append(p)
+        return {"role": entry.get("role"), "parts": parts}
+
+    def apply(self, history: List[dict]) -> List[dict]:
+        """History entries ({"role", "parts"}) to send with the next request."""
+        turns = split_turns(history)
+        old = turns[:-self.recent_turns] if len(turns) > self.recent_turns else []
+        recent = turns[len(old):]
+        recent_entries = [entry for turn in recent for entry in turn]
+        old = [[self._elide(entry) for entry in turn] for turn in old]
+
+        budget = self.token_budget - estimate_tokens(recent_entries)
+        # Blocks of old turns, aligned so the same block is summarized each time
+        blocks = [old[i:i + self.summary_turns] for i in range(0, len(old), self.summary_turns)]
+        sizes = [estimate_tokens([e for turn in block for e in turn]) for block in blocks]
+        summarized = 0
+        created = 0
+        window = []
+        with self._lock:
+            for i, block in enumerate(blocks):
+                if sum(sizes[i:]) <= budget:
+                    window.extend(entry for turn in block for entry in turn)
+                    continue
+                first = i * self.summary_turns
+                text, fresh = self._summary(block, first)
+                created += fresh
+                summarized += len(block)
+                summary = (f"[Summary of earlier conversation, turns {first + 1}-{first + len(block)}]\n"
+                           f"{text}")
+                window.append({"role": "user", "parts": [types.Part(text=summary)]})
+                budget -= estimate_tokens(window[-1:])
+            if created:
+                self._save_summaries()
+
+        window.extend(recent_entries)
+        self.last_stats = {
+            "entries": len(history),
+            "sent_entries": len(window),
+            "turns": len(turns),
+            "summarized_turns": summarized,
+            "new_summaries": created,
+            "tokens": estimate_tokens(history),
+            "sent_tokens": estimate_tokens(window),
+        }
+        return window
@@ -0,0 +1,145 @@
+"""
+Slide layouts of a presentation, parsed once per revision of ``layouts.md``.
+
+``layouts.md`` is a Marp deck whose slides are layout templates. Each one is
+tagged with HTML comments::
+
+    <!-- layout: two-column -->
+    <!-- image-friendly: true -->
+    <!-- recommended-aspect-ratio: 9:16 -->
+    <!-- image-position: left-or-right-column -->
+    <!-- description: Two-column grid -->
+
+The web API, the session service, the ``get_layouts`` tool, the agent's system
+prompt and the layout previews all need this metadata. They used to
+re-read and re-split the file on every call (the system prompt on every chat
+turn). ``get_layout_catalog`` parses it once per content hash and hands every
+consumer the same ``LayoutCatalog``.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from deckbot.deck_document import DeckDocument, content_hash
+
+LAYOUTS_FILENAME = "layouts.md"
+
+# How many parsed revisions to keep (one or two per open presentation)
+MAX_CACHED_CATALOGS = 32
+
+_LAYOUT_RE = re.compile(r'<!-- layout: ([\w-]+) -->')
+_IMAGE_FRIENDLY_RE = re.compile(r'<!-- image-friendly: (true|false) -->')
+_ASPECT_RATIO_RE = re.compile(r'<!-- recommended-aspect-ratio: ([\d:]+) -->')
+_IMAGE_POSITION_RE = re.compile(r'<!-- image-position: ([\w-]+) -->')
+_DESCRIPTION_RE = re.compile(r'<!-- description: (.+?) -->')
+
+
+def _group(pattern, text: str) -> Optional[str]:
+    match = pattern.search(text)
+    return match.group(1) if match else None
+
+
+class LayoutCatalog:
+    """The layouts defined by one revision of a layouts file."""
+
+    def __init__(self, content: str):
+        self.hash = content_hash(content)
+        doc = DeckDocument.parse(content)
+        self.front_matter_text = doc.front_matter_text
+        # Layout CSS from the front matter 'style' directive
+        self.css = doc.style
+        self._layouts = []
+        # Layout name -> slide number in the layouts deck
+        self._slide_numbers = {}
+        for slide in doc.slides:
+            name = _group(_LAYOUT_RE, slide.text)
+            if not name:
+                continue
+            self._slide_numbers.setdefault(name, slide.number)
+            self._layouts.append({
+                "name": name,
+                "content": slide.text.strip(),
+                # Position in the file, counting the front matter as block 0
+                "index": slide.number if doc.has_front_matter else slide.number - 1,
+                "image_friendly": _group(_IMAGE_FRIENDLY_RE, slide.text) == "true",
+                "recommended_aspect_ratio": _group(_ASPECT_RATIO_RE, slide.text),
+                "image_position": _group(_IMAGE_POSITION_RE, slide.text),
+                "description": _group(_DESCRIPTION_RE, slide.text),
+            })
+        self._by_name = {}
+        for layout in self._layouts:
+            self._by_name.setdefault(layout["name"], layout)
+
+    @classmethod
+    def parse(cls, content: str) -> "LayoutCatalog":
+        """Parse content, reusing the catalog of an identical revision."""
+        return _cache.get(content)
+
+    @property
+    def layouts(self) -> List[dict]:
+        """Layout metadata in file order (copies, safe to modify)."""
+        return [dict(layout) for layout in self._layouts]
+
+    @property
+    def names(self) -> List[str]:
+        return [layout["name"] for layout in self._layouts]
+
+    def get(self, name: str) -> Optional[dict]:
+        """Metadata of the first layout called name, or None."""
+        layout = self._by_name.get(name)
+        return dict(layout) if layout else None
+
+    def slide_number(self, name: str) -> Optional[int]:
+        """Slide number of the layout when layouts.md is rendered as a deck."""
+        return self._slide_numbers.get(name)
+
+    def __len__(self):
+        return len(self._layouts)
+
+
+class _CatalogCache:
+    """LRU of parsed catalogs keyed by content hash."""
+
+    def __init__(self, size: int = MAX_CACHED_CATALOGS):
+        self.size = size
+        self._catalogs = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, content: str) -> LayoutCatalog:
+        key = content_hash(content)
+        with self._lock:
+            catalog = self._catalogs.get(key)
+            if catalog is not None:
+                self._catalogs.move_to_end(key)
+                self.hits += 1
+                return catalog
+        catalog = LayoutCatalog(content)
+        with self._lock:
+            self.misses += 1
+            self._catalogs[key] = catalog
+            while len(self._catalogs) > self.size:
+                self._catalogs.popitem(last=False)
+        return catalog
+
+    def clear(self):
+        with self._lock:
+            self._catalogs.clear()
+            self.hits = self.misses = 0
+
+
+_cache = _CatalogCache()
+
+
+def get_layout_catalog(presentation_dir: str) -> Optional[LayoutCatalog]:
+    """Shared catalog of the presentation's layouts.md (None if it has none)."""
+    path = os.path.join(presentation_dir, LAYOUTS_FILENAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except OSError:
+        return None
+    return LayoutCatalog.parse(content)
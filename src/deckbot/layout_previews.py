@@ -0,0 +1,178 @@
+"""
+Layout previews for the layout picker.
+
+Previews used to be rendered one Marp process per layout, on first request,
+and cached as ``md5(layout name).png``. Opening the picker started one cold
+render per layout, and an edited layout kept its old preview forever.
+
+Now every layout in ``layouts.md`` is rendered in a single Marp run into
+``<presentation>/.layout-previews/<key>.png``. The key of a layout is its
+slide render key from ``preview_cache.analyze_deck``: a hash of the layouts
+front matter (including its CSS), global styles, inherited directives, the
+layout body and the assets it references. Editing a layout or the layouts CSS
+changes its key, so only the affected previews are rendered again. Previews
+whose key no longer exists are removed.
+
+``warm_layout_previews`` renders the missing previews in the background when a
+presentation is loaded, so the picker usually opens with every image ready.
+"""
+import glob
+import os
+import shutil
+import threading
+from typing import Dict, Optional
+
+from deckbot.layout_catalog import LAYOUTS_FILENAME, LayoutCatalog
+from deckbot.preview_cache import _presentation_lock, analyze_deck, build_subset_deck
+from deckbot.render_coordinator import deck_fingerprint, get_render_coordinator
+from deckbot.render_scheduler import BACKGROUND, schedule_render, warmup_enabled
+from deckbot.render_service import run_marp
+
+PREVIEW_DIR = ".layout-previews"
+
+
+class LayoutPreviewCache:
+    """Content-keyed PNG previews of a presentation's layouts."""
+
+    def __init__(self, presentation_dir: str):
+        self.presentation_dir = presentation_dir
+        self.layouts_path = os.path.join(presentation_dir, LAYOUTS_FILENAME)
+        self.preview_dir = os.path.join(presentation_dir, PREVIEW_DIR)
+
+    def _read(self) -> Optional[str]:
+        try:
+            with open(self.layouts_path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def plan(self, content: str) -> dict:
+        """Slide number and preview key of every layout in content."""
+        catalog = LayoutCatalog.parse(content)
+        analysis = analyze_deck(content, self.presentation_dir)
+        layouts = {}
+        for name in catalog.names:
+            number = catalog.slide_number(name)
+            layouts[name] = {"slide": number, "key": analysis["slides"][number - 1]["key"]}
+        return {"analysis": analysis, "layouts": layouts}
+
+    def preview_path(self, key: str) -> str:
+        return os.path.join(self.preview_dir, f"{key}.png")
+
+    def cached(self) -> Dict[str, str]:
+        """Layout name -> preview path, for the layouts whose preview is current."""
+        content = self._read()
+        if content is None:
+            return {}
+        paths = {}
+        for name, layout in self.plan(content)["layouts"].items():
+            path = self.preview_path(layout["key"])
+            if os.path.exists(path):
+                paths[name] = path
+        return paths
+
+    def ensure(self, timeout: float = 60, priority: int = BACKGROUND) -> Dict[str, str]:
+        """
+        Render every missing layout preview in one Marp run.
+
+        Concurrent requests for the same revision of layouts.md share one
+        render (see render_coordinator).
+
+        Returns:
+            Layout name -> preview path, for every layout that has a preview.
+        """
+        return get_render_coordinator().run(
+            self.presentation_dir,
+            "layout-previews",
+            lambda cancel_event: schedule_render(
+                lambda: self._ensure(timeout, cancel_event),
+                priority=priority,
+                label="layout previews"
+            ),
+            fingerprint=lambda: deck_fingerprint(self.presentation_dir, LAYOUTS_FILENAME)
+        )
+
+    def preview(self, name: str, timeout: float = 60) -> Optional[str]:
+        """Path of the current preview of a layout, rendering missing previews if needed."""
+        path = self.cached().get(name)
+        if path:
+            return path
+        return self.ensure(timeout=timeout).get(name)
+
+    def _ensure(self, timeout: float, cancel_event=None) -> Dict[str, str]:
+        # Separate from the slide preview lock: layouts.md is a different deck
+        with _presentation_lock(self.layouts_path):
+            content = self._read()
+            if content is None:
+                return {}
+            plan = self.plan(content)
+            layouts = plan["layouts"]
+            stale = sorted({layout["slide"] for layout in layouts.values()
+                            if not os.path.exists(self.preview_path(layout["key"]))})
+            os.makedirs(self.preview_dir, exist_ok=True)
+            if stale:
+                self._render(plan, stale, timeout, cancel_event)
+            self._remove_obsolete({layout["key"] for layout in layouts.values()})
+            return {name: self.preview_path(layout["key"]) for name, layout in layouts.items()
+                    if os.path.exists(self.preview_path(layout["key"]))}
+
+    def _render(self, plan: dict, stale, timeout: float, cancel_event=None):
+        analysis = plan["analysis"]
+        print(f"[PREVIEW] Rendering {len(stale)} layout previews for {self.presentation_dir}")
+        # Decks we can't split reliably are rendered whole
+        subset = stale if analysis["splittable"] else [s["index"] for s in analysis["slides"]]
+        token = f"{os.getpid()}-{threading.get_ident()}"
+        deck_name = f".layout-preview-{token}.marp.md"
+        deck_path = os.path.join(self.presentation_dir, deck_name)
+        out_dir = os.path.join(self.preview_dir, f".partial-{token}")
+        os.makedirs(out_dir, exist_ok=True)
+        try:
+            # The combined deck sits next to layouts.md so relative asset paths resolve
+            with open(deck_path, "w", encoding="utf-8") as f:
+                if analysis["splittable"]:
+                    f.write(build_subset_deck(analysis, subset))
+                else:
+                    with open(self.layouts_path, "r", encoding="utf-8") as src:
+                        f.write(src.read())
+            run_marp(
+                [
+                    deck_name,
+                    '--images', 'png',
+                    '--output', os.path.join(os.path.relpath(out_dir, self.presentation_dir), 'layout.png'),
+                    '--allow-local-files'
+                ],
+                cwd=self.presentation_dir,
+                capture_output=True,
+                timeout=timeout,
+                cancel_event=cancel_event
+            )
+            keys = {layout["slide"]: layout["key"] for layout in plan["layouts"].values()}
+            for position, number in enumerate(subset, start=1):
+                produced = os.path.join(out_dir, f"layout.{position:03d}.png")
+                if number in keys and number in stale and os.path.exists(produced):
+                    os.replace(produced, self.preview_path(keys[number]))
+        finally:
+            if os.path.exists(deck_path):
+                os.unlink(deck_path)
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def _remove_obsolete(self, keys):
+        for path in glob.glob(os.path.join(self.preview_dir, "*.png")):
+            if os.path.splitext(os.path.basename(path))[0] not in keys:
+                os.unlink(path)
+
+
+def warm_layout_previews(presentation_dir: str) -> Optional[threading.Thread]:
+    """Render missing layout previews in a background thread (None if there's nothing to do)."""
+    if not warmup_enabled() or not os.path.exists(os.path.join(presentation_dir, LAYOUTS_FILENAME)):
+        return None
+
+    def _warm():
+        try:
+            LayoutPreviewCache(presentation_dir).ensure()
+        except Exception as e:
+            print(f"[PREVIEW] Layout preview warm-up failed for {presentation_dir}: {e}")
+
+    thread = threading.Thread(target=_warm, daemon=True)
+    thread.start()
+    return thread
@@ -2,8 +2,8 @@ import os
 import json
 import time
 import re
-import yaml
 from datetime import datetime
+from deckbot.deck_document import DeckDocument, load_deck
 
 class PresentationManager:
     def __init__(self, root_dir=None):
@@ -274,49 +274,7 @@ paginate: true
             return None
         
         try:
-            with open(layouts_path, "r") as f:
-                lines = f.readlines()
-            
-            # Check if file starts with front matter
-            if not lines or not lines[0].strip() == '---':
-                return None
-            
-            # Find the closing --- of front matter
-            front_matter_end = -1
-            for i in range(1, len(lines)):
-                if lines[i].strip() == '---':
-                    front_matter_end = i
-                    break
-            
-            if front_matter_end == -1:
-                return None
-            
-            # Extract front matter lines
-            front_matter_lines = lines[1:front_matter_end]
-            
-            # Find and extract style block
-            css_lines = []
-            in_style_block = False
-            
-            for line in front_matter_lines:
-                if line.startswith('style:'):
-                    in_style_block = True
-                    continue
-                elif in_style_block:
-                    # Check if this is the start of a new top-level key
-                    if line and not line[0].isspace() and ':' in line:
-                        break
-                    # This is part of the style block - remove 2-space indentation
-                    if line.startswith('  '):
-                        css_lines.append(line[2:].rstrip())
-                    elif not line.strip():  # Empty line
-                        css_lines.append('')
-            
-            if css_lines:
-                css = '\n'.join(css_lines).strip()
-                return css
-            
-            return None
+            return load_deck(layouts_path).style.strip() or None
         except Exception as e:
             print(f"Error extracting layouts CSS: {e}")
             import traceback
@@ -336,69 +294,34 @@ paginate: true
             return
         
         try:
-            with open(deck_path, "r") as f:
-                lines = f.readlines()
+            doc = load_deck(deck_path)
+            style_lines = [f'  {css_line}' for css_line in layouts_css.split('\n')]
             
-            # Check if deck has front matter
-            if not lines or not lines[0].strip() == '---':
+            if not doc.has_front_matter:
                 # No front matter, add one with the layouts CSS
-                new_lines = ['---\n', 'marp: true\n', 'style: |\n']
-                for css_line in layouts_css.split('\n'):
-                    new_lines.append(f'  {css_line}\n')
-                new_lines.append('---\n\n')
-                new_lines.extend(lines)
-                
-                with open(deck_path, "w") as f:
-                    f.writelines(new_lines)
-                return
-            
-            # Find the end of front matter
-            front_matter_end = -1
-            for i in range(1, len(lines)):
-                if lines[i].strip() == '---':
-                    front_matter_end = i
-                    break
-            
-            if front_matter_end == -1:
+                new_content = doc.with_front_matter_text('\n'.join(['marp: true', 'style: |'] + style_lines))
+            elif not doc.front_matter_closed:
                 return
-            
-            # Check if there's already a style block in front matter
-            has_style = False
-            style_line_idx = -1
-            for i in range(1, front_matter_end):
-                if lines[i].startswith('style:'):
-                    has_style = True
-                    style_line_idx = i
-                    break
-            
-            if has_style:
-                # Merge layouts CSS with existing styles
-                # Find the end of the existing style block
-                style_end_idx = front_matter_end
-                for i in range(style_line_idx + 1, front_matter_end):
-                    # Check if this line starts a new top-level key (not indented)
-                    if lines[i].strip() and not lines[i][0].isspace() and ':' in lines[i]:
-                        style_end_idx = i
-                        break
-                
-                # Insert layouts CSS before the style block ends
-                style_lines = []
-                for css_line in layouts_css.split('\n'):
-                    style_lines.append(f'  {css_line}\n')
-                
-                # Insert the new CSS lines
-                new_lines = lines[:style_end_idx] + style_lines + lines[style_end_idx:]
             else:
-                # Add style block before the closing ---
-                style_lines = ['style: |\n']
-                for css_line in layouts_css.split('\n'):
-                    style_lines.append(f'  {css_line}\n')
+                lines = doc.front_matter_text.split('\n') if doc.front_matter_text else []
+                style_line_idx = next((i for i, line in enumerate(lines) if line.startswith('style:')), -1)
                 
-                # Insert style lines before the closing ---
-                new_lines = lines[:front_matter_end] + style_lines + lines[front_matter_end:]
+                if style_line_idx >= 0:
+                    # Merge layouts CSS with existing styles: insert before the
+                    # next top-level key (or the end of the front matter)
+                    style_end_idx = len(lines)
+                    for i in range(style_line_idx + 1, len(lines)):
+                        if lines[i].strip() and not lines[i][0].isspace() and ':' in lines[i]:
+                            style_end_idx = i
+                            break
+                    lines = lines[:style_end_idx] + style_lines + lines[style_end_idx:]
+                else:
+                    # Add style block at the end of the front matter
+                    lines = lines + ['style: |'] + style_lines
+                new_content = doc.with_front_matter_text('\n'.join(lines))
             
             with open(deck_path, "w") as f:
-                f.writelines(new_lines)
+                f.write(new_content)
                 
         except Exception as e:
             print(f"Error merging layouts CSS: {e}")
@@ -562,29 +485,12 @@ paginate: true
             with open(marp_path, "r") as f:
                 content = f.read()
             
-            # Parse front matter
-            if content.startswith('---'):
-                # Find the end of front matter
-                parts = content.split('\n---\n', 2)
-                if len(parts) >= 2:
-                    front_matter = parts[0][3:]  # Remove leading ---
-                    body = '\n---\n'.join(parts[1:])
-                    
-                    # Parse YAML front matter
-                    try:
-                        fm_data = yaml.safe_load(front_matter) or {}
-                    except:
-                        fm_data = {}
-                    
-                    # Update title
-                    fm_data['title'] = title
-                    
-                    # Reconstruct front matter
-                    new_front_matter = yaml.dump(fm_data, default_flow_style=False, sort_keys=False, allow_unicode=True).strip()
-                    new_content = '---\n' + new_front_matter + '\n---\n' + body
-                    
-                    with open(marp_path, "w") as f:
-                        f.write(new_content)
+            doc = DeckDocument.parse(content)
+            if doc.has_front_matter and doc.front_matter_closed and doc.front_matter_error is None:
+                fm_data = doc.front_matter
+                fm_data['title'] = title
+                with open(marp_path, "w") as f:
+                    f.write(doc.with_front_matter(fm_data))
         
         return self.get_presentation(name)
     
@@ -613,29 +519,12 @@ paginate: true
             with open(marp_path, "r") as f:
                 content = f.read()
             
-            # Parse front matter
-            if content.startswith('---'):
-                # Find the end of front matter
-                parts = content.split('\n---\n', 2)
-                if len(parts) >= 2:
-                    front_matter = parts[0][3:]  # Remove leading ---
-                    body = '\n---\n'.join(parts[1:])
-                    
-                    # Parse YAML front matter
-                    try:
-                        fm_data = yaml.safe_load(front_matter) or {}
-                    except:
-                        fm_data = {}
-                    
-                    # Update description
-                    fm_data['description'] = description
-                    
-                    # Reconstruct front matter
-                    new_front_matter = yaml.dump(fm_data, default_flow_style=False, sort_keys=False, allow_unicode=True).strip()
-                    new_content = '---\n' + new_front_matter + '\n---\n' + body
-                    
-                    with open(marp_path, "w") as f:
-                        f.write(new_content)
+            doc = DeckDocument.parse(content)
+            if doc.has_front_matter and doc.front_matter_closed and doc.front_matter_error is None:
+                fm_data = doc.front_matter
+                fm_data['description'] = description
+                with open(marp_path, "w") as f:
+                    f.write(doc.with_front_matter(fm_data))
         
         return self.get_presentation(name)
     
@@ -0,0 +1,85 @@
+#!/usr/bin/env node
+// Long-lived Marp render worker supervised by deckbot.render_service.
+//
+// Protocol (JSON lines):
+//   startup  -> {"ready": true} or {"ready": false, "error": "..."}
+//   stdin    <- {"id": 1, "args": ["deck.marp.md", "--allow-local-files"], "cwd": "/path"}
+//   stdout   -> {"id": 1, "ok": true, "code": 0, "stderr": "..."}
+//
+// Jobs run one at a time because Marp resolves relative paths against the
+// process working directory.
+'use strict';
+
+const readline = require('readline');
+
+const protocolWrite = process.stdout.write.bind(process.stdout);
+const send = (message) => protocolWrite(JSON.stringify(message) + '\n');
+
+let marpCli;
+try {
+  const target = process.env.DECKBOT_MARP_CLI || '@marp-team/marp-cli';
+  ({ marpCli } = require(target));
+  if (typeof marpCli !== 'function') {
+    throw new Error(`marpCli export not found in ${target}`);
+  }
+} catch (err) {
+  send({ ready: false, error: String((err && err.message) || err) });
+  process.exit(1);
+}
+
+// Anything Marp prints must not end up on the protocol channel.
+process.stdout.write = (chunk, encoding, callback) =>
+  process.stderr.write(chunk, encoding, callback);
+
+async function runJob(job) {
+  const captured = [];
+  const originalStderrWrite = process.stderr.write;
+  process.stderr.write = (chunk, encoding, callback) => {
+    captured.push(Buffer.isBuffer(chunk) ? chunk.toString() : String(chunk));
+    const done = typeof encoding === 'function' ? encoding : callback;
+    if (typeof done === 'function') done();
+    return true;
+  };
+
+  const previousCwd = process.cwd();
+  let code = 1;
+  try {
+    if (job.cwd) process.chdir(job.cwd);
+    const args = Array.isArray(job.args) ? job.args.slice() : [];
+    // Marp reads a deck from stdin unless told not to; ours is the job channel
+    if (!args.includes('--no-stdin')) args.push('--no-stdin');
+    code = await marpCli(args);
+  } catch (err) {
+    captured.push(String((err && err.stack) || err));
+  } finally {
+    process.stderr.write = originalStderrWrite;
+    try {
+      process.chdir(previousCwd);
+    } catch (err) {
+      // Previous directory vanished; nothing useful to do.
+    }
+  }
+
+  send({ id: job.id, ok: code === 0, code, stderr: captured.join('') });
+}
+
+let chain = Promise.resolve();
+const input = readline.createInterface({ input: process.stdin });
+
+input.on('line', (line) => {
+  if (!line.trim()) return;
+  let job;
+  try {
+    job = JSON.parse(line);
+  } catch (err) {
+    send({ id: null, ok: false, code: 1, stderr: `Invalid job: ${err.message}` });
+    return;
+  }
+  chain = chain.then(() => runJob(job));
+});
+
+input.on('close', () => {
+  chain.then(() => process.exit(0));
+});
+
+send({ ready: true });
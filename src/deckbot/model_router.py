@@ -0,0 +1,333 @@
+"""
+Latency-aware routing across the agent's model list, with circuit breakers.
+
+The agent used to retry on the secondary model only when an error message
+contained "429", and then stayed there for the rest of the session; the
+other models of ``Agent.model_names`` were never tried.
+
+``ModelRouter`` keeps, per model, the outcome and latency of its recent
+calls and a circuit breaker:
+
+- **closed**: the model is used normally.
+- **open**: after ``failure_threshold`` failures in a row (or at once for
+  rate-limit/quota errors) the model is skipped for ``cooldown`` seconds.
+- **half-open**: after the cooldown one request probes the model again. If
+  it succeeds the circuit closes; if it fails it opens for another cooldown.
+
+Each turn gets a ``Route``: the models to try, in order, and why. Models
+are tried in list order, skipping open circuits, up to ``max_attempts``.
+A failed call moves on to the next model if the error looks transient or
+model-specific (rate limits, overload, timeouts, unknown model); other
+errors are raised as before. So are errors of calls during which a tool
+ran: automatic function calling runs the tools inside the call, and
+replaying the turn on another model would run them again (inserting a
+slide twice, generating a second image). The streaming path has the same
+rule: no failover once the first chunk arrived.
+
+While the primary model's median latency is above ``slow_seconds``, simple
+turns (short, single-line messages) go to the fast model first.
+
+Latency is the time to the first streamed chunk, or to the whole response
+for non-streamed calls minus the time spent running tools in between.
+"""
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_WINDOW = 20
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 60.0
+DEFAULT_SLOW_SECONDS = 15.0
+DEFAULT_SIMPLE_MAX_CHARS = 200
+DEFAULT_MAX_ATTEMPTS = 3
+# Successful calls needed before a model's latency is trusted
+MIN_LATENCY_SAMPLES = 3
+
+_RATE_LIMIT_MARKERS = ("429", "RESOURCE_EXHAUSTED")
+_FAILOVER_MARKERS = _RATE_LIMIT_MARKERS + (
+    "500", "502", "503", "504", "INTERNAL", "UNAVAILABLE", "DEADLINE_EXCEEDED", "overloaded",
+    "404", "NOT_FOUND", "timed out", "Timeout",
+)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    text = str(error)
+    return any(marker in text for marker in _RATE_LIMIT_MARKERS)
+
+
+def should_fail_over(error: Exception) -> bool:
+    """Whether another model might succeed where this one failed."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    text = f"{type(error).__name__}: {error}"
+    return any(marker in text for marker in _FAILOVER_MARKERS)
+
+
+def is_simple_turn(message: str, max_chars: int = DEFAULT_SIMPLE_MAX_CHARS) -> bool:
+    """Short, single-line requests ("next slide", "make the title bold")."""
+    message = message.strip()
+    return bool(message) and len(message) <= max_chars and "\n" not in message
+
+
+class _ModelHealth:
+    def __init__(self, window: int):
+        self.calls = deque(maxlen=window)  # (ok, latency seconds or None)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.last_error = None
+
+    def latency(self) -> Optional[float]:
+        samples = [latency for ok, latency in self.calls if ok and latency is not None]
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return statistics.median(samples)
+
+    def error_rate(self) -> Optional[float]:
+        if not self.calls:
+            return None
+        return sum(1 for ok, _ in self.calls if not ok) / len(self.calls)
+
+    def to_dict(self) -> dict:
+        latency = self.latency()
+        error_rate = self.error_rate()
+        data = {
+            "state": self.state,
+            "calls": len(self.calls),
+            "p50_ms": round(latency * 1000, 1) if latency is not None else None,
+            "error_rate": round(error_rate, 2) if error_rate is not None else None,
+        }
+        if self.last_error:
+            data["last_error"] = self.last_error
+        return data
+
+
+class Route:
+    """The models one turn will try, in order, and what happened when it did."""
+
+    def __init__(self, models: List[str], reason: str, simple: bool, skipped: Dict[str, str]):
+        self.models = models
+        self.reason = reason
+        self.simple = simple
+        self.skipped = skipped
+        self.attempts: List[dict] = []
+
+    def to_dict(self) -> dict:
+        data = {"models": list(self.models), "reason": self.reason, "simple": self.simple}
+        if self.skipped:
+            data["skipped"] = dict(self.skipped)
+        if self.attempts:
+            data["attempts"] = list(self.attempts)
+        return data
+
+
+class ModelRouter:
+    """Chooses and fails over between models (see module docstring)."""
+
+    def __init__(self, models: List[str], fast_model: Optional[str] = None,
+                 window: int = DEFAULT_WINDOW,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown: float = DEFAULT_COOLDOWN,
+                 slow_seconds: Optional[float] = DEFAULT_SLOW_SECONDS,
+                 simple_max_chars: int = DEFAULT_SIMPLE_MAX_CHARS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 busy_seconds: Optional[Callable[[], float]] = None,
+                 tool_calls: Optional[Callable[[], int]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            models: Models in order of preference; the first is the primary.
+            fast_model: Model for simple turns while the primary is slow (None: no latency routing).
+            window: Recent calls per model that latency and error rate are computed from.
+            failure_threshold: Failures in a row that open a model's circuit.
+            cooldown: Seconds an open circuit waits before a probe request.
+            slow_seconds: Primary median latency above which simple turns go to fast_model.
+            simple_max_chars: Longest message that counts as a simple turn.
+            max_attempts: Models tried per turn before giving up.
+            busy_seconds: Running total of time spent outside the model during a
+                call (tool execution), subtracted from its latency.
+            tool_calls: Running count of tool calls. A call that fails after it
+                changed is not retried on another model.
+            clock: Time source (monotonic seconds).
+        """
+        self.models = list(dict.fromkeys(models))
+        self.fast_model = fast_model if fast_model in self.models else None
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.slow_seconds = slow_seconds
+        self.simple_max_chars = simple_max_chars
+        self.max_attempts = max(1, max_attempts)
+        self.busy_seconds = busy_seconds
+        self.tool_calls = tool_calls
+        self.clock = clock
+        self._health = {model: _ModelHealth(window) for model in self.models}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_preferences(cls, prefs, models: List[str], fast_model: Optional[str] = None,
+                         busy_seconds: Optional[Callable[[], float]] = None,
+                         tool_calls: Optional[Callable[[], int]] = None) -> "ModelRouter":
+        return cls(
+            models,
+            fast_model=prefs.get('router_fast_model', fast_model),
+            window=prefs.get('router_window', DEFAULT_WINDOW),
+            failure_threshold=prefs.get('router_failure_threshold', DEFAULT_FAILURE_THRESHOLD),
+            cooldown=prefs.get('router_cooldown_seconds', DEFAULT_COOLDOWN),
+            slow_seconds=prefs.get('router_slow_seconds', DEFAULT_SLOW_SECONDS),
+            simple_max_chars=prefs.get('router_simple_max_chars', DEFAULT_SIMPLE_MAX_CHARS),
+            max_attempts=prefs.get('router_max_attempts', DEFAULT_MAX_ATTEMPTS),
+            busy_seconds=busy_seconds,
+            tool_calls=tool_calls,
+        )
+
+    @property
+    def primary(self) -> str:
+        return self.models[0]
+
+    def _available(self, health: _ModelHealth, now: float) -> bool:
+        if health.state == CLOSED:
+            return True
+        # Open or half-open: one probe once the cooldown is over
+        return not health.probing and now - health.opened_at >= self.cooldown
+
+    def primary_slow(self) -> bool:
+        if self.slow_seconds is None:
+            return False
+        latency = self._health[self.primary].latency()
+        return latency is not None and latency > self.slow_seconds
+
+    def route(self, message: str = "") -> Route:
+        """The models to try for a turn with this user message."""
+        simple = is_simple_turn(message, self.simple_max_chars)
+        with self._lock:
+            now = self.clock()
+            order = list(self.models)
+            reason = "primary"
+            if simple and self.fast_model and self.fast_model != self.primary and self.primary_slow():
+                fast = self._health[self.fast_model]
+                if fast.state == CLOSED:
+                    order.remove(self.fast_model)
+                    order.insert(0, self.fast_model)
+                    p50 = self._health[self.primary].latency()
+                    reason = f"simple turn, primary slow (p50 {p50:.1f}s > {self.slow_seconds:g}s)"
+
+            skipped = {}
+            models = []
+            for model in order:
+                health = self._health[model]
+                if not self._available(health, now):
+                    skipped[model] = f"circuit {health.state}"
+                    continue
+                models.append(model)
+            if not models:
+                # Every circuit is open: try the one that has waited longest
+                models = [min(order, key=lambda m: self._health[m].opened_at)]
+                reason = "all circuits open"
+            elif models[0] != order[0]:
+                reason = f"{order[0]} unavailable ({skipped[order[0]]})"
+            return Route(models[:self.max_attempts], reason, simple, skipped)
+
+    def run(self, route: Route, call: Callable[[str], object]):
+        """
+        Call call(model) for the route's models until one succeeds.
+        Returns (model, result); raises the last error if every model failed,
+        and the error of a call that had already run tools.
+        """
+        last_error = None
+        for model in route.models:
+            if not self._begin(model):
+                route.attempts.append({"model": model, "ok": False, "error": "circuit open"})
+                continue
+            busy_before = self.busy_seconds() if self.busy_seconds else 0.0
+            calls_before = self.tool_calls() if self.tool_calls else 0
+            started = self.clock()
+            try:
+                result = call(model)
+            except Exception as e:
+                latency = self.clock() - started
+                failover = should_fail_over(e)
+                self.record_failure(model, e, counts=failover)
+                attempt = {"model": model, "ok": False, "ms": round(latency * 1000, 1),
+                           "error": f"{type(e).__name__}: {str(e)[:200]}"}
+                tools_ran = bool(self.tool_calls) and self.tool_calls() != calls_before
+                if tools_ran:
+                    attempt["tools_ran"] = True
+                route.attempts.append(attempt)
+                if not failover:
+                    raise
+                if tools_ran:
+                    print(f"[AGENT] {model} failed ({type(e).__name__}) after running tools, not retrying on another model")
+                    raise
+                print(f"[AGENT] {model} failed ({type(e).__name__}), trying the next model")
+                last_error = e
+                continue
+            latency = self.clock() - started
+            if self.busy_seconds:
+                latency = max(0.0, latency - (self.busy_seconds() - busy_before))
+            self.record_success(model, latency)
+            route.attempts.append({"model": model, "ok": True, "ms": round(latency * 1000, 1)})
+            return model, result
+        if last_error is not None:
+            raise last_error
+        raise RuntimeError(f"No model available: {route.skipped or route.models}")
+
+    def _begin(self, model: str) -> bool:
+        """Claim a call to a model: always for closed circuits, once for a due probe."""
+        with self._lock:
+            health = self._health[model]
+            if health.state == CLOSED:
+                return True
+            if health.probing:
+                return False
+            # Probes also go through when every circuit is open (the route's last resort)
+            health.state = HALF_OPEN
+            health.probing = True
+            print(f"[AGENT] Probing {model} (circuit half-open)")
+            return True
+
+    def record_success(self, model: str, latency: Optional[float] = None):
+        with self._lock:
+            health = self._health[model]
+            health.calls.append((True, latency))
+            health.consecutive_failures = 0
+            if health.state != CLOSED:
+                print(f"[AGENT] {model} recovered, circuit closed")
+            health.state = CLOSED
+            health.probing = False
+
+    def record_failure(self, model: str, error: Exception, counts: bool = True):
+        """
+        Record a failed call. Errors that say nothing about the model's health
+        (counts=False) only end a probe; the next turn probes again.
+        """
+        with self._lock:
+            health = self._health[model]
+            was_probe = health.probing
+            health.probing = False
+            if not counts:
+                return
+            health.calls.append((False, None))
+            health.consecutive_failures += 1
+            health.last_error = f"{type(error).__name__}: {str(error)[:200]}"
+            if (was_probe or is_rate_limited(error)
+                    or health.consecutive_failures >= self.failure_threshold):
+                if health.state != OPEN:
+                    print(f"[AGENT] Opening circuit for {model} after: {health.last_error[:120]}")
+                health.state = OPEN
+                health.opened_at = self.clock()
+
+    def state(self, model: str) -> str:
+        return self._health[model].state
+
+    def stats(self) -> Dict[str, dict]:
+        """Health of every model that has been called."""
+        with self._lock:
+            return {model: health.to_dict() for model, health in self._health.items()
+                    if health.calls or health.state != CLOSED}
@@ -12,6 +12,8 @@ from google.genai import types
 from datetime import datetime
 from rich.console import Console
 from google.api_core.exceptions import ResourceExhausted
+from deckbot.deck_document import load_deck
+from deckbot.genai_client import create_client
 
 console = Console()
 
@@ -81,6 +83,23 @@ def generate_batch_slug(prompt, max_length=40):
     
     return slug
 
+def deck_theme_info(deck_path):
+    """Fonts and colors from the deck's front matter style block, as prompt text."""
+    import re
+    try:
+        css_block = load_deck(deck_path).style.strip()
+    except OSError:
+        return ""
+    theme_info = ""
+    # Extract key style info (fonts, colors)
+    font_matches = re.findall(r'font-family:\s*[\'"]?([^;\'"]+)', css_block)
+    color_matches = re.findall(r'color:\s*(#[0-9a-fA-F]{3,6})', css_block)
+    if font_matches:
+        theme_info += f"Fonts: {', '.join(font_matches)}. "
+    if color_matches:
+        theme_info += f"Colors: {', '.join(color_matches)}. "
+    return theme_info
+
 class ImagePromptBuilder:
     """
     Builds prompts for image generation from presentation context.
@@ -355,9 +374,9 @@ class NanoBananaClient:
             # Silently fall back for image generation (warning already shown by Agent)
             self.api_key = os.getenv("GEMINI_API_KEY")
 
-        self.client = None
-        if self.api_key:
-             self.client = genai.Client(api_key=self.api_key)
+        # A plain genai.Client, or a recording/replaying one (see genai_client)
+        self.client = create_client(self.api_key, "images")
+        if self.client:
              # Use provided image model or default
              self.model_name = image_model or 'gemini-3-pro-image-preview'
         
@@ -438,31 +457,7 @@ class NanoBananaClient:
                 console.print(f"[yellow]Warning: Could not load style reference image: {e}[/yellow]")
         
         # Extract theme and styling information from deck.marp.md CSS
-        if os.path.exists(deck_path):
-            try:
-                with open(deck_path, "r") as f:
-                    content = f.read()
-                    # Extract front matter (between first two ---)
-                    if content.startswith("---"):
-                        parts = content.split("---", 2)
-                        if len(parts) >= 2:
-                            front_matter = parts[1]
-                            
-                            # Extract custom CSS style block
-                            import re
-                            style_match = re.search(r'^style:\s*\|(.+?)(?=^[a-z]+:|\Z)', front_matter, re.MULTILINE | re.DOTALL)
-                            if style_match:
-                                css_block = style_match.group(1).strip()
-                                # Extract key style info (fonts, colors)
-                                font_matches = re.findall(r'font-family:\s*[\'"]?([^;\'"]+)', css_block)
-                                color_matches = re.findall(r'color:\s*(#[0-9a-fA-F]{3,6})', css_block)
-                                
-                                if font_matches:
-                                    theme_info += f"Fonts: {', '.join(font_matches)}. "
-                                if color_matches:
-                                    theme_info += f"Colors: {', '.join(color_matches)}. "
-            except Exception:
-                pass
+        theme_info += deck_theme_info(deck_path)
 
         # Step 2: Build prompts using ImagePromptBuilder
         prompt_builder = ImagePromptBuilder(
@@ -634,7 +629,9 @@ class NanoBananaClient:
                 if progress_callback:
                     progress_callback(i+1, 4, f"Generated image {i+1}/4 (error)", candidates)
             
-            time.sleep(1)
+            # Pace requests (not needed when replaying a recording without its latency)
+            if not getattr(self.client, 'skips_rate_limits', False):
+                time.sleep(1)
 
         # Count actual vs fallback images
         actual_images = sum(1 for c in candidates if os.path.exists(c) and os.path.getsize(c) > 100)
@@ -0,0 +1,488 @@
+"""
+Incremental per-slide PNG previews.
+
+Previews live in ``<presentation>/.previews/slide.NNN.png``. Instead of
+re-rendering the whole deck whenever ``deck.marp.md`` changes, every slide
+gets a content key hashed from:
+
+- the deck-wide inputs (front matter, global ``<style>`` blocks and global
+  directives, plus the assets their CSS references),
+- the local directives the slide inherits from earlier slides,
+- its page number (only when the slide shows pagination),
+- the slide body and the hashes of the assets it references.
+
+``.previews/manifest.json`` maps slide index to key and file. Only the slides
+whose key changed are re-rendered. They go through a temporary "subset" deck
+that contains just those slides, with their inherited directives written out
+and their page numbers pinned, so the images match a full-deck render.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import unquote
+
+import yaml
+
+from deckbot.deck_document import FENCE_RE, split_deck
+from deckbot.render_coordinator import deck_fingerprint, get_render_coordinator
+from deckbot.render_scheduler import INTERACTIVE, schedule_render
+from deckbot.render_service import RenderCancelled, run_marp
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Local directives inherit to following slides unless prefixed with "_"
+LOCAL_DIRECTIVES = {
+    "paginate", "header", "footer", "class", "color",
+    "backgroundColor", "backgroundImage", "backgroundPosition",
+    "backgroundRepeat", "backgroundSize",
+}
+GLOBAL_DIRECTIVES = {
+    "marp", "theme", "style", "headingDivider", "size", "math", "lang",
+    "title", "description", "author", "image", "keywords", "url",
+}
+
+# If more than this share of slides is stale, one full render is cheaper
+FULL_RENDER_RATIO = 0.5
+
+_COMMENT_RE = re.compile(r'<!--(.*?)-->', re.DOTALL)
+_STYLE_RE = re.compile(r'<style(\s[^>]*)?>.*?</style>', re.DOTALL | re.IGNORECASE)
+_MD_IMAGE_RE = re.compile(r'!\[[^\]]*\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+_HTML_SRC_RE = re.compile(r'<(?:img|source|video|audio)\b[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+_CSS_URL_RE = re.compile(r'url\(\s*["\']?([^"\')]+)["\']?\s*\)')
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _presentation_lock(presentation_dir: str) -> threading.Lock:
+    key = os.path.abspath(presentation_dir)
+    with _locks_guard:
+        if key not in _locks:
+            _locks[key] = threading.Lock()
+        return _locks[key]
+
+
+def _sha(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, default=str)
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _strip_code(text: str) -> str:
+    """Remove fenced code blocks so directives/refs inside them are ignored."""
+    out = []
+    fence = None
+    for line in text.split("\n"):
+        m = FENCE_RE.match(line)
+        if fence:
+            if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence):
+                fence = None
+            continue
+        if m:
+            fence = m.group(1)
+            continue
+        out.append(line)
+    return "\n".join(out)
+
+
+def _parse_directive_comment(comment: str) -> Optional[dict]:
+    try:
+        data = yaml.safe_load(comment)
+    except yaml.YAMLError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    known = LOCAL_DIRECTIVES | GLOBAL_DIRECTIVES
+    if not any(str(k).lstrip("_") in known for k in data):
+        return None
+    return data
+
+
+def _referenced_paths(text: str) -> List[str]:
+    refs = []
+    for regex in (_MD_IMAGE_RE, _HTML_SRC_RE, _CSS_URL_RE):
+        refs.extend(regex.findall(text))
+    return [r for r in refs if r and not re.match(r'^(?:[a-z]+:)?//|^data:|^#', r, re.IGNORECASE)]
+
+
+_asset_memo: Dict[str, tuple] = {}
+
+
+def hash_asset(path: str) -> str:
+    """Content hash of a file, memoized on (mtime, size)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _asset_memo.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _asset_memo[path] = (stamp, digest)
+    return digest
+
+
+def resolve_asset(ref: str, base_dir: str) -> str:
+    """Filesystem path of an asset reference (query/fragment stripped, %-escapes decoded)."""
+    path = unquote(ref.split("?", 1)[0].split("#", 1)[0])
+    full = path if os.path.isabs(path) else os.path.join(base_dir, path)
+    return os.path.normpath(full)
+
+
+def _asset_hashes(text: str, base_dir: str) -> Dict[str, str]:
+    hashes = {}
+    for ref in _referenced_paths(text):
+        hashes[ref] = hash_asset(resolve_asset(ref, base_dir))
+    return hashes
+
+
+def analyze_deck(content: str, base_dir: str) -> dict:
+    """
+    Work out per-slide render keys and the information needed to render any
+    slide in isolation.
+    """
+    front_matter, bodies = split_deck(content)
+    try:
+        fm = yaml.safe_load(front_matter) if front_matter.strip() else {}
+    except yaml.YAMLError:
+        fm = {}
+    if not isinstance(fm, dict):
+        fm = {}
+
+    global_styles = []
+    global_comments = []
+    slide_infos = []
+    for body in bodies:
+        code_free = _strip_code(body)
+        styles = [m.group(0) for m in _STYLE_RE.finditer(code_free)
+                  if "scoped" not in (m.group(1) or "")]
+        global_styles.extend(styles)
+        local_set = {}
+        spot = {}
+        for m in _COMMENT_RE.finditer(code_free):
+            data = _parse_directive_comment(m.group(1))
+            if not data:
+                continue
+            if any(str(k) in GLOBAL_DIRECTIVES for k in data):
+                global_comments.append(m.group(0))
+            for key, value in data.items():
+                key = str(key)
+                if key in GLOBAL_DIRECTIVES:
+                    continue
+                elif key.startswith("_") and key[1:] in LOCAL_DIRECTIVES:
+                    spot[key[1:]] = value
+                elif key in LOCAL_DIRECTIVES:
+                    local_set[key] = value
+        slide_infos.append({"body": body, "code_free": code_free, "styles": styles,
+                            "local": local_set, "spot": spot})
+
+    global_css = (fm.get("style") or "") + "\n".join(global_styles)
+    # Front matter can reference assets too (e.g. backgroundImage: url(...))
+    global_key = _sha(front_matter, global_styles, global_comments,
+                      _asset_hashes(front_matter + "\n" + global_css, base_dir))
+
+    # Cases we can't reproduce slide-by-slide: fall back to full renders
+    splittable = not fm.get("headingDivider") and not any(
+        "headingDivider" in c for c in global_comments
+    ) and "data-marpit-pagination" not in global_css
+
+    inherited = {k: fm[k] for k in LOCAL_DIRECTIVES if k in fm}
+    materialized = {}  # inherited values that came from slide comments
+    page = 1
+    slides = []
+    for index, info in enumerate(slide_infos, start=1):
+        before = dict(materialized)
+        inherited.update(info["local"])
+        materialized.update(info["local"])
+        paginate = info["spot"].get("paginate", inherited.get("paginate", False))
+        shows_page = paginate is True or paginate == "hold"
+        key = _sha(global_key, before, page if shows_page else None, info["body"],
+                   _asset_hashes(info["code_free"], base_dir))
+        slides.append({
+            "index": index,
+            "key": key,
+            "body": info["body"],
+            "styles": info["styles"],
+            "inherited": before,
+            "page": page if shows_page else None,
+        })
+        if paginate not in ("hold", "skip"):
+            page += 1
+
+    return {
+        "front_matter": front_matter,
+        "global_styles": global_styles,
+        "global_comments": global_comments,
+        "splittable": splittable,
+        "slides": slides,
+    }
+
+
+def build_subset_deck(analysis: dict, indices: Iterable[int]) -> str:
+    """Build a deck containing only the given slides, rendering as in the full deck."""
+    parts = []
+    for n, index in enumerate(sorted(indices)):
+        slide = analysis["slides"][index - 1]
+        lines = []
+        if n == 0:
+            # Deck-wide directives and styles may live in any slide
+            lines.extend(analysis["global_comments"])
+            lines.extend(analysis["global_styles"])
+        if slide["inherited"]:
+            lines.append("<!--\n" + yaml.safe_dump(slide["inherited"], default_flow_style=False,
+                                                    sort_keys=True, allow_unicode=True).rstrip() + "\n-->")
+        if slide["page"] is not None:
+            lines.append("<style scoped>section[data-marpit-pagination]::after { content: '%d'; }</style>" % slide["page"])
+        body = slide["body"]
+        for style in slide["styles"]:
+            body = body.replace(style, "", 1)
+        lines.append(body)
+        parts.append("\n\n".join(lines))
+
+    deck = ""
+    if analysis["front_matter"]:
+        deck = "---\n" + analysis["front_matter"] + "\n---\n"
+    return deck + "\n\n---\n\n".join(parts) + "\n"
+
+
+class SlidePreviewCache:
+    """Keeps .previews/slide.NNN.png up to date, re-rendering only stale slides."""
+
+    def __init__(self, presentation_dir: str, deck_filename: str = "deck.marp.md"):
+        self.presentation_dir = presentation_dir
+        self.deck_path = os.path.join(presentation_dir, deck_filename)
+        self.deck_filename = deck_filename
+        self.preview_dir = os.path.join(presentation_dir, ".previews")
+        self.manifest_path = os.path.join(self.preview_dir, MANIFEST_NAME)
+
+    def preview_path(self, index: int) -> str:
+        return os.path.join(self.preview_dir, f"slide.{index:03d}.png")
+
+    def load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"version": MANIFEST_VERSION, "slides": {}}
+
+    def _save_manifest(self, manifest: dict):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def analyze(self) -> Optional[dict]:
+        if not os.path.exists(self.deck_path):
+            return None
+        with open(self.deck_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return analyze_deck(content, self.presentation_dir)
+
+    def stale_slides(self, analysis: dict, manifest: dict) -> List[int]:
+        entries = manifest.get("slides", {})
+        stale = []
+        for slide in analysis["slides"]:
+            entry = entries.get(str(slide["index"]))
+            if not entry or entry.get("hash") != slide["key"] or not os.path.exists(self.preview_path(slide["index"])):
+                stale.append(slide["index"])
+        return stale
+
+    def ensure(self, slides: Optional[Iterable[int]] = None, timeout: float = 30,
+               priority: int = INTERACTIVE) -> List[str]:
+        """
+        Make sure previews are current and return the paths of all slide previews.
+
+        Concurrent requests for the same slides of the same deck content share
+        one render; a render of older content is cancelled once a request for
+        newer content arrives (see render_coordinator).
+
+        Args:
+            slides: Only bring these slide numbers up to date (default: all slides).
+            timeout: Timeout in seconds for each Marp run.
+            priority: Render scheduler priority class (see render_scheduler).
+        """
+        wanted = None if slides is None else sorted(set(slides))
+        variant = "all" if wanted is None else ",".join(str(n) for n in wanted)
+        return get_render_coordinator().run(
+            self.presentation_dir,
+            "previews",
+            lambda cancel_event: schedule_render(
+                lambda: self._ensure(wanted, timeout, cancel_event),
+                priority=priority,
+                label="previews"
+            ),
+            variant=variant,
+            fingerprint=lambda: deck_fingerprint(self.presentation_dir, self.deck_filename)
+        )
+
+    def _ensure(self, slides: Optional[List[int]], timeout: float, cancel_event=None) -> List[str]:
+        with _presentation_lock(self.presentation_dir):
+            analysis = self.analyze()
+            if analysis is None:
+                return []
+            os.makedirs(self.preview_dir, exist_ok=True)
+            manifest = self.load_manifest()
+            total = len(analysis["slides"])
+
+            stale = self.stale_slides(analysis, manifest)
+            if slides is not None:
+                wanted = {n for n in slides if 1 <= n <= total}
+                stale = [n for n in stale if n in wanted]
+
+            if stale:
+                full = (
+                    not analysis["splittable"]
+                    or manifest.get("unsplittable")
+                    or len(stale) > total * FULL_RENDER_RATIO
+                )
+                try:
+                    if full:
+                        self._render_full(analysis, manifest, timeout, cancel_event)
+                    else:
+                        self._render_subset(analysis, manifest, stale, timeout, cancel_event)
+                except RenderCancelled:
+                    if full:
+                        # A full render writes in place, so any image may be half-updated
+                        manifest["slides"] = {}
+                        self._save_manifest(manifest)
+                    raise
+                self._save_manifest(manifest)
+
+            self._remove_extra_previews(total, manifest)
+            return [self.preview_path(s["index"]) for s in analysis["slides"]
+                    if os.path.exists(self.preview_path(s["index"]))]
+
+    def render_slide(self, slide_number: int, timeout: float = 30) -> Optional[str]:
+        """
+        Bring a single slide's preview up to date and return its path.
+
+        Only that slide is rendered (together with the deck's front matter,
+        global styles and the directives it inherits), so the cost doesn't
+        depend on the size of the deck. Decks we can't split reliably fall
+        back to a full render.
+        """
+        self.ensure(slides=[slide_number], timeout=timeout)
+        path = self.preview_path(slide_number)
+        return path if os.path.exists(path) else None
+
+    def _render_full(self, analysis: dict, manifest: dict, timeout: float, cancel_event=None):
+        print(f"[PREVIEW] Rendering all {len(analysis['slides'])} slides for {self.presentation_dir}")
+        started = time.time() - 1
+        # Large decks are split into shards rendered in parallel
+        from deckbot.sharded_render import render_images
+        render_images(
+            self.presentation_dir,
+            os.path.join('.previews', 'slide.png'),
+            deck_filename=self.deck_filename,
+            timeout=timeout,
+            cancel_event=cancel_event
+        )
+        rendered = [p for p in glob.glob(os.path.join(self.preview_dir, "slide.*.png"))
+                    if os.path.getmtime(p) >= started]
+        # If our slide split disagrees with Marp's, stop rendering slides individually
+        manifest["unsplittable"] = len(rendered) != len(analysis["slides"]) or not analysis["splittable"]
+        manifest["slides"] = {
+            str(s["index"]): {"hash": s["key"], "file": os.path.basename(self.preview_path(s["index"]))}
+            for s in analysis["slides"]
+        }
+
+    def _render_subset(self, analysis: dict, manifest: dict, stale: List[int], timeout: float,
+                       cancel_event=None):
+        print(f"[PREVIEW] Rendering slides {stale} for {self.presentation_dir}")
+        subset_name = f".preview-subset-{os.getpid()}-{threading.get_ident()}.marp.md"
+        subset_path = os.path.join(self.presentation_dir, subset_name)
+        out_dir = os.path.join(self.preview_dir, f".partial-{os.getpid()}-{threading.get_ident()}")
+        os.makedirs(out_dir, exist_ok=True)
+        try:
+            # The subset deck sits next to the real deck so relative asset paths resolve
+            with open(subset_path, "w", encoding="utf-8") as f:
+                f.write(build_subset_deck(analysis, stale))
+            run_marp(
+                [
+                    subset_name,
+                    '--images', 'png',
+                    '--output', os.path.join(os.path.relpath(out_dir, self.presentation_dir), 'slide.png'),
+                    '--allow-local-files'
+                ],
+                cwd=self.presentation_dir,
+                capture_output=True,
+                timeout=timeout,
+                cancel_event=cancel_event
+            )
+            entries = manifest.setdefault("slides", {})
+            for position, index in enumerate(sorted(stale), start=1):
+                produced = os.path.join(out_dir, f"slide.{position:03d}.png")
+                if not os.path.exists(produced):
+                    continue
+                os.replace(produced, self.preview_path(index))
+                slide = analysis["slides"][index - 1]
+                entries[str(index)] = {"hash": slide["key"], "file": os.path.basename(self.preview_path(index))}
+        finally:
+            if os.path.exists(subset_path):
+                os.unlink(subset_path)
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def apply_slide_map(self, slide_map: Dict[int, int]):
+        """
+        Follow a slide-level edit: previews of slides whose content didn't
+        change are renamed to their new numbers, and entries for everything
+        else are dropped. Renamed previews are still checked against their
+        key, so slides whose inherited directives or page number changed get
+        re-rendered anyway.
+
+        Args:
+            slide_map: Old slide number -> new slide number, for unchanged slides.
+        """
+        with _presentation_lock(self.presentation_dir):
+            manifest = self.load_manifest()
+            entries = manifest.get("slides", {})
+            if not entries:
+                return
+            moved = {}
+            for old, new in slide_map.items():
+                entry = entries.get(str(old))
+                if entry and os.path.exists(self.preview_path(old)):
+                    moved[new] = (old, entry)
+            # Two passes so a rename never overwrites a preview still to be moved
+            for new, (old, _) in moved.items():
+                if old != new:
+                    os.replace(self.preview_path(old), self.preview_path(old) + f".{new}.tmp")
+            for new, (old, _) in moved.items():
+                if old != new:
+                    os.replace(self.preview_path(old) + f".{new}.tmp", self.preview_path(new))
+            manifest["slides"] = {
+                str(new): dict(entry, file=os.path.basename(self.preview_path(new)))
+                for new, (_, entry) in moved.items()
+            }
+            self._save_manifest(manifest)
+            print(f"[PREVIEW] Kept {len(moved)} previews after a slide edit ({sum(o != n for n, (o, _) in moved.items())} renumbered)")
+
+    def _remove_extra_previews(self, total: int, manifest: dict):
+        entries = manifest.get("slides", {})
+        changed = False
+        for path in glob.glob(os.path.join(self.preview_dir, "slide.*.png")):
+            m = re.match(r'slide\.(\d+)\.png$', os.path.basename(path))
+            if m and int(m.group(1)) > total:
+                os.unlink(path)
+                changed = entries.pop(str(int(m.group(1))), None) is not None or changed
+        if changed:
+            self._save_manifest(manifest)
@@ -0,0 +1,103 @@
+"""
+Segmented, memoized system prompt.
+
+The agent rebuilds its system prompt on every chat turn. Doing that from
+scratch re-read ``MARP.md``, ``metadata.json``, ``layouts.md`` and every
+Markdown file of the presentation and re-assembled the long constant
+instructions each time.
+
+``PromptBuilder`` assembles the prompt from named segments. Each segment has
+a key function, usually a fingerprint of the files it is built from, and a
+build function. A segment is only rebuilt when its key changes; otherwise the
+text from the previous turn is reused. ``timings`` records, per segment, how
+long the last build took and whether it came from the cache.
+
+File fingerprints use ``(mtime, size, inode)``. Files modified within the
+last ``RACY_WINDOW`` seconds are also hashed, since a second write within the
+file system's timestamp granularity can leave the stat data unchanged.
+"""
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Files changed more recently than this are fingerprinted by content too
+RACY_WINDOW = 2.0
+
+
+def file_fingerprint(path: str) -> Optional[tuple]:
+    """Cheap change detector for a file (None if it doesn't exist)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+    if time.time() - st.st_mtime < RACY_WINDOW:
+        try:
+            with open(path, "rb") as f:
+                return stamp + (hashlib.sha256(f.read()).hexdigest(),)
+        except OSError:
+            return None
+    return stamp
+
+
+def files_fingerprint(paths: Iterable[str]) -> tuple:
+    return tuple((path, file_fingerprint(path)) for path in paths)
+
+
+class PromptBuilder:
+    """Builds a prompt from segments that are cached until their inputs change."""
+
+    def __init__(self):
+        # name -> (key function, build function)
+        self._segments: "OrderedDict[str, tuple]" = OrderedDict()
+        # name -> (key, text)
+        self._cache: Dict[str, tuple] = {}
+        # name -> {"ms": build time, "cached": reused?, "chars": length}
+        self.timings: Dict[str, dict] = {}
+
+    def add(self, name: str, key: Callable[[], Any], build: Callable[[], str]):
+        """
+        Register a segment. Segments appear in the prompt in registration order.
+
+        Args:
+            name: Segment name (for timings).
+            key: Returns a value that changes whenever the segment's text would.
+            build: Returns the segment's text.
+        """
+        self._segments[name] = (key, build)
+
+    def invalidate(self, name: Optional[str] = None):
+        """Force a rebuild of one segment (or all of them) on the next build()."""
+        if name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(name, None)
+
+    def segment(self, name: str) -> str:
+        """Text of one segment, rebuilt only if its key changed."""
+        key_fn, build = self._segments[name]
+        started = time.perf_counter()
+        key = key_fn()
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == key:
+            text = cached[1]
+            reused = True
+        else:
+            text = build()
+            self._cache[name] = (key, text)
+            reused = False
+        self.timings[name] = {
+            "ms": round((time.perf_counter() - started) * 1000, 3),
+            "cached": reused,
+            "chars": len(text),
+        }
+        return text
+
+    def build(self) -> str:
+        return "".join(self.segment(name) for name in self._segments)
+
+    def rebuilt(self) -> List[str]:
+        """Segments rebuilt during the last build()."""
+        return [name for name, timing in self.timings.items() if not timing["cached"]]
@@ -0,0 +1,208 @@
+"""
+Single-flight coordination of Marp renders.
+
+In the web UI the preview grid, inspect_slide/remix_slide, the settings
+handler and file saves can all ask for a render of the same presentation at
+the same moment. Without coordination each request runs Marp on its own and
+they race on the output files.
+
+RenderCoordinator keys every render by (presentation, output kind, content
+hash):
+
+* Requests for a key that is already rendering wait for that render and
+  share its result (or its exception) instead of starting another one.
+* Renders of the same presentation and kind run one at a time, so they
+  never write the same outputs concurrently.
+* When a request arrives for different content (the deck changed while a
+  render was running or queued), the older render is cancelled. Its waiters
+  re-evaluate the deck and follow the newer render.
+"""
+import hashlib
+import os
+import threading
+from typing import Any, Callable, Optional
+
+from deckbot.render_scheduler import INTERACTIVE, schedule_render
+from deckbot.render_service import RenderCancelled, run_marp
+
+# How many times a request follows superseding renders before giving up
+MAX_SUPERSEDED_ATTEMPTS = 5
+
+
+def deck_fingerprint(presentation_dir: str, deck_filename: str = "deck.marp.md") -> str:
+    """Content hash of a presentation's deck ("" if there is no deck)."""
+    path = os.path.join(presentation_dir, deck_filename)
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ""
+
+
+class _Flight:
+    """One render in progress and everyone waiting for it."""
+
+    def __init__(self, content_hash: str, variant: Optional[str]):
+        self.content_hash = content_hash
+        self.variant = variant
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+        self.superseded = False
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class RenderCoordinator:
+    """Deduplicates concurrent renders and cancels superseded ones."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (presentation, kind) -> list of in-flight _Flight
+        self._flights = {}
+        # (presentation, kind) -> lock serializing the actual renders
+        self._slot_locks = {}
+        self.renders = 0
+        self.joined = 0
+        self.cancelled = 0
+
+    def _slot(self, presentation_dir: str, kind: str):
+        return os.path.abspath(presentation_dir), kind
+
+    def in_flight(self, presentation_dir: str, kind: str) -> int:
+        """Number of renders currently queued or running for a presentation and kind."""
+        with self._lock:
+            return len(self._flights.get(self._slot(presentation_dir, kind), []))
+
+    def _register(self, slot, content_hash: str, variant: Optional[str]):
+        """Join a matching in-flight render or register a new one. Returns (flight, owner)."""
+        with self._lock:
+            flights = self._flights.setdefault(slot, [])
+            for flight in flights:
+                if flight.content_hash == content_hash and flight.variant == variant and not flight.cancel_event.is_set():
+                    flight.waiters += 1
+                    self.joined += 1
+                    return flight, False
+
+            # Anything still rendering older content is now wasted work
+            for flight in flights:
+                if flight.content_hash != content_hash and not flight.cancel_event.is_set():
+                    flight.cancel_event.set()
+                    self.cancelled += 1
+                    print(f"[RENDER] Cancelling superseded {slot[1]} render for {slot[0]}")
+
+            flight = _Flight(content_hash, variant)
+            flights.append(flight)
+            self._slot_locks.setdefault(slot, threading.Lock())
+            return flight, True
+
+    def _execute(self, slot, flight: _Flight, render_fn: Callable[[threading.Event], Any]):
+        try:
+            with self._slot_locks[slot]:
+                if flight.cancel_event.is_set():
+                    flight.superseded = True
+                    return
+                self.renders += 1
+                try:
+                    flight.result = render_fn(flight.cancel_event)
+                except RenderCancelled:
+                    flight.superseded = True
+                except Exception as e:
+                    flight.error = e
+        finally:
+            with self._lock:
+                flights = self._flights.get(slot, [])
+                if flight in flights:
+                    flights.remove(flight)
+                if not flights:
+                    self._flights.pop(slot, None)
+            flight.done.set()
+
+    def run(self, presentation_dir: str, kind: str, render_fn: Callable[[threading.Event], Any],
+            variant: Optional[str] = None, fingerprint: Optional[Callable[[], str]] = None) -> Any:
+        """
+        Run a render through the coordinator and return its result.
+
+        Args:
+            presentation_dir: Presentation being rendered.
+            kind: Output kind, e.g. "html", "previews", "pdf".
+            render_fn: Does the render. Receives a threading.Event that is set
+                       when the render has been superseded; pass it on to
+                       run_marp (cancel_event) so the render stops early.
+            variant: Distinguishes requests of the same kind that produce
+                     different outputs (e.g. which slides, which PDF file).
+                     Only requests with the same variant share a render.
+            fingerprint: Returns the content hash of what is being rendered
+                         (default: hash of deck.marp.md).
+
+        Raises whatever render_fn raised, or RenderCancelled if the request
+        kept being superseded.
+        """
+        slot = self._slot(presentation_dir, kind)
+        fingerprint = fingerprint or (lambda: deck_fingerprint(presentation_dir))
+
+        for _ in range(MAX_SUPERSEDED_ATTEMPTS):
+            flight, owner = self._register(slot, fingerprint(), variant)
+            if owner:
+                self._execute(slot, flight, render_fn)
+            else:
+                flight.done.wait()
+
+            if flight.superseded:
+                # The deck changed; follow the render of the current content
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        raise RenderCancelled(f"{kind} render for {presentation_dir} kept being superseded")
+
+
+_coordinator = RenderCoordinator()
+
+
+def get_render_coordinator() -> RenderCoordinator:
+    """Return the process-wide render coordinator."""
+    return _coordinator
+
+
+def compile_deck(presentation_dir: str, timeout: Optional[float] = None,
+                 capture_output: bool = False, text: bool = False, priority: int = INTERACTIVE,
+                 force: bool = False):
+    """
+    Compile deck.marp.md to HTML, sharing the run with concurrent compiles of
+    the same content.
+
+    Returns the CompletedProcess, or None if the compile was skipped because
+    deck.marp.html is already built from the same deck, CSS and assets (see
+    build_cache; force=True always compiles). Raises like run_marp.
+    """
+    from deckbot.build_cache import BuildCache, build_fingerprint
+
+    args = ["deck.marp.md", "--allow-local-files"]
+    build = BuildCache(presentation_dir)
+    fingerprint = build_fingerprint(presentation_dir, args=args)
+    if not force and build.is_current(fingerprint):
+        print(f"[COMPILE] Skipping compile of {presentation_dir}: deck and assets unchanged")
+        return None
+
+    result = get_render_coordinator().run(
+        presentation_dir,
+        "html",
+        lambda cancel_event: schedule_render(
+            lambda: run_marp(
+                args,
+                cwd=presentation_dir,
+                timeout=timeout,
+                capture_output=capture_output,
+                text=text,
+                cancel_event=cancel_event
+            ),
+            priority=priority,
+            label="compile"
+        )
+    )
+    # Fingerprint taken before the render: if the deck changed meanwhile, the
+    # next compile sees a mismatch and runs again
+    build.record(fingerprint)
+    return result
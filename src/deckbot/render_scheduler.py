@@ -0,0 +1,193 @@
+"""
+Priority-aware admission control for render work.
+
+Compiles, slide previews, layout/template previews, Visual QA renders and
+exports all end up running Marp. Before this module each ran inline in
+whatever thread asked for it, so a PDF export or a background preview could
+occupy every render process while the user waited for their edit to compile.
+
+Every render job now goes through RenderScheduler.run() with a priority
+class:
+
+* INTERACTIVE - what the user is waiting on (compiles, Visual QA, inspect/remix)
+* BACKGROUND  - previews that can wait (preview grid, layout/template previews)
+* EXPORT      - long, explicit exports (PDF)
+
+At most ``max_workers`` jobs run at once. Waiting jobs are admitted in
+priority order (then FIFO), so interactive work jumps the queue, and
+``reserved_interactive`` slots are kept free of background/export work so an
+interactive job never has to wait for a long export to finish. Jobs run in
+the calling thread; a job started from inside another job runs inline so
+nested renders can't deadlock on their own slot.
+
+A job that runs several renders in parallel (sharded PDF export, first
+preview) claims the extra slots with ``fan_out()``; it only gets the slots its
+priority class could be admitted to right now, so sharding never eats into
+the interactive reserve.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from itertools import count
+from typing import Any, Callable, Optional
+
+from deckbot.render_service import default_worker_count
+
+INTERACTIVE = 0
+BACKGROUND = 1
+EXPORT = 2
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background", EXPORT: "export"}
+
+
+class RenderScheduler:
+    """Bounds concurrent render jobs and admits them by priority."""
+
+    def __init__(self, max_workers: Optional[int] = None, reserved_interactive: int = 1):
+        """
+        Args:
+            max_workers: Jobs allowed to run concurrently (default: number of render processes).
+            reserved_interactive: Slots only interactive jobs may use.
+        """
+        self.max_workers = max(1, max_workers or default_worker_count())
+        # Background/export work always gets at least one slot
+        self.reserved_interactive = min(max(0, reserved_interactive), self.max_workers - 1)
+
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = count()
+        self._local = threading.local()
+        self._running = {p: 0 for p in PRIORITY_NAMES}
+        self._completed = {p: 0 for p in PRIORITY_NAMES}
+        self._max_wait = {p: 0.0 for p in PRIORITY_NAMES}
+
+    def _can_start(self, priority: int) -> bool:
+        running = sum(self._running.values())
+        if running >= self.max_workers:
+            return False
+        if priority != INTERACTIVE:
+            others = running - self._running[INTERACTIVE]
+            if others >= self.max_workers - self.reserved_interactive:
+                return False
+        return True
+
+    def _next_admissible(self):
+        for ticket in sorted(self._waiting):
+            if self._can_start(ticket[0]):
+                return ticket
+        return None
+
+    def run(self, fn: Callable[[], Any], priority: int = INTERACTIVE, label: str = "render") -> Any:
+        """
+        Run fn once a slot for its priority class is free and return its result.
+        """
+        if getattr(self._local, "depth", 0):
+            # Already inside a scheduled job: use its slot
+            return self._run_job(fn)
+
+        ticket = (priority, next(self._seq))
+        queued_at = time.time()
+        with self._cond:
+            self._waiting.append(ticket)
+            if self._next_admissible() is not ticket:
+                ahead = sum(1 for t in self._waiting if t < ticket) + sum(self._running.values())
+                print(f"[RENDER] {label} ({PRIORITY_NAMES[priority]}) queued behind {ahead} job(s)")
+            while self._next_admissible() is not ticket:
+                self._cond.wait()
+            self._waiting.remove(ticket)
+            self._running[priority] += 1
+            waited = time.time() - queued_at
+            self._max_wait[priority] = max(self._max_wait[priority], waited)
+            # Others may be admissible too now that the queue changed
+            self._cond.notify_all()
+
+        self._local.priority = priority
+        try:
+            return self._run_job(fn)
+        finally:
+            self._local.priority = None
+            with self._cond:
+                self._running[priority] -= 1
+                self._completed[priority] += 1
+                self._cond.notify_all()
+
+    def _run_job(self, fn: Callable[[], Any]) -> Any:
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            return fn()
+        finally:
+            self._local.depth -= 1
+
+    @contextmanager
+    def fan_out(self, wanted: int):
+        """
+        Slots for a job that wants to run ``wanted`` renders in parallel.
+
+        Yields how many it may run: its own slot plus the free slots of its
+        priority class (never more than ``wanted``), which are held until the
+        block exits. Queued jobs are not overtaken. Outside a scheduled job
+        ``wanted`` is yielded unchanged.
+        """
+        priority = getattr(self._local, "priority", None)
+        if priority is None or wanted <= 1:
+            yield max(1, wanted)
+            return
+        extra = 0
+        with self._cond:
+            while extra < wanted - 1 and not self._waiting and self._can_start(priority):
+                self._running[priority] += 1
+                extra += 1
+        try:
+            yield 1 + extra
+        finally:
+            if extra:
+                with self._cond:
+                    self._running[priority] -= extra
+                    self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Queue depth, running and completed jobs and worst wait per priority class."""
+        with self._cond:
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._waiting:
+                queued[PRIORITY_NAMES[priority]] += 1
+            return {
+                "max_workers": self.max_workers,
+                "reserved_interactive": self.reserved_interactive,
+                "queued": queued,
+                "running": {PRIORITY_NAMES[p]: n for p, n in self._running.items()},
+                "completed": {PRIORITY_NAMES[p]: n for p, n in self._completed.items()},
+                "max_wait_seconds": {PRIORITY_NAMES[p]: round(w, 3) for p, w in self._max_wait.items()},
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_render_scheduler() -> RenderScheduler:
+    """Return the process-wide render scheduler (created lazily)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RenderScheduler()
+        return _scheduler
+
+
+def set_render_scheduler(scheduler: Optional[RenderScheduler]):
+    """Replace the process-wide render scheduler (used by tests and embedders)."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+def schedule_render(fn: Callable[[], Any], priority: int = INTERACTIVE, label: str = "render") -> Any:
+    """Run fn through the process-wide render scheduler."""
+    return get_render_scheduler().run(fn, priority=priority, label=label)
+
+
+def warmup_enabled() -> bool:
+    """Background preview warm-up is on unless DECKBOT_PREVIEW_WARMUP is set to a falsy value."""
+    value = os.environ.get("DECKBOT_PREVIEW_WARMUP", "1").strip().lower()
+    return value not in ("0", "false", "no", "off")
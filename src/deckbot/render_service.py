@@ -0,0 +1,382 @@
+"""
+Persistent Marp render service.
+
+Every compile used to cold-start ``npx`` and Node, which costs seconds per
+edit. This module keeps Node processes (``marp_daemon.js``) alive that load
+Marp CLI once and accept HTML/PNG/PDF render jobs over a pipe. Processes are
+started lazily, up to ``max_processes`` of them when jobs run concurrently,
+and supervised from Python: a process that dies is replaced, and after
+repeated failures we fall back to spawning ``npx @marp-team/marp-cli`` per
+job like before.
+
+Set ``DECKBOT_RENDER_DAEMON=0`` to always use the subprocess path.
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import List, Optional
+
+MARP_COMMAND = ["npx", "@marp-team/marp-cli"]
+DAEMON_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "marp_daemon.js")
+# How often a running job checks whether it has been cancelled
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class RenderCancelled(Exception):
+    """Raised when a render is abandoned because a newer one superseded it."""
+
+
+def daemon_enabled() -> bool:
+    """The daemon is on unless DECKBOT_RENDER_DAEMON is set to a falsy value."""
+    value = os.environ.get("DECKBOT_RENDER_DAEMON", "1").strip().lower()
+    return value not in ("0", "false", "no", "off")
+
+
+def _find_marp_cli() -> Optional[str]:
+    """Locate an installed @marp-team/marp-cli package the daemon can require()."""
+    explicit = os.environ.get("DECKBOT_MARP_CLI")
+    if explicit:
+        return explicit
+
+    candidates = []
+    # Project-local install (node_modules next to where deckbot runs)
+    candidates.append(os.path.join(os.getcwd(), "node_modules", "@marp-team", "marp-cli"))
+    # The npx cache populated by previous `npx @marp-team/marp-cli` runs
+    npx_cache = os.path.join(os.path.expanduser("~"), ".npm", "_npx")
+    cached = glob.glob(os.path.join(npx_cache, "*", "node_modules", "@marp-team", "marp-cli"))
+    cached.sort(key=lambda p: os.path.getmtime(p), reverse=True)
+    candidates.extend(cached)
+
+    for candidate in candidates:
+        if os.path.exists(os.path.join(candidate, "package.json")):
+            return candidate
+    return None
+
+
+def default_worker_count() -> int:
+    """Number of render processes to allow (DECKBOT_RENDER_WORKERS or CPU count, max 4)."""
+    value = os.environ.get("DECKBOT_RENDER_WORKERS")
+    if value:
+        try:
+            return max(1, int(value))
+        except ValueError:
+            pass
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+class _RenderProcess:
+    """One Marp daemon process and the thread reading its responses."""
+
+    def __init__(self, process):
+        self.process = process
+        self.responses = queue.Queue()
+        reader = threading.Thread(target=self._read_loop, daemon=True)
+        reader.start()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_loop(self):
+        for line in self.process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self.responses.put(json.loads(line))
+            except ValueError:
+                # Stray output from the render process; ignore it
+                continue
+        # Wake up any waiter once the process goes away
+        self.responses.put(None)
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.kill()
+
+
+class MarpRenderService:
+    """Supervises long-lived Marp render processes and runs jobs through them."""
+
+    def __init__(self, command: Optional[List[str]] = None, startup_timeout: float = 15.0,
+                 max_failures: int = 3, max_processes: int = 1):
+        """
+        Args:
+            command: Command that starts a render daemon (defaults to node + marp_daemon.js).
+            startup_timeout: Seconds to wait for a daemon to report it is ready.
+            max_failures: Consecutive failures before falling back to npx for good.
+            max_processes: How many daemon processes may run jobs concurrently.
+        """
+        self.command = command
+        self.startup_timeout = startup_timeout
+        self.max_failures = max_failures
+        self.max_processes = max(1, max_processes)
+
+        self._idle = []
+        self._busy = 0
+        self._cond = threading.Condition()
+        self._next_id = 0
+        self._failures = 0
+        self.disabled_reason = None
+        self.jobs_completed = 0
+        self.processes_started = 0
+
+    # ------------------------------------------------------------------
+    # Process lifecycle
+    # ------------------------------------------------------------------
+    def _build_command(self):
+        if self.command:
+            return list(self.command), None
+
+        node = shutil.which("node")
+        if not node:
+            return None, "node executable not found"
+        if not os.path.exists(DAEMON_SCRIPT):
+            return None, f"daemon script missing: {DAEMON_SCRIPT}"
+
+        env = os.environ.copy()
+        marp_cli = _find_marp_cli()
+        if marp_cli:
+            env["DECKBOT_MARP_CLI"] = marp_cli
+        return [node, DAEMON_SCRIPT], env
+
+    @property
+    def running(self) -> bool:
+        with self._cond:
+            return self._busy > 0 or any(p.alive for p in self._idle)
+
+    @property
+    def available(self) -> bool:
+        return self.disabled_reason is None
+
+    def _start_process(self) -> Optional[_RenderProcess]:
+        command, env = self._build_command()
+        if not command:
+            self.disabled_reason = env or "render daemon unavailable"
+            return None
+
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1,
+                env=env,
+            )
+        except OSError as e:
+            self.disabled_reason = f"failed to start render daemon: {e}"
+            return None
+
+        worker = _RenderProcess(process)
+        try:
+            hello = worker.responses.get(timeout=self.startup_timeout)
+        except queue.Empty:
+            hello = None
+
+        if not hello or not hello.get("ready"):
+            error = (hello or {}).get("error", "render daemon did not become ready")
+            worker.kill()
+            # A daemon that cannot load Marp will never work in this process
+            self.disabled_reason = error
+            print(f"[RENDER] Render daemon unavailable, using npx fallback: {error}")
+            return None
+
+        with self._cond:
+            self.processes_started += 1
+        print(f"[RENDER] Render daemon started (pid {process.pid})")
+        return worker
+
+    def _acquire(self) -> Optional[_RenderProcess]:
+        """Take an idle render process, starting one if allowed, else wait for one."""
+        with self._cond:
+            while True:
+                if not self.available:
+                    return None
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.alive:
+                        self._busy += 1
+                        return worker
+                if self._busy + len(self._idle) < self.max_processes:
+                    self._busy += 1
+                    break
+                self._cond.wait()
+
+        # Start outside the lock so other callers can keep using idle processes
+        worker = self._start_process()
+        if worker is None:
+            self._release(None)
+        return worker
+
+    def _release(self, worker: Optional[_RenderProcess]):
+        with self._cond:
+            self._busy -= 1
+            if worker is not None and worker.alive and self.available:
+                self._idle.append(worker)
+            elif worker is not None:
+                worker.kill()
+            self._cond.notify()
+
+    def _record_failure(self, worker: _RenderProcess, reason: str):
+        worker.kill()
+        with self._cond:
+            self._failures += 1
+            if self._failures >= self.max_failures and self.disabled_reason is None:
+                self.disabled_reason = f"render daemon failed {self._failures} times: {reason}"
+                print(f"[RENDER] Disabling render daemon: {self.disabled_reason}")
+
+    def stop(self):
+        """Shut down idle render processes (busy ones exit when their job ends)."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+    def render(self, args: List[str], cwd: Optional[str] = None, timeout: Optional[float] = None,
+               cancel_event: Optional[threading.Event] = None):
+        """
+        Run a Marp CLI job (arguments exactly as for `marp`) in a daemon.
+
+        Returns (returncode, stderr) or None if the daemon can't take the job,
+        in which case the caller should fall back to a subprocess.
+        Raises subprocess.TimeoutExpired if the job exceeds the timeout and
+        RenderCancelled if cancel_event is set while the job runs.
+        """
+        worker = self._acquire()
+        if worker is None:
+            return None
+
+        try:
+            with self._cond:
+                self._next_id += 1
+                job_id = self._next_id
+            job = {"id": job_id, "args": list(args), "cwd": os.path.abspath(cwd) if cwd else None}
+
+            try:
+                worker.process.stdin.write(json.dumps(job) + "\n")
+                worker.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                self._record_failure(worker, str(e))
+                return None
+
+            deadline = time.time() + timeout if timeout else None
+            while True:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        # We can't cancel a job inside Node, so recycle the process
+                        worker.kill()
+                        raise subprocess.TimeoutExpired(MARP_COMMAND + list(args), timeout)
+                if cancel_event is not None:
+                    if cancel_event.is_set():
+                        worker.kill()
+                        raise RenderCancelled("render superseded")
+                    remaining = min(remaining, CANCEL_POLL_INTERVAL) if remaining is not None else CANCEL_POLL_INTERVAL
+                try:
+                    response = worker.responses.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+
+                if response is None:
+                    self._record_failure(worker, "render daemon exited during a job")
+                    return None
+                if response.get("id") != job_id:
+                    continue
+
+                with self._cond:
+                    self._failures = 0
+                    self.jobs_completed += 1
+                return int(response.get("code", 1)), response.get("stderr", "")
+        finally:
+            self._release(worker)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_render_service() -> MarpRenderService:
+    """Return the process-wide render service (created lazily)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = MarpRenderService(max_processes=default_worker_count())
+        return _service
+
+
+def set_render_service(service: Optional[MarpRenderService]):
+    """Replace the process-wide render service (used by tests and embedders)."""
+    global _service
+    with _service_lock:
+        previous = _service
+        _service = service
+    if previous is not None and previous is not service:
+        previous.stop()
+
+
+def _shutdown():
+    if _service is not None:
+        _service.stop()
+
+
+atexit.register(_shutdown)
+
+
+def run_marp(args: List[str], cwd: Optional[str] = None, timeout: Optional[float] = None,
+             capture_output: bool = False, text: bool = False,
+             cancel_event: Optional[threading.Event] = None) -> subprocess.CompletedProcess:
+    """
+    Run Marp CLI with the given arguments, preferring the persistent daemon.
+
+    Behaves like subprocess.run(..., check=True): raises CalledProcessError on
+    a non-zero exit and TimeoutExpired on timeout. If cancel_event is set the
+    job is abandoned with RenderCancelled (before it starts, or mid-render
+    when it runs in the daemon).
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise RenderCancelled("render superseded")
+
+    if daemon_enabled():
+        result = get_render_service().render(args, cwd=cwd, timeout=timeout, cancel_event=cancel_event)
+        if result is not None:
+            code, stderr = result
+            if not capture_output and stderr:
+                sys.stderr.write(stderr)
+            stderr_out = stderr if text else stderr.encode()
+            stdout_out = "" if text else b""
+            cmd = MARP_COMMAND + list(args)
+            if code != 0:
+                raise subprocess.CalledProcessError(code, cmd, output=stdout_out, stderr=stderr_out)
+            return subprocess.CompletedProcess(cmd, code, stdout=stdout_out, stderr=stderr_out)
+
+    kwargs = {"cwd": cwd, "check": True}
+    if capture_output:
+        kwargs["capture_output"] = True
+    if text:
+        kwargs["text"] = True
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return subprocess.run(MARP_COMMAND + list(args), **kwargs)
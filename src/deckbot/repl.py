@@ -2,12 +2,63 @@ from rich.console import Console
 from rich.prompt import Prompt, IntPrompt
 from rich.markdown import Markdown
 from rich.panel import Panel
+from rich.live import Live
 from deckbot.session_service import SessionService
 
 console = Console()
 
+
+class StreamPrinter:
+    """Renders a streamed reply as it arrives (subscribed to the session's events)."""
+
+    def __init__(self, console):
+        self.console = console
+        self.status = None
+        self.live = None
+        self.text = ""
+        # Whether the current reply was (at least partly) streamed to the console
+        self.streamed = False
+
+    def begin(self, status):
+        """Start a new reply; status is the spinner shown while nothing is streaming."""
+        self.status = status
+        self.streamed = False
+
+    def __call__(self, event_type, data=None):
+        if event_type == "stream_delta":
+            if self.live is None:
+                if self.status:
+                    self.status.stop()
+                if not self.streamed:
+                    self.console.print("[bold magenta]AI[/bold magenta]:")
+                self.streamed = True
+                self.text = ""
+                self.live = Live(Markdown(""), console=self.console, refresh_per_second=12)
+                self.live.start()
+            self.text += (data or {}).get("text", "")
+            self.live.update(Markdown(self.text))
+        elif event_type in ("tool_start", "stream_tool_call", "stream_end"):
+            # Text before a tool call is complete: leave it on screen
+            if self.live is not None:
+                self.live.stop()
+                self.live = None
+                if event_type != "stream_end" and self.status:
+                    self.status.start()
+
+    def print_reply(self, response):
+        """Print the reply unless it was already streamed."""
+        if self.streamed:
+            self.console.print()
+            return
+        self.console.print("[bold magenta]AI[/bold magenta]:")
+        self.console.print(Markdown(response))
+        self.console.print()
+
 def start_repl(presentation, resume=False, new_presentation=False):
     service = SessionService(presentation)
+    # Replies are rendered incrementally as they stream in
+    printer = StreamPrinter(console)
+    service.subscribe(printer)
     welcome_message = "I can help you make a presentation."
     
     if resume:
@@ -47,10 +98,9 @@ def start_repl(presentation, resume=False, new_presentation=False):
                 # Use service to send message, but note it logs to history.
                 # If we want to avoid logging initial prompt, we might need a flag in service or agent.
                 # For now, we accept it logs.
+                printer.begin(status)
                 response = service.send_message(initial_prompt, status_spinner=status)
-            console.print("[bold magenta]AI[/bold magenta]:")
-            console.print(Markdown(response))
-            console.print()
+            printer.print_reply(response)
         except Exception as e:
             console.print(f"[red]Error generating initial summary: {e}[/red]")
 
@@ -108,8 +158,7 @@ def start_repl(presentation, resume=False, new_presentation=False):
 
         # console.print("[bold green]Thinking...[/bold green]") # Removed duplicate print
         with console.status("[bold green]Thinking...[/bold green]") as status:
+            printer.begin(status)
             response = service.send_message(user_input, status_spinner=status)
             
-        console.print("[bold magenta]AI[/bold magenta]:")
-        console.print(Markdown(response))
-        console.print() # Vertical whitespace
+        printer.print_reply(response)
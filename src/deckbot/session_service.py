@@ -4,6 +4,8 @@ import threading
 from typing import Optional, List, Dict, Callable, Any
 from datetime import datetime
 from deckbot.agent import Agent
+from deckbot.deck_document import DeckDocument
+from deckbot.layout_catalog import get_layout_catalog
 from deckbot.nano_banana import NanoBananaClient
 
 class SessionService:
@@ -35,6 +37,8 @@ class SessionService:
         if hasattr(self.agent, 'tools_handler'):
             # Accept slide_number (or any data) and forward it
             self.agent.tools_handler.on_presentation_updated = lambda data=None: self._notify("presentation_updated", data)
+            # Hook slide-level edits so clients know exactly which slides changed
+            self.agent.tools_handler.on_slides_changed = lambda data: self._notify("slides_changed", data)
             # Hook image generation requests from the agent
             self.agent.tools_handler.on_image_generation = self._handle_agent_image_request
             # Hook layout creation requests from the agent
@@ -49,6 +53,10 @@ class SessionService:
         with self._lock:
             self.listeners.append(callback)
 
+    def publish(self, event_type: str, data: Any = None):
+        """Send an event to all subscribers (e.g. compile job progress from the web API)."""
+        self._notify(event_type, data)
+
     def _handle_tool_event(self, event_type: str, data: Any):
         """Forward tool events to listeners."""
         self._notify(event_type, data)
@@ -166,7 +174,9 @@ class SessionService:
                 user_input,
                 status_spinner=status_spinner,
                 cancelled_flag=self,
-                current_slide=current_slide
+                current_slide=current_slide,
+                # Partial text and tool call boundaries go out as they arrive
+                on_stream=self._notify
             )
             print(f"[SESSION] Agent.chat() returned: {response[:100] if response else 'None'}...")
             print("[SESSION] Notifying model response via SSE")
@@ -409,7 +419,7 @@ class SessionService:
                     self._notify("thinking_start")
                     
                     try:
-                        response = self.agent.chat(system_notification, status_spinner=None)
+                        response = self.agent.chat(system_notification, status_spinner=None, on_stream=self._notify)
                         self._notify("message", {"role": "model", "content": response})
                     finally:
                         self._notify("thinking_end")
@@ -500,47 +510,9 @@ class SessionService:
 
     def get_layouts(self):
         """Get available layouts for the current presentation with metadata."""
-        import re
-        
-        layouts_path = os.path.join(self.agent.presentation_dir, "layouts.md")
-        
-        if not os.path.exists(layouts_path):
-            return []
-        
         try:
-            with open(layouts_path, "r") as f:
-                content = f.read()
-            
-            # Split by --- to get individual slides
-            slides = content.split('\n---\n')
-            
-            layouts = []
-            for i, slide in enumerate(slides):
-                # Look for layout name in HTML comment
-                match = re.search(r'<!-- layout: ([\w-]+) -->', slide)
-                if match:
-                    layout_name = match.group(1)
-                    # Skip front matter slide
-                    if slide.strip().startswith('---'):
-                        continue
-                    
-                    # Parse metadata from HTML comments
-                    image_friendly = re.search(r'<!-- image-friendly: (true|false) -->', slide)
-                    aspect_ratio = re.search(r'<!-- recommended-aspect-ratio: ([\d:]+) -->', slide)
-                    image_position = re.search(r'<!-- image-position: ([\w-]+) -->', slide)
-                    description = re.search(r'<!-- description: (.+?) -->', slide)
-                    
-                    layouts.append({
-                        "name": layout_name,
-                        "content": slide.strip(),
-                        "index": i,
-                        "image_friendly": image_friendly.group(1) == "true" if image_friendly else False,
-                        "recommended_aspect_ratio": aspect_ratio.group(1) if aspect_ratio else None,
-                        "image_position": image_position.group(1) if image_position else None,
-                        "description": description.group(1) if description else None
-                    })
-            
-            return layouts
+            catalog = get_layout_catalog(self.agent.presentation_dir)
+            return catalog.layouts if catalog else []
         except Exception as e:
             print(f"Error reading layouts: {e}")
             return []
@@ -592,7 +564,7 @@ class SessionService:
                 deck_content = f.read()
             
             # Prepare new slide content
-            new_slide = "\n---\n\n" + selected_layout["content"]
+            new_slide = selected_layout["content"]
             
             # Replace placeholder title if provided
             if title:
@@ -602,15 +574,14 @@ class SessionService:
             
             # Insert slide based on position
             if position == "beginning":
-                # Insert after front matter
-                parts = deck_content.split('\n---\n', 2)
-                if len(parts) >= 2:
-                    deck_content = parts[0] + '\n---\n' + new_slide + '\n---\n' + '\n---\n'.join(parts[1:])
+                # Insert before the first slide (after the front matter)
+                first = DeckDocument.parse(deck_content).body_start
+                deck_content = deck_content[:first] + "\n" + new_slide + "\n\n---\n" + deck_content[first:]
             elif position == "after-current":
                 # For now, just append to end (would need slide tracking for true "after-current")
-                deck_content += new_slide
+                deck_content += "\n---\n\n" + new_slide
             else:  # "end" (default)
-                deck_content += new_slide
+                deck_content += "\n---\n\n" + new_slide
             
             # Write updated deck
             with open(deck_path, "w") as f:
@@ -629,7 +600,7 @@ class SessionService:
                     self._notify("thinking_start")
                     
                     try:
-                        response = self.agent.chat(system_notification, status_spinner=None)
+                        response = self.agent.chat(system_notification, status_spinner=None, on_stream=self._notify)
                         self._notify("message", {"role": "model", "content": response})
                     finally:
                         self._notify("thinking_end")
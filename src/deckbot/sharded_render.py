@@ -0,0 +1,227 @@
+"""
+Parallel, sharded full-deck renders.
+
+When every slide has to be rendered (first preview, PNG/PDF builds, PDF
+export) Marp works through the deck serially in one process. Here the deck
+is partitioned into contiguous shards. Each shard becomes a standalone deck
+(front matter, global styles, inherited directives and pinned page numbers,
+see preview_cache.build_subset_deck). The shards render concurrently and
+the results are reassembled: images keep the ``<name>.NNN.<ext>`` numbering
+and PDF pages keep the deck order.
+
+Decks that are too small to be worth splitting, or that can't be split
+reliably (e.g. headingDivider), are rendered serially as before. Inside a
+scheduled render job the shard count is also capped by the render slots the
+scheduler can spare (see RenderScheduler.fan_out).
+"""
+import glob
+import math
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional
+
+from deckbot.preview_cache import analyze_deck, build_subset_deck
+from deckbot.render_scheduler import get_render_scheduler
+from deckbot.render_service import run_marp
+
+# Below this many slides per shard the extra Marp runs cost more than they save
+MIN_SLIDES_PER_SHARD = 4
+
+
+def default_jobs() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def plan_shards(slide_count: int, jobs: Optional[int] = None) -> List[List[int]]:
+    """Split slides 1..slide_count into contiguous shards (lists of slide numbers)."""
+    jobs = jobs or default_jobs()
+    shard_count = min(jobs, max(1, slide_count // MIN_SLIDES_PER_SHARD))
+    if shard_count < 2:
+        return [list(range(1, slide_count + 1))] if slide_count else []
+    size = math.ceil(slide_count / shard_count)
+    return [list(range(start, min(start + size, slide_count + 1)))
+            for start in range(1, slide_count + 1, size)]
+
+
+@contextmanager
+def _claim_shards(slide_count: int, shards: List[List[int]]):
+    """Re-plan the shards for the render slots the scheduler grants; the slots are held while the block runs."""
+    with get_render_scheduler().fan_out(len(shards)) as workers:
+        if workers < len(shards):
+            print(f"[RENDER] {workers} render slot(s) free, rendering {slide_count} slides "
+                  f"in {workers} shard(s) instead of {len(shards)}")
+            shards = plan_shards(slide_count, workers)
+        yield shards
+
+
+def _load_analysis(presentation_dir: str, deck_filename: str):
+    with open(os.path.join(presentation_dir, deck_filename), "r", encoding="utf-8") as f:
+        return analyze_deck(f.read(), presentation_dir)
+
+
+def _render_shards(presentation_dir: str, analysis: dict, shards: List[List[int]],
+                   extra_args: List[str], output_name: str, timeout: Optional[float],
+                   cancel_event=None):
+    """
+    Render each shard into its own scratch directory, in parallel.
+    Returns a list of (shard, scratch_dir) in shard order.
+    """
+    token = uuid.uuid4().hex[:8]
+    scratch_root = os.path.join(presentation_dir, f".render-shards-{token}")
+    os.makedirs(scratch_root, exist_ok=True)
+
+    def render(position, shard):
+        shard_dir = os.path.join(scratch_root, f"{position:03d}")
+        os.makedirs(shard_dir, exist_ok=True)
+        # Shard decks sit next to the real deck so relative asset paths resolve
+        deck_name = f".render-shard-{token}-{position:03d}.marp.md"
+        deck_path = os.path.join(presentation_dir, deck_name)
+        with open(deck_path, "w", encoding="utf-8") as f:
+            f.write(build_subset_deck(analysis, shard))
+        try:
+            run_marp(
+                [deck_name] + extra_args + ['--output', os.path.relpath(os.path.join(shard_dir, output_name), presentation_dir)],
+                cwd=presentation_dir,
+                capture_output=True,
+                timeout=timeout,
+                cancel_event=cancel_event
+            )
+        finally:
+            os.unlink(deck_path)
+        return shard, shard_dir
+
+    print(f"[RENDER] Rendering {len(analysis['slides'])} slides in {len(shards)} parallel shards")
+    try:
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [pool.submit(render, i, shard) for i, shard in enumerate(shards, start=1)]
+            # Propagate the first failure (CalledProcessError / TimeoutExpired)
+            return [f.result() for f in futures], scratch_root
+    except BaseException:
+        shutil.rmtree(scratch_root, ignore_errors=True)
+        raise
+
+
+def render_images(presentation_dir: str, output: str, image_format: str = "png",
+                  jobs: Optional[int] = None, deck_filename: str = "deck.marp.md",
+                  timeout: Optional[float] = None, cancel_event=None) -> List[str]:
+    """
+    Render every slide to images named like Marp's ``--images`` output.
+
+    Args:
+        presentation_dir: Directory containing the deck.
+        output: Output pattern relative to presentation_dir, e.g. ".previews/slide.png".
+                Slide N is written to ".previews/slide.NNN.png".
+        image_format: "png" or "jpeg".
+        jobs: Maximum number of shards rendered in parallel (default: CPU count).
+        timeout: Timeout in seconds for each Marp run.
+        cancel_event: threading.Event that abandons the render when set
+                      (see render_coordinator).
+
+    Returns the list of image paths in slide order.
+    """
+    analysis = _load_analysis(presentation_dir, deck_filename)
+    total = len(analysis["slides"])
+    base, ext = os.path.splitext(os.path.join(presentation_dir, output))
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    shards = plan_shards(total, jobs) if analysis["splittable"] else []
+
+    def render_serially():
+        run_marp(
+            [deck_filename, '--images', image_format, '--output', output, '--allow-local-files'],
+            cwd=presentation_dir,
+            capture_output=True,
+            timeout=timeout,
+            cancel_event=cancel_event
+        )
+        return [f"{base}.{i:03d}{ext}" for i in range(1, total + 1) if os.path.exists(f"{base}.{i:03d}{ext}")]
+
+    with _claim_shards(total, shards) as shards:
+        if len(shards) < 2:
+            return render_serially()
+
+        results, scratch_root = _render_shards(
+            presentation_dir, analysis, shards,
+            ['--images', image_format, '--allow-local-files'], f"slide{ext}", timeout, cancel_event
+        )
+    paths = []
+    try:
+        # Images are matched to slides by position, so every shard must have
+        # rendered exactly its slides (a directive can add or drop pages)
+        for shard, shard_dir in results:
+            produced = len(glob.glob(os.path.join(shard_dir, f"slide.*{ext}")))
+            if produced != len(shard):
+                print(f"[RENDER] Shard of slides {shard[0]}-{shard[-1]} rendered {produced} images "
+                      f"instead of {len(shard)}, rendering the deck serially")
+                paths = None
+                break
+        else:
+            for shard, shard_dir in results:
+                for position, index in enumerate(shard, start=1):
+                    produced = os.path.join(shard_dir, f"slide.{position:03d}{ext}")
+                    if os.path.exists(produced):
+                        target = f"{base}.{index:03d}{ext}"
+                        os.replace(produced, target)
+                        paths.append(target)
+    finally:
+        shutil.rmtree(scratch_root, ignore_errors=True)
+    return paths if paths is not None else render_serially()
+
+
+def _pdf_merger():
+    """Return pypdf's PdfWriter if pypdf is installed, else None."""
+    try:
+        from pypdf import PdfWriter
+        return PdfWriter
+    except ImportError:
+        return None
+
+
+def render_pdf(presentation_dir: str, output: str, jobs: Optional[int] = None,
+               deck_filename: str = "deck.marp.md", timeout: Optional[float] = None,
+               cancel_event=None) -> str:
+    """
+    Render the deck to a PDF, in parallel shards when pypdf is available to
+    merge them (serially otherwise).
+
+    Args:
+        presentation_dir: Directory containing the deck.
+        output: Output PDF path (relative to presentation_dir or absolute).
+        jobs: Maximum number of shards rendered in parallel (default: CPU count).
+        timeout: Timeout in seconds for each Marp run.
+        cancel_event: threading.Event that abandons the render when set.
+
+    Returns the absolute path of the PDF.
+    """
+    output_path = output if os.path.isabs(output) else os.path.join(presentation_dir, output)
+    analysis = _load_analysis(presentation_dir, deck_filename)
+    writer_cls = _pdf_merger()
+    total = len(analysis["slides"])
+    shards = plan_shards(total, jobs) if analysis["splittable"] and writer_cls else []
+
+    with _claim_shards(total, shards) as shards:
+        if len(shards) < 2:
+            run_marp(
+                [deck_filename, "--pdf", "--allow-local-files", "-o", output],
+                cwd=presentation_dir,
+                timeout=timeout,
+                cancel_event=cancel_event
+            )
+            return output_path
+
+        results, scratch_root = _render_shards(
+            presentation_dir, analysis, shards, ['--pdf', '--allow-local-files'], "shard.pdf", timeout, cancel_event
+        )
+    try:
+        writer = writer_cls()
+        for _, shard_dir in results:
+            writer.append(os.path.join(shard_dir, "shard.pdf"))
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            writer.write(f)
+        os.replace(tmp_path, output_path)
+    finally:
+        shutil.rmtree(scratch_root, ignore_errors=True)
+    return output_path
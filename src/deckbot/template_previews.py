@@ -0,0 +1,198 @@
+"""
+Slide previews for the template gallery.
+
+The gallery serves ``<template>/.previews/slide.NNN.png``, but nothing used to
+generate those files, so new or edited templates showed no previews.
+
+``build_template_previews`` renders the previews of every template under
+``PresentationManager.templates_dir`` in parallel. Each template goes through
+``SlidePreviewCache``, so only changed slides are rendered, and a template
+whose build fingerprint (deck, CSS, referenced assets, Marp config) matches
+the last build is skipped entirely.
+
+Results are recorded in ``<templates_dir>/.previews.json``::
+
+    {"version": 1, "templates": {"Classic Tech": {
+        "fingerprint": "...", "deck_hash": "...",
+        "previews": ["slide.001.png", ...], "built_at": 1700000000.0}}}
+
+The preview endpoint answers from this index alone: it only hashes the
+template's deck to check the entry is current, instead of listing and
+stat-ing preview files on every request.
+
+Run ``deckbot templates build-previews`` after editing templates, or let the
+web server build missing previews in the background at startup.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from deckbot.build_cache import build_fingerprint
+from deckbot.preview_cache import SlidePreviewCache
+from deckbot.render_coordinator import deck_fingerprint
+from deckbot.render_scheduler import BACKGROUND, warmup_enabled
+from deckbot.render_service import default_worker_count
+
+INDEX_NAME = ".previews.json"
+INDEX_VERSION = 1
+
+# Marp arguments the previews are built with (part of the fingerprint)
+PREVIEW_ARGS = ["--images", "png"]
+
+_index_lock = threading.Lock()
+# Parsed index per path, reused while the file's mtime and size don't change
+_index_memo: Dict[str, tuple] = {}
+
+
+def template_names(templates_dir: str) -> List[str]:
+    """Templates that have a deck to preview."""
+    if not os.path.isdir(templates_dir):
+        return []
+    return [name for name in sorted(os.listdir(templates_dir))
+            if not name.startswith(".")
+            and os.path.exists(os.path.join(templates_dir, name, "metadata.json"))
+            and os.path.exists(os.path.join(templates_dir, name, "deck.marp.md"))]
+
+
+def load_index(templates_dir: str) -> dict:
+    path = os.path.join(templates_dir, INDEX_NAME)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {"version": INDEX_VERSION, "templates": {}}
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _index_memo.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    try:
+        with open(path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        index = {"version": INDEX_VERSION, "templates": {}}
+    _index_memo[path] = (stamp, index)
+    return index
+
+
+def _save_entries(templates_dir: str, entries: Dict[str, dict]):
+    """Merge entries into the index on disk (other builds may have written it meanwhile)."""
+    path = os.path.join(templates_dir, INDEX_NAME)
+    with _index_lock:
+        index = load_index(templates_dir)
+        templates = dict(index.get("templates", {}))
+        templates.update(entries)
+        # Forget templates that were deleted
+        existing = set(template_names(templates_dir))
+        templates = {name: entry for name, entry in templates.items() if name in existing}
+        if templates == index.get("templates"):
+            return
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": INDEX_VERSION, "templates": templates}, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+
+def template_previews(templates_dir: str, name: str) -> Optional[List[str]]:
+    """
+    Preview file names of a template, or None if it has no current previews.
+
+    Reads the index and hashes the template's deck; preview files aren't touched.
+    """
+    entry = load_index(templates_dir).get("templates", {}).get(name)
+    if not entry:
+        return None
+    if entry.get("deck_hash") != deck_fingerprint(os.path.join(templates_dir, name)):
+        return None
+    return list(entry.get("previews", []))
+
+
+def _build_one(templates_dir: str, name: str, force: bool, timeout: float) -> tuple:
+    template_dir = os.path.join(templates_dir, name)
+    fingerprint = build_fingerprint(template_dir, args=PREVIEW_ARGS)
+    cache = SlidePreviewCache(template_dir)
+    entry = load_index(templates_dir).get("templates", {}).get(name)
+    if (not force and entry and entry.get("fingerprint") == fingerprint
+            and all(os.path.exists(os.path.join(cache.preview_dir, f)) for f in entry.get("previews", []))):
+        return "current", None
+    # Hash the deck before rendering: if it changes meanwhile, the entry reads as stale
+    deck_hash = deck_fingerprint(template_dir)
+    paths = cache.ensure(timeout=timeout, priority=BACKGROUND)
+    return "built", {
+        "fingerprint": fingerprint,
+        "deck_hash": deck_hash,
+        "previews": [os.path.basename(p) for p in paths],
+        "built_at": time.time(),
+    }
+
+
+def build_template_previews(templates_dir: str, names: Optional[Iterable[str]] = None,
+                            jobs: Optional[int] = None, force: bool = False,
+                            timeout: float = 120) -> Dict[str, str]:
+    """
+    Render previews for templates whose previews are missing or out of date.
+
+    Args:
+        templates_dir: Directory holding the templates.
+        names: Only these templates (default: all).
+        jobs: Templates rendered concurrently (default: number of render processes).
+        force: Rebuild even if the fingerprint matches the last build.
+        timeout: Timeout in seconds for each Marp run.
+
+    Returns:
+        Template name -> "built", "current" or "failed: <reason>".
+    """
+    names = template_names(templates_dir) if names is None else list(names)
+    if not names:
+        return {}
+    results = {}
+    entries = {}
+
+    def run(name):
+        try:
+            status, entry = _build_one(templates_dir, name, force, timeout)
+        except Exception as e:
+            print(f"[PREVIEW] Template preview build failed for {name}: {e}")
+            results[name] = f"failed: {e}"
+            return
+        results[name] = status
+        if entry:
+            entries[name] = entry
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs or default_worker_count(), len(names)))) as pool:
+        list(pool.map(run, names))
+    _save_entries(templates_dir, entries)
+    built = sum(1 for status in results.values() if status == "built")
+    print(f"[PREVIEW] Template previews: {built} built, {len(results) - built} unchanged or failed")
+    return {name: results[name] for name in names}
+
+
+_warming = set()
+_warming_lock = threading.Lock()
+
+
+def warm_template_previews(templates_dir: str, names: Optional[Iterable[str]] = None) -> Optional[threading.Thread]:
+    """Build missing template previews in a background thread (None if warm-up is off or already running)."""
+    if not warmup_enabled():
+        return None
+    key = (os.path.abspath(templates_dir), None if names is None else tuple(sorted(names)))
+    with _warming_lock:
+        if key in _warming:
+            return None
+        _warming.add(key)
+
+    def _warm():
+        try:
+            build_template_previews(templates_dir, names=key[1])
+        except Exception as e:
+            print(f"[PREVIEW] Template preview warm-up failed: {e}")
+        finally:
+            with _warming_lock:
+                _warming.discard(key)
+
+    thread = threading.Thread(target=_warm, daemon=True)
+    thread.start()
+    return thread
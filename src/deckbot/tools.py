@@ -5,16 +5,42 @@ import re
 import inspect
 import uuid
 from functools import wraps
-from typing import Optional
+from typing import List, Optional
+from pydantic import BaseModel
 from rich.console import Console
 from rich.prompt import IntPrompt
 from deckbot.nano_banana import NanoBananaClient
 from deckbot.manager import PresentationManager
+from deckbot.deck_document import DeckDocument, SlideEdit, StaleDeckError, load_deck, markdown_files
 from deckbot.deck_validator import DeckValidator
 from deckbot.visual_qa import VisualQA
+from deckbot.asset_index import format_slide_list, get_asset_index
+from deckbot.layout_catalog import get_layout_catalog
+from deckbot.render_coordinator import compile_deck, get_render_coordinator
+from deckbot.render_scheduler import BACKGROUND, EXPORT, schedule_render
+from deckbot.render_service import run_marp
+from deckbot.compile_scheduler import CompileScheduler
+from deckbot.sharded_render import render_pdf
+from deckbot.preview_cache import SlidePreviewCache
+from deckbot import tracing
 
 console = Console()
 
+
+class SlideEditSpec(BaseModel):
+    """
+    One apply_edits() entry. Declared as a model so the tool's function
+    declaration gives the edit objects their properties (Gemini rejects
+    OBJECT schemas without any).
+    """
+    action: str
+    slide_number: Optional[int] = None
+    content: Optional[str] = None
+    old_text: Optional[str] = None
+    new_text: Optional[str] = None
+    new_position: Optional[int] = None
+
+
 class PresentationTools:
     def __init__(self, presentation_context, nano_client: NanoBananaClient, root_dir=None, api_key: Optional[str] = None):
         self.context = presentation_context
@@ -28,6 +54,9 @@ class PresentationTools:
         # Hook for notifying updates (e.g., presentation compiled)
         self.on_presentation_updated = None
         
+        # Hook for slide-level edits: which slides changed, were removed or moved
+        self.on_slides_changed = None
+        
         # Hook for tool call events (start, end, error)
         self.tool_listeners = []
         
@@ -45,14 +74,41 @@ class PresentationTools:
         
         self.presentation_dir = os.path.join(root, presentation_context['name'])
         self.manager = PresentationManager(root_dir=root)
+        
+        # Auto-compile requests go through a scheduler so bursts of edits
+        # collapse into one compile. Synchronous by default; the Agent
+        # enables debouncing via configure_auto_compile().
+        self.compile_scheduler = CompileScheduler(self.compile_presentation, on_status=self._notify_compile_status)
+
+        # Total time spent running tools (excluded from model latency)
+        self.tool_seconds = 0.0
+        # Tool calls made so far (a model call that ran tools is not retried)
+        self.tool_calls = 0
+
+    def configure_auto_compile(self, quiet_period: float = 0.0, max_latency: Optional[float] = None):
+        """Set the debounce window (seconds) and max latency cap for auto-compiles."""
+        self.compile_scheduler.quiet_period = max(0.0, float(quiet_period or 0))
+        self.compile_scheduler.max_latency = float(max_latency) if max_latency else None
+
+    def _notify_compile_status(self, status):
+        if self.on_presentation_updated:
+            self.on_presentation_updated(status)
+
+    def flush_pending_compile(self):
+        """Run any scheduled auto-compile now so the compiled output is fresh."""
+        return self.compile_scheduler.flush()
 
     def _try_auto_compile(self):
         """Automatically recompile the presentation and return status string."""
         try:
             # We don't want to force a specific slide, just general update
-            result = self.compile_presentation()
+            result = self.compile_scheduler.request()
+            if result is None:
+                return "\n\nPresentation compile scheduled. The preview will update once edits settle."
             if "successful" in result:
                 return "\n\nPresentation automatically compiled. The preview is updated."
+            elif result.startswith("Compilation skipped"):
+                return "\n\nPresentation output is already up to date (nothing that affects the build changed)."
             else:
                 return f"\n\nWarning: Auto-compilation failed: {result}"
         except Exception as e:
@@ -102,8 +158,14 @@ class PresentationTools:
             try:
                 import time
                 start_time = time.time()
-                result = func(*args, **kwargs)
-                elapsed = time.time() - start_time
+                self.tool_calls += 1
+                try:
+                    with tracing.span(f"tool:{tool_name}") as tool_span:
+                        result = func(*args, **kwargs)
+                        tool_span.set(result_chars=len(str(result)) if result else 0)
+                finally:
+                    elapsed = time.time() - start_time
+                    self.tool_seconds += elapsed
                 print(f"[TOOL] {tool_name} completed in {elapsed:.2f}s, result length: {len(str(result)) if result else 0}")
 
                 if self.on_tool_call:
@@ -169,7 +231,11 @@ class PresentationTools:
         console.print(f"[green]Previewing template '{template_name}'...[/green]")
         try:
             # Reuse standard Marp build
-            subprocess.run(["npx", "@marp-team/marp-cli", "deck.marp.md", "--allow-local-files"], cwd=template_path, check=True)
+            schedule_render(
+                lambda: run_marp(["deck.marp.md", "--allow-local-files"], cwd=template_path),
+                priority=BACKGROUND,
+                label="template preview"
+            )
             
             html_file = os.path.join(template_path, "deck.marp.html")
             if os.path.exists(html_file):
@@ -206,6 +272,9 @@ class PresentationTools:
         try:
             items = []
             for name in os.listdir(target_dir):
+                if name.startswith('.'):
+                    # Temporary render decks, caches and logs
+                    continue
                 path = os.path.join(target_dir, name)
                 try:
                     mtime = os.path.getmtime(path)
@@ -234,6 +303,23 @@ class PresentationTools:
         except Exception as e:
             return f"Error reading file: {str(e)}"
 
+    def read_slide(self, slide_number: int, count: int = 1):
+        """
+        Read slides of deck.marp.md (1-based), without reading the whole file.
+        Returns 'count' slides starting at slide_number, each with its number.
+        """
+        path = os.path.join(self.presentation_dir, 'deck.marp.md')
+        if not os.path.exists(path):
+            return "Error: deck.marp.md not found."
+        doc = load_deck(path)
+        if not 1 <= slide_number <= doc.slide_count:
+            return f"Error: Slide {slide_number} does not exist (the deck has {doc.slide_count} slides)."
+        last = min(doc.slide_count, slide_number + max(1, count) - 1)
+        return "\n\n".join(
+            f"Slide {number} of {doc.slide_count}:\n```markdown\n{doc.slide(number).text}\n```"
+            for number in range(slide_number, last + 1)
+        )
+
     def write_file(self, filename: str, content: str):
         """
         Write content to a file in the presentation directory. WARNING: Overwrites entire file.
@@ -325,10 +411,182 @@ class PresentationTools:
             if not validation['valid']:
                 return f"Validation Error:\n{validation['error']}"
             
-            return f"Validation Successful:\n{validation['summary']}"
+            return f"Validation Successful:\n{validation['summary']}" + self._asset_report()
         except Exception as e:
             return f"Error validating deck: {str(e)}"
 
+    def _asset_report(self) -> str:
+        """Missing and unused assets, from the asset index (no rendering needed)."""
+        index = get_asset_index(self.presentation_dir)
+        lines = []
+        for asset, slides in index.missing_assets().items():
+            lines.append(f"- Missing: '{asset}' (referenced by {format_slide_list(slides)})")
+        for asset in index.unused_assets():
+            lines.append(f"- Unused: '{asset}'")
+        if not lines:
+            return ""
+        return "\n\nAssets:\n" + "\n".join(lines)
+
+    def replace_slide(self, slide_number: int, content: str):
+        """
+        Replace the content of one slide (1-based) without touching the rest of the deck.
+        Pass the slide's markdown without surrounding '---' separators.
+        Automatically recompiles the presentation.
+        """
+        return self._edit_slides(
+            lambda doc: doc.replace_slide(slide_number, content),
+            f"Successfully replaced slide {slide_number}"
+        )
+
+    def insert_slide_after(self, slide_number: int, content: str):
+        """
+        Insert a new slide after slide N (use 0 to insert before the first slide).
+        The content may contain several slides separated by '---'.
+        Automatically recompiles the presentation.
+        """
+        where = "at the beginning" if slide_number == 0 else f"after slide {slide_number}"
+        return self._edit_slides(
+            lambda doc: doc.insert_slides_after(slide_number, content),
+            f"Successfully inserted slide(s) {where}"
+        )
+
+    def delete_slide(self, slide_number: int):
+        """
+        Delete one slide (1-based). Automatically recompiles the presentation.
+        """
+        return self._edit_slides(
+            lambda doc: doc.delete_slide(slide_number),
+            f"Successfully deleted slide {slide_number}"
+        )
+
+    def move_slide(self, slide_number: int, new_position: int):
+        """
+        Move slide N so that it becomes slide number new_position.
+        Automatically recompiles the presentation.
+        """
+        return self._edit_slides(
+            lambda doc: doc.move_slide(slide_number, new_position),
+            f"Successfully moved slide {slide_number} to position {new_position}"
+        )
+
+    def apply_edits(self, edits: List[SlideEditSpec]):
+        """
+        Apply several edits to deck.marp.md as one change. The edits are applied
+        in order in memory; the deck is then validated once, written once and
+        compiled once. If any edit fails, nothing is written.
+
+        Each edit is a dict with an "action" and its arguments:
+        - {"action": "replace_text", "old_text": "...", "new_text": "..."}
+        - {"action": "replace_slide", "slide_number": 2, "content": "..."}
+        - {"action": "insert_slide_after", "slide_number": 2, "content": "..."} (0 = before the first slide)
+        - {"action": "delete_slide", "slide_number": 2}
+        - {"action": "move_slide", "slide_number": 2, "new_position": 5}
+        Slide numbers refer to the deck as left by the previous edits.
+        """
+        path = os.path.join(self.presentation_dir, 'deck.marp.md')
+        if not os.path.exists(path):
+            return "Error: deck.marp.md not found."
+        if not edits:
+            return "Error: No edits given."
+        # Automatic function calling passes SlideEditSpec models, direct callers plain dicts
+        edits = [e.model_dump(exclude_none=True) if isinstance(e, BaseModel) else e for e in edits]
+
+        original = load_deck(path)
+        doc = original
+        done = []
+        for i, edit in enumerate(edits, start=1):
+            try:
+                doc, description = self._apply_edit(doc, edit)
+            except (IndexError, ValueError, KeyError, TypeError) as e:
+                return f"Error: Edit {i} failed, so no changes were made. {e}"
+            done.append(f"{i}. {description}")
+
+        if doc.content == original.content:
+            return "No changes: the edits leave deck.marp.md as it was."
+        return self._commit_deck_edit(
+            SlideEdit(original, doc),
+            f"Successfully applied {len(edits)} edits to deck.marp.md:\n" + "\n".join(done)
+        )
+
+    def _apply_edit(self, doc, edit: dict):
+        """Apply one apply_edits() entry in memory. Returns (new document, description)."""
+        if not isinstance(edit, dict):
+            raise ValueError(f"Expected an object with an 'action', got {edit!r}")
+        action = edit.get("action")
+        try:
+            if action == "replace_text":
+                old_text, new_text = edit["old_text"], edit["new_text"]
+                if "\r\n" in doc.content:
+                    old_text, new_text = (t.replace("\r\n", "\n").replace("\n", "\r\n") for t in (old_text, new_text))
+                count = doc.content.count(old_text) if old_text else 0
+                if not count:
+                    raise ValueError(f"'{old_text}' not found in deck.marp.md.")
+                return DeckDocument.parse(doc.content.replace(old_text, new_text)), f"Replaced text ({count} occurrence(s))"
+            number = int(edit["slide_number"])
+            if action == "replace_slide":
+                return doc.replace_slide(number, edit["content"]).after, f"Replaced slide {number}"
+            if action == "insert_slide_after":
+                return doc.insert_slides_after(number, edit["content"]).after, f"Inserted slide(s) after slide {number}"
+            if action == "delete_slide":
+                return doc.delete_slide(number).after, f"Deleted slide {number}"
+            if action == "move_slide":
+                position = int(edit["new_position"])
+                return doc.move_slide(number, position).after, f"Moved slide {number} to position {position}"
+        except KeyError as e:
+            raise KeyError(f"'{action}' needs {e}") from None
+        raise ValueError(f"Unknown action {action!r}. Use replace_text, replace_slide, "
+                         "insert_slide_after, delete_slide or move_slide.")
+
+    def _edit_slides(self, edit_fn, success: str):
+        """Apply a single slide-level edit to deck.marp.md (see _commit_deck_edit)."""
+        path = os.path.join(self.presentation_dir, 'deck.marp.md')
+        if not os.path.exists(path):
+            return "Error: deck.marp.md not found."
+
+        try:
+            edit = edit_fn(load_deck(path))
+        except (IndexError, ValueError) as e:
+            return f"Error: {e}"
+        return self._commit_deck_edit(edit, success)
+
+    def _commit_deck_edit(self, edit, success: str):
+        """
+        Validate only the front matter and the changed slides, write only the
+        changed bytes, tell the preview cache and listeners which slides
+        changed, and auto-compile.
+        """
+        path = os.path.join(self.presentation_dir, 'deck.marp.md')
+        error = DeckValidator.validate_front_matter(edit.after)
+        if error:
+            return f"Error: Invalid deck structure. {error}"
+        for number in edit.changed:
+            errors = DeckValidator.validate_slide(edit.after.slide(number).text)
+            if errors:
+                return f"Error: Invalid content for slide {number}. " + "\n".join(errors)
+
+        try:
+            edit.write(path)
+        except StaleDeckError:
+            return "Error: deck.marp.md changed while editing. Please retry."
+        except Exception as e:
+            return f"Error writing deck: {str(e)}"
+
+        # Unchanged slides keep their previews under their new numbers
+        SlidePreviewCache(self.presentation_dir).apply_slide_map(edit.slide_map)
+        if self.on_slides_changed:
+            self.on_slides_changed({
+                "changed": edit.changed,
+                "removed": edit.removed,
+                "slide_map": {str(old): new for old, new in edit.slide_map.items()},
+                "slide_count": edit.after.slide_count,
+            })
+
+        lines = [f"Total Slides: {edit.after.slide_count}"]
+        lines += [DeckValidator.summarize_slide(n, edit.after.slide(n).text) for n in edit.changed]
+        msg = success + "\n\n" + "\n".join(lines)
+        msg += self._try_auto_compile()
+        return msg
+
     def copy_file(self, source: str, destination: str):
         """Copy a file within the presentation directory."""
         src_path = os.path.abspath(os.path.join(self.presentation_dir, source))
@@ -364,8 +622,13 @@ class PresentationTools:
             return f"Error: Source file '{source}' not found."
             
         try:
+            # Slides that point at the old path will lose the file
+            affected = get_asset_index(self.presentation_dir).slides_for(src_path)
             shutil.move(src_path, dst_path)
             msg = f"Successfully moved '{source}' to '{destination}'"
+            if affected:
+                msg += (f"\n\nWarning: '{source}' is still referenced by {format_slide_list(affected)}. "
+                        f"Update those references to '{destination}'.")
             msg += self._try_auto_compile()
             return msg
         except Exception as e:
@@ -385,11 +648,14 @@ class PresentationTools:
             return f"Error: File '{filename}' not found."
             
         try:
+            affected = get_asset_index(self.presentation_dir).slides_for(path)
             if os.path.isdir(path):
                 shutil.rmtree(path)
             else:
                 os.remove(path)
             msg = f"Successfully deleted '{filename}'"
+            if affected:
+                msg += f"\n\nWarning: '{filename}' no longer exists but is still referenced by {format_slide_list(affected)}."
             msg += self._try_auto_compile()
             return msg
         except Exception as e:
@@ -476,6 +742,8 @@ class PresentationTools:
     def inspect_slide(self, slide_number: int) -> str:
         """Runs Visual QA on the specified slide and returns a formatted string if issues are found."""
         try:
+            self.flush_pending_compile()
+            
             # Ensure preview image exists
             preview_path, was_generated = self.visual_qa._ensure_preview(self.presentation_dir, slide_number)
             
@@ -527,6 +795,8 @@ class PresentationTools:
             return "Error: remix_prompt is required. Please provide a description of how to remix the slide."
         
         try:
+            self.flush_pending_compile()
+            
             # Render slide to image using same logic as inspect_slide
             preview_path, was_generated = self.visual_qa._ensure_preview(self.presentation_dir, slide_number)
             
@@ -687,17 +957,30 @@ class PresentationTools:
         Compiles the presentation using Marp.
         
         IMPORTANT: Most file operations (write_file, replace_text, delete_file) automatically recompile.
+        If the deck and the images it references haven't changed since the last build,
+        the compile is skipped and the existing output is reused.
         Only call this tool if:
-        1. You need to force a recompile without changing files.
+        1. You need to recompile after changing files outside the usual tools.
         2. You want to open the preview at a specific slide (using slide_number).
         
         Args:
             slide_number: Optional slide number to open the presentation at (1-based index).
         """
         console.print(f"[green]Compiling presentation in {self.presentation_dir}...[/green]")
+        # An explicit compile supersedes any scheduled auto-compile
+        self.compile_scheduler.cancel()
         try:
             # Use --allow-local-files to support absolute paths or images outside working dir if needed
-            subprocess.run(["npx", "@marp-team/marp-cli", "deck.marp.md", "--allow-local-files"], cwd=self.presentation_dir, check=True)
+            # Concurrent compiles of the same content (e.g. from the web UI) share one run
+            if compile_deck(self.presentation_dir) is None:
+                # Nothing changed since the last build: keep deck.marp.html as it is
+                if slide_number:
+                    return self.go_to_slide(slide_number)
+                if self.on_presentation_updated:
+                    self.on_presentation_updated({"compile": "skipped"})
+                else:
+                    self._open_locally(os.path.join(self.presentation_dir, "deck.marp.html"))
+                return "Compilation skipped: the deck and its assets are unchanged since the last build, so the presentation is already up to date."
             
             # Post-process HTML to inject IDs for navigation if missing
             # This ensures #1, #2, etc. work in both Web UI and local open
@@ -733,23 +1016,29 @@ class PresentationTools:
             # qa_report = self.inspect_slide(target_slide)
 
             if self.on_presentation_updated:
-                self.on_presentation_updated({})
+                self.on_presentation_updated({"compile": "complete"})
                 return f"Compilation successful. Presentation updated in Web UI."
 
             # Local open default
-            if os.path.exists(html_file):
-                if os.name == 'posix':
-                     subprocess.Popen(["open", html_file], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                elif os.name == 'nt':
-                     os.startfile(html_file)
+            self._open_locally(html_file)
             return f"Compilation successful."
         except Exception as e:
             return f"Error compiling: {str(e)}"
 
+    def _open_locally(self, html_file):
+        """Opens the compiled deck in the system viewer (REPL mode)."""
+        if os.path.exists(html_file):
+            if os.name == 'posix':
+                 subprocess.Popen(["open", html_file], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elif os.name == 'nt':
+                 os.startfile(html_file)
+
     def export_pdf(self):
         """Exports the presentation to PDF using Marp."""
         console.print(f"[green]Exporting PDF in {self.presentation_dir}...[/green]")
         try:
+            self.flush_pending_compile()
+            
             # Derive filename from presentation name
             presentation_name = self.context.get('name', 'presentation')
             # Sanitize name for filename
@@ -762,7 +1051,17 @@ class PresentationTools:
             # Ensure Chrome/Chromium is installed or managed by user environment
             # Use --allow-local-files to support local images in PDF export
             # Use -o to specify output filename
-            subprocess.run(["npx", "@marp-team/marp-cli", "deck.marp.md", "--pdf", "--allow-local-files", "-o", pdf_filename], cwd=self.presentation_dir, check=True)
+            # Large decks are rendered in parallel shards and merged
+            get_render_coordinator().run(
+                self.presentation_dir,
+                "pdf",
+                lambda cancel_event: schedule_render(
+                    lambda: render_pdf(self.presentation_dir, pdf_filename, cancel_event=cancel_event),
+                    priority=EXPORT,
+                    label="PDF export"
+                ),
+                variant=pdf_filename
+            )
             
             pdf_file = os.path.join(self.presentation_dir, pdf_filename)
             if os.path.exists(pdf_file):
@@ -782,7 +1081,7 @@ class PresentationTools:
         if not os.path.exists(self.presentation_dir):
             return "Presentation directory does not exist."
             
-        files = sorted([f for f in os.listdir(self.presentation_dir) if f.endswith('.md')])
+        files = markdown_files(self.presentation_dir)
         if not files:
             return "Presentation is empty."
 
@@ -860,49 +1159,12 @@ class PresentationTools:
         Get available slide layouts for this presentation.
         Returns a list of layouts with their names, markdown content, and metadata.
         """
-        layouts_path = os.path.join(self.presentation_dir, "layouts.md")
-        
-        if not os.path.exists(layouts_path):
-            return "No layouts file found in this presentation."
-        
         try:
-            with open(layouts_path, "r") as f:
-                content = f.read()
-            
-            # Parse layouts by splitting on slide breaks and finding layout comments
-            import re
-            
-            # Split by --- to get individual slides
-            slides = content.split('\n---\n')
-            
-            layouts = []
-            for slide in slides:
-                # Look for layout name in HTML comment
-                match = re.search(r'<!-- layout: ([\w-]+) -->', slide)
-                if match:
-                    layout_name = match.group(1)
-                    # Extract just the slide content (skip front matter for first slide)
-                    if slide.strip().startswith('---'):
-                        # This is the first slide with front matter, skip it
-                        continue
-                    
-                    # Parse metadata from HTML comments
-                    image_friendly = re.search(r'<!-- image-friendly: (true|false) -->', slide)
-                    aspect_ratio = re.search(r'<!-- recommended-aspect-ratio: ([\d:]+) -->', slide)
-                    image_position = re.search(r'<!-- image-position: ([\w-]+) -->', slide)
-                    description = re.search(r'<!-- description: (.+?) -->', slide)
-                    
-                    layout_info = {
-                        "name": layout_name,
-                        "content": slide.strip(),
-                        "image_friendly": image_friendly.group(1) == "true" if image_friendly else False,
-                        "recommended_aspect_ratio": aspect_ratio.group(1) if aspect_ratio else None,
-                        "image_position": image_position.group(1) if image_position else None,
-                        "description": description.group(1) if description else None
-                    }
-                    
-                    layouts.append(layout_info)
+            catalog = get_layout_catalog(self.presentation_dir)
+            if catalog is None:
+                return "No layouts file found in this presentation."
             
+            layouts = catalog.layouts
             if not layouts:
                 return "No layouts found in layouts.md"
             
@@ -964,7 +1226,7 @@ class PresentationTools:
             return "Presentation directory empty."
             
         context_str = "## Presentation Files\n\n"
-        files = sorted([f for f in os.listdir(self.presentation_dir) if f.endswith('.md')])
+        files = markdown_files(self.presentation_dir)
         
         if not files:
             return "No markdown files found in presentation."
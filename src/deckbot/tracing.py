@@ -0,0 +1,248 @@
+"""
+Per-turn tracing.
+
+Each ``Agent.chat`` turn is recorded as a tree of timed spans (prompt build,
+history windowing, the model call, each tool call, auto-compiles, Visual QA
+rate-limit sleeps, ...) so a slow turn shows where its time went.
+
+::
+
+    with trace_turn(presentation_dir, message="Fix the title") as turn:
+        with span("model", model="gemini-3-pro-preview") as model_span:
+            ...
+            model_span.set(first_chunk_ms=420.0)
+
+When the outermost span ends, the trace is appended as one JSON line to
+``<presentation>/.traces.jsonl``. The file is trimmed to the newest half once
+it grows past ``MAX_TRACE_BYTES``. ``read_traces`` loads it back (for
+``/api/traces`` and ``deckbot trace``).
+
+Spans nest through a context variable, so code deep in the call stack only
+needs ``span(...)``; outside a traced turn (or with ``DECKBOT_TRACE=0``) it
+returns a shared no-op span, which costs a single context variable lookup.
+Work handed to another thread can attach to the turn by passing
+``current_span()`` as ``parent``; spans that start after their turn ended
+are dropped.
+"""
+import contextvars
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+TRACE_FILENAME = ".traces.jsonl"
+MAX_TRACE_BYTES = 2_000_000
+
+_current = contextvars.ContextVar("deckbot_span", default=None)
+_write_lock = threading.Lock()
+
+
+def tracing_enabled() -> bool:
+    """Tracing is on unless DECKBOT_TRACE is set to a falsy value."""
+    value = os.environ.get("DECKBOT_TRACE", "1").strip().lower()
+    return value not in ("0", "false", "no", "off")
+
+
+def trace_path(presentation_dir: str) -> str:
+    return os.path.join(presentation_dir, TRACE_FILENAME)
+
+
+class _NoopSpan:
+    """Stands in for a span when nothing is being traced."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """A timed, named unit of work with attributes and child spans."""
+
+    __slots__ = ("name", "attrs", "start", "end", "children", "trace", "_token")
+
+    def __init__(self, name: str, attrs: dict, trace: "_Trace"):
+        self.name = name
+        self.attrs = attrs
+        self.start = None
+        self.end = None
+        self.children = []
+        self.trace = trace
+        self._token = None
+
+    def set(self, **attrs):
+        """Add or update attributes."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        if self.trace.root is self:
+            self.trace.close()
+        return False
+
+    def to_dict(self, origin: float) -> dict:
+        data = {"name": self.name, "start_ms": round((self.start - origin) * 1000, 2)}
+        if self.end is not None:
+            data["ms"] = round((self.end - self.start) * 1000, 2)
+        else:
+            data["ms"] = None
+            data["unfinished"] = True
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in list(self.children)]
+        return data
+
+
+class _Trace:
+    """One turn: the root span, and where the trace is written when it ends."""
+
+    def __init__(self, presentation_dir: Optional[str]):
+        self.presentation_dir = presentation_dir
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.datetime.now().isoformat(timespec="seconds")
+        self.root = None
+        self.closed = False
+
+    def record(self) -> dict:
+        record = {"trace_id": self.trace_id, "started_at": self.started_at}
+        record.update(self.root.to_dict(self.root.start))
+        return record
+
+    def close(self):
+        self.closed = True
+        if self.presentation_dir:
+            try:
+                write_trace(self.presentation_dir, self.record())
+            except (OSError, RuntimeError, TypeError, ValueError) as e:
+                print(f"[TRACE] Could not write trace: {e}")
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span of this thread/context, if any."""
+    return _current.get()
+
+
+def span(name: str, parent: Optional[Span] = None, **attrs):
+    """
+    A child span of ``parent`` (default: the current span). Returns a no-op
+    span if there is no trace to attach to.
+    """
+    if parent is None:
+        parent = _current.get()
+        if parent is None:
+            return _NOOP
+    if parent.trace.closed:
+        return _NOOP
+    child = Span(name, attrs, parent.trace)
+    parent.children.append(child)
+    return child
+
+
+def trace_turn(presentation_dir: Optional[str], name: str = "turn", **attrs):
+    """
+    Root span of a turn, written to the presentation's trace log when it ends.
+    Inside an active trace this is just a child span.
+    """
+    if not tracing_enabled():
+        return _NOOP
+    if _current.get() is not None:
+        return span(name, **attrs)
+    trace = _Trace(presentation_dir)
+    trace.root = Span(name, attrs, trace)
+    return trace.root
+
+
+def write_trace(presentation_dir: str, record: dict):
+    path = trace_path(presentation_dir)
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock:
+        if not os.path.isdir(presentation_dir):
+            return
+        with open(path, "a") as f:
+            f.write(line)
+        if os.path.getsize(path) > MAX_TRACE_BYTES:
+            _trim(path)
+
+
+def _trim(path: str):
+    """Keep the newest half of the trace log."""
+    with open(path) as f:
+        lines = f.readlines()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.writelines(lines[len(lines) // 2:])
+    os.replace(tmp, path)
+
+
+def read_traces(presentation_dir: str, limit: Optional[int] = 20) -> List[dict]:
+    """The last ``limit`` traces of a presentation, oldest first (all of them if ``limit`` is None)."""
+    path = trace_path(presentation_dir)
+    if not os.path.exists(path):
+        return []
+    with _write_lock, open(path) as f:
+        lines = f.readlines()
+    if limit is not None:
+        lines = lines[-limit:] if limit > 0 else []
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # Half-written line of a crashed process
+            continue
+    return records
+
+
+def self_ms(data: dict) -> Optional[float]:
+    """Time spent in a span itself, outside its children (which may overlap when run in other threads)."""
+    if data.get("ms") is None:
+        return None
+    return round(max(0.0, data["ms"] - sum(child.get("ms") or 0 for child in data.get("children", []))), 2)
+
+
+def _format_attrs(attrs: dict) -> str:
+    items = []
+    for key, value in attrs.items():
+        text = value if isinstance(value, str) else json.dumps(value, default=str)
+        if len(text) > 60:
+            text = text[:57] + "..."
+        items.append(f"{key}={text}")
+    return " ".join(items)
+
+
+def format_trace(record: dict) -> str:
+    """A trace as an indented tree of spans with durations (for the CLI)."""
+    lines = [f"{record.get('started_at', '')}  trace {record.get('trace_id', '')}"]
+
+    def walk(data, depth):
+        ms = data.get("ms")
+        duration = f"{ms:10.1f} ms" if ms is not None else "  (unfinished)"
+        own = self_ms(data)
+        own_text = f"  (self {own:.1f} ms)" if data.get("children") and own is not None else ""
+        attrs = _format_attrs(data.get("attrs", {}))
+        label = f"{'  ' * depth}{data['name']}"
+        lines.append(f"{label:<36}{duration}{own_text}" + (f"  {attrs}" if attrs else ""))
+        for child in data.get("children", []):
+            walk(child, depth + 1)
+
+    walk(record, 1)
+    return "\n".join(lines)
@@ -5,6 +5,9 @@ import logging
 from typing import Optional
 from google import genai
 from google.genai import types
+from deckbot.genai_client import create_client
+from deckbot.preview_cache import SlidePreviewCache
+from deckbot import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +17,11 @@ class VisualQA:
         # Use a model capable of vision. Flash is fast and good for this.
         self.model_name = "gemini-2.0-flash-exp" 
         self.client = None
-        if api_key:
-            try:
-                self.client = genai.Client(api_key=api_key)
-            except Exception as e:
-                logger.error(f"Failed to initialize GenAI client: {e}")
-        else:
+        try:
+            self.client = create_client(api_key, "visual_qa")
+        except Exception as e:
+            logger.error(f"Failed to initialize GenAI client: {e}")
+        if not api_key and not self.client:
             logger.warning("VisualQA initialized without API key")
 
     # Rate limiting: 10 requests per minute = 1 request every 6 seconds.
@@ -44,7 +46,9 @@ class VisualQA:
             return False, "[Visual QA] Skipped (No API Key)"
 
         # 1. Ensure previews exist
-        image_path, was_generated = self._ensure_preview(presentation_dir, slide_number)
+        with tracing.span("visual_qa.preview", slide=slide_number) as preview_span:
+            image_path, was_generated = self._ensure_preview(presentation_dir, slide_number)
+            preview_span.set(generated=was_generated)
         
         if not image_path:
             logger.warning(f"Could not generate preview image for Visual QA (slide {slide_number}).")
@@ -74,10 +78,12 @@ class VisualQA:
         
         # Enforce minimum 6s delay between calls
         time_since_last = time.time() - VisualQA._last_call_time
-        if time_since_last < 6.5:
+        # (not needed when replaying a recorded session without its latency)
+        if time_since_last < 6.5 and not getattr(self.client, 'skips_rate_limits', False):
             sleep_time = 6.5 - time_since_last
             print(f"[Visual QA] Rate limiting: Sleeping for {sleep_time:.2f}s...")
-            time.sleep(sleep_time)
+            with tracing.span("visual_qa.rate_limit_sleep", seconds=round(sleep_time, 2)):
+                time.sleep(sleep_time)
 
         try:
             gemini_start = time.time()
@@ -111,31 +117,33 @@ VERDICT: <"No issues found" or "ISSUES FOUND">
             
             for attempt in range(max_retries):
                 try:
-                    response = self.client.models.generate_content(
-                        model=self.model_name,
-                        contents=[
-                            types.Content(
-                                role="user",
-                                parts=[
-                                    types.Part(text=prompt),
-                                    types.Part(inline_data=types.Blob(
-                                        mime_type="image/png",
-                                        data=image_bytes
-                                    ))
-                                ]
+                    with tracing.span("visual_qa.model", model=self.model_name, attempt=attempt + 1):
+                        response = self.client.models.generate_content(
+                            model=self.model_name,
+                            contents=[
+                                types.Content(
+                                    role="user",
+                                    parts=[
+                                        types.Part(text=prompt),
+                                        types.Part(inline_data=types.Blob(
+                                            mime_type="image/png",
+                                            data=image_bytes
+                                        ))
+                                    ]
+                                )
+                            ],
+                            config=types.GenerateContentConfig(
+                                temperature=0.0
                             )
-                        ],
-                        config=types.GenerateContentConfig(
-                            temperature=0.0
                         )
-                    )
                     VisualQA._last_call_time = time.time()
                     break # Success
                 except Exception as e:
                     if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
                         if attempt < max_retries - 1:
                             print(f"[Visual QA] Hit rate limit (429). Retrying in {retry_delay}s...")
-                            time.sleep(retry_delay)
+                            with tracing.span("visual_qa.retry_sleep", seconds=retry_delay):
+                                time.sleep(retry_delay)
                             retry_delay *= 2 # Exponential backoff
                             continue
                     raise e # Re-raise if not 429 or retries exhausted
@@ -167,53 +175,25 @@ VERDICT: <"No issues found" or "ISSUES FOUND">
     def _ensure_preview(self, presentation_dir: str, slide_number: int, force: bool = False) -> tuple[Optional[str], bool]:
         """
         Ensures the preview image for the given slide exists and is up to date.
+        Only this slide is rendered, and only if its content changed.
         Returns (path_to_image, was_generated).
         """
-        preview_dir = os.path.join(presentation_dir, ".previews")
-        os.makedirs(preview_dir, exist_ok=True)
-        
-        filename = f"slide.{slide_number:03d}.png"
-        filepath = os.path.join(preview_dir, filename)
+        cache = SlidePreviewCache(presentation_dir)
+        filepath = cache.preview_path(slide_number)
         
-        md_path = os.path.join(presentation_dir, "deck.marp.md")
+        if force and os.path.exists(filepath):
+            os.unlink(filepath)
         
-        needs_gen = False
-        if force or not os.path.exists(filepath):
-            needs_gen = True
-        elif os.path.exists(md_path):
-            if os.path.getmtime(md_path) > os.path.getmtime(filepath):
-                needs_gen = True
+        before = os.path.getmtime(filepath) if os.path.exists(filepath) else None
+        try:
+            cache.render_slide(slide_number)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Marp generation failed: {e.stderr.decode() if e.stderr else e}")
+            return None, False
+        except Exception as e:
+            logger.error(f"VisualQA generation error: {e}")
+            return None, False
         
-        if needs_gen:
-            print(f"[DEBUG] Generating previews for {presentation_dir}...")
-            try:
-                # Generate only the specific slide if possible to save time?
-                # Marp CLI doesn't easily support single slide render without splitting file.
-                # But we can render all.
-                # Optimization: If deck is large, this is slow.
-                # But for now, correctness > speed.
-                subprocess.run(
-                    [
-                        'npx', '@marp-team/marp-cli',
-                        'deck.marp.md',
-                        '--images', 'png',
-                        '--output', os.path.join('.previews', 'slide.png'),
-                        '--allow-local-files'
-                    ],
-                    cwd=presentation_dir,
-                    check=True,
-                    capture_output=True,
-                    timeout=30
-                )
-                if os.path.exists(filepath):
-                    return filepath, True
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Marp generation failed: {e.stderr.decode()}")
-                return None, False
-            except Exception as e:
-                logger.error(f"VisualQA generation error: {e}")
-                return None, False
-                
         if os.path.exists(filepath):
-            return filepath, False
+            return filepath, before is None or os.path.getmtime(filepath) != before
         return None, False
@@ -2,12 +2,21 @@ import os
 import json
 import time
 import threading
-import yaml
 from flask import Flask, request, jsonify, Response, stream_with_context, send_file, send_from_directory
 from flask_cors import CORS
 from deckbot.manager import PresentationManager
 from deckbot.session_service import SessionService
 from deckbot.preferences import PreferencesManager
+from deckbot.render_coordinator import compile_deck
+from deckbot.compile_jobs import CompileJobManager
+from deckbot.render_scheduler import BACKGROUND, get_render_scheduler
+from deckbot.preview_cache import SlidePreviewCache
+from deckbot.asset_index import get_asset_index
+from deckbot.deck_document import load_deck
+from deckbot.layout_catalog import get_layout_catalog
+from deckbot.layout_previews import LayoutPreviewCache, warm_layout_previews
+from deckbot.template_previews import template_previews, warm_template_previews
+from deckbot.tracing import read_traces, tracing_enabled
 
 # Determine if we're in development mode (Vite dev server) or production (serving built files)
 DEVELOPMENT = os.getenv('FLASK_ENV') == 'development'
@@ -18,6 +27,9 @@ CORS(app)  # Enable CORS for development
 # Global service instance (single user for now)
 current_service = None
 
+# Background compile jobs started by the web API
+compile_jobs = CompileJobManager()
+
 # Backend API URL for frontend to use
 backend_api_url = None
 
@@ -130,15 +142,11 @@ def list_presentations():
         
         # Get slide count
         if os.path.exists(deck_path):
-            with open(deck_path, 'r') as f:
-                content = f.read()
-                # Count slides (separated by ---)
-                slide_count = len(content.split('\n---\n'))
-                pres['slide_count'] = slide_count
-                
-                # Get last modified
-                mtime = os.path.getmtime(deck_path)
-                pres['last_modified'] = datetime.fromtimestamp(mtime).isoformat()
+            pres['slide_count'] = load_deck(deck_path).slide_count
+            
+            # Get last modified
+            mtime = os.path.getmtime(deck_path)
+            pres['last_modified'] = datetime.fromtimestamp(mtime).isoformat()
         else:
             pres['slide_count'] = 0
             pres['last_modified'] = pres.get('created_at', '')
@@ -147,8 +155,6 @@ def list_presentations():
 
 @app.route('/api/presentations/create', methods=['POST'])
 def create_presentation():
-    import subprocess
-    
     data = request.json
     name = data.get('name')
     description = data.get('description', '')
@@ -169,12 +175,7 @@ def create_presentation():
         # Compile the presentation immediately so preview works
         presentation_dir = os.path.join(manager.root_dir, name)
         try:
-            subprocess.run(
-                ["npx", "@marp-team/marp-cli", "deck.marp.md", "--allow-local-files"],
-                cwd=presentation_dir,
-                check=True,
-                capture_output=True
-            )
+            compile_deck(presentation_dir, capture_output=True)
         except Exception as e:
             # Don't fail creation if compilation fails, just log it
             print(f"Warning: Failed to compile presentation on creation: {e}")
@@ -216,11 +217,7 @@ def list_templates():
         
         # Get slide count
         if os.path.exists(deck_path):
-            with open(deck_path, 'r') as f:
-                content = f.read()
-                # Count slides (separated by ---)
-                slide_count = len(content.split('\n---\n'))
-                template['slide_count'] = slide_count
+            template['slide_count'] = load_deck(deck_path).slide_count
         else:
             template['slide_count'] = 0
     
@@ -247,7 +244,6 @@ def delete_template():
 def get_presentation_preview_slides(name):
     """Generate and return cached PNG previews of all slides for a presentation."""
     import subprocess
-    import glob
     
     manager = PresentationManager()
     pres_dir = os.path.join(manager.root_dir, name)
@@ -259,48 +255,14 @@ def get_presentation_preview_slides(name):
     if not os.path.exists(deck_path):
         return jsonify({"error": "Presentation source not found"}), 404
     
-    # Create cache directory
-    cache_dir = os.path.join(pres_dir, ".previews")
-    os.makedirs(cache_dir, exist_ok=True)
-    
-    # Check if previews exist
-    existing_previews = sorted(glob.glob(os.path.join(cache_dir, "slide.*.png")))
-    
-    # Check if deck was modified after previews were generated
-    needs_regeneration = False
-    if not existing_previews:
-        needs_regeneration = True
-    else:
-        deck_mtime = os.path.getmtime(deck_path)
-        preview_mtime = os.path.getmtime(existing_previews[0])
-        if deck_mtime > preview_mtime:
-            needs_regeneration = True
-    
-    if needs_regeneration:
-        try:
-            # Generate preview images using Marp CLI
-            subprocess.run(
-                [
-                    'npx', '@marp-team/marp-cli',
-                    'deck.marp.md',
-                    '--images', 'png',
-                    '--output', os.path.join('.previews', 'slide.png'),
-                    '--allow-local-files'
-                ],
-                cwd=pres_dir,
-                check=True,
-                capture_output=True,
-                timeout=30
-            )
-            
-            # Refresh the list of previews
-            existing_previews = sorted(glob.glob(os.path.join(cache_dir, "slide.*.png")))
-            
-        except subprocess.TimeoutExpired:
-            return jsonify({"error": "Preview generation timed out"}), 500
-        except Exception as e:
-            print(f"Error generating previews for {name}: {e}")
-            return jsonify({"error": str(e)}), 500
+    # Re-render only the slides whose content changed since the last render
+    try:
+        existing_previews = SlidePreviewCache(pres_dir).ensure(timeout=30, priority=BACKGROUND)
+    except subprocess.TimeoutExpired:
+        return jsonify({"error": "Preview generation timed out"}), 500
+    except Exception as e:
+        print(f"Error generating previews for {name}: {e}")
+        return jsonify({"error": str(e)}), 500
     
     # Return URLs for all preview images
     preview_urls = []
@@ -322,10 +284,7 @@ def serve_presentation_preview(name, filename):
 
 @app.route('/api/templates/<path:name>/preview-slides')
 def get_template_preview_slides(name):
-    """Generate and return cached PNG previews of all slides for a template."""
-    import subprocess
-    import glob
-    
+    """Return the URLs of a template's slide previews (built by template_previews)."""
     manager = PresentationManager()
     template_dir = os.path.join(manager.templates_dir, name)
     
@@ -336,35 +295,13 @@ def get_template_preview_slides(name):
     if not os.path.exists(deck_path):
         return jsonify({"error": "Template source not found"}), 404
     
-    # Create cache directory
-    cache_dir = os.path.join(template_dir, ".previews")
-    os.makedirs(cache_dir, exist_ok=True)
-    
-    # Check if previews exist
-    existing_previews = sorted(glob.glob(os.path.join(cache_dir, "slide.*.png")))
-    
-    # Check if deck was modified after previews were generated
-    needs_regeneration = False
-    if not existing_previews:
-        needs_regeneration = True
-    else:
-        deck_mtime = os.path.getmtime(deck_path)
-        preview_mtime = os.path.getmtime(existing_previews[0])
-        if deck_mtime > preview_mtime:
-            needs_regeneration = True
-    
-    if needs_regeneration:
-        # For templates, return empty previews if not cached
-        # Templates are static so we pre-generate their previews
+    previews = template_previews(manager.templates_dir, name)
+    if previews is None:
+        # Missing or outdated: build in the background, the next request gets them
+        warm_template_previews(manager.templates_dir, names=[name])
         return jsonify({"previews": []})
     
-    # Return URLs for all preview images
-    preview_urls = []
-    for preview_path in existing_previews:
-        filename = os.path.basename(preview_path)
-        url = f"/api/templates/{name}/.previews/{filename}"
-        preview_urls.append(url)
-    
+    preview_urls = [f"/api/templates/{name}/.previews/{filename}" for filename in previews]
     return jsonify({"previews": preview_urls})
 
 @app.route('/api/templates/<path:name>/.previews/<filename>')
@@ -399,48 +336,9 @@ def get_layouts():
     if not current_service:
         return jsonify({"error": "No presentation loaded"}), 400
     
-    pres_dir = current_service.agent.presentation_dir
-    layouts_path = os.path.join(pres_dir, "layouts.md")
-    
-    if not os.path.exists(layouts_path):
-        return jsonify({"layouts": []})
-    
     try:
-        with open(layouts_path, "r") as f:
-            content = f.read()
-        
-        import re
-        
-        # Split by --- to get individual slides
-        slides = content.split('\n---\n')
-        
-        layouts = []
-        for i, slide in enumerate(slides):
-            # Look for layout name in HTML comment
-            match = re.search(r'<!-- layout: ([\w-]+) -->', slide)
-            if match:
-                layout_name = match.group(1)
-                # Skip front matter slide
-                if slide.strip().startswith('---'):
-                    continue
-                
-                # Parse metadata from HTML comments
-                image_friendly = re.search(r'<!-- image-friendly: (true|false) -->', slide)
-                aspect_ratio = re.search(r'<!-- recommended-aspect-ratio: ([\d:]+) -->', slide)
-                image_position = re.search(r'<!-- image-position: ([\w-]+) -->', slide)
-                description = re.search(r'<!-- description: (.+?) -->', slide)
-                
-                layouts.append({
-                    "name": layout_name,
-                    "content": slide.strip(),
-                    "index": i,
-                    "image_friendly": image_friendly.group(1) == "true" if image_friendly else False,
-                    "recommended_aspect_ratio": aspect_ratio.group(1) if aspect_ratio else None,
-                    "image_position": image_position.group(1) if image_position else None,
-                    "description": description.group(1) if description else None
-                })
-        
-        return jsonify({"layouts": layouts})
+        catalog = get_layout_catalog(current_service.agent.presentation_dir)
+        return jsonify({"layouts": catalog.layouts if catalog else []})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -661,6 +559,8 @@ def load_presentation():
         return jsonify({"error": "Presentation not found"}), 404
         
     current_service = SessionService(presentation)
+    # Render layout previews before the user opens the layout picker
+    warm_layout_previews(current_service.agent.presentation_dir)
 
     # Note: State is now managed in frontend localStorage (no backend persistence)
 
@@ -847,92 +747,26 @@ def select_layout():
 
 @app.route('/api/layouts/<layout_name>/preview')
 def get_layout_preview(layout_name):
-    """Generate and serve a preview image for a layout."""
+    """Serve the preview image of a layout, rendering missing previews in one pass."""
     global current_service
     if not current_service:
         return "No presentation loaded", 404
     
     import subprocess
-    import tempfile
-    import hashlib
     
     pres_dir = current_service.agent.presentation_dir
-    layouts_path = os.path.join(pres_dir, "layouts.md")
-    
-    if not os.path.exists(layouts_path):
+    catalog = get_layout_catalog(pres_dir)
+    if catalog is None:
         return "Layouts file not found", 404
-    
-    # Create cache directory for preview images
-    cache_dir = os.path.join(pres_dir, ".layout-previews")
-    os.makedirs(cache_dir, exist_ok=True)
-    
-    # Generate cache key from layout name
-    cache_key = hashlib.md5(layout_name.encode()).hexdigest()
-    preview_path = os.path.join(cache_dir, f"{cache_key}.png")
-    
-    # Return cached preview if it exists
-    if os.path.exists(preview_path):
-        return send_file(preview_path, mimetype='image/png')
+    if catalog.get(layout_name) is None:
+        return "Layout not found", 404
     
     try:
-        # Read layouts file
-        with open(layouts_path, "r") as f:
-            content = f.read()
-        
-        # Extract the specific layout
-        import re
-        pattern = f'<!-- layout: {re.escape(layout_name)} -->.*?(?=\n---\n|$)'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if not match:
-            return "Layout not found", 404
-        
-        layout_content = match.group(0)
-        
-        # Extract front matter from layouts.md (CSS styles)
-        front_matter = ""
-        if content.startswith('---'):
-            parts = content.split('\n---\n', 2)
-            if len(parts) >= 2:
-                front_matter = '---\n' + parts[1] + '\n---\n'
-        
-        # Create a temporary markdown file with just this layout
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as tmp:
-            tmp.write(front_matter)
-            tmp.write('\n')
-            tmp.write(layout_content)
-            tmp_path = tmp.name
-        
-        try:
-            # Generate preview image using Marp CLI
-            subprocess.run(
-                [
-                    'npx', '@marp-team/marp-cli',
-                    tmp_path,
-                    '--image', 'png',
-                    '--output', preview_path,
-                    '--allow-local-files'
-                ],
-                check=True,
-                capture_output=True,
-                timeout=10
-            )
-            
-            # Marp CLI outputs slide-001.png, rename to our cache key
-            generated_path = preview_path.replace('.png', '-001.png')
-            if os.path.exists(generated_path):
-                os.rename(generated_path, preview_path)
-            
-            if os.path.exists(preview_path):
-                return send_file(preview_path, mimetype='image/png')
-            else:
-                return "Failed to generate preview", 500
-                
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-                
+        preview_path = LayoutPreviewCache(pres_dir).preview(layout_name)
+        if preview_path:
+            # The URL stays the same when a layout changes, so make browsers revalidate
+            return send_file(preview_path, mimetype='image/png', max_age=0)
+        return "Failed to generate preview", 500
     except subprocess.TimeoutExpired:
         return "Preview generation timed out", 500
     except Exception as e:
@@ -980,6 +814,20 @@ def events():
 
     return Response(stream_with_context(stream()), mimetype='text/event-stream')
 
+def _submit_compile(presentation_dir, reason=None):
+    """Start a background compile job that reports progress to the current session."""
+    service = current_service
+    notify = service.publish if service else None
+    return compile_jobs.submit(presentation_dir, notify=notify, reason=reason)
+
+@app.route('/api/compile/<job_id>', methods=['GET'])
+def get_compile_job(job_id):
+    """Status of a background compile job."""
+    job = compile_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Compile job not found"}), 404
+    return jsonify(job.to_dict())
+
 @app.route('/api/presentation/settings', methods=['GET'])
 def get_presentation_settings():
     global current_service
@@ -1004,19 +852,10 @@ def get_presentation_settings():
     marp_path = os.path.join(manager.root_dir, pres_name, "deck.marp.md")
     if os.path.exists(marp_path):
         try:
-            with open(marp_path, "r") as f:
-                content = f.read()
-            if content.startswith('---'):
-                parts = content.split('\n---\n', 2)
-                if len(parts) >= 2:
-                    front_matter = parts[0][3:]  # Remove leading ---
-                    try:
-                        fm_data = yaml.safe_load(front_matter) or {}
-                        if 'title' in fm_data:
-                            title = fm_data['title']
-                    except:
-                        pass
-        except:
+            fm_data = load_deck(marp_path).front_matter
+            if 'title' in fm_data:
+                title = fm_data['title']
+        except OSError:
             pass
         
     return jsonify({
@@ -1083,23 +922,22 @@ def set_presentation_settings():
         if font_settings:
             manager.set_presentation_font_settings(pres_name, font_settings)
         
-        # Recompile
-        if presentation_dir and os.path.exists(presentation_dir):
-            import subprocess
-            subprocess.run(["npx", "@marp-team/marp-cli", "deck.marp.md", "--allow-local-files"], 
-                          cwd=presentation_dir, check=True)
-        elif pres_name:
+        # Recompile in the background; progress is streamed over /events
+        if not (presentation_dir and os.path.exists(presentation_dir)):
             # Fallback: construct path
             presentation_dir = os.path.join(manager.root_dir, pres_name)
-            if os.path.exists(presentation_dir):
-                import subprocess
-                subprocess.run(["npx", "@marp-team/marp-cli", "deck.marp.md", "--allow-local-files"], 
-                              cwd=presentation_dir, check=True)
+        job = None
+        if os.path.exists(presentation_dir):
+            job = _submit_compile(presentation_dir, reason="settings")
             
     except Exception as e:
-        return jsonify({"error": f"Settings saved but compile failed: {e}"}), 500
+        return jsonify({"error": f"Failed to save settings: {e}"}), 500
              
-    return jsonify({"message": "Settings updated"})
+    response = {"message": "Settings updated"}
+    if job:
+        response["compile_job"] = job.to_dict()
+        return jsonify(response), 202
+    return jsonify(response)
 
 @app.route('/api/presentation/style', methods=['GET'])
 def get_style_spec():
@@ -1270,6 +1108,33 @@ def export_pdf():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/presentation/assets', methods=['GET'])
+def get_presentation_assets():
+    """Which slides reference which assets, plus missing and unused assets."""
+    global current_service
+    if not current_service:
+        return jsonify({"error": "No presentation loaded"}), 400
+    return jsonify(get_asset_index(current_service.agent.presentation_dir).report())
+
+@app.route('/api/traces', methods=['GET'])
+def get_traces():
+    """Timed spans of the current presentation's recent agent turns (newest last)."""
+    global current_service
+    if not current_service:
+        return jsonify({"error": "No presentation loaded"}), 400
+    limit = request.args.get('limit', default=20, type=int)
+    if limit < 1:
+        return jsonify({"error": "limit must be a positive number"}), 400
+    return jsonify({
+        "enabled": tracing_enabled(),
+        "traces": read_traces(current_service.agent.presentation_dir, limit=limit)
+    })
+
+@app.route('/api/render/queue', methods=['GET'])
+def get_render_queue():
+    """Queue depth and throughput of the render scheduler, per priority class."""
+    return jsonify(get_render_scheduler().stats())
+
 @app.route('/api/presentation/files', methods=['GET'])
 def get_presentation_files():
     """Get the file tree structure for the current presentation."""
@@ -1451,30 +1316,14 @@ def save_file():
         with open(full_path, 'w', encoding='utf-8') as f:
             f.write(content)
         
-        # Trigger Marp compilation
-        import subprocess
-        compile_result = {"success": True, "message": ""}
-        try:
-            result = subprocess.run(
-                ["npx", "@marp-team/marp-cli", "deck.marp.md", "--allow-local-files"],
-                cwd=pres_dir,
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            compile_result["message"] = "File saved and presentation recompiled successfully"
-        except subprocess.CalledProcessError as e:
-            compile_result["success"] = False
-            compile_result["message"] = f"File saved but compilation failed: {e.stderr or str(e)}"
-        except Exception as e:
-            compile_result["success"] = False
-            compile_result["message"] = f"File saved but compilation failed: {str(e)}"
+        # Compile in the background so the save returns immediately
+        job = _submit_compile(pres_dir, reason="file-save")
         
         return jsonify({
             "success": True,
             "message": "File saved successfully",
-            "compile": compile_result
-        })
+            "compile": job.to_dict()
+        }), 202
     except Exception as e:
         return jsonify({"error": f"Failed to save file: {str(e)}"}), 500
 
@@ -1690,31 +1539,10 @@ def get_image_prompts():
     aspect_ratio = pres.get("aspect_ratio", "4:3")
     
     # Import and use ImagePromptBuilder
-    from deckbot.nano_banana import ImagePromptBuilder
-    import re
+    from deckbot.nano_banana import ImagePromptBuilder, deck_theme_info
     
     # Extract theme info from deck.marp.md
-    theme_info = ""
-    deck_path = os.path.join(presentation_dir, "deck.marp.md")
-    if os.path.exists(deck_path):
-        try:
-            with open(deck_path, "r") as f:
-                content = f.read()
-            if content.startswith("---"):
-                parts = content.split("---", 2)
-                if len(parts) >= 2:
-                    front_matter = parts[1]
-                    style_match = re.search(r'^style:\s*\|(.+?)(?=^[a-z]+:|\Z)', front_matter, re.MULTILINE | re.DOTALL)
-                    if style_match:
-                        css_block = style_match.group(1).strip()
-                        font_matches = re.findall(r'font-family:\s*[\'"]?([^;\'"]+)', css_block)
-                        color_matches = re.findall(r'color:\s*(#[0-9a-fA-F]{3,6})', css_block)
-                        if font_matches:
-                            theme_info += f"Fonts: {', '.join(font_matches)}. "
-                        if color_matches:
-                            theme_info += f"Colors: {', '.join(color_matches)}. "
-        except Exception:
-            pass
+    theme_info = deck_theme_info(os.path.join(presentation_dir, "deck.marp.md"))
     
     # Check for style reference image
     has_style_ref = os.path.exists(os.path.join(presentation_dir, "images", "style.png"))